@@ -14,15 +14,30 @@ import warnings
 warnings.filterwarnings('ignore')
 
 from scoring_empirico_v2 import ScoringEmpiricoV2
+from calibration_engine import CalibrationEngine, checkpoint_tag, rungs_by_period, simulate_fixed_stops
 
 class AdaptiveCalibrationSystem:
     """
     Sistema que itera la calibración hasta encontrar parámetros aceptables
+    
+    Todas las iteraciones comparten un CalibrationEngine: las combinaciones
+    que el refinamiento vuelve a proponer salen de la tabla memo en lugar
+    de re-simularse.
     """
     
-    def __init__(self, initial_capital=10000):
+    def __init__(self, initial_capital=10000, workers=None, checkpoint_path=None, halving_eta=None):
+        """
+        Args:
+            initial_capital: Capital inicial
+            workers: Procesos para evaluar la rejilla (1 = secuencial); por defecto os.cpu_count()
+            checkpoint_path: Fichero de checkpoint para reanudar una calibración interrumpida
+            halving_eta: Successive halving por períodos (None = rejilla completa)
+        """
         self.initial_capital = initial_capital
         self.scoring_system = ScoringEmpiricoV2()
+        self.workers = workers
+        self.checkpoint_path = checkpoint_path
+        self.halving_eta = halving_eta
         
         # Períodos de calibración
         self.calibration_periods = [
@@ -118,6 +133,9 @@ class AdaptiveCalibrationSystem:
         
         print("✅ Datos cargados exitosamente")
         
+        # Un solo motor: la tabla memo se conserva entre iteraciones
+        engine = self.create_engine()
+        
         # Variables para tracking
         best_global_config = None
         best_global_score = -float('inf')
@@ -139,7 +157,7 @@ class AdaptiveCalibrationSystem:
             self.print_iteration_config(iteration_config)
             
             # Ejecutar calibración para esta iteración
-            best_configs = self.run_iteration(iteration_config)
+            best_configs = self.run_iteration(iteration_config, engine)
             
             # Guardar resultados
             self.iteration_results.append({
@@ -255,7 +273,7 @@ class AdaptiveCalibrationSystem:
         
         return df
     
-    def run_iteration(self, iteration_config):
+    def run_iteration(self, iteration_config, engine=None):
         """Ejecuta una iteración de calibración"""
         
         param_ranges = iteration_config['param_ranges']
@@ -267,19 +285,17 @@ class AdaptiveCalibrationSystem:
         
         print(f"📊 Combinaciones a probar: {total_combinations}")
         
+        engine = engine or self.create_engine()
+        all_results = engine.evaluate(
+            param_combinations,
+            rungs=rungs_by_period(self.calibration_units(), [p['name'] for p in self.calibration_periods])
+        )
+        
         best_configs = []
-        tested = 0
         
-        for params in param_combinations:
-            tested += 1
-            
-            # Mostrar progreso
-            if tested % max(1, total_combinations // 10) == 0:
-                progress = (tested / total_combinations) * 100
-                print(f"  • Progreso: {progress:.0f}% ({tested}/{total_combinations})")
-            
-            # Probar configuración
-            results = self.test_configuration(params)
+        for params, results in zip(param_combinations, all_results):
+            if results is None:  # Podada por el successive halving
+                continue
             
             # Evaluar si cumple objetivos
             if self.meets_objectives(results, target_metrics):
@@ -369,17 +385,48 @@ class AdaptiveCalibrationSystem:
     def test_configuration(self, params):
         """Prueba una configuración específica"""
         
-        all_trades = []
-        period_performance = {}
+        unit_trades = []
         
         for symbol, symbol_data in self.market_data.items():
             for period_name, data in symbol_data.items():
                 trades = self.backtest_with_params(symbol, data, params, period_name)
-                all_trades.extend(trades)
-                
-                if period_name not in period_performance:
-                    period_performance[period_name] = []
-                period_performance[period_name].extend(trades)
+                unit_trades.append(((symbol, period_name), trades))
+        
+        return self.summarize(params, unit_trades)
+    
+    # ===========================================
+    # INTERFAZ DEL MOTOR DE CALIBRACIÓN
+    # ===========================================
+    
+    def create_engine(self):
+        """Motor de calibración sobre self.market_data"""
+        tag = checkpoint_tag('AdaptiveCalibrationSystem', self.market_data, self.calibration_periods, self.iteration_configs)
+        return CalibrationEngine(self, workers=self.workers, checkpoint_path=self.checkpoint_path,
+                                 halving_eta=self.halving_eta, tag=tag)
+    
+    def calibration_units(self):
+        """(símbolo, período) en el orden en que se agregan los trades"""
+        return [(symbol, period_name)
+                for symbol, symbol_data in self.market_data.items()
+                for period_name in symbol_data]
+    
+    def evaluate_unit(self, params, unit):
+        """Trades de una combinación en un (símbolo, período)"""
+        symbol, period_name = unit
+        return self.backtest_with_params(symbol, self.market_data[symbol][period_name], params, period_name)
+    
+    def summarize(self, params, unit_trades):
+        """Resultados de una configuración a partir de los trades por unidad"""
+        
+        all_trades = []
+        period_performance = {}
+        
+        for (symbol, period_name), trades in unit_trades:
+            all_trades.extend(trades)
+            
+            if period_name not in period_performance:
+                period_performance[period_name] = []
+            period_performance[period_name].extend(trades)
         
         # Calcular métricas
         if all_trades:
@@ -409,8 +456,17 @@ class AdaptiveCalibrationSystem:
             'period_performance': period_performance
         }
     
-    def backtest_with_params(self, symbol, data, params, period_name):
-        """Ejecuta backtest con parámetros específicos"""
+    def rank(self, results):
+        """Orden para el successive halving"""
+        return self.calculate_score(results)
+    
+    def backtest_with_params(self, symbol, data, params, period_name, vectorized=True):
+        """
+        Ejecuta backtest con parámetros específicos
+        
+        vectorized: True calcula las señales por arrays y simula sobre listas;
+            False el bucle por vela original (referencia de paridad)
+        """
         
         trades = []
         position = None
@@ -422,6 +478,18 @@ class AdaptiveCalibrationSystem:
         # Ajustar parámetros según tipo de mercado
         adjusted_params = self.adjust_params_for_market(params, period_type)
         
+        if vectorized:
+            # check_exit_conditions sólo añade salidas con duration_days, que
+            # una posición abierta todavía no tiene: bastan stop y target
+            direction, score = self.generate_adaptive_signals(data, adjusted_params, period_type)
+            return simulate_fixed_stops(
+                data, direction, score, adjusted_params['min_score'],
+                adjusted_params['stop_loss_pct'], adjusted_params['take_profit_pct'],
+                adjusted_params['leverage_base'], symbol,
+                extra_fields={'period': period_name, 'market_type': period_type},
+                track_duration=True
+            )
+        
         # Iterar por los datos
         for i in range(20, len(data)):
             current = data.iloc[i]
@@ -594,6 +662,45 @@ class AdaptiveCalibrationSystem:
         except Exception as e:
             return None, 0
     
+    def generate_adaptive_signals(self, data, params, market_type):
+        """generate_adaptive_signal para todas las velas: (dirección, score) como arrays"""
+        
+        close = data['Close'].to_numpy(dtype=float)
+        rsi = data['RSI'].to_numpy(dtype=float)
+        macd = data['MACD'].to_numpy(dtype=float)
+        macd_signal = data['MACD_Signal'].to_numpy(dtype=float)
+        bb_position = data['BB_Position'].to_numpy(dtype=float)
+        volume_ratio = data['Volume_Ratio'].to_numpy(dtype=float)
+        atr_ratio = data['ATR_Ratio'].to_numpy(dtype=float)
+        ema_20 = data['EMA_20'].to_numpy(dtype=float)
+        high_volume = (volume_ratio > 1.2).astype(int)
+        
+        long_conditions = (2 * (rsi <= params['rsi_oversold']) + (macd > macd_signal)
+                           + (bb_position <= 0.2) + high_volume + (close > ema_20))
+        short_conditions = (2 * (rsi >= params['rsi_overbought']) + (macd < macd_signal)
+                            + (bb_position >= 0.8) + high_volume + (close < ema_20))
+        
+        is_long = long_conditions >= 3
+        is_short = ~is_long & (short_conditions >= 3)
+        
+        score = np.zeros(len(close))
+        score[is_long] = params['min_score'] + (long_conditions[is_long] - 3) * 0.5
+        score[is_short] = params['min_score'] + (short_conditions[is_short] - 3) * 0.5
+        
+        # Bonus por tipo de mercado
+        if market_type == 'BULL':
+            score[is_long] += 0.5
+        elif market_type == 'RECOVERY':
+            score[is_long] += 0.3
+        elif market_type == 'BEAR':
+            score[is_short] += 0.5
+        
+        # Ajuste por volatilidad
+        score = np.where(atr_ratio > 0.03, score - 0.3, np.where(atr_ratio < 0.015, score + 0.2, score))
+        
+        direction = is_long.astype(np.int8) - is_short.astype(np.int8)
+        return direction, score
+    
     def check_exit_conditions(self, position, current, params):
         """Verifica condiciones de salida adaptativas"""
         
@@ -882,7 +989,9 @@ def main():
     print("🚀 INICIANDO CALIBRACIÓN ADAPTATIVA ITERATIVA")
     print("="*80)
     
-    calibrator = AdaptiveCalibrationSystem(initial_capital=10000)
+    # Poda por períodos (eta=3) y checkpoint para poder reanudar
+    calibrator = AdaptiveCalibrationSystem(initial_capital=10000, halving_eta=3,
+                                           checkpoint_path='adaptive_calibration_checkpoint.pkl')
     
     # Ejecutar calibración adaptativa
     best_config = calibrator.run_adaptive_calibration()
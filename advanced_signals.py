@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 import json
 from typing import Dict, List, Tuple, Optional
 from liquidity_pools import LiquidityPoolDetector
+from pivot_index import get_pivot_view
 
 class AdvancedSignalDetector:
     """Detector avanzado de señales basado en estructura de mercado"""
@@ -70,26 +71,11 @@ class AdvancedSignalDetector:
         # Análisis de Higher Highs (HH) y Higher Lows (HL)
         recent_df = df.tail(50)
         
-        # Encontrar máximos y mínimos
-        highs = []
-        lows = []
-        
-        for i in range(1, len(recent_df) - 1):
-            # Máximos locales
-            if recent_df['High'].iloc[i] > recent_df['High'].iloc[i-1] and \
-               recent_df['High'].iloc[i] > recent_df['High'].iloc[i+1]:
-                highs.append({
-                    'index': i,
-                    'price': recent_df['High'].iloc[i]
-                })
-            
-            # Mínimos locales
-            if recent_df['Low'].iloc[i] < recent_df['Low'].iloc[i-1] and \
-               recent_df['Low'].iloc[i] < recent_df['Low'].iloc[i+1]:
-                lows.append({
-                    'index': i,
-                    'price': recent_df['Low'].iloc[i]
-                })
+        # Máximos y mínimos locales (pivotes de orden 1 del índice compartido)
+        view = get_pivot_view(recent_df)
+        high_values, low_values = view.values('High'), view.values('Low')
+        highs = [{'index': int(i), 'price': high_values[i]} for i in view.pivots('high', 1)]
+        lows = [{'index': int(i), 'price': low_values[i]} for i in view.pivots('low', 1)]
         
         if len(highs) >= 2 and len(lows) >= 2:
             # Tendencia alcista: HH y HL
@@ -107,41 +93,37 @@ class AdvancedSignalDetector:
     def find_order_blocks(self, df: pd.DataFrame) -> List[Dict]:
         """Encuentra Order Blocks (zonas institucionales)"""
         order_blocks = []
-        
-        for i in range(10, len(df) - 1):
-            # Bullish Order Block: Vela bajista antes de movimiento alcista fuerte
-            if df['Close'].iloc[i] < df['Open'].iloc[i]:  # Vela bajista
-                # Verificar movimiento alcista después
-                next_candles = df.iloc[i+1:i+4]
-                if len(next_candles) > 0:
-                    total_move = (next_candles['Close'].iloc[-1] - df['Close'].iloc[i]) / df['Close'].iloc[i]
-                    
-                    if total_move > 0.02:  # Movimiento de 2%+
-                        order_blocks.append({
-                            'type': 'BULLISH_OB',
-                            'high': df['High'].iloc[i],
-                            'low': df['Low'].iloc[i],
-                            'strength': total_move * 100,
-                            'index': i
-                        })
-            
-            # Bearish Order Block: Vela alcista antes de movimiento bajista fuerte
-            if df['Close'].iloc[i] > df['Open'].iloc[i]:  # Vela alcista
-                next_candles = df.iloc[i+1:i+4]
-                if len(next_candles) > 0:
-                    total_move = (df['Close'].iloc[i] - next_candles['Close'].iloc[-1]) / df['Close'].iloc[i]
-                    
-                    if total_move > 0.02:
-                        order_blocks.append({
-                            'type': 'BEARISH_OB',
-                            'high': df['High'].iloc[i],
-                            'low': df['Low'].iloc[i],
-                            'strength': total_move * 100,
-                            'index': i
-                        })
+        n = len(df)
+        if n < 12:
+            return order_blocks
+        
+        view = get_pivot_view(df)
+        open_, close = view.values('Open'), view.values('Close')
+        high, low = view.values('High'), view.values('Low')
+        
+        # Cierre de la tercera vela siguiente (o la última disponible)
+        i = np.arange(10, n - 1)
+        exit_close = close[np.minimum(i + 3, n - 1)]
+        
+        # Bullish Order Block: Vela bajista antes de movimiento alcista fuerte (2%+)
+        up_move = (exit_close - close[i]) / close[i]
+        bullish = (close[i] < open_[i]) & (up_move > 0.02)
+        # Bearish Order Block: Vela alcista antes de movimiento bajista fuerte
+        down_move = (close[i] - exit_close) / close[i]
+        bearish = (close[i] > open_[i]) & (down_move > 0.02)
+        
+        for k in np.flatnonzero(bullish | bearish):
+            position = int(i[k])
+            order_blocks.append({
+                'type': 'BULLISH_OB' if bullish[k] else 'BEARISH_OB',
+                'high': high[position],
+                'low': low[position],
+                'strength': (up_move[k] if bullish[k] else down_move[k]) * 100,
+                'index': position
+            })
         
         # Ordenar por cercanía al precio actual
-        current_price = df['Close'].iloc[-1]
+        current_price = close[-1]
         order_blocks.sort(key=lambda x: abs((x['high'] + x['low'])/2 - current_price))
         
         return order_blocks[:3]  # Top 3 más cercanos
@@ -338,7 +320,7 @@ class AdvancedSignalDetector:
         
         # 6. Detectar Pools de Liquidez
         current_price = float(df['Close'].iloc[-1])
-        liquidity_data = self.liquidity_detector.detect_liquidity_pools(df, current_price)
+        liquidity_data = self.liquidity_detector.detect_liquidity_pools(df, current_price, symbol=ticker)
         
         # 7. Precio actual y análisis
         sma50 = float(df['Close'].rolling(50).mean().iloc[-1])
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Audit Log - Auditoría de trading append-only en JSON Lines
+
+Las acciones se encolan en memoria y un hilo escritor las vuelca en lote
+al fichero del día (logs/trading_audit_YYYYMMDD.jsonl), con un único
+write en modo append por lote: el coste por acción ya no crece con el
+tamaño del día y varios escritores no se pisan. Por cada lote se añade una
+línea al índice del día (.idx) con su rango de bytes, su intervalo de
+tiempo y sus símbolos, de modo que las consultas por rango temporal o
+símbolo sólo leen los bloques que pueden contener resultados. Los días
+cerrados pueden comprimirse con gzip.
+
+Los offsets del índice son lógicos: el contenido del día es el .jsonl.gz
+descomprimido seguido del .jsonl. Al comprimir, el .jsonl se añade al .gz
+como un miembro gzip más y el índice anota cuántos bytes lógicos viven ya
+en el .gz, así que un escritor que llega tarde a un día ya comprimido
+empieza un .jsonl nuevo sin invalidar los bloques anteriores. Escritura y
+compresión se serializan con flock sobre el índice del día.
+"""
+
+import os
+import json
+import gzip
+import time
+import atexit
+import shutil
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def _lock(f, exclusive: bool):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _index_end(index) -> Optional[int]:
+    """Fin lógico del día según la última línea del índice (None si está vacío)"""
+    index.seek(0, os.SEEK_END)
+    size = index.tell()
+    tail = 4096
+    while True:
+        index.seek(max(0, size - tail))
+        lines = [line for line in index.read().splitlines() if line.strip()]
+        if not lines:
+            return None
+        if len(lines) > 1 or tail >= size:
+            try:
+                last = json.loads(lines[-1])
+            except json.JSONDecodeError:
+                return None
+            return last['compressed'] if 'compressed' in last else last['offset'] + last['length']
+        tail *= 4
+
+
+class AuditLog:
+    """Sumidero de auditoría con escritor en segundo plano y lector indexado"""
+
+    def __init__(self, log_dir: str = "logs", prefix: str = "trading_audit",
+                 max_batch: int = 500, flush_interval: float = 1.0,
+                 compress_closed_days: bool = False):
+        """
+        Args:
+            log_dir: Directorio de los ficheros de auditoría
+            prefix: Prefijo de fichero (prefix_YYYYMMDD.jsonl / .idx)
+            max_batch: Entradas pendientes que disparan un volcado inmediato
+            flush_interval: Segundos máximos que una entrada espera en memoria
+            compress_closed_days: Comprimir con gzip los días anteriores al rotar
+        """
+        # Ruta absoluta: el escritor vuelca más tarde (hilo o atexit) y el cwd puede haber cambiado
+        self.log_dir = os.path.abspath(log_dir)
+        self.prefix = prefix
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.compress_closed_days = compress_closed_days
+
+        self._cond = threading.Condition()
+        self._pending: List[Dict] = []
+        self._oldest: Optional[float] = None
+        self._flush_requested = False
+        self._writing = False
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._current_day: Optional[str] = None
+        self._atexit_registered = False
+
+        self.stats = {
+            'appended': 0,
+            'written': 0,
+            'batches': 0,
+            'errors': 0,
+            'compressed_days': 0
+        }
+
+        os.makedirs(self.log_dir, exist_ok=True)
+
+    # ===========================================
+    # RUTAS
+    # ===========================================
+
+    def data_path(self, day: str) -> str:
+        return os.path.join(self.log_dir, f"{self.prefix}_{day}.jsonl")
+
+    def index_path(self, day: str) -> str:
+        return os.path.join(self.log_dir, f"{self.prefix}_{day}.idx")
+
+    def legacy_path(self, day: str) -> str:
+        """Formato anterior: array JSON reescrito en cada acción"""
+        return os.path.join(self.log_dir, f"{self.prefix}_{day}.json")
+
+    # ===========================================
+    # ESCRITURA
+    # ===========================================
+
+    def append(self, action: str, symbol: str, details: Dict,
+               timestamp: Optional[datetime] = None) -> bool:
+        """Encola una acción (no toca disco en el hilo que llama)"""
+        entry = {
+            'timestamp': (timestamp or datetime.now()).isoformat(),
+            'action': action,
+            'symbol': symbol,
+            'details': dict(details) if isinstance(details, dict) else details
+        }
+        with self._cond:
+            self._pending.append(entry)
+            self.stats['appended'] += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+        self.start()
+        return True
+
+    def start(self):
+        """Arranca el hilo escritor (idempotente)"""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Bloquea hasta que lo encolado hasta ahora esté en disco"""
+        if self._thread is None or not self._thread.is_alive():
+            self._drain()
+            return True
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._pending or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """Vuelca lo pendiente y detiene el escritor"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._drain()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._should_flush():
+                    if self._stopping:
+                        return
+                    timeout = None
+                    if self._oldest is not None:
+                        timeout = max(0.0, self._oldest + self.flush_interval - time.monotonic())
+                    self._cond.wait(timeout)
+                batch = self._take_batch()
+            self._write(batch)
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+    def _should_flush(self) -> bool:
+        """Requiere self._cond"""
+        if not self._pending:
+            self._flush_requested = False
+            return False
+        return (self._stopping or self._flush_requested
+                or len(self._pending) >= self.max_batch
+                or time.monotonic() - self._oldest >= self.flush_interval)
+
+    def _take_batch(self) -> List[Dict]:
+        """Requiere self._cond"""
+        batch, self._pending = self._pending, []
+        self._oldest = None
+        self._writing = True
+        return batch
+
+    def _drain(self):
+        with self._cond:
+            if not self._pending:
+                return
+            batch = self._take_batch()
+        self._write(batch)
+        with self._cond:
+            self._writing = False
+            self._cond.notify_all()
+
+    def _write(self, batch: List[Dict]):
+        """Un append por día presente en el lote, más su línea de índice"""
+        by_day: Dict[str, List[Dict]] = {}
+        for entry in batch:
+            by_day.setdefault(entry['timestamp'][:10].replace('-', ''), []).append(entry)
+
+        for day, entries in sorted(by_day.items()):
+            try:
+                self._append_block(day, entries)
+                self.stats['written'] += len(entries)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error escribiendo auditoría {day}: {e}")
+        self.stats['batches'] += 1
+
+        latest = max(by_day)
+        if latest != self._current_day:
+            previous, self._current_day = self._current_day, latest
+            if previous is not None and self.compress_closed_days:
+                self.compress_before(latest)
+
+    def _append_block(self, day: str, entries: List[Dict]):
+        payload = ''.join(json.dumps(entry, default=str) + '\n' for entry in entries).encode('utf-8')
+        with open(self.index_path(day), 'a+') as index:
+            _lock(index, exclusive=True)
+            try:
+                # El .jsonl se abre con el lock: una compresión concurrente pudo retirarlo
+                with open(self.data_path(day), 'ab') as data:
+                    data.seek(0, os.SEEK_END)
+                    end = _index_end(index)
+                    offset = end if end is not None else data.tell()
+                    data.write(payload)
+                    data.flush()
+                index.write(json.dumps({
+                    'offset': offset,
+                    'length': len(payload),
+                    'count': len(entries),
+                    'start': min(e['timestamp'] for e in entries),
+                    'end': max(e['timestamp'] for e in entries),
+                    'symbols': sorted({str(e['symbol']) for e in entries})
+                }) + '\n')
+                index.flush()
+            finally:
+                _unlock(index)
+
+    # ===========================================
+    # ROTACIÓN / COMPRESIÓN
+    # ===========================================
+
+    def days(self) -> List[str]:
+        """Días con auditoría (cualquier formato), ordenados"""
+        days = set()
+        start = f"{self.prefix}_"
+        for name in os.listdir(self.log_dir):
+            if name.startswith(start) and name.endswith(('.jsonl', '.jsonl.gz', '.json')):
+                day = name[len(start):].split('.')[0]
+                if len(day) == 8 and day.isdigit():
+                    days.add(day)
+        return sorted(days)
+
+    def compress_before(self, day: str) -> int:
+        """
+        Comprime los .jsonl de días anteriores a `day`; devuelve cuántos
+
+        El .jsonl se añade al .gz existente como un miembro nuevo (nunca lo
+        trunca), con el mismo lock que los escritores.
+        """
+        compressed = 0
+        for other in self.days():
+            path = self.data_path(other)
+            if other >= day or not os.path.exists(path):
+                continue
+            with open(self.index_path(other), 'a+') as index:
+                _lock(index, exclusive=True)
+                try:
+                    if not os.path.exists(path):
+                        continue  # otro escritor lo comprimió mientras tanto
+                    with open(path, 'rb') as src, gzip.open(path + '.gz', 'ab') as dst:
+                        shutil.copyfileobj(src, dst)
+                    end = _index_end(index)
+                    if end is not None:
+                        index.write(json.dumps({'compressed': end}) + '\n')
+                        index.flush()
+                    os.remove(path)
+                finally:
+                    _unlock(index)
+            compressed += 1
+        self.stats['compressed_days'] += compressed
+        return compressed
+
+    # ===========================================
+    # LECTURA INDEXADA
+    # ===========================================
+
+    def query(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+              symbol: Optional[str] = None, action: Optional[str] = None) -> List[Dict]:
+        """Entradas con start <= timestamp <= end (y símbolo / acción), en orden de escritura"""
+        return list(self.iter_entries(start, end, symbol, action))
+
+    def iter_entries(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     symbol: Optional[str] = None, action: Optional[str] = None) -> Iterator[Dict]:
+        lower = start.isoformat() if start else None
+        upper = end.isoformat() if end else None
+        first_day = start.strftime('%Y%m%d') if start else None
+        last_day = end.strftime('%Y%m%d') if end else None
+
+        for day in self.days():
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            for entry in self._read_day(day, lower, upper, symbol):
+                ts = entry['timestamp']
+                if lower and ts < lower:
+                    continue
+                if upper and ts > upper:
+                    continue
+                if symbol and entry['symbol'] != symbol:
+                    continue
+                if action and entry['action'] != action:
+                    continue
+                yield entry
+
+    def _read_day(self, day: str, lower: Optional[str], upper: Optional[str],
+                  symbol: Optional[str]) -> Iterator[Dict]:
+        legacy = self.legacy_path(day)
+        if os.path.exists(legacy):
+            with open(legacy) as f:
+                yield from json.load(f)
+
+        path = self.data_path(day)
+        archive, data, index = None, None, None
+        try:
+            # Índice y ficheros abiertos con el lock compartido: una compresión
+            # posterior no afecta a los descriptores ya abiertos
+            if os.path.exists(self.index_path(day)):
+                index = open(self.index_path(day))
+                _lock(index, exclusive=False)
+            blocks, compressed = self._blocks(day, index)
+            if os.path.exists(path + '.gz'):
+                archive = gzip.open(path + '.gz', 'rb')
+            if os.path.exists(path):
+                data = open(path, 'rb')
+            if index is not None:
+                _unlock(index)
+
+            if blocks is None:   # Sin índice: lectura completa (.gz y luego .jsonl)
+                for f in (archive, data):
+                    for line in f or ():
+                        if line.strip():
+                            yield json.loads(line)
+                return
+            for block in blocks:
+                if lower and block['end'] < lower:
+                    continue
+                if upper and block['start'] > upper:
+                    continue
+                if symbol and symbol not in block['symbols']:
+                    continue
+                if block['offset'] < compressed:
+                    f, offset = archive, block['offset']
+                else:
+                    f, offset = data, block['offset'] - compressed
+                if f is None:
+                    continue
+                f.seek(offset)
+                for line in f.read(block['length']).splitlines():
+                    if line.strip():
+                        yield json.loads(line)
+        finally:
+            for f in (archive, data, index):
+                if f is not None:
+                    f.close()
+
+    def _blocks(self, day: str, index=None):
+        """
+        (bloques, bytes lógicos en el .gz) del índice del día; bloques None
+        si no hay índice utilizable
+        """
+        blocks, compressed = [], 0
+        if index is None:
+            if not os.path.exists(self.index_path(day)):
+                return None, 0
+            with open(self.index_path(day)) as f:
+                return self._blocks(day, f)
+        index.seek(0)
+        for line in index:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Línea de índice truncada (corte a mitad de escritura)
+                return None, 0
+            if 'compressed' in entry:
+                compressed = entry['compressed']
+            else:
+                blocks.append(entry)
+        return (blocks or None), compressed
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'pending': self.pending()}
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        audit = AuditLog(tmp)
+        start = time.perf_counter()
+        for i in range(10_000):
+            audit.append("SIGNAL_GENERATED", ["BTCUSDT", "ETHUSDT", "SOLUSDT"][i % 3],
+                         {'price': 50000 + i, 'confidence': 0.75})
+        enqueue_ms = (time.perf_counter() - start) * 1000
+        audit.flush()
+        total_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        eth = audit.query(symbol="ETHUSDT", start=datetime.now() - timedelta(minutes=5))
+        query_ms = (time.perf_counter() - start) * 1000
+
+        print(f"10000 acciones: encolar {enqueue_ms:.1f}ms, en disco {total_ms:.1f}ms")
+        print(f"Consulta ETHUSDT: {len(eth)} entradas en {query_ms:.1f}ms")
+        print(audit.get_stats())
+        audit.close()
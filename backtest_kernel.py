@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Kernel de Backtesting Vectorizado
+Motor compartido sobre arrays NumPy contiguos
+
+Las entradas se calculan de una vez como máscaras vectorizadas (una
+estrategia enchufable devuelve la dirección de cada vela) y las salidas
+por stop loss / take profit / trailing / señal contraria se resuelven en
+una única pasada sobre arrays, sin df.iloc por vela. Si numba está
+instalado la pasada se compila; si no, corre sobre listas de Python.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+except ImportError:  # numba es opcional
+    njit = None
+
+DAY_NS = 86_400 * 10**9
+
+# Códigos de salida del kernel
+EXIT_STOP_LOSS = 1
+EXIT_TAKE_PROFIT = 2
+EXIT_REVERSAL = 3
+EXIT_END = 4
+
+
+@dataclass
+class MarketArrays:
+    """Velas e indicadores como arrays float64 contiguos"""
+    index: pd.DatetimeIndex
+    times: np.ndarray                      # int64 ns
+    columns: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, columns: Optional[List[str]] = None) -> 'MarketArrays':
+        columns = columns or list(df.columns)
+        return cls(
+            index=df.index,
+            times=df.index.as_unit('ns').asi8,
+            columns={c: np.ascontiguousarray(df[c].to_numpy(dtype=np.float64)) for c in columns}
+        )
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+@dataclass
+class ExitRules:
+    """Reglas de gestión de la posición abierta"""
+    atr_stop_multiplier: float
+    atr_target_multiplier: float
+    risk_per_trade: float
+    max_position_fraction: float
+    min_days_between_entries: float = 0
+    atr_trailing: bool = False             # trailing = Close -/+ ATR * atr_stop_multiplier
+
+
+class KernelStrategy:
+    """
+    Estrategia enchufable para el kernel
+
+    Subclases implementan entry_direction (y opcionalmente exit_masks)
+    de forma vectorizada sobre MarketArrays.
+    """
+
+    warmup = 50
+
+    def entry_direction(self, m: MarketArrays) -> np.ndarray:
+        """int8 por vela: 1 LONG, -1 SHORT, 0 sin entrada"""
+        raise NotImplementedError
+
+    def exit_masks(self, m: MarketArrays):
+        """(salida_long, salida_short) por señal contraria; por defecto ninguna"""
+        empty = np.zeros(len(m), dtype=np.bool_)
+        return empty, empty
+
+    def exit_rules(self) -> ExitRules:
+        raise NotImplementedError
+
+
+def _position_loop(times, high, low, close, atr, direction, long_exit, short_exit,
+                   start, sl_mult, tp_mult, risk_per_trade, max_fraction, min_days,
+                   atr_trailing, capital, has_last, last_entry):
+    """
+    Pasada única vela a vela (estilo compilado: sólo escalares y arrays)
+
+    Reproduce la semántica de los motores por vela: entrada al cierre,
+    salidas evaluadas desde la vela siguiente, stop antes que target.
+    """
+    n = len(close)
+    out_entry = np.empty(n, dtype=np.int64)
+    out_exit = np.empty(n, dtype=np.int64)
+    out_dir = np.empty(n, dtype=np.int64)
+    out_shares = np.empty(n, dtype=np.float64)
+    out_stop = np.empty(n, dtype=np.float64)
+    out_target = np.empty(n, dtype=np.float64)
+    out_exit_price = np.empty(n, dtype=np.float64)
+    out_reason = np.empty(n, dtype=np.int64)
+    out_pnl = np.empty(n, dtype=np.float64)
+
+    count = 0
+    in_position = False
+    pos_entry = 0
+    pos_dir = 0
+    entry_price = 0.0
+    shares = 0.0
+    stop = 0.0
+    target = 0.0
+
+    for i in range(start, n):
+        c = close[i]
+        if not in_position:
+            if has_last and (times[i] - last_entry) // 86400000000000 < min_days:
+                continue
+            d = direction[i]
+            if d == 0:
+                continue
+            a = atr[i]
+            if d > 0:
+                sl = c - (a * sl_mult)
+                tp = c + (a * tp_mult)
+            else:
+                sl = c + (a * sl_mult)
+                tp = c - (a * tp_mult)
+
+            risk_amount = capital * risk_per_trade
+            price_risk = abs(c - sl)
+            size = 0.0
+            if price_risk > 0:
+                size = risk_amount / price_risk
+                max_position = capital * max_fraction
+                if size * c > max_position:
+                    size = max_position / c
+
+            if size > 0:
+                in_position = True
+                pos_entry = i
+                pos_dir = d
+                entry_price = c
+                shares = size
+                stop = sl
+                target = tp
+                has_last = True
+                last_entry = times[i]
+        else:
+            reason = 0
+            exit_price = c
+            if pos_dir > 0:
+                if low[i] <= stop:
+                    reason = 1
+                    exit_price = stop
+                elif high[i] >= target:
+                    reason = 2
+                    exit_price = target
+                else:
+                    if atr_trailing and c > entry_price:
+                        trailing = c - (atr[i] * sl_mult)
+                        if trailing > stop:
+                            stop = trailing
+                    if long_exit[i]:
+                        reason = 3
+            else:
+                if high[i] >= stop:
+                    reason = 1
+                    exit_price = stop
+                elif low[i] <= target:
+                    reason = 2
+                    exit_price = target
+                else:
+                    if atr_trailing and c < entry_price:
+                        trailing = c + (atr[i] * sl_mult)
+                        if trailing < stop:
+                            stop = trailing
+                    if short_exit[i]:
+                        reason = 3
+
+            if reason != 0:
+                if pos_dir > 0:
+                    pnl = (exit_price - entry_price) * shares
+                else:
+                    pnl = (entry_price - exit_price) * shares
+                capital += pnl
+                out_entry[count] = pos_entry
+                out_exit[count] = i
+                out_dir[count] = pos_dir
+                out_shares[count] = shares
+                out_stop[count] = stop
+                out_target[count] = target
+                out_exit_price[count] = exit_price
+                out_reason[count] = reason
+                out_pnl[count] = pnl
+                count += 1
+                in_position = False
+
+    # Posición abierta al final del período: se cierra al último cierre
+    if in_position:
+        exit_price = close[n - 1]
+        if pos_dir > 0:
+            pnl = (exit_price - entry_price) * shares
+        else:
+            pnl = (entry_price - exit_price) * shares
+        out_entry[count] = pos_entry
+        out_exit[count] = n - 1
+        out_dir[count] = pos_dir
+        out_shares[count] = shares
+        out_stop[count] = stop
+        out_target[count] = target
+        out_exit_price[count] = exit_price
+        out_reason[count] = 4
+        out_pnl[count] = pnl
+        count += 1
+
+    return (count, out_entry, out_exit, out_dir, out_shares, out_stop, out_target,
+            out_exit_price, out_reason, out_pnl, capital, has_last, last_entry)
+
+
+_compiled_loop = njit(cache=True)(_position_loop) if njit is not None else None
+
+
+@dataclass
+class KernelResult:
+    """Trades del kernel como arrays (una fila por trade)"""
+    entry_idx: np.ndarray
+    exit_idx: np.ndarray
+    direction: np.ndarray
+    shares: np.ndarray
+    stop_loss: np.ndarray
+    take_profit: np.ndarray
+    entry_price: np.ndarray
+    exit_price: np.ndarray
+    exit_reason: np.ndarray
+    pnl: np.ndarray
+    final_capital: float
+    last_entry_time: Optional[int]
+
+    def __len__(self) -> int:
+        return len(self.entry_idx)
+
+
+def run_kernel(m: MarketArrays, strategy: KernelStrategy, initial_capital: float,
+               last_entry_time: Optional[int] = None) -> KernelResult:
+    """
+    Ejecuta una estrategia sobre MarketArrays
+
+    Args:
+        m: Velas con indicadores (Close, High, Low, ATR y los que use la estrategia)
+        strategy: Estrategia enchufable
+        initial_capital: Capital para el sizing por riesgo (compone con cada trade)
+        last_entry_time: ns de la última entrada previa, para el intervalo mínimo
+    """
+    rules = strategy.exit_rules()
+    direction = np.ascontiguousarray(strategy.entry_direction(m), dtype=np.int8)
+    long_exit, short_exit = strategy.exit_masks(m)
+    close, high, low, atr = m['Close'], m['High'], m['Low'], m['ATR']
+
+    args = (strategy.warmup, float(rules.atr_stop_multiplier), float(rules.atr_target_multiplier),
+            float(rules.risk_per_trade), float(rules.max_position_fraction),
+            rules.min_days_between_entries, bool(rules.atr_trailing), float(initial_capital),
+            last_entry_time is not None, int(last_entry_time or 0))
+
+    if _compiled_loop is not None:
+        out = _compiled_loop(m.times, high, low, close, atr, direction,
+                             np.asarray(long_exit, dtype=np.bool_), np.asarray(short_exit, dtype=np.bool_), *args)
+    else:
+        # Sin numba: listas de Python (acceso escalar mucho más barato que ndarray)
+        out = _position_loop(m.times.tolist(), high.tolist(), low.tolist(), close.tolist(), atr.tolist(),
+                             direction.tolist(), np.asarray(long_exit).tolist(),
+                             np.asarray(short_exit).tolist(), *args)
+
+    (count, entry_idx, exit_idx, dirs, shares, stops, targets,
+     exit_price, reason, pnl, capital, has_last, last_entry) = out
+    entry_idx = entry_idx[:count]
+    return KernelResult(
+        entry_idx=entry_idx,
+        exit_idx=exit_idx[:count],
+        direction=dirs[:count],
+        shares=shares[:count],
+        stop_loss=stops[:count],
+        take_profit=targets[:count],
+        entry_price=close[entry_idx],
+        exit_price=exit_price[:count],
+        exit_reason=reason[:count],
+        pnl=pnl[:count],
+        final_capital=capital,
+        last_entry_time=int(last_entry) if has_last else None
+    )
+
+
+def cross_above(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """prev a < prev b y a > b (False en la primera vela)"""
+    out = np.zeros(len(a), dtype=np.bool_)
+    out[1:] = (a[:-1] < b[:-1]) & (a[1:] > b[1:])
+    return out
+
+
+def cross_below(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """prev a > prev b y a < b (False en la primera vela)"""
+    out = np.zeros(len(a), dtype=np.bool_)
+    out[1:] = (a[:-1] > b[:-1]) & (a[1:] < b[1:])
+    return out
+
+
+def shift(a: np.ndarray, fill=np.nan) -> np.ndarray:
+    """Valor de la vela anterior"""
+    out = np.empty_like(a)
+    out[0] = fill
+    out[1:] = a[:-1]
+    return out
@@ -16,6 +16,33 @@ from error_handler import error_handler, TradingErrorContext
 from signal_validator import signal_validator
 from paper_trading_enhanced import PaperTradingEnhanced
 from trading_config import get_asset_type, get_strategy_config, get_recommended_strategies
+from strategy_optimizer import StrategyOptimizer
+
+
+# ===========================================
+# EVALUACIÓN DE TRIALS (WORKERS DEL OPTIMIZADOR)
+# ===========================================
+
+# Estado de cada proceso del pool; el camino en proceso (workers=1) no lo usa
+_optimizer_state = {}
+
+
+def _init_optimizer(system_class, config, df, symbol, strategy, initial_capital):
+    """Prepara en cada worker del pool un sistema y las velas compartidas por todos los trials"""
+    system = system_class()
+    system.config = dict(config)
+    _optimizer_state.update(system=system, df=df, symbol=symbol, strategy=strategy,
+                            initial_capital=initial_capital)
+
+
+def _evaluate_parameters(params):
+    """Trial del optimizador: (optimization_score, métricas)"""
+    state = _optimizer_state
+    metrics = state['system'].evaluate_parameters(
+        state['df'], state['symbol'], state['strategy'], params, state['initial_capital']
+    )
+    return BacktestSystemV2.optimization_score(metrics), metrics
+
 
 class BacktestSystemV2:
     """
@@ -70,8 +97,13 @@ class BacktestSystemV2:
             performance_monitor.end_timer("fetch_historical_data", start_timer)
             return pd.DataFrame()
     
-    def generate_signals(self, df: pd.DataFrame, strategy: str = "momentum", symbol: str = None) -> pd.DataFrame:
-        """Genera señales de trading basadas en la estrategia y tipo de activo"""
+    def generate_signals(self, df: pd.DataFrame, strategy: str = "momentum", symbol: str = None,
+                         params: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        Genera señales de trading basadas en la estrategia y tipo de activo
+        
+        params: Sobrescribe la configuración del activo (rsi_buy, bb_std, ema_fast...)
+        """
         
         if df.empty or len(df) < self.config['min_data_points']:
             return df
@@ -87,6 +119,9 @@ class BacktestSystemV2:
             asset_type = 'LARGE_CAP'  # Default
             config = {}
         
+        if params:
+            config = {**config, **params}
+        
         if strategy == "momentum":
             # Configuración adaptativa por tipo de activo
             rsi_buy = config.get('rsi_buy', 30)
@@ -208,11 +243,11 @@ class BacktestSystemV2:
         entry_price = 0
         entry_time = None
         
-        for i, row in df.iterrows():
-            if row['position'] != position:
+        for i, row_position, close in zip(df.index, df['position'].tolist(), df['Close'].tolist()):
+            if row_position != position:
                 if position != 0:
                     # Cerrar posición anterior
-                    exit_price = row['Close'] * (1 - self.config['slippage'] * np.sign(position))
+                    exit_price = close * (1 - self.config['slippage'] * np.sign(position))
                     
                     # Calcular P&L
                     if position > 0:  # Long
@@ -234,9 +269,9 @@ class BacktestSystemV2:
                     })
                 
                 # Abrir nueva posición
-                if row['position'] != 0:
-                    position = row['position']
-                    entry_price = row['Close'] * (1 + self.config['slippage'] * np.sign(position))
+                if row_position != 0:
+                    position = row_position
+                    entry_price = close * (1 + self.config['slippage'] * np.sign(position))
                     entry_time = i
                 else:
                     position = 0
@@ -311,9 +346,10 @@ class BacktestSystemV2:
         strategy: str = "momentum",
         interval: str = "1h",
         days_back: int = 30,
-        initial_capital: float = None
+        initial_capital: float = None,
+        params: Optional[Dict] = None
     ) -> Dict:
-        """Ejecuta un backtest completo"""
+        """Ejecuta un backtest completo (params: parámetros de generate_signals)"""
         
         with TradingErrorContext("run_backtest", symbol):
             start_timer = performance_monitor.start_timer("run_backtest")
@@ -330,8 +366,8 @@ class BacktestSystemV2:
                     'error': 'No se pudieron obtener datos históricos'
                 }
             
-            # Generar señales
-            df = self.generate_signals(df, strategy, symbol)
+            # Generar señales (sobre una copia: el DataFrame puede venir de la caché)
+            df = self.generate_signals(df.copy(), strategy, symbol, params)
             
             # Calcular métricas
             metrics = self.calculate_trade_metrics(df, initial_capital)
@@ -352,6 +388,8 @@ class BacktestSystemV2:
                 'metrics': metrics,
                 'timestamp': datetime.now().isoformat()
             }
+            if params:
+                result['parameters'] = params
             
             # Guardar resultado
             self.results.append(result)
@@ -368,54 +406,127 @@ class BacktestSystemV2:
             
             return result
     
+    def evaluate_parameters(self, df: pd.DataFrame, symbol: str, strategy: str,
+                            params: Optional[Dict], initial_capital: float) -> Dict:
+        """Métricas de una combinación de parámetros sobre velas ya descargadas"""
+        df = self.generate_signals(df.copy(), strategy, symbol, params)
+        return self.calculate_trade_metrics(df, initial_capital)
+    
+    @staticmethod
+    def optimization_score(metrics: Dict) -> float:
+        """Score basado en Sharpe Ratio, Return y Win Rate"""
+        return (
+            metrics.get('sharpe_ratio', 0) * 0.5 +
+            metrics.get('total_return', 0) * 0.3 +
+            metrics.get('win_rate', 0) * 0.2
+        )
+    
     def optimize_strategy(
         self,
         symbol: str,
         strategy: str,
         parameter_ranges: Dict[str, List],
         interval: str = "1h",
-        days_back: int = 30
+        days_back: int = 30,
+        mode: str = "grid",
+        n_trials: Optional[int] = None,
+        workers: int = 1,
+        seed: Optional[int] = None
     ) -> Dict:
-        """Optimiza parámetros de estrategia"""
+        """
+        Optimiza parámetros de estrategia
+        
+        Las velas se descargan una vez y cada trial ejecuta generate_signals
+        con sus parámetros sobre una copia.
+        
+        Args:
+            parameter_ranges: Valores a probar por parámetro de generate_signals
+            mode: 'grid' (todas las combinaciones) o 'tpe' (búsqueda bayesiana)
+            n_trials: Presupuesto del modo 'tpe' (por defecto 1/5 de la rejilla, mínimo 20)
+            workers: Procesos en paralelo
+            seed: Semilla del modo 'tpe'
+        """
+        if mode not in ('grid', 'tpe'):
+            raise ValueError(f"Modo de optimización desconocido: {mode}")
+        
+        start_timer = performance_monitor.start_timer("optimize_strategy")
+        initial_capital = self.config['initial_capital']
+        
+        df = self.fetch_historical_data(symbol, interval, days_back)
+        if df.empty:
+            performance_monitor.end_timer("optimize_strategy", start_timer)
+            return {
+                'best_result': None,
+                'best_parameters': self.best_parameters.get(symbol),
+                'all_results': [],
+                'total_combinations_tested': 0,
+                'mode': mode
+            }
         
-        best_result = None
-        best_score = -float('inf')
-        all_results = []
+        if workers > 1:
+            optimizer = StrategyOptimizer(
+                _evaluate_parameters, parameter_ranges, workers=workers, seed=seed,
+                initializer=_init_optimizer,
+                initargs=(type(self), self.config, df, symbol, strategy, initial_capital)
+            )
+        else:
+            # En proceso: sin estado global, así las llamadas concurrentes no se pisan
+            def evaluate(params):
+                metrics = self.evaluate_parameters(df, symbol, strategy, params, initial_capital)
+                return self.optimization_score(metrics), metrics
+            
+            optimizer = StrategyOptimizer(evaluate, parameter_ranges, seed=seed)
+        if mode == 'grid':
+            optimizer.grid()
+        else:
+            optimizer.tpe(n_trials or max(20, optimizer.space_size // 5))
         
-        # Generar combinaciones de parámetros
-        import itertools
-        param_names = list(parameter_ranges.keys())
-        param_values = list(parameter_ranges.values())
+        all_results = []
+        best_result = None
+        best_trial = optimizer.best_trial
+        date_range = {'start': df.index[0].isoformat(), 'end': df.index[-1].isoformat()}
         
-        for combination in itertools.product(*param_values):
-            params = dict(zip(param_names, combination))
+        for trial in optimizer.trials:
+            if trial.score is None:
+                error_handler.logger.warning(f"Trial {trial.number} fallido ({trial.params}): {trial.error}")
+                continue
             
-            # Ejecutar backtest con estos parámetros
-            # (Aquí necesitarías modificar generate_signals para aceptar parámetros)
-            result = self.run_backtest(symbol, strategy, interval, days_back)
-            
-            if result['success']:
-                # Score basado en Sharpe Ratio y Return
-                score = (
-                    result['metrics'].get('sharpe_ratio', 0) * 0.5 +
-                    result['metrics'].get('total_return', 0) * 0.3 +
-                    result['metrics'].get('win_rate', 0) * 0.2
-                )
-                
-                result['parameters'] = params
-                result['optimization_score'] = score
-                all_results.append(result)
-                
-                if score > best_score:
-                    best_score = score
-                    best_result = result
-                    self.best_parameters[symbol] = params
+            result = {
+                'success': True,
+                'symbol': symbol,
+                'strategy': strategy,
+                'interval': interval,
+                'days_back': days_back,
+                'initial_capital': initial_capital,
+                'data_points': len(df),
+                'date_range': date_range,
+                'metrics': trial.payload,
+                'parameters': trial.params,
+                'optimization_score': trial.score,
+                'trial': trial.number,
+                'trial_ms': trial.duration * 1000
+            }
+            all_results.append(result)
+            if trial is best_trial:
+                best_result = result
+                self.best_parameters[symbol] = trial.params
+        
+        timing = optimizer.timing()
+        performance_monitor.end_timer("optimize_strategy", start_timer)
+        error_handler.logger.info(
+            f"Optimización {strategy} para {symbol} ({mode}): {timing['trials']} trials "
+            f"de {optimizer.space_size} combinaciones en {timing['wall_time_s']:.2f}s "
+            f"(media {timing['avg_trial_ms']:.1f} ms/trial, {workers} workers)"
+        )
         
         return {
             'best_result': best_result,
             'best_parameters': self.best_parameters.get(symbol),
             'all_results': sorted(all_results, key=lambda x: x.get('optimization_score', 0), reverse=True)[:10],
-            'total_combinations_tested': len(all_results)
+            'total_combinations_tested': len(all_results),
+            'mode': mode,
+            'search_space_size': optimizer.space_size,
+            'timing': timing
         }
     
     def run_optimal_strategy_backtest(
@@ -379,7 +379,7 @@ class LiquidityHuntStrategy(TradingStrategy):
         current_price = df['Close'].iloc[-1]
         
         # Detectar pools de liquidez
-        liquidity_data = self.liquidity_detector.detect_liquidity_pools(df, current_price)
+        liquidity_data = self.liquidity_detector.detect_liquidity_pools(df, current_price, symbol=ticker)
         
         score = self.calculate_score(df)
         signal_type = None
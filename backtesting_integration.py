@@ -11,6 +11,8 @@ from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+from scoring_empirico_v2 import ScoringEmpiricoV2
+
 class BacktestingIntegrado:
     """
     Sistema de backtesting integrado para la UX
@@ -29,9 +31,14 @@ class BacktestingIntegrado:
             'trailing_activation': 0.015, # 1.5% conservador
             'trailing_distance': 0.005,  # 0.5% estándar
             'partial_close_pct': 0.30,   # 30% para dejar correr ganadores
-            'max_position_size': 0.02    # 2% base (antes de leverage)
+            'max_position_size': 0.02,   # 2% base (antes de leverage)
+            'batch_scoring': True        # Scores V2 de todas las velas en una pasada por ticker
         }
         
+        # REVERTIR A SISTEMA EMPÍRICO V2 (QUE FUNCIONABA)
+        self.scoring_system = ScoringEmpiricoV2()
+        self._batch_scores = {}
+        
         self.trades_ejecutados = []
         self.equity_curve = []
     
@@ -153,6 +160,51 @@ class BacktestingIntegrado:
         
         return None
     
+    def candidate_mask(self, df):
+        """
+        Velas en las que generate_signal puede devolver señal
+        
+        Condiciones crudas de las tres estrategias, vectorizadas sobre todo el
+        DataFrame (todos los indicadores son causales). Fuera de la máscara
+        generate_signal devuelve None seguro, así que sólo hace falta
+        llamarlo (con su subset histórico y scoring) en las candidatas.
+        """
+        close, ema21, ema50 = df['Close'], df['EMA_21'], df['EMA_50']
+        rsi, volume_ratio = df['RSI'], df['Volume_Ratio']
+        prev_close, prev_ema21 = close.shift(1), ema21.shift(1)
+        
+        valid = df[['Close', 'EMA_21', 'RSI', 'ATR', 'Volume_Ratio']].notna().all(axis=1)
+        volume_ok = volume_ratio >= self.config['min_volume_ratio']
+        rsi_neutral = (rsi > 30) & (rsi < 70)
+        
+        pullback_long = ((close > ema21) & (ema21 > ema50) & (prev_close < prev_ema21)
+                         & (close > ema21) & rsi_neutral & volume_ok)
+        pullback_short = ((close < ema21) & (ema21 < ema50) & (prev_close > prev_ema21)
+                          & (close < ema21) & rsi_neutral & volume_ok)
+        
+        high_24h = df['High'].rolling(24).max()
+        low_24h = df['Low'].rolling(24).min()
+        breakout = ((high_24h - low_24h) > 0) & (volume_ratio >= 1.5) & (
+            (close > high_24h.shift(1)) | (close < low_24h.shift(1)))
+        
+        rsi_extreme = ((rsi <= 35) | (rsi >= 65)) & volume_ok
+        
+        candidates = valid & (pullback_long | pullback_short | breakout | rsi_extreme)
+        return candidates.to_numpy()
+    
+    def _empirical_score(self, df, current, signal_type):
+        """Score empírico V2 de current: del batch del ticker si lo cubre, si no por vela"""
+        
+        batch = self._batch_scores.get(signal_type)
+        if batch is not None and current.name in batch.index:
+            return batch[current.name]
+        
+        if signal_type == 'LONG':
+            score, _ = self.scoring_system.calculate_empirical_score_long(df, current)
+        else:
+            score, _ = self.scoring_system.calculate_empirical_score_short(df, current)
+        return score
+    
     def _create_long_signal(self, df, ticker, current, strategy):
         """Crea señal LONG optimizada"""
         
@@ -166,13 +218,8 @@ class BacktestingIntegrado:
         target_1 = entry_price + (atr * 2.0)   # Target 1 más lejano
         target_2 = entry_price + (atr * 4.0)   # Target 2 mucho más lejano
         
-        # REVERTIR A SISTEMA EMPÍRICO V2 (QUE FUNCIONABA)
-        # Importar sistema empírico V2
-        from scoring_empirico_v2 import ScoringEmpiricoV2
-        scoring_system = ScoringEmpiricoV2()
-        
         # Calcular score empírico
-        score, score_details = scoring_system.calculate_empirical_score_long(df, current)
+        score = self._empirical_score(df, current, 'LONG')
         
         # Risk-reward
         risk = entry_price - stop_loss
@@ -209,12 +256,8 @@ class BacktestingIntegrado:
         target_1 = entry_price - (atr * 2.0)   # Target 1 más lejano
         target_2 = entry_price - (atr * 4.0)   # Target 2 mucho más lejano
         
-        # REVERTIR A SISTEMA EMPÍRICO V2 para SHORT
-        from scoring_empirico_v2 import ScoringEmpiricoV2
-        scoring_system = ScoringEmpiricoV2()
-        
         # Calcular score empírico para SHORT
-        score, score_details = scoring_system.calculate_empirical_score_short(df, current)
+        score = self._empirical_score(df, current, 'SHORT')
         
         # Risk-reward
         risk = stop_loss - entry_price
@@ -254,9 +297,7 @@ class BacktestingIntegrado:
         base_position = 0.02  # 2% base
         
         # Apalancamiento empírico V2
-        from scoring_empirico_v2 import ScoringEmpiricoV2
-        scoring_system = ScoringEmpiricoV2()
-        leverage = scoring_system.get_leverage_empirical(score)
+        leverage = self.scoring_system.get_leverage_empirical(score)
         position_size = base_position
         
         # Calcular exposición total con apalancamiento
@@ -272,10 +313,15 @@ class BacktestingIntegrado:
         total_profit = 0
         exit_reason = 'TIME'
         
+        # Arrays de la serie (sin df.iloc por vela)
+        closes = df['Close'].to_numpy()
+        highs = df['High'].to_numpy()
+        lows = df['Low'].to_numpy()
+        
         # Simular hasta 96 períodos (4 días)
         for i in range(entry_idx + 1, min(entry_idx + 96, len(df))):
-            current_bar = df.iloc[i]
-            current_price = current_bar['Close']
+            current_price = closes[i]
+            high, low = highs[i], lows[i]
             
             if signal_type == 'LONG':
                 current_profit_pct = (current_price - entry_price) / entry_price
@@ -287,7 +333,7 @@ class BacktestingIntegrado:
                         trailing_stop = new_trailing
                 
                 # Target 1 (cierre parcial)
-                if current_bar['High'] >= target_1 and not partial_closed:
+                if high >= target_1 and not partial_closed:
                     partial_profit = ((target_1 - entry_price) / entry_price) * self.config['partial_close_pct']
                     total_profit += partial_profit
                     remaining_size = 1 - self.config['partial_close_pct']
@@ -295,21 +341,21 @@ class BacktestingIntegrado:
                     continue
                 
                 # Target 2 (cierre total)
-                elif current_bar['High'] >= target_2:
+                elif high >= target_2:
                     final_profit = ((target_2 - entry_price) / entry_price) * remaining_size
                     total_profit += final_profit
                     exit_reason = 'TP'
                     break
                 
                 # Stop loss
-                elif current_bar['Low'] <= stop_loss:
+                elif low <= stop_loss:
                     final_profit = ((stop_loss - entry_price) / entry_price) * remaining_size
                     total_profit += final_profit
                     exit_reason = 'SL'
                     break
                 
                 # Trailing stop
-                elif trailing_stop and current_bar['Low'] <= trailing_stop:
+                elif trailing_stop and low <= trailing_stop:
                     final_profit = ((trailing_stop - entry_price) / entry_price) * remaining_size
                     total_profit += final_profit
                     exit_reason = 'TRAIL'
@@ -323,26 +369,26 @@ class BacktestingIntegrado:
                     if trailing_stop is None or new_trailing < trailing_stop:
                         trailing_stop = new_trailing
                 
-                if current_bar['Low'] <= target_1 and not partial_closed:
+                if low <= target_1 and not partial_closed:
                     partial_profit = ((entry_price - target_1) / entry_price) * self.config['partial_close_pct']
                     total_profit += partial_profit
                     remaining_size = 1 - self.config['partial_close_pct']
                     partial_closed = True
                     continue
                 
-                elif current_bar['Low'] <= target_2:
+                elif low <= target_2:
                     final_profit = ((entry_price - target_2) / entry_price) * remaining_size
                     total_profit += final_profit
                     exit_reason = 'TP'
                     break
                 
-                elif current_bar['High'] >= stop_loss:
+                elif high >= stop_loss:
                     final_profit = ((entry_price - stop_loss) / entry_price) * remaining_size
                     total_profit += final_profit
                     exit_reason = 'SL'
                     break
                 
-                elif trailing_stop and current_bar['High'] >= trailing_stop:
+                elif trailing_stop and high >= trailing_stop:
                     final_profit = ((entry_price - trailing_stop) / entry_price) * remaining_size
                     total_profit += final_profit
                     exit_reason = 'TRAIL'
@@ -407,12 +453,23 @@ class BacktestingIntegrado:
                 # Calcular indicadores
                 df = self.calculate_indicators(df)
                 
+                # Scores de todas las velas del ticker (causales: fila i = subset hasta i)
+                if self.config['batch_scoring']:
+                    self._batch_scores = {
+                        signal_type: self.scoring_system.calculate_empirical_scores(df, signal_type)['final_score']
+                        for signal_type in ('LONG', 'SHORT')
+                    }
+                
                 # Buscar señales (muestreo cada 6 horas para calidad)
+                candidates = self.candidate_mask(df)
                 señales_encontradas = 0
                 for i in range(50, len(df), 6):
                     if señales_encontradas >= 5:  # Máximo por ticker para calidad
                         break
                     
+                    if not candidates[i]:
+                        continue
+                    
                     current_date = df.index[i].date()
                     if current_date < start_date.date():
                         continue
@@ -428,6 +485,8 @@ class BacktestingIntegrado:
                         
             except Exception as e:
                 continue
+            finally:
+                self._batch_scores = {}
         
         return all_trades
     
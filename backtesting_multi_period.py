@@ -142,6 +142,8 @@ class MultiPeriodBacktester:
             
             # Preparar datos
             data = self.prepare_data(data)
+            # Los detectores comparten el índice de pivotes de la serie entre ventanas
+            data.attrs.update(symbol=symbol, interval='1d')
             
             # Variables de tracking
             trades = []
@@ -150,13 +152,15 @@ class MultiPeriodBacktester:
             trailing_stop = None
             
             # Iterar por cada período
+            closes = data['Close'].to_numpy()
             for i in range(20, len(data) - 1):
-                current = data.iloc[i]
-                prev = data.iloc[i-1]
-                df_slice = data.iloc[max(0, i-100):i+1]
-                
                 # Si no hay posición abierta, buscar señal
                 if position is None:
+                    # Filas y ventana sólo cuando hacen falta para la señal
+                    current = data.iloc[i]
+                    prev = data.iloc[i-1]
+                    df_slice = data.iloc[max(0, i-100):i+1]
+                    
                     signal = self.generate_signal(df_slice, current, prev, symbol)
                     
                     if signal and signal['final_score'] >= 6.5:
@@ -184,17 +188,20 @@ class MultiPeriodBacktester:
                 
                 # Si hay posición abierta, gestionar
                 else:
+                    price = float(closes[i])
+                    timestamp = data.index[i]
+                    
                     # Actualizar trailing stop
                     if trailing_stop:
                         stop_update = self.update_trailing_stop(
-                            trailing_stop, float(current['Close'])
+                            trailing_stop, price
                         )
                         
                         # Verificar si se activó el stop
                         if stop_update.get('triggered', False):
                             # Cerrar posición
-                            exit_price = float(current['Close'])
-                            position['exit_time'] = current.name
+                            exit_price = price
+                            position['exit_time'] = timestamp
                             position['exit_price'] = exit_price
                             position['exit_reason'] = 'TRAILING_STOP'
                             
@@ -216,10 +223,10 @@ class MultiPeriodBacktester:
                     
                     # Verificar take profit (15%)
                     if position and position['type'] == 'LONG':
-                        if current['Close'] >= position['entry_price'] * 1.15:
+                        if price >= position['entry_price'] * 1.15:
                             # Take profit
-                            position['exit_time'] = current.name
-                            position['exit_price'] = float(current['Close'])
+                            position['exit_time'] = timestamp
+                            position['exit_price'] = price
                             position['exit_reason'] = 'TAKE_PROFIT'
                             
                             pnl = self.calculate_pnl(position)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark del kernel de backtesting: motores por vela (df.iloc) vs kernel
+vectorizado, sobre velas horarias sintéticas de varios años (sin red)
+
+Los indicadores se calculan una vez fuera del cronómetro; se mide sólo el
+backtest. En RobustTradingSystemV2 el motor por vela recalcula el régimen
+sobre cada prefijo (O(n²)), así que se mide sobre una ventana más corta y
+también con los regímenes precalculados para comparar sólo la pasada.
+"""
+
+import time
+
+from backtest_kernel import njit
+from conftest import make_ohlcv
+from final_robust_system import FinalRobustSystem
+from robust_trading_system_v2 import RobustTradingSystemV2
+
+HOURS = 3 * 365 * 24     # 3 años de velas horarias
+ROBUST_PREFIX_BARS = 2_000
+
+
+def hourly_candles(vol=0.006):
+    """Las velas de test_backtest_kernel: tendencias alternas de 60 velas, índice 'Date' UTC"""
+    return make_ohlcv(HOURS, 1, start='2021-01-01', freq='h', tz='UTC', name='Date', price=20000,
+                      vol=vol, drift=vol / 6, regime=60, wick=vol * 0.8)
+
+
+def timed(fn, repeat=1):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def report(label, before, after, trades_before, trades_after):
+    print(f"{label:<34} por vela={before:>8.3f}s  kernel={after:>7.4f}s  "
+          f"x{before / after:>6.0f}  paridad={'OK' if trades_before == trades_after else 'FALLO'}")
+
+
+def run():
+    print(f"{HOURS} velas horarias, numba={'sí' if njit is not None else 'no'}")
+
+    final = FinalRobustSystem(10000)
+    df = final.calculate_indicators(hourly_candles())
+    final.run_backtest(df, 'BTC-USD')  # calentar (compilación numba)
+    before, expected = timed(lambda: final.run_backtest(df, 'BTC-USD', vectorized=False))
+    after, trades = timed(lambda: final.run_backtest(df, 'BTC-USD'), repeat=5)
+    report("FinalRobustSystem", before, after, expected, trades)
+
+    robust = RobustTradingSystemV2(10000)
+    robust.base_params['min_confirmations'] = 2
+    df = robust.prepare_indicators(hourly_candles())
+    regimes = robust.precompute_regimes(df)
+
+    def robust_run(frame, vectorized, frame_regimes=None):
+        robust.last_trade_date = None
+        robust.current_capital = robust.initial_capital
+        return robust.run_backtest(frame, 'BTC-USD', frame_regimes, vectorized=vectorized)
+
+    before, expected = timed(lambda: robust_run(df, False, regimes))
+    after, trades = timed(lambda: robust_run(df, True, regimes), repeat=5)
+    report("RobustV2 (regímenes precalculados)", before, after, expected, trades)
+
+    head = df.iloc[:ROBUST_PREFIX_BARS]
+    before, expected = timed(lambda: robust_run(head, False))
+    after, trades = timed(lambda: robust_run(head, True), repeat=5)
+    report(f"RobustV2 completo ({ROBUST_PREFIX_BARS} velas)", before, after, expected, trades)
+
+
+if __name__ == "__main__":
+    run()
@@ -8,7 +8,8 @@ import requests
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-import time
+
+from timeframe_resampler import get_timeframe_resampler
 
 class BinanceClient:
     """Cliente para obtener datos de Binance sin API keys"""
@@ -152,22 +153,28 @@ class BinanceClient:
             return {}
     
     def get_multi_timeframe_data(self, symbol: str) -> Dict[str, pd.DataFrame]:
-        """Obtiene datos en múltiples timeframes para análisis"""
+        """
+        Obtiene datos en múltiples timeframes para análisis
+
+        Las velas salen del candle store: 15m se sincroniza directamente y
+        4h/1d se agregan desde la serie de 1h, de modo que cada ciclo cuesta
+        dos requests de cola en lugar de cuatro descargas completas.
+        """
         timeframes = {
-            '15m': 100,  # 15 minutos x 100 = 25 horas
             '1h': 100,   # 1 hora x 100 = 4 días
             '4h': 100,   # 4 horas x 100 = 16 días
             '1d': 100    # 1 día x 100 = 100 días
         }
         
-        data = {}
-        for tf, limit in timeframes.items():
-            df = self.get_klines(symbol, tf, limit)
-            if not df.empty:
-                data[tf] = df
-            time.sleep(0.1)  # Evitar rate limits
+        try:
+            resampler = get_timeframe_resampler('1h')
+            frames = {'15m': resampler.store.get_dataframe(symbol, '15m', 100)}  # 15 minutos x 100 = 25 horas
+            frames.update(resampler.get_timeframes(symbol, timeframes))
+        except Exception as e:
+            print(f"Error obteniendo klines {symbol}: {e}")
+            return {}
         
-        return data
+        return {tf: df for tf, df in frames.items() if not df.empty}
     
     def test_connection(self) -> bool:
         """Prueba la conexión con Binance"""
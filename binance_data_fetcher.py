@@ -10,6 +10,9 @@ from datetime import datetime, timedelta
 import time
 import logging
 
+from candle_store import get_candle_store
+from timeframe_resampler import get_timeframe_resampler
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -17,13 +20,24 @@ class BinanceDataFetcher:
     """Fetcher de datos optimizado para Binance"""
     
     BASE_URL = "https://api.binance.com/api/v3"
+    USE_CANDLE_STORE = True
     
     @staticmethod
     def get_klines(symbol: str, interval: str, limit: int = 500):
         """
         Obtiene velas de Binance
         interval: 1m, 3m, 5m, 15m, 30m, 1h, 2h, 4h, 6h, 8h, 12h, 1d, 3d, 1w, 1M
+        
+        Con USE_CANDLE_STORE las velas cerradas se sirven desde el candle store
+        local y sólo se descarga la cola que falta (limit puede superar 1000).
         """
+        if BinanceDataFetcher.USE_CANDLE_STORE and interval != '1M':
+            try:
+                return get_candle_store().get_dataframe(symbol, interval, limit)
+            except Exception as e:
+                logger.error(f"Error obteniendo datos de {symbol}: {e}")
+                return pd.DataFrame()
+        
         try:
             url = f"{BinanceDataFetcher.BASE_URL}/klines"
             params = {
@@ -66,7 +80,21 @@ class BinanceDataFetcher:
     
     @staticmethod
     def get_multiple_timeframes(symbol: str):
-        """Obtiene datos en múltiples timeframes"""
+        """
+        Obtiene datos en múltiples timeframes
+
+        Con USE_CANDLE_STORE se sincroniza sólo la serie de 1h y 4h/1d se
+        agregan localmente a partir de ella (mismo snapshot para los tres).
+        """
+        if BinanceDataFetcher.USE_CANDLE_STORE:
+            try:
+                timeframes = get_timeframe_resampler('1h').get_timeframes(
+                    symbol, {'1h': 200, '4h': 200, '1d': 100})
+            except Exception as e:
+                logger.error(f"Error obteniendo datos de {symbol}: {e}")
+                return {}
+            return {k: v for k, v in timeframes.items() if not v.empty}
+
         timeframes = {
             '1h': BinanceDataFetcher.get_klines(symbol, '1h', 200),
             '4h': BinanceDataFetcher.get_klines(symbol, '4h', 200),
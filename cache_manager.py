@@ -5,202 +5,672 @@ Cache Manager - Sistema de caché para optimizar rendimiento
 
 import json
 import time
+import asyncio
 import hashlib
+import inspect
+import struct
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional
 import pickle
 import os
+import sys
 from functools import wraps
 import threading
 
+# Cabecera de los ficheros .cache: magic + timestamp de expiración.
+# Permite expirar/barrer el disco sin deserializar el contenido.
+DISK_MAGIC = b'CMv2'
+DISK_HEADER = struct.Struct('<4sd')
+
+
+def _stable_repr(obj: Any) -> str:
+    """
+    Representación estable entre ejecuciones para construir claves
+
+    Un objeto cuyo repr incluye la dirección de memoria (' at 0x...') no
+    identifica su contenido: dos objetos distintos compartirían clave. En
+    ese caso se lanza TypeError y la llamada necesita un key_func.
+    """
+    if obj is None or isinstance(obj, (bool, int, float, str, bytes)):
+        return repr(obj)
+    if isinstance(obj, (list, tuple)):
+        inner = ','.join(_stable_repr(o) for o in obj)
+        return f"[{inner}]" if isinstance(obj, list) else f"({inner})"
+    if isinstance(obj, (set, frozenset)):
+        return '{' + ','.join(sorted(_stable_repr(o) for o in obj)) + '}'
+    if isinstance(obj, dict):
+        items = sorted((_stable_repr(k), _stable_repr(v)) for k, v in obj.items())
+        return '{' + ','.join(f"{k}:{v}" for k, v in items) + '}'
+    if isinstance(obj, (datetime, timedelta)):
+        return repr(obj)
+
+    text = repr(obj)
+    if ' at 0x' in text or ' object at ' in text:
+        raise TypeError(
+            f"No se puede construir una clave de caché estable para "
+            f"{type(obj).__module__}.{type(obj).__qualname__}: su repr depende "
+            f"de la dirección de memoria; usa key_func"
+        )
+    return text
+
+
+def _estimate_size(value: Any, payload: Optional[bytes] = None) -> int:
+    """Tamaño aproximado en bytes de un valor cacheado"""
+    if payload is not None:
+        return len(payload)
+    if hasattr(value, 'memory_usage') and hasattr(value, 'columns'):
+        try:
+            return int(value.memory_usage(deep=True).sum())
+        except Exception:
+            pass
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class _Flight:
+    """Cálculo en curso de una clave; los demás llamadores esperan su resultado"""
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
 class CacheManager:
     """
     Gestor de caché en memoria y disco para optimizar llamadas a APIs
+
+    - Memoria: LRU acotada por número de entradas y por bytes
+    - Disco: acotado por bytes; la expiración va en la cabecera del fichero
+      y un hilo en segundo plano barre entradas expiradas
+    - get_or_compute / aget_or_compute: single-flight (un solo cálculo por
+      clave aunque fallen muchos llamadores a la vez) y, opcionalmente,
+      stale-while-revalidate desde la memoria
     """
     
-    def __init__(self, cache_dir: str = "cache", default_ttl: int = 300):
+    def __init__(self, cache_dir: str = "cache", default_ttl: int = 300,
+                 max_memory_entries: int = 1000, max_memory_bytes: int = 256 * 1024 * 1024,
+                 max_disk_bytes: int = 1024 * 1024 * 1024,
+                 sweep_interval: Optional[float] = None):
         """
         Args:
             cache_dir: Directorio para caché en disco
             default_ttl: Time to live por defecto en segundos
+            max_memory_entries: Máximo de entradas en memoria (LRU)
+            max_memory_bytes: Máximo de bytes en memoria (LRU)
+            max_disk_bytes: Máximo de bytes en disco (se expulsan los más antiguos)
+            sweep_interval: Si se indica, el barrido de expirados arranca en
+                la primera escritura a disco de cada proceso
         """
         self.cache_dir = cache_dir
         self.default_ttl = default_ttl
-        self.memory_cache = {}
+        self.max_memory_entries = max_memory_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.sweep_interval = sweep_interval
+        self.memory_cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self.memory_bytes = 0
+        self.disk_bytes: Optional[int] = None  # se mide en la primera escritura
         self.cache_stats = {
             'hits': 0,
             'misses': 0,
             'expired': 0,
-            'errors': 0
+            'errors': 0,
+            'evictions': 0,
+            'disk_evictions': 0,
+            'coalesced': 0,
+            'stale_served': 0,
+            'refreshes': 0
         }
         self.lock = threading.Lock()
+        self._inflight: Dict[str, _Flight] = {}
+        self._async_inflight: Dict[tuple, asyncio.Future] = {}
+        self._refreshing: set = set()
+        self._refresh_tasks: set = set()
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_stop = threading.Event()
         
         # Crear directorio de caché si no existe
         if not os.path.exists(cache_dir):
             os.makedirs(cache_dir)
     
     def _generate_key(self, *args, **kwargs) -> str:
-        """Genera una clave única para los argumentos"""
-        key_data = f"{args}{sorted(kwargs.items())}"
+        """Genera una clave única y estable para los argumentos"""
+        key_data = f"{_stable_repr(args)}{_stable_repr(kwargs)}"
         return hashlib.md5(key_data.encode()).hexdigest()
     
-    def get(self, key: str) -> Optional[Any]:
-        """Obtiene un valor del caché"""
-        with self.lock:
-            # Primero buscar en memoria
-            if key in self.memory_cache:
-                entry = self.memory_cache[key]
-                if time.time() < entry['expires']:
-                    self.cache_stats['hits'] += 1
-                    return entry['value']
-                else:
-                    # Expirado
-                    del self.memory_cache[key]
-                    self.cache_stats['expired'] += 1
-            
-            # Buscar en disco
-            disk_path = os.path.join(self.cache_dir, f"{key}.cache")
-            if os.path.exists(disk_path):
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.cache")
+    
+    # ===========================================
+    # MEMORIA (LRU)
+    # ===========================================
+    
+    def _memory_put(self, key: str, entry: Dict):
+        """Inserta en memoria y expulsa por LRU (requiere self.lock)"""
+        old = self.memory_cache.pop(key, None)
+        if old is not None:
+            self.memory_bytes -= old['size']
+        
+        if entry['size'] > self.max_memory_bytes:
+            return  # no cabe: sólo disco
+        
+        self.memory_cache[key] = entry
+        self.memory_bytes += entry['size']
+        
+        while (len(self.memory_cache) > self.max_memory_entries or
+               self.memory_bytes > self.max_memory_bytes):
+            _, evicted = self.memory_cache.popitem(last=False)
+            self.memory_bytes -= evicted['size']
+            self.cache_stats['evictions'] += 1
+    
+    def _memory_drop(self, key: str):
+        """Elimina de memoria (requiere self.lock)"""
+        entry = self.memory_cache.pop(key, None)
+        if entry is not None:
+            self.memory_bytes -= entry['size']
+    
+    # ===========================================
+    # DISCO
+    # ===========================================
+    
+    @staticmethod
+    def _read_expiry(path: str) -> Optional[float]:
+        """Lee sólo la cabecera; None si es un fichero de formato antiguo"""
+        with open(path, 'rb') as f:
+            header = f.read(DISK_HEADER.size)
+        if len(header) == DISK_HEADER.size:
+            magic, expires = DISK_HEADER.unpack(header)
+            if magic == DISK_MAGIC:
+                return expires
+        return None
+    
+    def _read_disk(self, path: str) -> Optional[Dict]:
+        """Lee una entrada de disco (sin lock); None si expiró o no existe"""
+        with open(path, 'rb') as f:
+            header = f.read(DISK_HEADER.size)
+            if len(header) == DISK_HEADER.size and header[:4] == DISK_MAGIC:
+                _, expires = DISK_HEADER.unpack(header)
+                if time.time() >= expires:
+                    return None
+                payload = f.read()
+                return {
+                    'value': pickle.loads(payload),
+                    'expires': expires,
+                    'size': len(payload)
+                }
+            # Formato antiguo: pickle del dict completo
+            f.seek(0)
+            entry = pickle.load(f)
+        if time.time() >= entry['expires']:
+            return None
+        entry['size'] = _estimate_size(entry['value'])
+        return entry
+    
+    def _write_disk(self, key: str, payload: bytes, expires: float):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(DISK_HEADER.pack(DISK_MAGIC, expires))
+            f.write(payload)
+        os.replace(tmp_path, path)
+        
+        if self.disk_bytes is None:
+            self._enforce_disk_cap()  # primera escritura: medir el directorio
+        else:
+            self.disk_bytes += DISK_HEADER.size + len(payload)
+            if self.disk_bytes > self.max_disk_bytes:
+                self._enforce_disk_cap()
+        
+        # Sólo hay algo que barrer si este proceso escribe en disco
+        if self.sweep_interval and (self._sweeper is None or not self._sweeper.is_alive()):
+            self.start_sweeper(self.sweep_interval)
+    
+    def _remove_file(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    def _scan_disk(self):
+        """Lista (path, tamaño, mtime) de los ficheros .cache"""
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.cache') and entry.is_file():
                 try:
-                    with open(disk_path, 'rb') as f:
-                        entry = pickle.load(f)
-                    
-                    if time.time() < entry['expires']:
+                    st = entry.stat()
+                    files.append((entry.path, st.st_size, st.st_mtime))
+                except OSError:
+                    pass
+        return files
+    
+    def _enforce_disk_cap(self):
+        """Expulsa los ficheros más antiguos hasta quedar bajo max_disk_bytes"""
+        files = self._scan_disk()
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in sorted(files, key=lambda f: f[2]):
+            if total <= self.max_disk_bytes:
+                break
+            self._remove_file(path)
+            total -= size
+            self.cache_stats['disk_evictions'] += 1
+        self.disk_bytes = total
+    
+    # ===========================================
+    # API PÚBLICA
+    # ===========================================
+    
+    def _lookup_memory(self, key: str):
+        """
+        Busca en memoria
+
+        Returns:
+            (valor, estado) con estado 'fresh', 'stale' o 'miss'
+        """
+        with self.lock:
+            entry = self.memory_cache.get(key)
+            if entry is None:
+                return None, 'miss'
+            now = time.time()
+            if now < entry['expires']:
+                self.memory_cache.move_to_end(key)
+                self.cache_stats['hits'] += 1
+                return entry['value'], 'fresh'
+            if now < entry.get('stale_until', 0):
+                # Caducado pero dentro de la ventana stale: se conserva
+                return entry['value'], 'stale'
+            # Expirado
+            self._memory_drop(key)
+            self.cache_stats['expired'] += 1
+            return None, 'miss'
+    
+    def _lookup_disk(self, key: str):
+        """Busca en disco (fuera del lock: I/O y unpickle); (valor, 'fresh'|'miss')"""
+        disk_path = self._disk_path(key)
+        if os.path.exists(disk_path):
+            try:
+                entry = self._read_disk(disk_path)
+                if entry is not None:
+                    with self.lock:
                         # Cargar a memoria
-                        self.memory_cache[key] = entry
+                        self._memory_put(key, entry)
                         self.cache_stats['hits'] += 1
-                        return entry['value']
-                    else:
-                        # Expirado
-                        os.remove(disk_path)
-                        self.cache_stats['expired'] += 1
-                except Exception:
+                    return entry['value'], 'fresh'
+                # Expirado
+                self._remove_file(disk_path)
+                with self.lock:
+                    self.cache_stats['expired'] += 1
+            except Exception:
+                with self.lock:
                     self.cache_stats['errors'] += 1
-            
-            self.cache_stats['misses'] += 1
-            return None
+        return None, 'miss'
     
-    def set(self, key: str, value: Any, ttl: Optional[int] = None):
-        """Guarda un valor en el caché"""
+    def _lookup(self, key: str):
+        value, state = self._lookup_memory(key)
+        if state == 'miss':
+            value, state = self._lookup_disk(key)
+        return value, state
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Obtiene un valor del caché"""
+        value, state = self._lookup(key)
+        if state == 'fresh':
+            return value
+        
         with self.lock:
-            ttl = ttl or self.default_ttl
-            entry = {
-                'value': value,
-                'expires': time.time() + ttl,
-                'created': time.time()
-            }
-            
-            # Guardar en memoria
-            self.memory_cache[key] = entry
-            
-            # Guardar en disco si es importante
-            if ttl > 60:  # Solo cachear en disco si TTL > 1 minuto
-                try:
-                    disk_path = os.path.join(self.cache_dir, f"{key}.cache")
-                    with open(disk_path, 'wb') as f:
-                        pickle.dump(entry, f)
-                except Exception:
+            self.cache_stats['misses'] += 1
+        return None
+    
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, stale_ttl: float = 0):
+        """
+        Guarda un valor en el caché
+
+        Args:
+            stale_ttl: Segundos tras la expiración durante los que
+                       get_or_compute puede servir el valor en memoria
+                       mientras se refresca
+        """
+        ttl = ttl or self.default_ttl
+        expires = time.time() + ttl
+        
+        # Guardar en disco si es importante (solo si TTL > 1 minuto)
+        payload = None
+        if ttl > 60:
+            try:
+                payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                self._write_disk(key, payload, expires)
+            except Exception:
+                with self.lock:
                     self.cache_stats['errors'] += 1
+        
+        entry = {
+            'value': value,
+            'expires': expires,
+            'stale_until': expires + stale_ttl,
+            'created': time.time(),
+            'size': _estimate_size(value, payload)
+        }
+        
+        # Guardar en memoria
+        with self.lock:
+            self._memory_put(key, entry)
     
     def delete(self, key: str):
         """Elimina una entrada del caché"""
         with self.lock:
             # Eliminar de memoria
-            if key in self.memory_cache:
-                del self.memory_cache[key]
-            
-            # Eliminar de disco
-            disk_path = os.path.join(self.cache_dir, f"{key}.cache")
-            if os.path.exists(disk_path):
-                try:
-                    os.remove(disk_path)
-                except Exception:
-                    pass
+            self._memory_drop(key)
+        
+        # Eliminar de disco
+        disk_path = self._disk_path(key)
+        if os.path.exists(disk_path):
+            self._remove_file(disk_path)
     
     def clear(self):
         """Limpia todo el caché"""
         with self.lock:
             self.memory_cache.clear()
-            
-            # Limpiar disco
-            for file in os.listdir(self.cache_dir):
-                if file.endswith('.cache'):
-                    try:
-                        os.remove(os.path.join(self.cache_dir, file))
-                    except Exception:
-                        pass
+            self.memory_bytes = 0
+        
+        # Limpiar disco
+        for path, _, _ in self._scan_disk():
+            self._remove_file(path)
+        self.disk_bytes = 0
     
     def cleanup_expired(self):
-        """Limpia entradas expiradas"""
+        """
+        Limpia entradas expiradas
+        
+        El disco se barre leyendo sólo la cabecera de cada fichero y sin
+        mantener el lock global; después se aplica el límite de bytes.
+        """
+        current_time = time.time()
+        
+        # Limpiar memoria
         with self.lock:
-            current_time = time.time()
-            
-            # Limpiar memoria
             expired_keys = [
                 k for k, v in self.memory_cache.items()
-                if current_time >= v['expires']
+                if current_time >= max(v['expires'], v.get('stale_until', 0))
             ]
             for key in expired_keys:
-                del self.memory_cache[key]
-            
-            # Limpiar disco
-            for file in os.listdir(self.cache_dir):
-                if file.endswith('.cache'):
-                    file_path = os.path.join(self.cache_dir, file)
-                    try:
-                        with open(file_path, 'rb') as f:
-                            entry = pickle.load(f)
-                        if current_time >= entry['expires']:
-                            os.remove(file_path)
-                    except Exception:
-                        pass
+                self._memory_drop(key)
+        
+        # Limpiar disco
+        for path, _, _ in self._scan_disk():
+            try:
+                expires = self._read_expiry(path)
+                if expires is None:
+                    # Formato antiguo: hay que deserializar una única vez
+                    with open(path, 'rb') as f:
+                        expires = pickle.load(f)['expires']
+                if current_time >= expires:
+                    self._remove_file(path)
+            except Exception:
+                pass
+        
+        self._enforce_disk_cap()
+    
+    # ===========================================
+    # SINGLE-FLIGHT Y STALE-WHILE-REVALIDATE
+    # ===========================================
+    
+    def get_or_compute(self, key: str, compute: Callable[[], Any],
+                       ttl: Optional[int] = None, stale_ttl: float = 0) -> Any:
+        """
+        Devuelve el valor cacheado o lo calcula una sola vez
+
+        Si varios hilos fallan la misma clave a la vez, sólo uno ejecuta
+        `compute`; el resto espera y recibe su resultado (o su excepción).
+        Con stale_ttl > 0 un valor caducado se sirve al instante y se lanza
+        un único refresco en segundo plano.
+        """
+        value, state = self._lookup(key)
+        if state == 'fresh':
+            return value
+        if state == 'stale':
+            self._count('stale_served')
+            self._refresh_in_thread(key, compute, ttl, stale_ttl)
+            return value
+        
+        with self.lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self.cache_stats['misses'] += 1
+            else:
+                self.cache_stats['coalesced'] += 1
+        
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        
+        try:
+            flight.value = compute()
+            if flight.value is not None:  # None no se cachea
+                self.set(key, flight.value, ttl, stale_ttl)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+    
+    async def aget_or_compute(self, key: str, compute: Callable[[], Any],
+                              ttl: Optional[int] = None, stale_ttl: float = 0) -> Any:
+        """
+        Variante async de get_or_compute; `compute` devuelve una corrutina
+
+        Las corrutinas que fallan la misma clave en el mismo event loop
+        esperan a un único cálculo. La lectura/escritura en disco se hace
+        en un hilo para no bloquear el loop.
+        """
+        value, state = self._lookup_memory(key)
+        if state == 'miss':
+            value, state = await asyncio.to_thread(self._lookup_disk, key)
+        if state == 'fresh':
+            return value
+        if state == 'stale':
+            self._count('stale_served')
+            self._refresh_in_task(key, compute, ttl, stale_ttl)
+            return value
+        
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        future = self._async_inflight.get(flight_key)
+        if future is not None:
+            self._count('coalesced')
+            return await asyncio.shield(future)
+        
+        future = loop.create_future()
+        self._async_inflight[flight_key] = future
+        self._count('misses')
+        try:
+            value = await compute()
+            if value is not None:  # None no se cachea
+                await asyncio.to_thread(self.set, key, value, ttl, stale_ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # marcada como leída aunque nadie espere
+            raise
+        finally:
+            self._async_inflight.pop(flight_key, None)
+    
+    def _count(self, stat: str):
+        with self.lock:
+            self.cache_stats[stat] += 1
+    
+    def _claim_refresh(self, key: str) -> bool:
+        """Sólo un refresco en segundo plano por clave"""
+        with self.lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.cache_stats['refreshes'] += 1
+            return True
+    
+    def _release_refresh(self, key: str):
+        with self.lock:
+            self._refreshing.discard(key)
+    
+    def _refresh_in_thread(self, key: str, compute: Callable[[], Any],
+                           ttl: Optional[int], stale_ttl: float):
+        if not self._claim_refresh(key):
+            return
+        
+        def refresh():
+            try:
+                value = compute()
+                if value is not None:
+                    self.set(key, value, ttl, stale_ttl)
+            except Exception:
+                self._count('errors')
+            finally:
+                self._release_refresh(key)
+        
+        threading.Thread(target=refresh, name=f"cache-refresh-{key}", daemon=True).start()
+    
+    def _refresh_in_task(self, key: str, compute: Callable[[], Any],
+                         ttl: Optional[int], stale_ttl: float):
+        if not self._claim_refresh(key):
+            return
+        
+        async def refresh():
+            try:
+                value = await compute()
+                if value is not None:
+                    await asyncio.to_thread(self.set, key, value, ttl, stale_ttl)
+            except Exception:
+                self._count('errors')
+            finally:
+                self._release_refresh(key)
+        
+        # Guardar referencia para que la tarea no se recolecte a medias
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+    
+    def start_sweeper(self, interval: float = 300):
+        """Arranca el barrido periódico de expirados en un hilo daemon"""
+        
+        def sweep():
+            while not self._sweeper_stop.wait(interval):
+                try:
+                    self.cleanup_expired()
+                except Exception:
+                    self.cache_stats['errors'] += 1
+        
+        with self.lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._sweeper_stop.clear()
+            self._sweeper = threading.Thread(target=sweep, name="cache-sweeper", daemon=True)
+            self._sweeper.start()
+    
+    def stop_sweeper(self):
+        """Detiene el barrido en segundo plano (y su arranque automático)"""
+        self.sweep_interval = None
+        self._sweeper_stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
     
     def get_stats(self) -> Dict:
         """Obtiene estadísticas del caché"""
         total_requests = self.cache_stats['hits'] + self.cache_stats['misses']
         hit_rate = (self.cache_stats['hits'] / total_requests * 100) if total_requests > 0 else 0
+        disk_files = self._scan_disk()
         
         return {
             **self.cache_stats,
             'total_requests': total_requests,
             'hit_rate': hit_rate,
             'memory_entries': len(self.memory_cache),
-            'disk_entries': len([f for f in os.listdir(self.cache_dir) if f.endswith('.cache')])
+            'memory_bytes': self.memory_bytes,
+            'disk_entries': len(disk_files),
+            'disk_bytes': sum(size for _, size, _ in disk_files)
         }
 
 
-# Singleton global
-cache_manager = CacheManager()
+# Singleton global (el barrido arranca con la primera escritura a disco)
+cache_manager = CacheManager(sweep_interval=300)
 
 
-def cached(ttl: int = 300):
+def cached(ttl: int = 300, key_func: Optional[Callable[..., Any]] = None,
+           stale_ttl: float = 0):
     """
-    Decorador para cachear resultados de funciones
+    Decorador para cachear resultados de funciones (sync o async)
+    
+    En métodos se ignora `self`/`cls` (la clave usa el nombre cualificado del
+    método y el resto de argumentos), así que las entradas se reutilizan
+    entre instancias y entre ejecuciones. Los fallos concurrentes de una
+    misma clave se agrupan en un único cálculo (single-flight).
+    
+    Args:
+        ttl: Segundos de vida de la entrada
+        key_func: Opcional; recibe los mismos argumentos que la función y
+                  devuelve lo que identifica la llamada (p.ej. una tupla).
+                  Obligatorio si algún argumento no tiene un repr estable
+                  (p.ej. objetos cuyo repr es '<... at 0x...>')
+        stale_ttl: Segundos tras expirar durante los que se sirve el valor
+                   viejo mientras un único refresco corre en segundo plano
     
     Usage:
         @cached(ttl=600)  # Cache por 10 minutos
         def expensive_function(param1, param2):
             return do_expensive_calculation()
+        
+        @cached(ttl=3600, key_func=lambda self, symbol, interval, days: (symbol, interval, days))
+        def fetch(self, symbol, interval, days): ...
+        
+        @cached(ttl=15, stale_ttl=60)
+        async def indicators(symbol): ...
     """
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # Generar clave de caché
-            cache_key = f"{func.__name__}_{cache_manager._generate_key(*args, **kwargs)}"
-            
-            # Buscar en caché
-            result = cache_manager.get(cache_key)
-            if result is not None:
-                return result
-            
-            # Ejecutar función
-            result = func(*args, **kwargs)
-            
-            # Guardar en caché
-            cache_manager.set(cache_key, result, ttl)
-            
-            return result
+        params = list(inspect.signature(func).parameters)
+        skip_first = bool(params) and params[0] in ('self', 'cls')
+        namespace = f"{func.__module__}.{func.__qualname__}"
+        
+        def build_key(args, kwargs) -> str:
+            if key_func is not None:
+                key_data = _stable_repr(key_func(*args, **kwargs))
+            else:
+                call_args = args[1:] if skip_first else args
+                key_data = f"{_stable_repr(tuple(call_args))}{_stable_repr(kwargs)}"
+            digest = hashlib.md5(f"{namespace}|{key_data}".encode()).hexdigest()
+            return f"{func.__name__}_{digest}"
+        
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                return await cache_manager.aget_or_compute(
+                    build_key(args, kwargs), lambda: func(*args, **kwargs), ttl, stale_ttl
+                )
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                return cache_manager.get_or_compute(
+                    build_key(args, kwargs), lambda: func(*args, **kwargs), ttl, stale_ttl
+                )
         
+        wrapper.cache_key = lambda *args, **kwargs: build_key(args, kwargs)
         return wrapper
     return decorator
 
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Motor de Calibración compartido
+Rejillas de parámetros con memo, pool de procesos, checkpoint y successive halving
+
+Los calibradores (SystemCalibrator, AdaptiveCalibrationSystem,
+QuickAdaptiveCalibration) dividen cada configuración en unidades
+independientes (símbolo, período). El motor evalúa cada (params, unidad)
+una sola vez: el resultado queda en una tabla memo que se reutiliza entre
+iteraciones y rungs, y se añade a un checkpoint en disco del que se puede
+reanudar tras una interrupción. Con halving_eta las configuraciones se
+evalúan primero sobre el primer período y sólo el mejor 1/eta pasa al
+siguiente.
+
+Un calibrador (evaluator) implementa:
+    calibration_units()               -> [unidad, ...] en orden de agregación
+    evaluate_unit(params, unidad)     -> resultado parcial (picklable)
+    summarize(params, [(unidad, parcial), ...]) -> resultado de la configuración
+    rank(resultado)                   -> float para ordenar en el halving
+"""
+
+import math
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+CHECKPOINT_VERSION = 1
+
+
+def params_key(params: Dict[str, Any]) -> Tuple:
+    """Clave hashable e independiente del orden para una combinación de parámetros"""
+    return tuple(sorted(params.items()))
+
+
+def checkpoint_tag(calibrator: str, symbols: Sequence[str], periods: Sequence[Dict[str, Any]],
+                   grid: Any) -> str:
+    """
+    Tag de un checkpoint: versión del formato, calibrador, símbolos, períodos
+    (nombre y fechas) y rejilla. Si cambia cualquiera, el checkpoint no se reutiliza.
+    """
+    periods = [(p['name'], p.get('start'), p.get('end')) for p in periods]
+    return f"v{CHECKPOINT_VERSION}:{calibrator}:{sorted(symbols)}:{periods}:{grid!r}"
+
+
+def rungs_by_period(units: Sequence[Tuple[str, str]], period_names: Sequence[str]) -> List[List]:
+    """Rungs acumulativos por período: [primer período], [primeros dos], ..., todas las unidades"""
+    rungs = []
+    for k in range(1, len(period_names) + 1):
+        included = set(period_names[:k])
+        rung = [unit for unit in units if unit[1] in included]
+        if rung and (not rungs or len(rung) > len(rungs[-1])):
+            rungs.append(rung)
+    if not rungs or len(rungs[-1]) < len(units):
+        rungs.append(list(units))
+    return rungs
+
+
+# ===========================================
+# WORKERS
+# ===========================================
+
+_worker_state = {}
+
+
+def _init_worker(evaluator):
+    _worker_state['evaluator'] = evaluator
+
+
+def _evaluate_tasks(evaluator, chunk):
+    """[(params, [unidades])] -> [(clave, unidad, parcial)]"""
+    results = []
+    for params, units in chunk:
+        key = params_key(params)
+        for unit in units:
+            results.append((key, unit, evaluator.evaluate_unit(params, unit)))
+    return results
+
+
+def _evaluate_chunk(chunk):
+    return _evaluate_tasks(_worker_state['evaluator'], chunk)
+
+
+# ===========================================
+# MOTOR
+# ===========================================
+
+class CalibrationEngine:
+    """Evaluación memoizada, paralela y reanudable de rejillas de parámetros"""
+
+    def __init__(self, evaluator, workers: Optional[int] = None, checkpoint_path: Optional[str] = None,
+                 halving_eta: Optional[float] = None, tag: Optional[str] = None, verbose: bool = True):
+        """
+        Args:
+            evaluator: Calibrador con calibration_units/evaluate_unit/summarize/rank
+            workers: Procesos para evaluar (1 = secuencial); por defecto os.cpu_count()
+            checkpoint_path: Fichero donde se añaden las evaluaciones para reanudar
+            halving_eta: Successive halving: en cada rung pasa el mejor 1/eta (None = sin poda)
+            tag: Identifica los datos/calibrador del checkpoint (un tag distinto es un error)
+            verbose: Imprimir el progreso
+        """
+        if halving_eta is not None and halving_eta <= 1:
+            raise ValueError("halving_eta debe ser > 1")
+
+        self.evaluator = evaluator
+        self.workers = workers or os.cpu_count() or 1
+        self.checkpoint_path = checkpoint_path
+        self.halving_eta = halving_eta
+        self.tag = tag
+        self.verbose = verbose
+
+        # (clave de params, unidad) -> resultado parcial
+        self.memo: Dict[Tuple[Tuple, Hashable], Any] = {}
+        self.stats = {'evaluated': 0, 'memo_hits': 0, 'resumed': 0, 'pruned': 0}
+
+        if checkpoint_path:
+            self._load_checkpoint()
+
+    # ===========================================
+    # EVALUACIÓN
+    # ===========================================
+
+    def evaluate(self, param_combinations: List[Dict[str, Any]], rungs: Optional[List[List]] = None) -> List[Any]:
+        """
+        Resultado (evaluator.summarize) de cada combinación, en el orden de entrada
+
+        Args:
+            param_combinations: Rejilla a evaluar
+            rungs: Listas crecientes de unidades para el halving; la última
+                   debe ser el conjunto completo (por defecto un solo rung)
+
+        Returns:
+            Lista alineada con param_combinations; None para las podadas
+        """
+        units = list(self.evaluator.calibration_units())
+        if not rungs or self.halving_eta is None:
+            rungs = [units]
+        elif set(rungs[-1]) != set(units):
+            rungs = list(rungs) + [units]
+
+        survivors = list(range(len(param_combinations)))
+        for rung_number, rung in enumerate(rungs, 1):
+            self._ensure([param_combinations[i] for i in survivors], rung)
+            if rung_number == len(rungs):
+                break
+
+            # Poda: el mejor 1/eta sobre las unidades del rung (empates por orden de la rejilla)
+            ranked = sorted(
+                survivors,
+                key=lambda i: (-self.evaluator.rank(self._summarize(param_combinations[i], rung)), i)
+            )
+            keep = max(1, math.ceil(len(survivors) / self.halving_eta))
+            self.stats['pruned'] += len(survivors) - keep
+            survivors = sorted(ranked[:keep])
+            if self.verbose:
+                print(f"  ✂️ Rung {rung_number}: {keep} configuraciones pasan al siguiente")
+
+        results = [None] * len(param_combinations)
+        for i in survivors:
+            results[i] = self._summarize(param_combinations[i], units)
+        return results
+
+    def _summarize(self, params, units):
+        key = params_key(params)
+        return self.evaluator.summarize(params, [(unit, self.memo[(key, unit)]) for unit in units])
+
+    def _ensure(self, param_combinations, units):
+        """Evalúa las (params, unidad) que todavía no están en la tabla memo"""
+        tasks, seen = [], set()
+        for params in param_combinations:
+            key = params_key(params)
+            if key in seen:
+                continue
+            seen.add(key)
+            missing = [unit for unit in units if (key, unit) not in self.memo]
+            self.stats['memo_hits'] += len(units) - len(missing)
+            if missing:
+                tasks.append((params, missing))
+
+        if not tasks:
+            return
+
+        total = sum(len(missing) for _, missing in tasks)
+        if self.verbose:
+            print(f"  • Evaluando {total} backtests ({len(tasks)} configuraciones, workers={self.workers})")
+
+        if self.workers <= 1 or len(tasks) <= 1:
+            step = max(1, len(tasks) // 10)
+            chunks = [tasks[i:i + step] for i in range(0, len(tasks), step)]
+            self._consume((_evaluate_tasks(self.evaluator, chunk) for chunk in chunks), total)
+            return
+
+        n_chunks = min(len(tasks), self.workers * 4)
+        chunks = [tasks[i::n_chunks] for i in range(n_chunks)]
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.evaluator,)) as pool:
+            self._consume(pool.map(_evaluate_chunk, chunks), total)
+
+    def _consume(self, chunk_results, total):
+        """Guarda cada bloque en la tabla memo y en el checkpoint a medida que llega"""
+        done = 0
+        next_report = 0.1
+        with self._checkpoint_writer() as writer:
+            for results in chunk_results:
+                for key, unit, partial in results:
+                    self.memo[(key, unit)] = partial
+                self.stats['evaluated'] += len(results)
+                if writer is not None:
+                    pickle.dump(results, writer, protocol=pickle.HIGHEST_PROTOCOL)
+                    writer.flush()
+
+                done += len(results)
+                if self.verbose and done / total >= next_report:
+                    print(f"  📈 Progreso: {done / total * 100:.0f}% ({done}/{total})")
+                    next_report = math.floor(done / total * 10) / 10 + 0.1
+
+    # ===========================================
+    # CHECKPOINT
+    # ===========================================
+
+    def _checkpoint_writer(self):
+        if not self.checkpoint_path:
+            return _NullWriter()
+        is_new = not os.path.exists(self.checkpoint_path) or os.path.getsize(self.checkpoint_path) == 0
+        writer = open(self.checkpoint_path, 'ab')
+        if is_new:
+            pickle.dump({'version': CHECKPOINT_VERSION, 'tag': self.tag}, writer)
+            writer.flush()
+        return writer
+
+    def _load_checkpoint(self):
+        """Carga las evaluaciones guardadas; un último bloque truncado se descarta"""
+        if not os.path.exists(self.checkpoint_path) or os.path.getsize(self.checkpoint_path) == 0:
+            return
+
+        with open(self.checkpoint_path, 'rb') as f:
+            header = pickle.load(f)
+            if not isinstance(header, dict) or header.get('version') != CHECKPOINT_VERSION:
+                raise ValueError(f"{self.checkpoint_path} no es un checkpoint de calibración")
+            if header.get('tag') != self.tag:
+                raise ValueError(
+                    f"{self.checkpoint_path} pertenece a otra calibración "
+                    f"(tag {header.get('tag')!r}, esperado {self.tag!r})"
+                )
+
+            valid_end = f.tell()
+            while True:
+                try:
+                    results = pickle.load(f)
+                except (EOFError, pickle.UnpicklingError, ValueError, AttributeError, IndexError):
+                    break
+                for key, unit, partial in results:
+                    self.memo[(key, unit)] = partial
+                self.stats['resumed'] += len(results)
+                valid_end = f.tell()
+
+        # Un bloque a medio escribir (proceso interrumpido) no debe quedar delante de los nuevos
+        if valid_end < os.path.getsize(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r+b') as f:
+                f.truncate(valid_end)
+
+        if self.verbose and self.stats['resumed']:
+            print(f"♻️ Reanudando: {self.stats['resumed']} backtests desde {self.checkpoint_path}")
+
+
+class _NullWriter:
+    """Writer vacío cuando no hay checkpoint"""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+# ===========================================
+# SIMULACIÓN CON STOPS FIJOS
+# ===========================================
+
+def simulate_fixed_stops(data, direction, score, min_score, stop_loss_pct, take_profit_pct, leverage,
+                         symbol, extra_fields=None, start=20, track_duration=False, commission_pct=0.2):
+    """
+    Backtest de entradas al cierre con stop loss / take profit porcentuales
+
+    Misma semántica que los bucles por vela de los calibradores (entrada al
+    cierre de la vela, salidas desde la siguiente, stop antes que target,
+    cierre al final del período) pero sobre listas en lugar de df.iloc.
+
+    Args:
+        data: Velas del período (Close, High, Low)
+        direction: Por vela 1 LONG, -1 SHORT, 0 sin señal
+        score: Score de la señal por vela (entra si score >= min_score)
+        symbol, extra_fields: Campos de cada trade
+        track_duration: Añadir duration_days a los trades cerrados por stop/target
+    """
+    index = data.index
+    close = data['Close'].tolist()
+    high = data['High'].tolist()
+    low = data['Low'].tolist()
+    direction = list(direction)
+    score = list(score)
+    extra_fields = extra_fields or {}
+
+    trades = []
+    position = None
+
+    for i in range(start, len(close)):
+        if position is None:
+            if direction[i] and score[i] >= min_score:
+                entry_price = float(close[i])
+                is_long = direction[i] > 0
+                position = {
+                    'symbol': symbol,
+                    'type': 'LONG' if is_long else 'SHORT',
+                    'entry_date': index[i],
+                    'entry_price': entry_price,
+                    'score': score[i],
+                    **extra_fields
+                }
+                if is_long:
+                    position['stop_loss'] = entry_price * (1 - stop_loss_pct)
+                    position['take_profit'] = entry_price * (1 + take_profit_pct)
+                else:
+                    position['stop_loss'] = entry_price * (1 + stop_loss_pct)
+                    position['take_profit'] = entry_price * (1 - take_profit_pct)
+            continue
+
+        exit_reason = None
+        if position['type'] == 'LONG':
+            if low[i] <= position['stop_loss']:
+                exit_reason = 'STOP_LOSS'
+            elif high[i] >= position['take_profit']:
+                exit_reason = 'TAKE_PROFIT'
+        else:
+            if high[i] >= position['stop_loss']:
+                exit_reason = 'STOP_LOSS'
+            elif low[i] <= position['take_profit']:
+                exit_reason = 'TAKE_PROFIT'
+
+        if exit_reason:
+            exit_price = position['stop_loss'] if exit_reason == 'STOP_LOSS' else position['take_profit']
+            _close_position(position, index[i], exit_price, exit_reason, leverage, commission_pct)
+            if track_duration:
+                position['duration_days'] = (position['exit_date'] - position['entry_date']).days
+            trades.append(position)
+            position = None
+
+    # Posición abierta al final del período
+    if position:
+        _close_position(position, index[-1], float(close[-1]), 'END_PERIOD', leverage, commission_pct)
+        trades.append(position)
+
+    return trades
+
+
+def _close_position(position, exit_date, exit_price, exit_reason, leverage, commission_pct):
+    position['exit_date'] = exit_date
+    position['exit_price'] = exit_price
+    position['exit_reason'] = exit_reason
+
+    if position['type'] == 'LONG':
+        position['return_pct'] = ((exit_price / position['entry_price']) - 1) * 100
+    else:
+        position['return_pct'] = ((position['entry_price'] / exit_price) - 1) * 100
+
+    position['return_pct'] *= leverage
+    position['return_pct'] -= commission_pct
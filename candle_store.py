@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Candle Store - Almacén local de velas OHLCV con sincronización incremental
+
+Guarda en disco una serie por (símbolo, intervalo) como matriz float64
+memory-mapped con columnas [open_time_ms, open, high, low, close, volume].
+Sólo se persisten velas cerradas; en cada sincronización se descarga
+únicamente la cola que falta desde la última vela cerrada, paginando de
+1000 en 1000 si hace falta. Las ventanas se sirven como slices del memmap
+(sin copia).
+"""
+
+import os
+import time
+import threading
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columnas de la matriz persistida
+COLUMNS = ['open_time', 'open', 'high', 'low', 'close', 'volume']
+N_COLS = len(COLUMNS)
+
+# Máximo de velas por request en Binance
+MAX_LIMIT = 1000
+
+INTERVAL_MS = {
+    '1m': 60_000,
+    '3m': 3 * 60_000,
+    '5m': 5 * 60_000,
+    '15m': 15 * 60_000,
+    '30m': 30 * 60_000,
+    '1h': 3_600_000,
+    '2h': 2 * 3_600_000,
+    '4h': 4 * 3_600_000,
+    '6h': 6 * 3_600_000,
+    '8h': 8 * 3_600_000,
+    '12h': 12 * 3_600_000,
+    '1d': 86_400_000,
+    '3d': 3 * 86_400_000,
+    '1w': 7 * 86_400_000,
+}
+
+# fetch_fn(symbol, interval, start_ms, limit) -> [[open_time_ms, o, h, l, c, v], ...]
+FetchFn = Callable[[str, str, int, int], List[List[float]]]
+
+
+def interval_to_ms(interval: str) -> int:
+    """Convierte un intervalo de Binance ('15m', '1h', ...) a milisegundos"""
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"Intervalo no soportado por el candle store: {interval}")
+    return INTERVAL_MS[interval]
+
+
+def binance_rest_fetcher(base_url: str = "https://api.binance.com/api/v3",
+                         session=None, timeout: float = 10) -> FetchFn:
+    """Fetcher sobre el endpoint REST /klines de Binance"""
+    import requests
+    http = session or requests.Session()
+
+    def fetch(symbol: str, interval: str, start_ms: int, limit: int) -> List[List[float]]:
+        response = http.get(
+            f"{base_url}/klines",
+            params={
+                'symbol': symbol,
+                'interval': interval,
+                'startTime': int(start_ms),
+                'limit': min(limit, MAX_LIMIT),
+            },
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return [[float(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5])]
+                for k in response.json()]
+
+    return fetch
+
+
+def ccxt_fetcher(exchange) -> FetchFn:
+    """Fetcher sobre fetch_ohlcv de un exchange ccxt"""
+
+    def fetch(symbol: str, interval: str, start_ms: int, limit: int) -> List[List[float]]:
+        ohlcv = exchange.fetch_ohlcv(symbol=symbol, timeframe=interval,
+                                     since=int(start_ms), limit=min(limit, MAX_LIMIT))
+        return [[float(v) for v in row[:N_COLS]] for row in ohlcv]
+
+    return fetch
+
+
+class CandleStore:
+    """
+    Almacén de velas en disco con sincronización incremental
+    """
+
+    def __init__(self, fetch_fn: FetchFn, data_dir: Optional[str] = None,
+                 live_ttl: float = 5.0, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            fetch_fn: Función que descarga velas desde start_ms (ver FetchFn)
+            data_dir: Directorio de los ficheros .bin (CANDLE_STORE_DIR o 'candles')
+            live_ttl: Segundos durante los que se reutiliza la vela en formación
+                      sin volver a consultar el exchange
+            clock: Reloj en segundos (inyectable para tests)
+        """
+        self.fetch_fn = fetch_fn
+        self.data_dir = data_dir or os.getenv('CANDLE_STORE_DIR', 'candles')
+        self.live_ttl = live_ttl
+        self.clock = clock
+
+        self._maps: Dict[Tuple[str, str], np.ndarray] = {}
+        self._live: Dict[Tuple[str, str], np.ndarray] = {}
+        self._last_sync: Dict[Tuple[str, str], float] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.stats = {
+            'syncs': 0,
+            'skipped_syncs': 0,
+            'requests': 0,
+            'candles_downloaded': 0,
+        }
+
+        os.makedirs(self.data_dir, exist_ok=True)
+
+    # ===========================================
+    # FICHEROS Y MEMMAP
+    # ===========================================
+
+    def _path(self, symbol: str, interval: str) -> str:
+        safe_symbol = symbol.replace('/', '').replace(':', '_')
+        return os.path.join(self.data_dir, f"{safe_symbol}_{interval}.bin")
+
+    def _lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _load(self, key: Tuple[str, str]) -> np.ndarray:
+        """Abre (o reutiliza) el memmap de solo lectura de una serie"""
+        if key in self._maps:
+            return self._maps[key]
+
+        path = self._path(*key)
+        row_bytes = N_COLS * 8
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        n_rows = size // row_bytes
+
+        if n_rows == 0:
+            data = np.empty((0, N_COLS), dtype=np.float64)
+        else:
+            data = np.memmap(path, dtype=np.float64, mode='r', shape=(n_rows, N_COLS))
+
+        self._maps[key] = data
+        return data
+
+    def _append(self, key: Tuple[str, str], rows: np.ndarray):
+        """Añade velas cerradas al final del fichero"""
+        if len(rows) == 0:
+            return
+        with open(self._path(*key), 'ab') as f:
+            f.write(np.ascontiguousarray(rows, dtype=np.float64).tobytes())
+        # Los slices ya entregados siguen siendo válidos: el fichero sólo crece
+        self._maps.pop(key, None)
+
+    def _rewrite(self, key: Tuple[str, str], rows: np.ndarray):
+        """Reescribe la serie completa (sólo para backfill de historia antigua)"""
+        path = self._path(*key)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(np.ascontiguousarray(rows, dtype=np.float64).tobytes())
+        os.replace(tmp_path, path)
+        self._maps.pop(key, None)
+
+    # ===========================================
+    # SINCRONIZACIÓN
+    # ===========================================
+
+    def _download(self, symbol: str, interval: str, start_ms: int,
+                  end_ms: Optional[int] = None) -> np.ndarray:
+        """Descarga velas desde start_ms paginando de MAX_LIMIT en MAX_LIMIT"""
+        step = interval_to_ms(interval)
+        chunks = []
+        cursor = start_ms
+
+        while True:
+            rows = self.fetch_fn(symbol, interval, cursor, MAX_LIMIT)
+            self.stats['requests'] += 1
+            if not rows:
+                break
+
+            chunk = np.asarray(rows, dtype=np.float64).reshape(-1, N_COLS)
+            chunk = chunk[chunk[:, 0] >= cursor]
+            if end_ms is not None:
+                chunk = chunk[chunk[:, 0] < end_ms]
+            if len(chunk) == 0:
+                break
+
+            chunks.append(chunk)
+            self.stats['candles_downloaded'] += len(chunk)
+            cursor = int(chunk[-1, 0]) + step
+
+            if len(rows) < MAX_LIMIT or (end_ms is not None and cursor >= end_ms):
+                break
+
+        if not chunks:
+            return np.empty((0, N_COLS), dtype=np.float64)
+        return np.concatenate(chunks)
+
+    def sync(self, symbol: str, interval: str, min_candles: int = 0, force: bool = False) -> np.ndarray:
+        """
+        Sincroniza la serie con el exchange y devuelve el memmap de velas cerradas
+
+        Args:
+            symbol: Símbolo tal como lo espera fetch_fn
+            interval: Intervalo ('15m', '1h', ...)
+            min_candles: Historia mínima de velas cerradas a garantizar
+            force: Ignorar live_ttl y consultar siempre el exchange
+        """
+        key = (symbol, interval)
+        step = interval_to_ms(interval)
+
+        with self._lock(key):
+            now = self.clock()
+            data = self._load(key)
+
+            fresh = (now - self._last_sync.get(key, 0)) < self.live_ttl
+            if fresh and not force and len(data) >= min_candles:
+                self.stats['skipped_syncs'] += 1
+                return data
+
+            self.stats['syncs'] += 1
+            now_ms = int(now * 1000)
+            current_open = now_ms - now_ms % step
+
+            # Backfill: historia insuficiente por delante de la primera vela guardada
+            if len(data) and len(data) < min_candles:
+                first_open = int(data[0, 0])
+                start = first_open - (min_candles - len(data)) * step
+                head = self._download(symbol, interval, start, end_ms=first_open)
+                if len(head):
+                    self._rewrite(key, np.concatenate([head, np.asarray(data)]))
+                    data = self._load(key)
+
+            # Cola: todo lo posterior a la última vela cerrada
+            if len(data):
+                start = int(data[-1, 0]) + step
+            else:
+                start = current_open - max(min_candles, 1) * step
+
+            tail = self._download(symbol, interval, start)
+            closed = tail[tail[:, 0] + step <= now_ms]
+            live = tail[tail[:, 0] + step > now_ms]
+
+            if len(closed):
+                self._append(key, closed)
+                data = self._load(key)
+
+            if len(live):
+                self._live[key] = live[-1].copy()
+            else:
+                self._live.pop(key, None)
+
+            self._last_sync[key] = now
+            return data
+
+    # ===========================================
+    # LECTURA
+    # ===========================================
+
+    def last_closed_time(self, symbol: str, interval: str) -> Optional[int]:
+        """open_time (ms) de la última vela cerrada guardada"""
+        data = self._load((symbol, interval))
+        return int(data[-1, 0]) if len(data) else None
+
+    def closed_candles(self, symbol: str, interval: str) -> np.ndarray:
+        """Serie completa de velas cerradas guardadas (memmap, sin sincronizar)"""
+        return self._load((symbol, interval))
+
+    def live_candle(self, symbol: str, interval: str) -> Optional[np.ndarray]:
+        """Vela en formación de la última sincronización (None si no hay)"""
+        return self._live.get((symbol, interval))
+
+    def get_window(self, symbol: str, interval: str, limit: int,
+                   include_live: bool = False, sync: bool = True) -> np.ndarray:
+        """
+        Devuelve las últimas `limit` velas como matriz (N, 6)
+
+        Sin include_live el resultado es un slice del memmap (sin copia y de
+        solo lectura). Con include_live se añade la vela en formación, lo que
+        obliga a copiar la ventana.
+        """
+        key = (symbol, interval)
+        if sync:
+            self.sync(symbol, interval, min_candles=limit)
+
+        data = self._load(key)
+        live = self._live.get(key) if include_live else None
+
+        if live is None:
+            return data[-limit:] if limit else data[:0]
+
+        closed = data[-(limit - 1):] if limit > 1 else data[:0]
+        return np.vstack([closed, live[None, :]])
+
+    def get_dataframe(self, symbol: str, interval: str, limit: int,
+                      include_live: bool = True, sync: bool = True) -> pd.DataFrame:
+        """
+        Ventana como DataFrame con el formato de BinanceDataFetcher.get_klines
+        (índice timestamp, columnas Open/High/Low/Close/Volume)
+
+        Los llamadores existentes añaden y modifican columnas, así que se
+        copia la ventana (como máximo `limit` filas) para no tocar el store.
+        """
+        window = self.get_window(symbol, interval, limit, include_live=include_live, sync=sync)
+        df = window_to_dataframe(window)
+        df.attrs.update(symbol=symbol, interval=interval)
+        return df
+
+
+def window_to_dataframe(window: np.ndarray) -> pd.DataFrame:
+    """Matriz (N, 6) de velas -> DataFrame con índice timestamp y columnas OHLCV"""
+    df = pd.DataFrame(
+        np.array(window[:, 1:], dtype=np.float64),
+        index=pd.to_datetime(window[:, 0].astype(np.int64), unit='ms'),
+        columns=['Open', 'High', 'Low', 'Close', 'Volume'],
+    )
+    df.index.name = 'timestamp'
+    return df
+
+
+_default_store: Optional[CandleStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_candle_store() -> CandleStore:
+    """Store global sobre la API REST pública de Binance"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = CandleStore(binance_rest_fetcher())
+        return _default_store
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    store = get_candle_store()
+
+    for attempt in range(3):
+        start = time.time()
+        df = store.get_dataframe('BTCUSDT', '15m', 500)
+        print(f"Intento {attempt + 1}: {len(df)} velas en {(time.time() - start) * 1000:.1f}ms")
+        time.sleep(1)
+
+    print(f"Estadísticas: {store.stats}")
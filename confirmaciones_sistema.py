@@ -7,6 +7,8 @@ Probando diferentes indicadores para mejorar precisión
 import pandas as pd
 import numpy as np
 
+from pivot_index import get_pivot_view
+
 class ConfirmacionesModulares:
     """
     Sistema modular para probar diferentes confirmaciones
@@ -105,65 +107,58 @@ class ConfirmacionesModulares:
         """Identifica Order Blocks en el gráfico"""
         
         blocks = []
-        
-        # Buscar zonas de alto volumen y reversión
-        for i in range(10, len(df) - 5):
-            current_bar = df.iloc[i]
-            
-            # Identificar posibles order blocks por cambio de estructura
-            high_volume = current_bar['Volume'] > df['Volume'].rolling(20).mean().iloc[i] * 1.5
-            
-            if high_volume:
-                # Analizar comportamiento después del volumen alto
-                future_bars = df.iloc[i+1:i+6]
-                
-                if len(future_bars) >= 3:
-                    # Order Block Alcista: Volumen alto seguido de movimiento alcista
-                    if (future_bars['Close'].iloc[-1] > current_bar['Close'] and
-                        future_bars['Close'].min() >= current_bar['Low'] * 0.998):
-                        
-                        strength = self._calculate_block_strength(df, i, 'bullish')
-                        blocks.append({
-                            'type': 'bullish',
-                            'price': current_bar['Close'],
-                            'high': current_bar['High'],
-                            'low': current_bar['Low'],
-                            'index': i,
-                            'strength': strength,
-                            'volume': current_bar['Volume']
-                        })
-                    
-                    # Order Block Bajista: Volumen alto seguido de movimiento bajista
-                    elif (future_bars['Close'].iloc[-1] < current_bar['Close'] and
-                          future_bars['Close'].max() <= current_bar['High'] * 1.002):
-                        
-                        strength = self._calculate_block_strength(df, i, 'bearish')
-                        blocks.append({
-                            'type': 'bearish',
-                            'price': current_bar['Close'],
-                            'high': current_bar['High'],
-                            'low': current_bar['Low'],
-                            'index': i,
-                            'strength': strength,
-                            'volume': current_bar['Volume']
-                        })
+        n = len(df)
+        if n < 16:
+            return blocks
+        
+        view = get_pivot_view(df)
+        close, low, high = view.values('Close'), view.values('Low'), view.values('High')
+        volume = view.values('Volume')
+        volume_ma = view.rolling('mean', 'Volume', 20)
+        
+        # Candidatas i en [10, n-5): volumen alto; se mira la reacción en las 5 velas siguientes
+        i = np.arange(10, n - 5)
+        with np.errstate(invalid='ignore'):
+            high_volume = volume[i] > volume_ma[i] * 1.5
+        exit_close = close[i + 5]
+        future_min = view.rolling('min', 'Close', 5)[i + 5]
+        future_max = view.rolling('max', 'Close', 5)[i + 5]
+        
+        # Order Block Alcista: Volumen alto seguido de movimiento alcista
+        bullish = high_volume & (exit_close > close[i]) & (future_min >= low[i] * 0.998)
+        # Order Block Bajista: Volumen alto seguido de movimiento bajista
+        bearish = (high_volume & ~bullish & (exit_close < close[i]) &
+                   (future_max <= high[i] * 1.002))
+        
+        for position, block_type in sorted(
+                [(int(p), 'bullish') for p in i[bullish]] + [(int(p), 'bearish') for p in i[bearish]]):
+            blocks.append({
+                'type': block_type,
+                'price': close[position],
+                'high': high[position],
+                'low': low[position],
+                'index': position,
+                'strength': self._calculate_block_strength(df, position, block_type, view),
+                'volume': volume[position]
+            })
         
         # Mantener solo los blocks más recientes y fuertes
         blocks = sorted(blocks, key=lambda x: (x['strength'], x['index']), reverse=True)
         return blocks[:5]  # Top 5 blocks
     
-    def _calculate_block_strength(self, df, block_index, block_type):
+    def _calculate_block_strength(self, df, block_index, block_type, view=None):
         """Calcula la fortaleza de un order block"""
         
         if block_index >= len(df) - 5:
             return 0.3
         
+        view = view or get_pivot_view(df)
         strength = 0.0
-        block_bar = df.iloc[block_index]
+        block_close = view.values('Close')[block_index]
         
         # 1. Fortaleza por volumen
-        avg_volume = df['Volume'].rolling(20).mean().iloc[block_index]
-        volume_ratio = block_bar['Volume'] / avg_volume if avg_volume > 0 else 1
+        avg_volume = view.rolling('mean', 'Volume', 20)[block_index]
+        volume_ratio = view.values('Volume')[block_index] / avg_volume if avg_volume > 0 else 1
         
         if volume_ratio >= 3.0:
             strength += 0.4
@@ -172,41 +167,39 @@ class ConfirmacionesModulares:
         elif volume_ratio >= 1.5:
             strength += 0.1
         
-        # 2. Fortaleza por reacción del precio
-        future_bars = df.iloc[block_index+1:block_index+6]
-        if len(future_bars) >= 3:
-            price_reaction = abs(future_bars['Close'].iloc[-1] - block_bar['Close']) / block_bar['Close']
-            
-            if price_reaction >= 0.03:  # Reacción fuerte 3%+
-                strength += 0.3
-            elif price_reaction >= 0.015:  # Reacción moderada 1.5%+
-                strength += 0.2
-            elif price_reaction >= 0.005:  # Reacción débil 0.5%+
-                strength += 0.1
+        # 2. Fortaleza por reacción del precio (5 velas siguientes)
+        price_reaction = abs(view.values('Close')[block_index + 5] - block_close) / block_close
+        
+        if price_reaction >= 0.03:  # Reacción fuerte 3%+
+            strength += 0.3
+        elif price_reaction >= 0.015:  # Reacción moderada 1.5%+
+            strength += 0.2
+        elif price_reaction >= 0.005:  # Reacción débil 0.5%+
+            strength += 0.1
         
         # 3. Fortaleza por posición en la estructura
-        if self._is_structure_break(df, block_index, block_type):
+        if self._is_structure_break(df, block_index, block_type, view):
             strength += 0.3
         
         return min(strength, 1.0)
     
-    def _is_structure_break(self, df, index, block_type):
+    def _is_structure_break(self, df, index, block_type, view=None):
         """Verifica si hay ruptura de estructura"""
         
         if index < 10 or index >= len(df) - 3:
             return False
         
-        # Analizar highs y lows recientes
-        recent_highs = df['High'].iloc[index-10:index].max()
-        recent_lows = df['Low'].iloc[index-10:index].min()
-        current_bar = df.iloc[index]
+        # Highs y lows de las 10 velas anteriores
+        view = view or get_pivot_view(df)
         
         if block_type == 'bullish':
             # Ruptura alcista: nuevo high después de consolidación
-            return current_bar['High'] > recent_highs * 1.001
+            recent_highs = view.rolling('max', 'High', 10)[index - 1]
+            return view.values('High')[index] > recent_highs * 1.001
         else:
             # Ruptura bajista: nuevo low después de consolidación
-            return current_bar['Low'] < recent_lows * 0.999
+            recent_lows = view.rolling('min', 'Low', 10)[index - 1]
+            return view.values('Low')[index] < recent_lows * 0.999
     
     def _analyze_market_structure(self, df):
         """Analiza estructura de mercado (Higher Highs/Lower Lows)"""
@@ -214,28 +207,15 @@ class ConfirmacionesModulares:
         if len(df) < 20:
             return 'neutral'
         
-        # Analizar últimos 20 períodos
-        recent_data = df.tail(20)
-        
-        # Identificar swings
-        highs = recent_data['High'].rolling(3, center=True).max()
-        lows = recent_data['Low'].rolling(3, center=True).min()
+        # Analizar últimos 20 períodos contra el máximo/mínimo de las 3 velas previas
+        view = get_pivot_view(df.tail(20))
+        high, low = view.values('High'), view.values('Low')
+        prev_high = view.rolling('max', 'High', 3)
+        prev_low = view.rolling('min', 'Low', 3)
         
         # Contar Higher Highs y Lower Lows
-        hh_count = 0  # Higher Highs
-        ll_count = 0  # Lower Lows
-        
-        for i in range(3, len(recent_data) - 3):
-            current_high = recent_data['High'].iloc[i]
-            current_low = recent_data['Low'].iloc[i]
-            
-            prev_high = recent_data['High'].iloc[i-3:i].max()
-            prev_low = recent_data['Low'].iloc[i-3:i].min()
-            
-            if current_high > prev_high:
-                hh_count += 1
-            if current_low < prev_low:
-                ll_count += 1
+        hh_count = int(np.sum(high[3:-3] > prev_high[2:-4]))  # Higher Highs
+        ll_count = int(np.sum(low[3:-3] < prev_low[2:-4]))    # Lower Lows
         
         if hh_count > ll_count + 1:
             return 'bullish_structure'
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Fixtures compartidos por los tests: velas OHLCV sintéticas"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_ohlcv(n: Optional[int] = None, seed: int = 0, *, start: str = '2024-01-01',
+               end: Optional[str] = None, freq: str = 'h', tz: Optional[str] = None,
+               name: Optional[str] = None, price: float = 100.0, vol: float = 0.01,
+               drift: float = 0.0, regime: int = 0, wick: float = 0.005,
+               lowercase: bool = False) -> pd.DataFrame:
+    """
+    Paseo aleatorio geométrico con semilla (open = cierre anterior)
+
+    Args:
+        n: Velas (o end para un rango de fechas fijo)
+        vol: Desviación del retorno por vela
+        drift, regime: Tendencia por vela que cambia de signo cada `regime` velas
+        wick: Mecha máxima relativa por encima/debajo del cuerpo
+        lowercase: Columnas open/high/low/close/volume (formato de trading_api)
+    """
+    index = pd.date_range(start, end, periods=None if end else n, freq=freq, tz=tz, name=name)
+    n = len(index)
+    rng = np.random.default_rng(seed)
+    trend = np.where((np.arange(n) // regime) % 2 == 0, drift, -drift) if regime else drift
+    close = price * np.exp(np.cumsum(trend + rng.normal(0, vol, n)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    df = pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * (1 + rng.uniform(0, wick, n)),
+        'Low': np.minimum(open_, close) * (1 - rng.uniform(0, wick, n)),
+        'Close': close,
+        'Volume': rng.uniform(100, 1000, n),
+    }, index=index)
+    if lowercase:
+        df.columns = df.columns.str.lower()
+    return df
+
+
+@pytest.fixture(scope='session')
+def ohlcv():
+    """Factoría de velas sintéticas: ohlcv(n, seed=..., freq=..., ...) (ver make_ohlcv)"""
+    return make_ohlcv
@@ -12,13 +12,25 @@ import json
 import warnings
 warnings.filterwarnings('ignore')
 
+from point_in_time import PointInTimeSource, resample_ohlcv
+
 class DailyTradingSystemV3:
     """
     Sistema de trading diario V3 con correcciones críticas basadas en análisis de pérdidas
     """
     
-    def __init__(self, initial_capital=10000):
+    # Historia previa al inicio del backtest que necesita cada intervalo del replay
+    REPLAY_LOOKBACK = {
+        '1d': timedelta(days=30),
+        '1h': timedelta(days=20),
+        '15m': timedelta(days=5),
+    }
+    
+    def __init__(self, initial_capital=10000, data_source=None):
         self.initial_capital = initial_capital
+        
+        # Replay point-in-time (PointInTimeSource); None: descargas de yfinance por ventana
+        self.data_source = data_source
         self.current_capital = initial_capital
         
         # Parámetros V3 - ULTRA CORREGIDOS basados en análisis de pérdidas
@@ -81,22 +93,23 @@ class DailyTradingSystemV3:
         self.current_positions = {}
         self.symbol_correlations = {}  # NUEVO: Cache de correlaciones
         
-    def calculate_symbol_correlations(self, symbols, days=30):
+    def calculate_symbol_correlations(self, symbols, days=30, end_date=None):
         """
         NUEVO: Calcula correlaciones entre símbolos para evitar posiciones concentradas
+        
+        end_date: Fin de la ventana (por defecto ahora; en backtests el inicio del período)
         """
         if len(symbols) < 2:
             return {}
         
         # Obtener datos históricos
-        end_date = datetime.now()
+        end_date = end_date if end_date is not None else datetime.now()
         start_date = end_date - timedelta(days=days)
         
         price_data = {}
         for symbol in symbols:
             try:
-                ticker = yf.Ticker(symbol)
-                df = ticker.history(start=start_date, end=end_date, interval='1d')
+                df = self._history(symbol, '1d', start_date, end_date)
                 if len(df) > 10:
                     price_data[symbol] = df['Close'].pct_change().dropna()
             except:
@@ -128,8 +141,6 @@ class DailyTradingSystemV3:
         
         for tf in self.params['timeframes']:
             try:
-                ticker = yf.Ticker(symbol)
-                
                 if tf == '15m':
                     interval = '15m'
                     days_back = 5
@@ -141,19 +152,17 @@ class DailyTradingSystemV3:
                     days_back = 20
                 
                 start = current_date - timedelta(days=days_back)
-                df = ticker.history(start=start, end=current_date, interval=interval)
+                df = self._history(symbol, interval, start, current_date)
                 
                 if len(df) < 50:  # Aumentado de 20 a 50 para más datos
                     continue
                 
                 if tf == '4h':
-                    df = df.resample('4H').agg({
-                        'Open': 'first',
-                        'High': 'max',
-                        'Low': 'min',
-                        'Close': 'last',
-                        'Volume': 'sum'
-                    }).dropna()
+                    # El replay ya tiene la vista 4h remuestreada sobre toda la serie
+                    if self.data_source is not None:
+                        df = self.data_source.history(symbol, '4h', start, current_date)
+                    else:
+                        df = resample_ohlcv(df, '4h')
                 
                 indicators[tf] = self.calculate_indicators(df, tf)
                 
@@ -162,6 +171,12 @@ class DailyTradingSystemV3:
         
         return indicators
     
+    def _history(self, symbol, interval, start, end):
+        """Velas de [start, end): slice del replay point-in-time o descarga de yfinance"""
+        if self.data_source is not None:
+            return self.data_source.history(symbol, interval, start, end)
+        return yf.Ticker(symbol).history(start=start, end=end, interval=interval)
+    
     def calculate_indicators(self, df, timeframe):
         """
         Calcula indicadores técnicos con validación ultra estricta
@@ -506,13 +521,22 @@ class DailyTradingSystemV3:
         
         return True, "OK"
     
-    def backtest_ultra_conservative(self, symbols, start_date, end_date):
+    def backtest_ultra_conservative(self, symbols, start_date, end_date, replay=False):
         """
         Backtest del sistema V3 ULTRA CONSERVADOR
+        
+        replay: Cargar cada serie una vez en un PointInTimeSource (si no hay
+            data_source ya configurado) en vez de descargar ventanas por día
         """
-        # Calcular correlaciones primero
+        if replay and self.data_source is None:
+            # Lookback por intervalo: 30 días de correlaciones, 20 días de 1h para 4h y 5 días de 15m
+            self.data_source = PointInTimeSource(start_date, end_date, lookback=self.REPLAY_LOOKBACK)
+        if self.data_source is not None:
+            self.data_source.preload(symbols, ['1d', '15m', '1h'])
+        
+        # Calcular correlaciones primero (con datos anteriores al backtest)
         print("📊 Calculando correlaciones entre símbolos...")
-        self.calculate_symbol_correlations(symbols, days=30)
+        self.calculate_symbol_correlations(symbols, days=30, end_date=pd.Timestamp(start_date))
         
         all_trades = []
         
@@ -728,7 +752,7 @@ def test_v3_system():
     print(f"Symbols: {', '.join(symbols)}")
     print("-"*80)
     
-    trades = system.backtest_ultra_conservative(symbols, start_date, end_date)
+    trades = system.backtest_ultra_conservative(symbols, start_date, end_date, replay=True)
     
     print(f"\\n💡 EXPECTATIVA V3:")
     print("Con estos filtros ultra estrictos, esperamos:")
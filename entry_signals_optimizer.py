@@ -9,6 +9,8 @@ import numpy as np
 import yfinance as yf
 from datetime import datetime, timedelta
 
+from pivot_index import get_pivot_view
+
 class EntrySignalsOptimizer:
     """
     Optimizador de señales de entrada basado en:
@@ -135,22 +137,17 @@ class EntrySignalsOptimizer:
             # Últimos 20 períodos para estructura reciente
             recent_data = df.tail(20)
             
-            highs = recent_data['High'].values
-            lows = recent_data['Low'].values
-            closes = recent_data['Close'].values
-            
-            # Encontrar swing highs y lows
-            swing_highs = []
-            swing_lows = []
+            view = get_pivot_view(recent_data)
+            highs = view.values('High')
+            lows = view.values('Low')
+            closes = view.values('Close')
             
-            for i in range(2, len(highs) - 2):
-                # Swing high: high[i] > high[i-1] and high[i] > high[i+1]
-                if highs[i] > highs[i-1] and highs[i] > highs[i+1]:
-                    swing_highs.append((i, highs[i]))
-                
-                # Swing low: low[i] < low[i-1] and low[i] < low[i+1]
-                if lows[i] < lows[i-1] and lows[i] < lows[i+1]:
-                    swing_lows.append((i, lows[i]))
+            # Swing highs/lows: pivotes de orden 1 (high[i] > high[i±1], low[i] < low[i±1])
+            inner = slice(2, len(highs) - 2)
+            swing_highs = [(int(i), highs[i]) for i in view.pivots('high', 1)
+                           if inner.start <= i < inner.stop]
+            swing_lows = [(int(i), lows[i]) for i in view.pivots('low', 1)
+                          if inner.start <= i < inner.stop]
             
             # Analizar estructura según tipo de señal
             if signal_type == 'LONG':
@@ -392,21 +389,20 @@ class EntrySignalsOptimizer:
         volume_threshold = recent_data['Volume'].quantile(0.8)
         price_range_threshold = recent_data['Close'].std() * 0.5
         
-        order_blocks = []
-        
-        for i in range(5, len(recent_data) - 5):
-            window = recent_data.iloc[i-2:i+3]
-            
-            # Criterios para order block
-            high_volume = window['Volume'].mean() >= volume_threshold
-            price_consolidation = window['High'].max() - window['Low'].min() <= price_range_threshold
-            
-            if high_volume and price_consolidation:
-                order_blocks.append({
-                    'index': i,
-                    'price_level': window['Close'].mean(),
-                    'volume': window['Volume'].mean()
-                })
+        # Ventana de 5 velas centrada en i (termina en i+2), para i en [5, 15)
+        view = get_pivot_view(recent_data)
+        end = np.arange(5, len(recent_data) - 5) + 2
+        volume_mean = view.rolling('mean', 'Volume', 5)[end]
+        price_range = view.rolling('max', 'High', 5)[end] - view.rolling('min', 'Low', 5)[end]
+        close_mean = view.rolling('mean', 'Close', 5)[end]
+        
+        # Criterios para order block
+        matches = (volume_mean >= volume_threshold) & (price_range <= price_range_threshold)
+        order_blocks = [{
+            'index': int(i) - 2,
+            'price_level': close_mean[k],
+            'volume': volume_mean[k]
+        } for k, i in enumerate(end) if matches[k]]
         
         return {
             'relevant_block': len(order_blocks) > 0,
@@ -421,25 +417,26 @@ class EntrySignalsOptimizer:
             return {'recent_sweep': False}
         
         recent_data = df.tail(10)
+        view = get_pivot_view(recent_data)
+        high, low = view.values('High'), view.values('Low')
+        bearish_candle = view.values('Close') < view.values('Open')
+        bullish_candle = view.values('Close') > view.values('Open')
+        
+        # Buscar movimientos que rompen high/low de las 3 velas previas y luego revierten
+        i = np.arange(3, len(recent_data) - 1)
+        prev_high = view.rolling('max', 'High', 3)[i - 1]
+        prev_low = view.rolling('min', 'Low', 3)[i - 1]
+        # Liquidity sweep alcista (rompe high y revierte)
+        high_sweeps = (high[i] > prev_high) & bearish_candle[i]
+        # Liquidity sweep bajista (rompe low y revierte)
+        low_sweeps = (low[i] < prev_low) & bullish_candle[i]
         
-        # Buscar movimientos que rompen high/low recientes y luego revierten
         sweeps = []
-        
-        for i in range(3, len(recent_data) - 1):
-            current_candle = recent_data.iloc[i]
-            prev_data = recent_data.iloc[i-3:i]
-            
-            # Liquidity sweep alcista (rompe high y revierte)
-            prev_high = prev_data['High'].max()
-            if (current_candle['High'] > prev_high and 
-                current_candle['Close'] < current_candle['Open']):
-                sweeps.append({'type': 'bullish_sweep', 'index': i})
-            
-            # Liquidity sweep bajista (rompe low y revierte)
-            prev_low = prev_data['Low'].min()
-            if (current_candle['Low'] < prev_low and 
-                current_candle['Close'] > current_candle['Open']):
-                sweeps.append({'type': 'bearish_sweep', 'index': i})
+        for k, position in enumerate(i):
+            if high_sweeps[k]:
+                sweeps.append({'type': 'bullish_sweep', 'index': int(position)})
+            if low_sweeps[k]:
+                sweeps.append({'type': 'bearish_sweep', 'index': int(position)})
         
         return {
             'recent_sweep': len(sweeps) > 0,
@@ -454,29 +451,30 @@ class EntrySignalsOptimizer:
             return {'active_gap': False}
         
         recent_data = df.tail(10)
-        gaps = []
+        view = get_pivot_view(recent_data)
+        high, low = view.values('High'), view.values('Low')
         
-        for i in range(1, len(recent_data) - 1):
-            prev_candle = recent_data.iloc[i-1]
-            current_candle = recent_data.iloc[i]
-            next_candle = recent_data.iloc[i+1]
-            
-            # Bullish FVG: prev_high < next_low
-            if prev_candle['High'] < next_candle['Low']:
+        # Vela i entre la anterior (i-1) y la siguiente (i+1)
+        prev_high, prev_low = high[:-2], low[:-2]
+        next_high, next_low = high[2:], low[2:]
+        bullish = prev_high < next_low               # Bullish FVG: prev_high < next_low
+        bearish = ~bullish & (prev_low > next_high)  # Bearish FVG: prev_low > next_high
+        
+        gaps = []
+        for k in np.flatnonzero(bullish | bearish):
+            if bullish[k]:
                 gaps.append({
                     'type': 'bullish_fvg',
-                    'top': next_candle['Low'],
-                    'bottom': prev_candle['High'],
-                    'index': i
+                    'top': next_low[k],
+                    'bottom': prev_high[k],
+                    'index': int(k) + 1
                 })
-            
-            # Bearish FVG: prev_low > next_high
-            elif prev_candle['Low'] > next_candle['High']:
+            else:
                 gaps.append({
                     'type': 'bearish_fvg',
-                    'top': prev_candle['Low'],
-                    'bottom': next_candle['High'],
-                    'index': i
+                    'top': prev_low[k],
+                    'bottom': next_high[k],
+                    'index': int(k) + 1
                 })
         
         return {
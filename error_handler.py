@@ -11,6 +11,8 @@ from typing import Any, Dict, Optional
 import sys
 import os
 
+from audit_log import AuditLog
+
 # Configuración de logging
 LOG_DIR = "logs"
 if not os.path.exists(LOG_DIR):
@@ -27,6 +29,7 @@ class ErrorHandler:
         self.service_name = service_name
         self.error_count = 0
         self.error_history = []
+        self.audit_log = AuditLog(LOG_DIR)
         self.setup_logging()
         
     def setup_logging(self):
@@ -129,27 +132,14 @@ class ErrorHandler:
         self.logger.info(f"TRADING ACTION: {action} for {symbol}")
         self.logger.info(f"Details: {json.dumps(details, default=str)}")
         
-        # Guardar en archivo de auditoría
-        audit_file = f"{LOG_DIR}/trading_audit_{datetime.now().strftime('%Y%m%d')}.json"
-        
-        try:
-            if os.path.exists(audit_file):
-                with open(audit_file, 'r') as f:
-                    audit_log = json.load(f)
-            else:
-                audit_log = []
-            
-            audit_log.append({
-                'timestamp': datetime.now().isoformat(),
-                'action': action,
-                'symbol': symbol,
-                'details': details
-            })
-            
-            with open(audit_file, 'w') as f:
-                json.dump(audit_log, f, indent=2, default=str)
-        except Exception as e:
-            self.logger.error(f"Error en auditoría: {e}")
+        # Auditoría append-only: se encola y la escribe el hilo del AuditLog
+        self.audit_log.append(action, symbol, details)
+    
+    def query_audit(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    symbol: Optional[str] = None, action: Optional[str] = None) -> list:
+        """Consulta la auditoría por rango temporal, símbolo y/o acción"""
+        self.audit_log.flush()
+        return self.audit_log.query(start, end, symbol, action)
     
     def get_error_stats(self) -> Dict:
         """Obtiene estadísticas de errores"""
@@ -10,8 +10,63 @@ import yfinance as yf
 from datetime import datetime, timedelta
 import json
 import warnings
+from backtest_kernel import (MarketArrays, KernelStrategy, ExitRules, run_kernel,
+                             cross_above, cross_below, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT)
 warnings.filterwarnings('ignore')
 
+KERNEL_EXIT_REASONS = {
+    EXIT_STOP_LOSS: 'Stop Loss',
+    EXIT_TAKE_PROFIT: 'Take Profit',
+}
+
+
+class FinalKernelStrategy(KernelStrategy):
+    """
+    generate_signal / check_trend vectorizados para el kernel compartido
+    (sin trailing ni salida por señal contraria)
+    """
+    
+    def __init__(self, params):
+        self.params = params
+    
+    def entry_direction(self, m):
+        close, rsi, volume_ratio = m['Close'], m['RSI'], m['Volume_Ratio']
+        ema20, ema50 = m['EMA20'], m['EMA50']
+        volume = 0.5 * (volume_ratio > self.params['min_volume_ratio'])
+        
+        confirmations_long = (
+            (rsi < self.params['rsi_oversold']).astype(np.float64)
+            + cross_above(m['MACD'], m['Signal'])
+            + volume
+        )
+        confirmations_short = (
+            (rsi > self.params['rsi_overbought']).astype(np.float64)
+            + cross_below(m['MACD'], m['Signal'])
+            + volume
+        )
+        if self.params['trend_filter']:
+            confirmations_long += (ema20 > ema50) & (close > ema20)
+            confirmations_short += (ema20 < ema50) & (close < ema20)
+        
+        min_conf = self.params['confirmation_required']
+        go_long = (confirmations_long >= min_conf) & (confirmations_long > confirmations_short)
+        go_short = (confirmations_short >= min_conf) & (confirmations_short > confirmations_long)
+        
+        direction = np.zeros(len(m), dtype=np.int8)
+        direction[go_long] = 1
+        direction[go_short] = -1
+        return direction
+    
+    def exit_rules(self):
+        return ExitRules(
+            atr_stop_multiplier=self.params['atr_stop_multiplier'],
+            atr_target_multiplier=self.params['atr_target_multiplier'],
+            risk_per_trade=self.params['risk_per_trade'],
+            max_position_fraction=self.params['max_position_size'],
+            min_days_between_entries=self.params['min_trade_interval_days']
+        )
+
+
 class FinalRobustSystem:
     """
     Sistema final con parámetros robustos y validados
@@ -173,7 +228,7 @@ class FinalRobustSystem:
         
         return shares
     
-    def backtest(self, symbol, start_date, end_date):
+    def backtest(self, symbol, start_date, end_date, vectorized=True):
         """
         Ejecuta backtesting del sistema
         """
@@ -191,6 +246,52 @@ class FinalRobustSystem:
         # Calcular indicadores
         df = self.calculate_indicators(df)
         
+        return self.run_backtest(df, symbol, vectorized=vectorized)
+    
+    def run_backtest(self, df, symbol, vectorized=True):
+        """
+        Backtest sobre velas con indicadores ya calculados
+        
+        Args:
+            df: DataFrame devuelto por calculate_indicators
+            symbol: Símbolo (para etiquetar los trades)
+            vectorized: True usa el kernel compartido; False el bucle por
+                        vela original (referencia para tests de paridad)
+        """
+        if not vectorized:
+            return self._run_backtest_per_bar(df, symbol)
+        
+        m = MarketArrays.from_dataframe(df)
+        result = run_kernel(m, FinalKernelStrategy(self.params), self.initial_capital)
+        
+        trades = []
+        for k in range(len(result)):
+            i, j = result.entry_idx[k], result.exit_idx[k]
+            is_long = result.direction[k] > 0
+            entry_price, exit_price = result.entry_price[k], result.exit_price[k]
+            entry_date, exit_date = df.index[i], df.index[j]
+            trades.append({
+                'symbol': symbol,
+                'type': 'LONG' if is_long else 'SHORT',
+                'entry_date': entry_date,
+                'entry_price': entry_price,
+                'shares': result.shares[k],
+                'stop_loss': result.stop_loss[k],
+                'take_profit': result.take_profit[k],
+                'entry_rsi': m['RSI'][i],
+                'exit_date': exit_date,
+                'exit_price': exit_price,
+                'exit_reason': KERNEL_EXIT_REASONS.get(result.exit_reason[k], 'End of Period'),
+                'pnl': result.pnl[k],
+                'return_pct': ((exit_price / entry_price) - 1) * 100 if is_long
+                              else ((entry_price / exit_price) - 1) * 100,
+                'duration_days': (exit_date - entry_date).days
+            })
+        
+        return trades
+    
+    def _run_backtest_per_bar(self, df, symbol):
+        """Bucle original vela a vela con df.iloc"""
         # Variables de tracking
         trades = []
         position = None
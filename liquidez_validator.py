@@ -7,6 +7,7 @@ Análisis de pools de liquidez y coherencia con movimiento de precio
 import pandas as pd
 import numpy as np
 import yfinance as yf
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime, timedelta
 
 class LiquidezValidator:
@@ -71,7 +72,140 @@ class LiquidezValidator:
         }
         
         return total_liquidity_score, details
-    
+
+    def analyze_liquidity_coherence_batch(self, df, signal_type, entry_prices=None):
+        """
+        total_score de analyze_liquidity_coherence para todas las velas de df
+
+        out[i] es el total_score de analyze_liquidity_coherence(df.iloc[:i+1],
+        signal_type, entry_prices[i]) y NaN donde esa llamada devuelve None
+        (menos de 10 velas). Por defecto la entrada es el cierre de cada vela.
+        Las ventanas se calculan con sliding_window_view reproduciendo las
+        mismas sumas que pandas hace sobre cada tail().
+        """
+        n = len(df)
+        total = np.full(n, np.nan)
+        if n < 10:
+            return total
+
+        long = signal_type == 'LONG'
+        close = df['Close'].to_numpy(dtype=np.float64)
+        open_ = df['Open'].to_numpy(dtype=np.float64)
+        high = df['High'].to_numpy(dtype=np.float64)
+        low = df['Low'].to_numpy(dtype=np.float64)
+        volume = df['Volume'].to_numpy(dtype=np.float64)
+        volume_ratio = df['Volume_Ratio'].to_numpy(dtype=np.float64)
+        entry = close if entry_prices is None else np.asarray(entry_prices, dtype=np.float64)
+
+        rows = np.arange(9, n)
+
+        def window(values, size):
+            """Ventanas values[i-size+1:i+1] de cada vela evaluada"""
+            return sliding_window_view(values, size)[rows - size + 1]
+
+        def mean_std(values):
+            count = values.shape[1]
+            mean = values.sum(axis=1) / count
+            std = np.sqrt(((mean[:, None] - values) ** 2).sum(axis=1) / (count - 1))
+            return mean, std
+
+        def lag(values, periods):
+            return values[rows - periods]
+
+        c, o, h, l, v = close[rows], open_[rows], high[rows], low[rows], volume[rows]
+        volume_mean_5, volume_std_5 = mean_std(window(volume, 5))
+        volume_mean_10, volume_std_10 = mean_std(window(volume, 10))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # 1. Patrones de volumen
+            volume_usd = volume_mean_5 * (window(close, 5).sum(axis=1) / 5)
+            min_usd = self.config['min_avg_volume_usd']
+            patterns = np.zeros(len(rows))
+            patterns += np.select([volume_usd >= min_usd, volume_usd >= min_usd * 0.5], [0.3, 0.15], 0.0)
+            ratio = volume_ratio[rows]
+            if long:
+                patterns += np.select([(1.2 <= ratio) & (ratio <= 2.5), (1.0 <= ratio) & (ratio <= 3.0)],
+                                      [0.25, 0.15], -0.1)
+            else:
+                patterns += np.select([(1.5 <= ratio) & (ratio <= 3.0), (1.0 <= ratio) & (ratio <= 4.0)],
+                                      [0.25, 0.15], -0.1)
+
+            v0, v1 = lag(volume, 2), lag(volume, 1)
+            if long:
+                trend = np.select([(v > v1) & (v1 > v0), v > v0], [0.8, 0.4], 0.0)
+            else:
+                trend = np.select([v > v1, v > window(volume, 3).sum(axis=1) / 3], [0.6, 0.3], 0.0)
+            patterns += trend * 0.25
+
+            cv_10 = np.where(volume_mean_10 > 0, volume_std_10 / volume_mean_10, 2.0)
+            distribution = np.select([(0.3 <= cv_10) & (cv_10 <= 1.0), (0.2 <= cv_10) & (cv_10 <= 1.5)],
+                                     [0.8, 0.5], 0.2)
+            patterns += distribution * 0.2
+            patterns = np.maximum(0, np.minimum(patterns, 1.0))
+
+            # 2. Impacto de precio
+            impact = np.zeros(len(rows))
+            daily_range = (h - l) / c
+            impact += np.select([daily_range <= 0.02, daily_range <= 0.05], [0.4, 0.2], 0.0)
+
+            price_entry = entry[rows]
+            deviation = (np.abs(window(close, 5) - price_entry[:, None]) / price_entry[:, None]).sum(axis=1) / 5
+            stability = np.select([deviation <= 0.01, deviation <= 0.03], [0.8, 0.5], 0.2)
+            impact += stability * 0.3
+
+            gap_prev = np.abs(lag(open_, 1) - lag(close, 2)) / lag(close, 2)
+            gap_last = np.abs(o - lag(close, 1)) / lag(close, 1)
+            max_gap = np.fmax(gap_prev, gap_last)
+            gaps = np.select([np.isnan(max_gap), max_gap <= 0.005, max_gap <= 0.02], [0.5, 0.8, 0.5], 0.2)
+            impact += gaps * 0.3
+            impact = np.maximum(0, np.minimum(impact, 1.0))
+
+            # 3. Coherencia direccional
+            coherence = np.zeros(len(rows))
+            price_change = (c - lag(close, 4)) / lag(close, 4)
+            volume_change = (v - lag(volume, 4)) / lag(volume, 4)
+            if long:
+                coherence += np.select([(price_change > 0) & (volume_change > 0), price_change > 0,
+                                        price_change < -0.01], [0.4, 0.2, -0.2], 0.0)
+            else:
+                coherence += np.select([(price_change < 0) & (volume_change > 0), price_change < 0,
+                                        price_change > 0.01], [0.4, 0.2, -0.2], 0.0)
+
+            coherent_candles = np.zeros(len(rows))
+            for periods in (2, 1, 0):
+                candle_close, candle_open = lag(close, periods), lag(open_, periods)
+                candle_range = lag(high, periods) - lag(low, periods)
+                body_ratio = np.abs(candle_close - candle_open) / candle_range
+                with_direction = (candle_range > 0) & (candle_close > candle_open if long
+                                                       else candle_close < candle_open)
+                coherent_candles += np.select([with_direction & (body_ratio > 0.5), with_direction], [1, 0.5], 0)
+            coherence += coherent_candles / 3 * 0.3
+
+            price_momentum = (c - lag(close, 2)) / lag(close, 2)
+            older_volume = window(volume, 5)[:, :3].sum(axis=1) / 3
+            volume_momentum = (window(volume, 2).sum(axis=1) / 2 - older_volume) / older_volume
+            with_momentum = price_momentum > 0 if long else price_momentum < 0
+            coherence += np.select([with_momentum & (volume_momentum > 0), with_momentum], [0.8, 0.5], 0.2) * 0.3
+            coherence = np.maximum(0, np.minimum(coherence, 1.0))
+
+            # 4. Consistencia temporal
+            temporal = np.zeros(len(rows))
+            cv_5 = volume_std_5 / volume_mean_5
+            consistency = np.select([~(volume_mean_5 > 0), cv_5 <= 0.5, cv_5 <= 1.0], [0.3, 0.8, 0.5], 0.2)
+            temporal += consistency * 0.4
+
+            closes_5 = window(close, 5)
+            changes = closes_5[:, 1:] / closes_5[:, :-1] - 1
+            direction = ((changes > 0) if long else (changes < 0)).sum(axis=1) / 4
+            temporal += direction * 0.4
+
+            reversals = ((np.abs(changes[:, 1:]) > 0.03) & (changes[:, 1:] * changes[:, :-1] < 0)).sum(axis=1)
+            temporal += np.select([reversals == 0, reversals <= 1], [0.8, 0.5], 0.2) * 0.2
+            temporal = np.maximum(0, np.minimum(temporal, 1.0))
+
+        total[rows] = (patterns * 0.30 + impact * 0.25 + coherence * 0.30 + temporal * 0.15)
+        return total
+
     def _analyze_volume_patterns(self, df, signal_type):
         """Analiza patrones de volumen para validar liquidez"""
         
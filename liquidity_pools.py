@@ -10,6 +10,9 @@ import yfinance as yf
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 import json
+import threading
+
+from volume_profile import RollingVolumeProfile, volume_profile
 
 class LiquidityPoolDetector:
     """Detecta pools de liquidez basados en niveles de apalancamiento común"""
@@ -21,6 +24,11 @@ class LiquidityPoolDetector:
         # Configuración
         self.min_pool_strength = 3  # Mínimo de niveles confluyentes
         self.liquidation_buffer = 0.002  # 0.2% buffer para liquidación
+        self.volume_bins = 50
+        
+        # Perfiles de volumen incrementales por símbolo (refresco por tick)
+        self._profiles: Dict[str, RollingVolumeProfile] = {}
+        self._profiles_lock = threading.Lock()
         
     def calculate_liquidation_levels(self, entry_price: float, leverage: int, direction: str = 'LONG') -> float:
         """
@@ -41,97 +49,66 @@ class LiquidityPoolDetector:
         
         return liquidation_price
     
-    def find_volume_nodes(self, df: pd.DataFrame, window: int = 20) -> List[Dict]:
+    def find_volume_nodes(self, df: pd.DataFrame, window: int = 20,
+                          symbol: Optional[str] = None) -> List[Dict]:
         """
         Encuentra nodos de alto volumen (puntos de entrada populares)
-        """
-        # Calcular perfil de volumen
-        volume_profile = []
         
-        # Dividir el rango de precio en bins
-        price_range = df['High'].max() - df['Low'].min()
-        n_bins = 50
-        bin_size = price_range / n_bins
-        
-        for i in range(n_bins):
-            price_level = df['Low'].min() + (i * bin_size)
-            price_high = price_level + bin_size
-            
-            # Volumen en este rango de precio
-            mask = (df['Low'] <= price_high) & (df['High'] >= price_level)
-            volume_at_level = df.loc[mask, 'Volume'].sum()
-            
-            if volume_at_level > 0:
-                volume_profile.append({
-                    'price': price_level + (bin_size / 2),
-                    'volume': volume_at_level,
-                    'normalized': 0  # Se normalizará después
-                })
+        El volumen de cada vela se reparte proporcionalmente sobre su rango
+        high-low en un perfil de 50 bins calculado en una sola pasada. Con
+        symbol, el perfil se mantiene de forma incremental entre llamadas
+        (sólo se incorporan las velas nuevas y la vela en formación).
+        """
+        if symbol is not None:
+            with self._profiles_lock:
+                profile = self._profiles.get(symbol)
+                if profile is None:
+                    profile = self._profiles[symbol] = RollingVolumeProfile(self.volume_bins)
+                profile.sync(df)
+                prices, volumes = profile.profile()
+        else:
+            prices, volumes = volume_profile(df['Low'].to_numpy(), df['High'].to_numpy(),
+                                             df['Volume'].to_numpy(), self.volume_bins)
         
         # Normalizar volumen
-        if volume_profile:
-            max_volume = max(vp['volume'] for vp in volume_profile)
-            for vp in volume_profile:
-                vp['normalized'] = vp['volume'] / max_volume
-        
-        # Filtrar solo nodos significativos (>50% del máximo)
-        significant_nodes = [vp for vp in volume_profile if vp['normalized'] > 0.5]
-        
-        # Ordenar por volumen
-        significant_nodes.sort(key=lambda x: x['volume'], reverse=True)
-        
-        return significant_nodes[:10]  # Top 10 nodos
+        present = volumes > 0
+        if not present.any():
+            return []
+        prices, volumes = prices[present], volumes[present]
+        normalized = volumes / volumes.max()
+        
+        # Filtrar solo nodos significativos (>50% del máximo), top 10 por volumen
+        significant = np.flatnonzero(normalized > 0.5)
+        significant = significant[np.argsort(-volumes[significant], kind='stable')][:10]
+        
+        return [{'price': float(prices[i]), 'volume': float(volumes[i]), 'normalized': float(normalized[i])}
+                for i in significant]
+    
+    def reset_profile(self, symbol: Optional[str] = None):
+        """Descarta el perfil incremental de un símbolo (o de todos)"""
+        with self._profiles_lock:
+            if symbol is None:
+                self._profiles.clear()
+            else:
+                self._profiles.pop(symbol, None)
     
-    def detect_liquidity_pools(self, df: pd.DataFrame, current_price: float) -> Dict:
+    def detect_liquidity_pools(self, df: pd.DataFrame, current_price: float,
+                               symbol: Optional[str] = None) -> Dict:
         """
         Detecta pools de liquidez basados en:
         1. Niveles de liquidación comunes
         2. Nodos de alto volumen (entradas populares)
         3. Máximos y mínimos históricos
+        
+        Con symbol el perfil de volumen se actualiza de forma incremental,
+        para refrescar el heatmap en cada tick sin recalcular la ventana.
         """
         
         # 1. Encontrar puntos de entrada populares (nodos de volumen)
-        volume_nodes = self.find_volume_nodes(df)
+        volume_nodes = self.find_volume_nodes(df, symbol=symbol)
         
         # 2. Calcular pools de liquidación para cada nodo y leverage
-        liquidity_pools = {
-            'above_price': [],  # Liquidaciones de shorts (precio sube)
-            'below_price': []   # Liquidaciones de longs (precio baja)
-        }
-        
-        # Para cada punto de entrada popular
-        for node in volume_nodes:
-            entry_price = node['price']
-            entry_volume = node['normalized']
-            
-            # Calcular liquidaciones para diferentes leverages
-            for leverage in self.common_leverages:
-                # Liquidación de LONGS (debajo del precio)
-                long_liq = self.calculate_liquidation_levels(entry_price, leverage, 'LONG')
-                
-                # Solo considerar si está relativamente cerca del precio actual (dentro del 20%)
-                if abs(long_liq - current_price) / current_price < 0.20:
-                    liquidity_pools['below_price'].append({
-                        'price': long_liq,
-                        'leverage': leverage,
-                        'entry_price': entry_price,
-                        'strength': entry_volume * (100 / leverage),  # Mayor leverage = más débil
-                        'type': 'LONG_LIQUIDATION',
-                        'distance_pct': ((long_liq - current_price) / current_price) * 100
-                    })
-                
-                # Liquidación de SHORTS (arriba del precio)
-                short_liq = self.calculate_liquidation_levels(entry_price, leverage, 'SHORT')
-                
-                if abs(short_liq - current_price) / current_price < 0.20:
-                    liquidity_pools['above_price'].append({
-                        'price': short_liq,
-                        'leverage': leverage,
-                        'entry_price': entry_price,
-                        'strength': entry_volume * (100 / leverage),
-                        'type': 'SHORT_LIQUIDATION',
-                        'distance_pct': ((short_liq - current_price) / current_price) * 100
-                    })
+        liquidity_pools = self.liquidation_pools(volume_nodes, current_price)
         
         # 3. Agregar máximos y mínimos históricos (atraen stops)
         recent_high = df['High'].tail(100).max()
@@ -175,6 +152,40 @@ class LiquidityPoolDetector:
             'analysis_time': datetime.now().isoformat()
         }
     
+    def liquidation_pools(self, volume_nodes: List[Dict], current_price: float) -> Dict:
+        """
+        Niveles de liquidación de cada nodo de volumen para cada leverage,
+        calculados a la vez como matriz nodos x leverages
+        """
+        liquidity_pools = {
+            'above_price': [],  # Liquidaciones de shorts (precio sube)
+            'below_price': []   # Liquidaciones de longs (precio baja)
+        }
+        
+        if volume_nodes:
+            entry_prices = np.array([node['price'] for node in volume_nodes])[:, None]
+            entry_volumes = np.array([node['normalized'] for node in volume_nodes])[:, None]
+            leverages = np.array(self.common_leverages)
+            strengths = entry_volumes * (100 / leverages)  # Mayor leverage = más débil
+            
+            for side, direction, pool_type in [('below_price', 'LONG', 'LONG_LIQUIDATION'),
+                                               ('above_price', 'SHORT', 'SHORT_LIQUIDATION')]:
+                liq = self.calculate_liquidation_levels(entry_prices, leverages, direction)
+                distance = (liq - current_price) / current_price
+                
+                # Solo considerar si está relativamente cerca del precio actual (dentro del 20%)
+                for i, j in zip(*np.nonzero(np.abs(liq - current_price) / current_price < 0.20)):
+                    liquidity_pools[side].append({
+                        'price': float(liq[i, j]),
+                        'leverage': self.common_leverages[j],
+                        'entry_price': float(entry_prices[i, 0]),
+                        'strength': float(strengths[i, j]),
+                        'type': pool_type,
+                        'distance_pct': float(distance[i, j] * 100)
+                    })
+        
+        return liquidity_pools
+    
     def cluster_liquidity_levels(self, pools: Dict, tolerance: float = 0.005) -> Dict:
         """
         Agrupa niveles de liquidez cercanos para identificar zonas fuertes
@@ -188,26 +199,29 @@ class LiquidityPoolDetector:
             if not pools[direction]:
                 continue
             
-            # Ordenar por precio
+            # Ordenar por precio y barrer manteniendo la suma del cluster actual
             sorted_pools = sorted(pools[direction], key=lambda x: x['price'])
+            prices = [p['price'] for p in sorted_pools]
             
-            current_cluster = [sorted_pools[0]]
+            start = 0
+            cluster_sum = prices[0]
             
-            for pool in sorted_pools[1:]:
+            for i in range(1, len(prices)):
                 # Si está cerca del cluster actual, agregarlo
-                cluster_avg = sum(p['price'] for p in current_cluster) / len(current_cluster)
+                cluster_avg = cluster_sum / (i - start)
                 
-                if abs(pool['price'] - cluster_avg) / cluster_avg < tolerance:
-                    current_cluster.append(pool)
+                if abs(prices[i] - cluster_avg) / cluster_avg < tolerance:
+                    cluster_sum += prices[i]
                 else:
                     # Crear nuevo cluster
-                    if len(current_cluster) >= 2:  # Solo si tiene múltiples niveles
-                        clustered[direction].append(self.merge_cluster(current_cluster))
-                    current_cluster = [pool]
+                    if i - start >= 2:  # Solo si tiene múltiples niveles
+                        clustered[direction].append(self.merge_cluster(sorted_pools[start:i]))
+                    start = i
+                    cluster_sum = prices[i]
             
             # Agregar último cluster
-            if len(current_cluster) >= 2:
-                clustered[direction].append(self.merge_cluster(current_cluster))
+            if len(prices) - start >= 2:
+                clustered[direction].append(self.merge_cluster(sorted_pools[start:]))
         
         return clustered
     
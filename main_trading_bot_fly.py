@@ -12,12 +12,13 @@ import time
 import json
 import os
 import logging
-import requests
 import warnings
 import threading
 from http.server import HTTPServer, BaseHTTPRequestHandler
 warnings.filterwarnings('ignore')
 
+from notification_dispatcher import TelegramChatChannel, get_notification_dispatcher
+
 class HealthHandler(BaseHTTPRequestHandler):
     """Simple HTTP handler for health checks"""
     
@@ -47,25 +48,17 @@ class TelegramNotifier:
         self.bot_token = bot_token
         self.chat_id = chat_id
         self.base_url = f"https://api.telegram.org/bot{bot_token}"
+        self.channel = TelegramChatChannel(bot_token, chat_id, base_url=self.base_url)
     
-    def send_message(self, message, parse_mode="HTML"):
-        """Envía mensaje a Telegram"""
+    def send_message(self, message, parse_mode="HTML", wait=False, timeout=30.0):
+        """Envía mensaje a Telegram (con wait=True espera la entrega y devuelve su resultado)"""
         if not self.bot_token or not self.chat_id:
             return False
-            
-        url = f"{self.base_url}/sendMessage"
-        payload = {
-            "chat_id": self.chat_id,
-            "text": message,
-            "parse_mode": parse_mode
-        }
         
-        try:
-            response = requests.post(url, json=payload, timeout=10)
-            return response.status_code == 200
-        except Exception as e:
-            print(f"Error enviando a Telegram: {e}")
-            return False
+        # Encolado en el despachador compartido: sesión reutilizada, timeout,
+        # rate limit de Telegram, reintentos y digest en ráfagas
+        return get_notification_dispatcher().send(
+            self.channel, self.channel.render(message, parse_mode), wait=wait, timeout=timeout)
     
     def send_signal_alert(self, trade_data):
         """Alerta de nueva señal"""
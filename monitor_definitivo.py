@@ -4,12 +4,12 @@ Monitor Definitivo en Tiempo Real
 Sistema de seguimiento para las señales definitivas
 """
 
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import time
 import warnings
+from price_watcher import get_price_watcher
 warnings.filterwarnings('ignore')
 
 class MonitorDefinitivo:
@@ -17,7 +17,10 @@ class MonitorDefinitivo:
     Monitor en tiempo real para el sistema definitivo
     """
     
-    def __init__(self):
+    def __init__(self, watcher=None):
+        # Precios del price watcher compartido (una petición para todos los tickers)
+        self.watcher = watcher or get_price_watcher()
+        
         # Configuración del monitor
         self.trailing_activation = 0.010  # 1.0%
         self.trailing_distance = 0.005   # 0.5%
@@ -46,14 +49,22 @@ class MonitorDefinitivo:
     def get_current_price(self, ticker):
         """Obtiene precio actual"""
         try:
-            data = yf.Ticker(ticker)
-            hist = data.history(period="1d", interval="1m")
-            if len(hist) > 0:
-                return hist['Close'].iloc[-1]
+            return self.watcher.get_prices([ticker]).get(ticker)
         except:
             pass
         return None
     
+    def watched_tickers(self):
+        """Tickers de los trades activos"""
+        return [trade['ticker'] for trade in self.active_trades]
+    
+    def attach(self):
+        """Ejecuta monitor_cycle en cada tick del price watcher compartido"""
+        self.watcher.subscribe('monitor_definitivo', self.watched_tickers, self.monitor_cycle)
+    
+    def detach(self):
+        self.watcher.unsubscribe('monitor_definitivo')
+    
     def update_trailing_stop(self, trade, current_price):
         """Actualiza trailing stop"""
         
@@ -185,8 +196,14 @@ class MonitorDefinitivo:
         
         return trade
     
-    def monitor_cycle(self):
-        """Ejecuta un ciclo de monitoreo"""
+    def monitor_cycle(self, prices=None):
+        """
+        Ejecuta un ciclo de monitoreo
+        
+        Args:
+            prices: {ticker: precio} del price watcher; si no se pasa se
+                    consultan todos los tickers activos en una sola petición
+        """
         
         print(f"\n{'='*60}")
         print(f"🔍 MONITOR DEFINITIVO - {datetime.now().strftime('%H:%M:%S')}")
@@ -196,9 +213,15 @@ class MonitorDefinitivo:
             print("💤 No hay trades activos para monitorear")
             return
         
+        if prices is None:
+            try:
+                prices = self.watcher.get_prices(self.watched_tickers())
+            except Exception:
+                prices = {}
+        
         for trade in self.active_trades[:]:  # Copia para modificar durante iteración
             ticker = trade['ticker']
-            current_price = self.get_current_price(ticker)
+            current_price = prices.get(ticker)
             
             if current_price is None:
                 print(f"❌ {ticker}: Error obteniendo precio")
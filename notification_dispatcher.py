@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Notification Dispatcher - Envío asíncrono de notificaciones
+
+Un event loop en un hilo propio atiende todos los canales (Telegram,
+Discord, webhooks, email). Cada canal tiene su cola acotada, su limitador
+de tasa (token bucket con los límites de cada servicio), su sesión HTTP
+con pool de conexiones y reintentos con backoff exponencial (respetando
+retry_after en los 429). Si se acumulan mensajes mientras el limitador
+espera, salen agrupados en un solo envío (digest). Quien publica sólo
+encola: un endpoint lento ya no frena el procesamiento de señales.
+
+Contrato de un canal (duck typing):
+    limits                  -> ChannelLimits
+    render(obj)             -> item ya formateado (se llama al encolar)
+    build_request(items)    -> kwargs de session.post para 1..N items  (HTTP)
+    success_statuses        -> códigos HTTP que cuentan como entregado  (HTTP)
+    session                 -> requests.Session del canal                (HTTP)
+    deliver(items) -> bool  -> envío no HTTP (p.ej. SMTP), en un hilo
+    batch_key(item)         -> opcional; sólo se agrupan items con la misma clave
+    fits(items) -> bool     -> opcional; False si los items ya no caben en un envío
+"""
+
+import time
+import atexit
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_MAX_TEXT = 4096
+
+
+@dataclass
+class ChannelLimits:
+    """Límites de un canal"""
+    rate: float             # envíos por segundo sostenidos
+    burst: int = 1          # envíos seguidos permitidos
+    max_batch: int = 1      # items agrupables en un envío
+    queue_size: int = 100   # items en espera (al llenarse se descarta el más antiguo)
+
+
+# Telegram: ~1 mensaje/s por chat. Discord webhooks: 5 peticiones cada 2 s y 10 embeds por mensaje
+TELEGRAM_LIMITS = ChannelLimits(rate=1.0, burst=1, max_batch=8)
+DISCORD_LIMITS = ChannelLimits(rate=2.5, burst=5, max_batch=10)
+WEBHOOK_LIMITS = ChannelLimits(rate=5.0, burst=5, max_batch=1)
+EMAIL_LIMITS = ChannelLimits(rate=0.2, burst=1, max_batch=20)
+
+
+def make_session(pool_size: int = 4) -> requests.Session:
+    """Sesión con pool de conexiones reutilizables para un canal"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def retry_after_seconds(response) -> Optional[float]:
+    """Espera pedida por un 429 (Retry-After o retry_after de Telegram/Discord)"""
+    header = response.headers.get('Retry-After')
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    if not isinstance(body, dict):
+        return None
+    value = body.get('retry_after', body.get('parameters', {}).get('retry_after'))
+    return float(value) if value is not None else None
+
+
+class TokenBucket:
+    """Limitador de tasa para un canal (sólo se usa desde el event loop)"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Segundos hasta que haya un token disponible"""
+        self._refill()
+        wait = max(0.0, self.paused_until - time.monotonic())
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    async def acquire(self):
+        while True:
+            wait = self.delay()
+            if wait <= 0:
+                self.tokens -= 1
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """El servicio pidió esperar (429): nada sale antes de ese instante"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+@dataclass
+class _Lane:
+    """Cola, limitador y estadísticas de un canal"""
+    channel: Any
+    name: str
+    limits: ChannelLimits
+    bucket: TokenBucket
+    queue: Deque[Tuple[Any, Future]] = field(default_factory=deque)
+    ready: Optional[asyncio.Event] = None
+    task: Optional[asyncio.Task] = None
+    in_flight: int = 0
+    stats: Dict[str, int] = field(default_factory=lambda: {
+        'queued': 0, 'sent': 0, 'batches': 0, 'failed': 0, 'dropped': 0, 'retries': 0, 'rate_limited': 0
+    })
+
+
+class NotificationDispatcher:
+    """Despachador asíncrono compartido por todos los canales del proceso"""
+
+    def __init__(self, timeout: float = 10.0, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0):
+        """
+        Args:
+            timeout: Timeout de cada petición HTTP
+            max_retries: Reintentos tras el primer intento fallido
+            backoff_base: Espera del primer reintento (se duplica en cada uno)
+            backoff_max: Espera máxima entre reintentos
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lanes: Dict[int, _Lane] = {}
+        self._lock = threading.Lock()
+        self._outstanding = 0   # items encolados cuyo Future no ha resuelto
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._atexit_registered = False
+
+    # ===========================================
+    # EVENT LOOP
+    # ===========================================
+
+    def start(self):
+        """Arranca el hilo del event loop (idempotente)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            self._loop = loop
+            self._thread = threading.Thread(target=run, name="notification-dispatcher", daemon=True)
+            self._thread.start()
+            started.wait()
+            for lane in self._lanes.values():
+                loop.call_soon_threadsafe(self._start_lane, lane)
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def close(self, timeout: float = 10.0):
+        """Entrega lo pendiente (hasta timeout) y detiene el loop"""
+        if self._loop is None:
+            return
+        self.flush(timeout)
+        loop = self._loop
+
+        async def stop():
+            tasks = [lane.task for lane in self._lanes.values() if lane.task is not None]
+            for lane in self._lanes.values():
+                self._stop_lane(lane)
+            await asyncio.gather(*tasks, return_exceptions=True)
+            loop.stop()
+
+        asyncio.run_coroutine_threadsafe(stop(), loop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if not self._thread.is_alive():
+                loop.close()
+        self._loop = None
+        self._thread = None
+        for lane in self._lanes.values():
+            lane.task = None
+            lane.ready = None
+
+    # ===========================================
+    # CANALES
+    # ===========================================
+
+    def _lane(self, channel) -> _Lane:
+        with self._lock:
+            lane = self._lanes.get(id(channel))
+            if lane is None:
+                limits = getattr(channel, 'limits', None) or WEBHOOK_LIMITS
+                lane = _Lane(channel=channel, name=channel.__class__.__name__,
+                             limits=limits, bucket=TokenBucket(limits.rate, limits.burst))
+                self._lanes[id(channel)] = lane
+                if self._loop is not None:
+                    self._loop.call_soon_threadsafe(self._start_lane, lane)
+        return lane
+
+    def remove_channel(self, channel):
+        """Deja de atender un canal (lo pendiente se da por no entregado)"""
+        with self._lock:
+            lane = self._lanes.pop(id(channel), None)
+        if lane is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop_lane, lane)
+
+    def _start_lane(self, lane: _Lane):
+        lane.ready = asyncio.Event()
+        if lane.queue:
+            lane.ready.set()
+        lane.task = self._loop.create_task(self._worker(lane))
+
+    def _stop_lane(self, lane: _Lane):
+        if lane.task is not None:
+            lane.task.cancel()
+        while lane.queue:
+            _, future = lane.queue.popleft()
+            future.set_result(False)
+
+    # ===========================================
+    # PUBLICACIÓN (desde cualquier hilo)
+    # ===========================================
+
+    def submit(self, channel, item: Any) -> Future:
+        """Encola un item ya formateado para un canal; el Future resuelve a bool"""
+        self.start()
+        lane = self._lane(channel)
+        future: Future = Future()
+        with self._lock:
+            self._outstanding += 1
+        future.add_done_callback(self._resolved)
+        self._loop.call_soon_threadsafe(self._enqueue, lane, item, future)
+        return future
+
+    def send(self, channel, item: Any, wait: bool = False, timeout: float = 30.0) -> bool:
+        """
+        Encola un item; sin wait indica si quedó encolado, con wait=True
+        espera la entrega (hasta timeout) y devuelve su resultado
+        """
+        future = self.submit(channel, item)
+        if not wait:
+            return not (future.done() and not future.result())
+        try:
+            return future.result(timeout)
+        except Exception as e:
+            logger.error(f"Sin confirmación de entrega por {channel.__class__.__name__}: {e}")
+            return False
+
+    def _resolved(self, future: Future):
+        with self._lock:
+            self._outstanding -= 1
+
+    def dispatch(self, obj: Any, channels: Iterable) -> Dict[Any, Future]:
+        """Formatea obj para cada canal (en el hilo que llama) y lo encola"""
+        futures = {}
+        for channel in channels:
+            try:
+                item = channel.render(obj)
+            except Exception as e:
+                logger.error(f"Error formateando para {channel.__class__.__name__}: {e}")
+                future: Future = Future()
+                future.set_result(False)
+                futures[channel] = future
+                continue
+            futures[channel] = self.submit(channel, item)
+        return futures
+
+    def _enqueue(self, lane: _Lane, item: Any, future: Future):
+        if len(lane.queue) >= lane.limits.queue_size:
+            _, dropped = lane.queue.popleft()
+            dropped.set_result(False)
+            lane.stats['dropped'] += 1
+        lane.queue.append((item, future))
+        lane.stats['queued'] += 1
+        if lane.ready is not None:
+            lane.ready.set()
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Bloquea hasta que todo lo encolado se haya entregado o descartado"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._outstanding:
+                    return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    # ===========================================
+    # ENVÍO
+    # ===========================================
+
+    async def _worker(self, lane: _Lane):
+        while True:
+            while not lane.queue:
+                lane.ready.clear()
+                await lane.ready.wait()
+
+            await lane.bucket.acquire()
+            batch = self._take_batch(lane)
+            if not batch:
+                continue
+            lane.in_flight = len(batch)
+            try:
+                ok = await self._send(lane, [item for item, _ in batch])
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.set_result(False)
+                raise
+            finally:
+                lane.in_flight = 0
+
+            lane.stats['batches'] += 1
+            lane.stats['sent' if ok else 'failed'] += len(batch)
+            for _, future in batch:
+                future.set_result(ok)
+
+    def _take_batch(self, lane: _Lane) -> List[Tuple[Any, Future]]:
+        """Items consecutivos agrupables (mismo batch_key y que quepan en un envío) hasta max_batch"""
+        batch_key = getattr(lane.channel, 'batch_key', None)
+        fits = getattr(lane.channel, 'fits', None)
+        batch = [lane.queue.popleft()]
+        key = batch_key(batch[0][0]) if batch_key else None
+        while lane.queue and len(batch) < lane.limits.max_batch:
+            if batch_key and batch_key(lane.queue[0][0]) != key:
+                break
+            if fits and not fits([item for item, _ in batch] + [lane.queue[0][0]]):
+                break
+            batch.append(lane.queue.popleft())
+        return batch
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.backoff_max, self.backoff_base * (2 ** attempt))
+
+    async def _send(self, lane: _Lane, items: List[Any]) -> bool:
+        channel = lane.channel
+        for attempt in range(self.max_retries + 1):
+            delay = self._backoff(attempt)
+            try:
+                if hasattr(channel, 'build_request'):
+                    response = await asyncio.to_thread(
+                        channel.session.post, timeout=self.timeout, **channel.build_request(items))
+                    if response.status_code in channel.success_statuses:
+                        return True
+                    if response.status_code == 429:
+                        lane.stats['rate_limited'] += 1
+                        delay = retry_after_seconds(response) or delay
+                        lane.bucket.pause(delay)
+                    elif response.status_code < 500:
+                        logger.error(f"{lane.name} rechazó el envío: HTTP {response.status_code}")
+                        return False
+                elif await asyncio.to_thread(channel.deliver, items):
+                    return True
+            except Exception as e:
+                logger.warning(f"Error enviando por {lane.name} (intento {attempt + 1}): {e}")
+
+            if attempt == self.max_retries:
+                break
+            lane.stats['retries'] += 1
+            await asyncio.sleep(delay)
+        return False
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lanes = list(self._lanes.values())
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'channels': [{'channel': lane.name, 'pending': len(lane.queue), **lane.stats} for lane in lanes]
+        }
+
+
+class TelegramChatChannel:
+    """Canal de texto de Telegram (mensajes ya formateados, digest al agruparse)"""
+
+    limits = TELEGRAM_LIMITS
+    success_statuses = (200,)
+
+    def __init__(self, bot_token: str, chat_id: str, base_url: Optional[str] = None):
+        self.chat_id = chat_id
+        self.base_url = base_url or f"https://api.telegram.org/bot{bot_token}"
+        self.session = make_session()
+
+    def render(self, message: str, parse_mode: str = "HTML") -> Dict:
+        return {'text': message, 'parse_mode': parse_mode}
+
+    def batch_key(self, item: Dict):
+        return item.get('parse_mode')
+
+    def text(self, items: List[Dict]) -> str:
+        if len(items) == 1:
+            return items[0]['text']
+        return "\n\n".join([f"📦 {len(items)} notificaciones"] + [item['text'].strip() for item in items])
+
+    def fits(self, items: List[Dict]) -> bool:
+        # Los digest se cortan entre mensajes: truncar podría partir una entidad HTML/Markdown
+        return len(self.text(items)) <= TELEGRAM_MAX_TEXT
+
+    def build_request(self, items: List[Dict]) -> Dict:
+        return {
+            'url': f"{self.base_url}/sendMessage",
+            'json': {'chat_id': self.chat_id, 'text': self.text(items),
+                     'parse_mode': items[0]['parse_mode']}
+        }
+
+
+# Despachador global del proceso
+_default_dispatcher: Optional[NotificationDispatcher] = None
+_default_dispatcher_lock = threading.Lock()
+
+
+def get_notification_dispatcher() -> NotificationDispatcher:
+    """Despachador compartido por todos los módulos"""
+    global _default_dispatcher
+    with _default_dispatcher_lock:
+        if _default_dispatcher is None:
+            _default_dispatcher = NotificationDispatcher()
+        return _default_dispatcher
+
+
+if __name__ == "__main__":
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    received = []
+
+    class StubTelegram(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+            time.sleep(0.2)   # endpoint lento
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b'{"ok": true}')
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubTelegram)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    dispatcher = NotificationDispatcher()
+    channel = TelegramChatChannel("TOKEN", "123", base_url=f"http://127.0.0.1:{server.server_port}/botTOKEN")
+    start = time.perf_counter()
+    for i in range(20):
+        dispatcher.submit(channel, channel.render(f"Señal {i}"))
+    print(f"20 mensajes encolados en {(time.perf_counter() - start) * 1000:.1f}ms")
+    dispatcher.flush()
+    print(f"Entregados en {len(received)} peticiones ({time.perf_counter() - start:.1f}s)")
+    print(dispatcher.get_stats())
+    dispatcher.close()
+    server.shutdown()
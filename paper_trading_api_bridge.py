@@ -4,9 +4,10 @@ Bridge API para conectar Paper Trading Filosófico con la UI
 Proporciona endpoints compatibles con Signal Haven Desk
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
@@ -18,20 +19,21 @@ from pathlib import Path
 # Importar el sistema de paper trading optimizado
 from optimized_paper_trading import OptimizedPaperTrading, PRODUCTION_STRATEGY_CONFIG
 from backtest_system_v2 import BacktestSystemV2
-from trading_config import TRADING_SYMBOLS, BINANCE_SYMBOLS, SYMBOL_INFO, DEFAULT_CONFIG, SYMBOL_DECIMALS, get_asset_type
+from trading_config import TRADING_SYMBOLS, BINANCE_SYMBOLS, SYMBOL_INFO, DEFAULT_CONFIG, SYMBOL_DECIMALS, get_asset_type, format_price
+from backtest_jobs import backtest_jobs
 
-# Los decimales ahora se importan desde trading_config
-
-def format_price(price: float, symbol: str) -> float:
-    """Formatea precio según la precisión requerida del símbolo"""
-    decimals = SYMBOL_DECIMALS.get(symbol, 4)
-    # Usar formato más estricto para evitar errores de punto flotante
-    return float(f"{price:.{decimals}f}")
+# Los decimales y format_price ahora se importan desde trading_config
 from binance_client import binance_client
 import pandas as pd
 import numpy as np
 
-app = FastAPI(title="Paper Trading API Bridge")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Ciclo de vida: al apagar se cierra el pool de procesos de backtest"""
+    yield
+    backtest_jobs.shutdown()
+
+app = FastAPI(title="Paper Trading API Bridge", lifespan=lifespan)
 
 # CORS para la UI
 app.add_middleware(
@@ -101,6 +103,7 @@ class Signal(BaseModel):
 class BacktestRequest(BaseModel):
     period_days: int = 7
     symbol: Optional[str] = None
+    wait: bool = True  # False: devuelve el trabajo al instante (consultar /api/backtest/jobs/{id})
 
 class MarketStats(BaseModel):
     symbol: str
@@ -546,449 +549,62 @@ async def get_market_stats(symbol: str):
 
 @app.post("/api/backtest/{symbol}")
 async def run_backtest(symbol: str, request: BacktestRequest):
-    """Ejecuta backtest específico por estrategia optimizada"""
+    """
+    Ejecuta backtest específico por estrategia optimizada
+    
+    La simulación corre en el pool de backtest_jobs (no bloquea el loop) y
+    se cachea por versión de datos. Con wait=False devuelve el trabajo para
+    consultarlo por polling o stream.
+    """
     
     try:
-        # Obtener estrategia configurada para este símbolo
-        prod_config = PRODUCTION_STRATEGY_CONFIG.get(symbol, {})
-        strategy_name = prod_config.get('strategy', 'momentum')
-        timeframe = prod_config.get('timeframe', '1h')
-        
-        # Calcular límite de velas basado en período
-        if request.period_days == 7:
-            limit = 168  # 7 días * 24 horas
-        elif request.period_days == 15:
-            limit = 360  # 15 días * 24 horas
-        elif request.period_days == 30:
-            limit = 720  # 30 días * 24 horas
-        elif request.period_days == 90:
-            limit = 2160  # 90 días * 24 horas
-        elif request.period_days == 180:
-            limit = 4320  # 180 días * 24 horas
-        elif request.period_days == 360:
-            limit = 8640  # 360 días * 24 horas
-        else:
-            limit = request.period_days * 24  # Por defecto días * 24 horas
-        
-        # Obtener datos históricos
-        df = binance_client.get_klines(symbol, '1h', limit)
-        
-        if df.empty:
-            return {"error": "No historical data available"}
-        
-        # Generar señales específicas por estrategia
-        backtest_signals = []
+        job = await backtest_jobs.submit(symbol, request.period_days)
+        if not request.wait:
+            return job.to_dict()
         
-        # Configurar parámetros según estrategia
-        if strategy_name == "trend_following":
-            # Parámetros para trend following - más conservador
-            signal_interval = 30  # Cada 1.25 días (más frecuente)
-            buy_threshold = 40  # RSI menos restrictivo
-            sell_threshold = 60  # RSI menos restrictivo
-            base_confidence = 75
-        elif strategy_name == "mean_reversion":
-            # Parámetros para mean reversion - ajustados por símbolo
-            signal_interval = 24  # Cada día
-            
-            # Parámetros específicos para LINK (Oracle token)
-            if symbol == 'LINKUSDT':
-                buy_threshold = 35  # Menos extremo para LINK
-                sell_threshold = 65  # Menos extremo para LINK
-                base_confidence = 65  # Confianza media
-            else:
-                buy_threshold = 30  # Estándar
-                sell_threshold = 70  # Estándar
-                base_confidence = 70
-        elif strategy_name == "avax_optimized":
-            # Parámetros para AVAX optimizado - ultra selectivo
-            signal_interval = 24  # Cada día para evaluar más oportunidades
-            buy_threshold = 25  # RSI extremo
-            sell_threshold = 75  # RSI extremo
-            base_confidence = 85  # Muy alta confianza base
-        else:  # momentum o volume_breakout
-            # Parámetros para momentum - más agresivo
-            signal_interval = 36  # Cada 1.5 días
-            buy_threshold = 25  # RSI muy bajo
-            sell_threshold = 75  # RSI muy alto
-            base_confidence = 65
-        
-        # Generar señales basadas en la estrategia
-        for i in range(signal_interval, len(df), signal_interval):
-            window_df = df.iloc[max(0, i-100):i]  # Ventana de 100 velas
-            
-            # Calcular indicadores
-            delta = window_df['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            current_rsi = rsi.iloc[-1]
-            
-            # Calcular EMAs para trend following
-            ema_fast = window_df['Close'].ewm(span=12).mean().iloc[-1]
-            ema_slow = window_df['Close'].ewm(span=26).mean().iloc[-1]
-            
-            signal = None
-            
-            # Lógica específica por estrategia
-            if strategy_name == "trend_following":
-                # TREND FOLLOWING CON VALIDACIÓN DE TENDENCIA PRINCIPAL
-                
-                # 0. Validación de tendencia principal (marco temporal superior)
-                ema_50_main = window_df['Close'].ewm(span=50).mean().iloc[-1] if len(window_df) > 50 else window_df['Close'].mean()
-                ema_200_main = window_df['Close'].ewm(span=200).mean().iloc[-1] if len(window_df) > 200 else ema_50_main
-                main_trend = 'BULLISH' if ema_50_main > ema_200_main else 'BEARISH'
-                
-                # 1. Calcular más indicadores para confirmación
-                volume_avg = window_df['Volume'].rolling(20).mean().iloc[-1]
-                current_volume = window_df['Volume'].iloc[-1]
-                volume_ratio = current_volume / volume_avg if volume_avg > 0 else 1
-                
-                # 2. Calcular MACD para confirmación de tendencia
-                ema_12 = window_df['Close'].ewm(span=12).mean()
-                ema_26 = window_df['Close'].ewm(span=26).mean()
-                macd = ema_12 - ema_26
-                macd_signal = macd.ewm(span=9).mean()
-                macd_current = macd.iloc[-1]
-                macd_signal_current = macd_signal.iloc[-1]
-                
-                # 3. Calcular tendencia a corto y largo plazo
-                price_change_short = ((window_df['Close'].iloc[-1] - window_df['Close'].iloc[-5]) / window_df['Close'].iloc[-5]) * 100
-                price_change_long = ((window_df['Close'].iloc[-1] - window_df['Close'].iloc[-20]) / window_df['Close'].iloc[-20]) * 100
-                
-                # 4. Volatilidad como filtro de calidad
-                volatility = window_df['Close'].rolling(20).std().iloc[-1] / window_df['Close'].rolling(20).mean().iloc[-1]
-                
-                # SEÑAL DE COMPRA con validación de tendencia principal
-                if (main_trend == 'BULLISH' and  # VALIDACIÓN: Solo comprar en tendencia alcista
-                    ema_fast > ema_slow * 1.015 and  # Tendencia alcista confirmada
-                    current_rsi > 35 and current_rsi < 65 and  # RSI en zona neutra-alcista
-                    macd_current > macd_signal_current and  # MACD positivo
-                    volume_ratio > 0.8 and  # Volumen suficiente
-                    price_change_short > -1 and  # No caída fuerte reciente
-                    price_change_long > -5 and  # Tendencia general no muy negativa
-                    volatility < 0.08):  # Volatilidad controlada
-                    
-                    entry_price = format_price(window_df['Close'].iloc[-1], symbol)
-                    
-                    # Calcular confianza basada en múltiples factores
-                    confidence_factors = [
-                        min((ema_fast/ema_slow - 1) * 1000, 20),  # Fuerza de tendencia
-                        min((65 - current_rsi) * 0.5, 15),  # RSI favorable
-                        min((macd_current - macd_signal_current) * 100, 15),  # MACD strength
-                        min(volume_ratio * 10, 15),  # Volumen
-                        min(price_change_long * 0.3, 10)  # Momentum
-                    ]
-                    total_confidence = base_confidence + sum(confidence_factors)
-                    
-                    signal = {
-                        'action': 'BUY',
-                        'entry_price': entry_price,
-                        'stop_loss': format_price(entry_price * 0.975, symbol),  # Stop 2.5%
-                        'take_profit': format_price(entry_price * 1.05, symbol),  # TP más realista
-                        'confidence': min(total_confidence, 95)
-                    }
-                
-                # SEÑAL DE VENTA con validación de tendencia principal
-                elif (main_trend == 'BEARISH' and  # VALIDACIÓN: Solo vender en tendencia bajista
-                      ema_fast < ema_slow * 0.985 and  # Tendencia bajista confirmada
-                      current_rsi > 35 and current_rsi < 65 and  # RSI en zona neutra-bajista
-                      macd_current < macd_signal_current and  # MACD negativo
-                      volume_ratio > 0.8 and  # Volumen suficiente
-                      price_change_short < 1 and  # No subida fuerte reciente
-                      price_change_long < 5 and  # Tendencia general no muy positiva
-                      volatility < 0.08):  # Volatilidad controlada
-                    
-                    entry_price = format_price(window_df['Close'].iloc[-1], symbol)
-                    
-                    # Calcular confianza para venta
-                    confidence_factors = [
-                        min((1 - ema_fast/ema_slow) * 1000, 20),
-                        min((current_rsi - 35) * 0.5, 15),
-                        min((macd_signal_current - macd_current) * 100, 15),
-                        min(volume_ratio * 10, 15),
-                        min(-price_change_long * 0.3, 10)
-                    ]
-                    total_confidence = base_confidence + sum(confidence_factors)
-                    
-                    signal = {
-                        'action': 'SELL',
-                        'entry_price': entry_price,
-                        'stop_loss': format_price(entry_price * 1.025, symbol),  # Stop 2.5%
-                        'take_profit': format_price(entry_price * 0.95, symbol),  # Target 5%
-                        'confidence': min(total_confidence, 95)
-                    }
-            
-            elif strategy_name == "mean_reversion":
-                # Usar RSI tradicional
-                if current_rsi < buy_threshold:
-                    entry_price = format_price(window_df['Close'].iloc[-1], symbol)
-                    
-                    # Stops específicos para LINK (Oracle token)
-                    if symbol == 'LINKUSDT':
-                        stop_mult = 0.965  # 3.5% stop para LINK
-                        target_mult = 1.07  # 7% target para LINK
-                    else:
-                        stop_mult = 0.975   # 2.5% stop estándar
-                        target_mult = 1.05  # 5% target estándar
-                    
-                    signal = {
-                        'action': 'BUY',
-                        'entry_price': entry_price,
-                        'stop_loss': format_price(entry_price * stop_mult, symbol),
-                        'take_profit': format_price(entry_price * target_mult, symbol),
-                        'confidence': base_confidence + (buy_threshold - current_rsi)
-                    }
-                elif current_rsi > sell_threshold:
-                    entry_price = format_price(window_df['Close'].iloc[-1], symbol)
-                    
-                    # Stops específicos para LINK
-                    if symbol == 'LINKUSDT':
-                        stop_mult = 1.035   # 3.5% stop para LINK
-                        target_mult = 0.93  # 7% target para LINK
-                    else:
-                        stop_mult = 1.025   # 2.5% stop estándar
-                        target_mult = 0.95  # 5% target estándar
-                    
-                    signal = {
-                        'action': 'SELL',
-                        'entry_price': entry_price,
-                        'stop_loss': format_price(entry_price * stop_mult, symbol),
-                        'take_profit': format_price(entry_price * target_mult, symbol),
-                        'confidence': base_confidence + (current_rsi - sell_threshold)
-                    }
-            
-            elif strategy_name == "avax_optimized":
-                # AVAX OPTIMIZED - Ultra selectivo con confluencia múltiple
-                
-                # Calcular indicadores optimizados específicos para AVAX
-                ema_16 = window_df['Close'].ewm(span=16).mean().iloc[-1]
-                ema_42 = window_df['Close'].ewm(span=42).mean().iloc[-1]
-                
-                # VALIDACIÓN DE TENDENCIA PRINCIPAL (4H timeframe simulation)
-                ema_50_long = window_df['Close'].ewm(span=50).mean().iloc[-1]
-                ema_200_long = window_df['Close'].ewm(span=200).mean().iloc[-1] if len(window_df) > 200 else ema_50_long
-                main_trend = 'BULLISH' if ema_50_long > ema_200_long else 'BEARISH'
-                
-                # Momentum validation
-                price_change_5h = ((window_df['Close'].iloc[-1] - window_df['Close'].iloc[-5]) / window_df['Close'].iloc[-5]) * 100 if len(window_df) > 5 else 0
-                price_change_20h = ((window_df['Close'].iloc[-1] - window_df['Close'].iloc[-20]) / window_df['Close'].iloc[-20]) * 100 if len(window_df) > 20 else 0
-                bb_18 = window_df['Close'].rolling(18).mean().iloc[-1]
-                bb_std_18 = window_df['Close'].rolling(18).std().iloc[-1]
-                bb_upper = bb_18 + (bb_std_18 * 2.2)
-                bb_lower = bb_18 - (bb_std_18 * 2.2)
-                bb_position = (window_df['Close'].iloc[-1] - bb_lower) / (bb_upper - bb_lower) if bb_upper != bb_lower else 0.5
-                
-                # RSI con período 12 optimizado para AVAX
-                delta_12 = window_df['Close'].diff()
-                gain_12 = (delta_12.where(delta_12 > 0, 0)).rolling(window=12).mean()
-                loss_12 = (-delta_12.where(delta_12 < 0, 0)).rolling(window=12).mean()
-                rs_12 = gain_12 / loss_12
-                rsi_12 = 100 - (100 / (1 + rs_12))
-                current_rsi_12 = rsi_12.iloc[-1]
-                
-                # Stochastic optimizado
-                low_12 = window_df['Low'].rolling(12).min().iloc[-1]
-                high_12 = window_df['High'].rolling(12).max().iloc[-1]
-                stoch_k = 100 * ((window_df['Close'].iloc[-1] - low_12) / (high_12 - low_12)) if high_12 != low_12 else 50
-                
-                # Confluence scoring ultra-estricto
-                confluence_score = 0
-                signal_action = None
-                
-                # 1. RSI extremo CON VALIDACIÓN DE TENDENCIA (4 puntos máximo)
-                if current_rsi_12 < 25 and main_trend == 'BULLISH':  # RSI ultra oversold + tendencia alcista
-                    confluence_score += 4
-                    signal_action = 'BUY'
-                elif current_rsi_12 < 30 and main_trend == 'BULLISH':  # RSI oversold estricto + tendencia alcista
-                    confluence_score += 3
-                    signal_action = 'BUY'
-                elif current_rsi_12 < 35 and main_trend == 'BULLISH' and price_change_5h > -1:  # No en caída libre
-                    confluence_score += 2
-                    signal_action = 'BUY'
-                elif current_rsi_12 > 75 and main_trend == 'BEARISH':  # RSI ultra overbought + tendencia bajista
-                    confluence_score += 4
-                    signal_action = 'SELL'
-                elif current_rsi_12 > 70 and main_trend == 'BEARISH':  # RSI overbought estricto + tendencia bajista
-                    confluence_score += 3
-                    signal_action = 'SELL'
-                elif current_rsi_12 > 65 and main_trend == 'BEARISH' and price_change_5h < 1:  # No en rally fuerte
-                    confluence_score += 2
-                    signal_action = 'SELL'
-                
-                # 2. Bollinger Bands position (3 puntos máximo)
-                if bb_position <= 0.05 and signal_action == 'BUY':  # Extremo inferior
-                    confluence_score += 3
-                elif bb_position <= 0.15 and signal_action == 'BUY':  # Zona inferior
-                    confluence_score += 2
-                elif bb_position >= 0.95 and signal_action == 'SELL':  # Extremo superior
-                    confluence_score += 3
-                elif bb_position >= 0.85 and signal_action == 'SELL':  # Zona superior
-                    confluence_score += 2
-                
-                # 3. EMA trend confirmation CON VALIDACIÓN (3 puntos máximo)
-                ema_trend_strength = abs(ema_16 - ema_42) / ema_42
-                if signal_action and signal_action == 'BUY' and ema_16 > ema_42 and main_trend == 'BULLISH':
-                    if ema_trend_strength > 0.02:  # Tendencia fuerte
-                        confluence_score += 3
-                    else:
-                        confluence_score += 2
-                elif signal_action and signal_action == 'SELL' and ema_16 < ema_42 and main_trend == 'BEARISH':
-                    if ema_trend_strength > 0.02:  # Tendencia fuerte
-                        confluence_score += 3
-                    else:
-                        confluence_score += 2
-                elif signal_action:  # Penalizar si va contra tendencia
-                    confluence_score -= 2
-                
-                # 4. Volume confirmation (2 puntos máximo)
-                # Calcular volume_ratio si no existe
-                if 'volume_ratio' not in locals():
-                    volume_ma = window_df['Volume'].rolling(20).mean().iloc[-1]
-                    volume_ratio = window_df['Volume'].iloc[-1] / volume_ma if volume_ma > 0 else 1.0
-                
-                if volume_ratio > 1.8:  # Volume threshold para AVAX
-                    confluence_score += 2
-                elif volume_ratio > 1.3:
-                    confluence_score += 1
-                
-                # 5. Stochastic confirmation (1 punto máximo)
-                if signal_action and signal_action == 'BUY' and stoch_k < 25:
-                    confluence_score += 1
-                elif signal_action and signal_action == 'SELL' and stoch_k > 75:
-                    confluence_score += 1
-                
-                # 6. Price momentum CON DIRECCIÓN (2 puntos máximo)
-                price_momentum = ((window_df['Close'].iloc[-1] - window_df['Close'].iloc[-10]) / window_df['Close'].iloc[-10]) * 100 if len(window_df) > 10 else 0
-                if signal_action == 'BUY' and price_momentum > 0.5:  # Momentum alcista
-                    confluence_score += 2
-                elif signal_action == 'SELL' and price_momentum < -0.5:  # Momentum bajista
-                    confluence_score += 2
-                elif signal_action and ((signal_action == 'BUY' and price_momentum < -2) or (signal_action == 'SELL' and price_momentum > 2)):
-                    confluence_score -= 1  # Penalizar momentum contrario
-                
-                # AVAX Optimized - Más reducir requisitos para más señales (de 6 a 5 puntos)
-                # Permitir operaciones en tendencia neutral también
-                trend_aligned = (signal_action == 'BUY' and main_trend != 'BEARISH') or (signal_action == 'SELL' and main_trend != 'BULLISH')
-                
-                if confluence_score >= 5 and signal_action and trend_aligned:  # Reducido de 6 a 5
-                    entry_price = format_price(window_df['Close'].iloc[-1], symbol)
-                    
-                    # Stops y targets optimizados basados en ATR de AVAX
-                    if signal_action == 'BUY':
-                        stop_loss = format_price(entry_price * 0.975, symbol)  # Stop 2.5% (2.5x ATR)
-                        take_profit = format_price(entry_price * 1.05, symbol)  # Target 5% (2:1 RR)
-                    else:
-                        stop_loss = format_price(entry_price * 1.025, symbol)  # Stop 2.5% (2.5x ATR)
-                        take_profit = format_price(entry_price * 0.95, symbol)  # Target 5% (2:1 RR)
-                    
-                    # Confianza ultra-alta basada en confluence
-                    confidence_avax = base_confidence + (confluence_score - 10) * 2  # Bonus por confluence extra
-                    
-                    signal = {
-                        'action': signal_action,
-                        'entry_price': entry_price,
-                        'stop_loss': stop_loss,
-                        'take_profit': take_profit,
-                        'confidence': min(confidence_avax, 98)  # Max 98%
-                    }
-            
-            else:  # momentum/volume_breakout
-                # Calcular tendencia principal para filtrar
-                ema_50_mom = window_df['Close'].ewm(span=50).mean().iloc[-1] if len(window_df) > 50 else window_df['Close'].mean()
-                ema_200_mom = window_df['Close'].ewm(span=200).mean().iloc[-1] if len(window_df) > 200 else ema_50_mom
-                main_trend_mom = 'BULLISH' if ema_50_mom > ema_200_mom else 'BEARISH'
-                
-                # Usar RSI extremo + volatilidad + filtro de tendencia
-                price_change = ((window_df['Close'].iloc[-1] - window_df['Close'].iloc[-5]) / window_df['Close'].iloc[-5]) * 100
-                
-                # BUY solo en tendencia alcista
-                if current_rsi < buy_threshold and price_change > -2 and main_trend_mom == 'BULLISH':
-                    entry_price = format_price(window_df['Close'].iloc[-1], symbol)
-                    
-                    # Stops más amplios para LINK (Oracle token)
-                    if symbol == 'LINKUSDT':
-                        stop_mult = 0.965  # 3.5% stop para LINK
-                        target_mult = 1.07  # 7% target
-                    else:
-                        stop_mult = 0.975   # 2.5% stop estándar
-                        target_mult = 1.08  # 8% target estándar
-                    
-                    signal = {
-                        'action': 'BUY',
-                        'entry_price': entry_price,
-                        'stop_loss': format_price(entry_price * stop_mult, symbol),
-                        'take_profit': format_price(entry_price * target_mult, symbol),
-                        'confidence': base_confidence + (buy_threshold - current_rsi) * 1.5
-                    }
-                # SELL solo en tendencia bajista
-                elif current_rsi > sell_threshold and price_change < 2 and main_trend_mom == 'BEARISH':
-                    entry_price = format_price(window_df['Close'].iloc[-1], symbol)
-                    
-                    # Stops más amplios para LINK
-                    if symbol == 'LINKUSDT':
-                        stop_mult = 1.035   # 3.5% stop para LINK
-                        target_mult = 0.93  # 7% target
-                    else:
-                        stop_mult = 1.025   # 2.5% stop estándar
-                        target_mult = 0.92  # 8% target estándar
-                    
-                    signal = {
-                        'action': 'SELL',
-                        'entry_price': entry_price,
-                        'stop_loss': format_price(entry_price * stop_mult, symbol),
-                        'take_profit': format_price(entry_price * target_mult, symbol),
-                        'confidence': base_confidence + (current_rsi - sell_threshold) * 1.5
-                    }
-            
-            if signal:
-                # Calcular P&L simulado
-                future_idx = min(i + signal_interval, len(df) - 1)
-                future_price = df['Close'].iloc[future_idx]
-                
-                if signal['action'] == 'BUY':
-                    profit_loss = ((future_price - signal['entry_price']) / signal['entry_price']) * 100
-                else:
-                    profit_loss = ((signal['entry_price'] - future_price) / signal['entry_price']) * 100
-                
-                # Añadir variabilidad según la estrategia
-                strategy_multiplier = {
-                    'trend_following': 1.1,   # Ligeramente mejor
-                    'mean_reversion': 0.9,    # Ligeramente peor 
-                    'momentum': 1.0,          # Neutro
-                    'volume_breakout': 1.05,  # Poco mejor
-                    'avax_optimized': 1.4     # Significativamente mejor (target 65-75% vs 50%)
-                }.get(strategy_name, 1.0)
-                
-                profit_loss *= strategy_multiplier
-                
-                signal.update({
-                    'id': f'backtest_{len(backtest_signals)}',
-                    'date': df.index[i].isoformat(),
-                    'philosopher': f"{strategy_name.replace('_', ' ').title()} Strategy",
-                    'profit_loss': float(profit_loss),
-                    'success': bool(profit_loss > 0)
-                })
-                backtest_signals.append(signal)
-        
-        # Calcular win rate
-        winning_trades = sum(1 for s in backtest_signals if s.get('success', False))
-        win_rate = (winning_trades / len(backtest_signals) * 100) if backtest_signals else 0
-        
-        return {
-            'symbol': symbol,
-            'strategy_used': strategy_name,
-            'timeframe': timeframe,
-            'period_days': request.period_days,
-            'signals': backtest_signals,
-            'total_signals': len(backtest_signals),
-            'win_rate': win_rate,
-            'total_pnl': sum(s.get('profit_loss', 0) for s in backtest_signals)
-        }
+        await backtest_jobs.wait(job)
+        if job.status == 'done':
+            return job.result
+        return {"error": job.error or f"Backtest {job.status}"}
         
     except Exception as e:
         return {"error": f"Error ejecutando backtest: {str(e)}"}
 
+@app.post("/api/backtest/{symbol}/jobs")
+async def submit_backtest_job(symbol: str, request: BacktestRequest):
+    """Encola un backtest y devuelve su id sin esperar"""
+    job = await backtest_jobs.submit(symbol, request.period_days)
+    return job.to_dict()
+
+@app.get("/api/backtest/jobs/{job_id}")
+async def get_backtest_job(job_id: str):
+    """Estado (y resultado al terminar) de un backtest"""
+    job = backtest_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return job.to_dict()
+
+@app.get("/api/backtest/jobs/{job_id}/stream")
+async def stream_backtest_job(job_id: str):
+    """Progreso del backtest como Server-Sent Events hasta que termine"""
+    job = backtest_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    
+    async def events():
+        async for state in backtest_jobs.stream(job):
+            yield f"data: {json.dumps(state, default=str)}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.delete("/api/backtest/jobs/{job_id}")
+async def cancel_backtest_job(job_id: str):
+    """Cancela un backtest en curso"""
+    job = backtest_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return {"job_id": job_id, "cancelled": backtest_jobs.cancel(job_id)}
+
 @app.get("/api/trades/history")
 async def get_trade_history():
     """Obtiene historial de trades cerrados"""
@@ -15,6 +15,8 @@ import os
 from binance_data_fetcher import BinanceDataFetcher
 from error_handler import error_handler, TradingErrorContext
 from signal_validator import signal_validator
+from price_watcher import get_price_watcher
+from position_marks import PositionMarks
 
 class PaperTradingEnhanced:
     """
@@ -54,6 +56,11 @@ class PaperTradingEnhanced:
         # Data fetcher
         self.data_fetcher = BinanceDataFetcher()
         
+        # Precios: price watcher compartido (una petición para todos los símbolos)
+        self.watcher = get_price_watcher()
+        # Mark-to-market y disparo SL/TP por posición (se leen sin red)
+        self.marks = PositionMarks()
+        
         # Files for persistence
         self.positions_file = "active_trades.json"
         self.history_file = "trade_history.json"
@@ -204,6 +211,7 @@ class PaperTradingEnhanced:
             
             # Actualizar estado
             self.positions[position_id] = position
+            self._track(position_id, position)
             self.available_capital -= (capital_to_use + commission)
             self.performance_metrics['total_commission'] += commission
             
@@ -231,53 +239,66 @@ class PaperTradingEnhanced:
                 'position': position
             }
     
-    def update_positions(self):
-        """Actualiza precios y P&L de todas las posiciones"""
+    def _track(self, position_id: str, position: Dict):
+        """Crea la marca de una posición abierta a partir de su estado guardado"""
+        self.marks.track(position_id, position['symbol'], position['side'],
+                         position['entry_price'], position['capital_used'],
+                         position['stop_loss'], position['take_profit'])
+    
+    def watched_symbols(self) -> List[str]:
+        """Símbolos con posiciones abiertas"""
+        return [p['symbol'] for p in list(self.positions.values()) if p.get('status') == 'OPEN']
+    
+    def start_price_updates(self, watcher=None):
+        """Actualiza posiciones en cada tick del price watcher y guarda estado en sus snapshots"""
+        if watcher is not None:
+            self.watcher = watcher
+        self.watcher.subscribe('paper_trading_enhanced', self.watched_symbols,
+                               self.update_positions, self.save_state)
+    
+    def stop_price_updates(self):
+        self.watcher.unsubscribe('paper_trading_enhanced')
+    
+    def update_positions(self, prices: Optional[Dict[str, float]] = None):
+        """
+        Marca las posiciones a mercado con un snapshot de precios
         
-        for position_id, position in self.positions.items():
-            if position['status'] != 'OPEN':
+        Args:
+            prices: {symbol: precio} del price watcher; si no se pasa se usa
+                    el snapshot compartido del tick en curso (una petición
+                    como mucho para todos los libros)
+        """
+        if prices is None:
+            with TradingErrorContext("fetch_prices"):
+                prices = self.watcher.snapshot_prices(self.watched_symbols())
+            prices = prices or {}
+        
+        # Sólo se recalculan las posiciones cuyo precio cambió
+        for position_id in self.marks.apply(prices):
+            position = self.positions.get(position_id)
+            if position is None or position['status'] != 'OPEN':
+                self.marks.drop(position_id)
                 continue
             
             with TradingErrorContext("update_position", position['symbol']):
-                # Obtener precio actual
-                ticker = self.data_fetcher.get_ticker_24hr(position['symbol'])
-                if not ticker:
-                    continue
-                
-                current_price = ticker['current_price']
-                position['current_price'] = current_price
-                
-                # Calcular P&L
-                if position['side'] == 'LONG':
-                    pnl_pct = (current_price - position['entry_price']) / position['entry_price']
-                else:  # SHORT
-                    pnl_pct = (position['entry_price'] - current_price) / position['entry_price']
-                
-                position['pnl'] = position['capital_used'] * pnl_pct
-                position['pnl_pct'] = pnl_pct * 100
-                
-                # Actualizar max profit/loss
-                position['max_profit'] = max(position['max_profit'], position['pnl'])
-                position['max_loss'] = min(position['max_loss'], position['pnl'])
-                
-                # Verificar stop loss
-                if position['side'] == 'LONG':
-                    if current_price <= position['stop_loss']:
-                        self.close_position(position_id, current_price, 'STOP_LOSS')
-                    elif current_price >= position['take_profit']:
-                        self.close_position(position_id, current_price, 'TAKE_PROFIT')
-                else:  # SHORT
-                    if current_price >= position['stop_loss']:
-                        self.close_position(position_id, current_price, 'STOP_LOSS')
-                    elif current_price <= position['take_profit']:
-                        self.close_position(position_id, current_price, 'TAKE_PROFIT')
+                mark = self.marks.get(position_id)
+                position['current_price'] = mark.price
+                position['pnl'] = mark.pnl
+                position['pnl_pct'] = mark.pnl_pct * 100
+                position['max_profit'] = max(position['max_profit'], mark.max_pnl)
+                position['max_loss'] = min(position['max_loss'], mark.min_pnl)
+                position['last_mark'] = datetime.fromtimestamp(mark.marked_at).isoformat()
                 
                 # Trailing stop
                 if position['pnl_pct'] > 5 and not position['trailing_stop_active']:
                     position['trailing_stop_active'] = True
                 
-                if position['trailing_stop_active']:
-                    self.update_trailing_stop(position_id, current_price)
+                if position['trailing_stop_active'] and not mark.trigger:
+                    self.update_trailing_stop(position_id, mark.price)
+        
+        # SL/TP disparados (el disparo queda fijado en la marca)
+        for position_id, reason in self.marks.triggered().items():
+            self.close_position(position_id, self.marks.get(position_id).price, reason)
     
     def update_trailing_stop(self, position_id: str, current_price: float):
         """Actualiza trailing stop loss"""
@@ -292,6 +313,10 @@ class PaperTradingEnhanced:
             new_stop = current_price * (1 + trailing_pct)
             if new_stop < position['stop_loss']:
                 position['stop_loss'] = new_stop
+        
+        mark = self.marks.get(position_id)
+        if mark is not None:
+            mark.set_stops(stop_loss=position['stop_loss'])
     
     def close_position(self, position_id: str, exit_price: float, reason: str = "MANUAL"):
         """Cierra una posición"""
@@ -354,6 +379,7 @@ class PaperTradingEnhanced:
             
             # Remover de posiciones activas
             del self.positions[position_id]
+            self.marks.drop(position_id)
             
             # Guardar estado
             self.save_state()
@@ -488,10 +514,7 @@ class PaperTradingEnhanced:
             )
     
     def get_portfolio_status(self) -> Dict:
-        """Obtiene estado actual del portfolio"""
-        
-        # Actualizar posiciones primero
-        self.update_positions()
+        """Obtiene estado actual del portfolio desde las marcas del último tick (sin red)"""
         
         open_positions = [p for p in self.positions.values() if p['status'] == 'OPEN']
         
@@ -515,7 +538,9 @@ class PaperTradingEnhanced:
             'realized_pnl': self.performance_metrics['total_return'] - unrealized_pnl,
             'performance_metrics': self.performance_metrics,
             'positions': open_positions,
-            'last_update': datetime.now().isoformat()
+            'last_update': datetime.now().isoformat(),
+            'last_mark': (datetime.fromtimestamp(self.marks.last_mark_time()).isoformat()
+                          if self.marks.last_mark_time() else None)
         }
     
     def save_state(self):
@@ -547,6 +572,9 @@ class PaperTradingEnhanced:
             if os.path.exists(self.positions_file):
                 with open(self.positions_file, 'r') as f:
                     self.positions = json.load(f)
+                for position_id, position in self.positions.items():
+                    if position.get('status') == 'OPEN':
+                        self._track(position_id, position)
             
             # Cargar historial
             if os.path.exists(self.history_file):
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Pivot Index - Índice vectorizado de pivotes y estructura de mercado
+
+Los detectores de divergencias, order blocks, barridas de liquidez y
+estructura comparten las mismas primitivas: máximos/mínimos/medias sobre
+ventanas deslizantes y pivotes estrictos (un máximo o mínimo que supera a
+sus `order` vecinos por cada lado). Aquí se calculan una vez con
+sliding_window_view sobre arrays de NumPy, se cachean por
+(símbolo, intervalo) y se extienden al cerrar velas: sólo se recalculan
+las posiciones afectadas por las filas nuevas o por la vela en formación.
+
+Los detectores consultan un PivotView (el tramo del índice que cubre su
+DataFrame). Las ventanas que empezarían antes del DataFrame se devuelven
+como NaN y los pivotes sólo cuentan si todos sus vecinos están dentro,
+así que los resultados coinciden con los de calcularlo sobre el propio df.
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+def rolling(values: np.ndarray, stat: str, window: int) -> np.ndarray:
+    """
+    Estadístico de la ventana que termina en cada posición
+    (out[i] = stat(values[i-window+1:i+1]); NaN si no hay window valores)
+    """
+    out = np.full(len(values), np.nan)
+    if 0 < window <= len(values):
+        out[window - 1:] = getattr(sliding_window_view(values, window), stat)(axis=1)
+    return out
+
+
+def strict_pivots(values: np.ndarray, kind: str, order: int) -> np.ndarray:
+    """
+    Máscara de pivotes estrictos: values[i] es menor ('low') o mayor
+    ('high') que los `order` valores a cada lado
+    """
+    n = len(values)
+    out = np.zeros(n, dtype=bool)
+    if order < 1 or n < 2 * order + 1:
+        return out
+
+    side = rolling(values, 'min' if kind == 'low' else 'max', order)
+    left = side[order - 1:n - order - 1]     # extremo de values[i-order:i]
+    right = side[2 * order:n]                # extremo de values[i+1:i+order+1]
+    centre = values[order:n - order]
+    if kind == 'low':
+        out[order:n - order] = centre < np.minimum(left, right)
+    else:
+        out[order:n - order] = centre > np.maximum(left, right)
+    return out
+
+
+class PivotIndex:
+    """Columnas OHLCV de una serie con sus ventanas y pivotes cacheados"""
+
+    def __init__(self, max_candles: int = 5000):
+        """
+        Args:
+            max_candles: Velas a conservar; las más antiguas se descartan al
+                extender (0: sin límite)
+        """
+        self.max_candles = max_candles
+        self.times = np.empty(0)
+        self.columns: Dict[str, np.ndarray] = {}
+        self._rolling: Dict[Tuple[str, str, int], np.ndarray] = {}
+        self._pivots: Dict[Tuple[str, int, str], np.ndarray] = {}
+        self._lock = threading.RLock()
+        # Cambia con cada rebuild/extensión/recorte: las vistas anteriores dejan de usar los cachés
+        self.generation = 0
+        self.stats = {'rebuilds': 0, 'extensions': 0, 'hits': 0, 'rows_updated': 0}
+
+    def __len__(self):
+        return len(self.times)
+
+    # ===========================================
+    # SINCRONIZACIÓN
+    # ===========================================
+
+    def sync(self, df: pd.DataFrame) -> Optional['PivotView']:
+        """
+        Alinea el índice con df y devuelve la vista que lo cubre.
+
+        df puede repetir la última vela (hit), traer la vela en formación
+        cambiada o velas nuevas (extensión), o ser una ventana ya contenida
+        en el índice (p.ej. df.tail(20)). Cualquier otra cosa reconstruye.
+        Devuelve None si df es un tramo pasado que no coincide con el índice.
+        """
+        with self._lock:
+            times = df.index.to_numpy()
+            if not len(times):
+                return PivotView(self, 0, 0)
+
+            start = self._locate(times[0])
+            if start is None or set(self.columns) != {c for c in COLUMNS if c in df.columns}:
+                self._rebuild(df)
+                return PivotView(self, 0, len(self))
+
+            overlap = min(len(self) - start, len(times))
+            # Mismas velas: marcas de tiempo del último solape y valores de la primera fila
+            if (self.times[start + overlap - 1] != times[overlap - 1]
+                    or not self._row_equals(start, df, 0)):
+                self._rebuild(df)
+                return PivotView(self, 0, len(self))
+
+            last = start + overlap - 1
+            live_changed = not self._row_equals(last, df, overlap - 1)
+            if overlap == len(times) and last < len(self) - 1:
+                # Ventana interior: sólo sirve si su última vela es la misma
+                return PivotView(self, start, last + 1) if not live_changed else None
+
+            if not live_changed and overlap == len(times):
+                self.stats['hits'] += 1
+                return PivotView(self, start, start + len(times))
+
+            dirty = last if live_changed else last + 1
+            self._replace_tail(dirty, df.iloc[dirty - start:])
+            start -= self._trim(start)
+            return PivotView(self, start, len(self))
+
+    def view(self, df: pd.DataFrame) -> 'PivotView':
+        """Vista de df; si es un tramo pasado que no coincide, índice aparte sin cachear"""
+        view = self.sync(df)
+        if view is None:
+            standalone = PivotIndex(self.max_candles)
+            view = standalone.sync(df)
+        return view
+
+    def _locate(self, timestamp) -> Optional[int]:
+        if not len(self):
+            return None
+        position = int(np.searchsorted(self.times, timestamp))
+        if position < len(self) and self.times[position] == timestamp:
+            return position
+        return None
+
+    def _row_equals(self, position: int, df: pd.DataFrame, row: int) -> bool:
+        for name, values in self.columns.items():
+            other = df[name].iloc[row]
+            if values[position] != other and not (np.isnan(values[position]) and np.isnan(other)):
+                return False
+        return True
+
+    def _rebuild(self, df: pd.DataFrame):
+        self.times = df.index.to_numpy()
+        self.columns = {name: df[name].to_numpy(dtype=np.float64, copy=True)
+                        for name in COLUMNS if name in df.columns}
+        self._rolling.clear()
+        self._pivots.clear()
+        self.generation += 1
+        self.stats['rebuilds'] += 1
+
+    def _replace_tail(self, position: int, rows: pd.DataFrame):
+        """Sustituye las filas desde position y recalcula sólo las posiciones afectadas"""
+        self.times = np.concatenate([self.times[:position], rows.index.to_numpy()])
+        for name in self.columns:
+            self.columns[name] = np.concatenate(
+                [self.columns[name][:position], rows[name].to_numpy(dtype=np.float64)])
+
+        for (stat, name, window), values in self._rolling.items():
+            begin = max(position - window + 1, 0)
+            fresh = rolling(self.columns[name][begin:], stat, window)
+            self._rolling[(stat, name, window)] = np.concatenate(
+                [values[:position], fresh[position - begin:]])
+
+        for (kind, order, name), flags in self._pivots.items():
+            # Un pivote depende de `order` velas posteriores
+            first = max(position - order, 0)
+            begin = max(first - order, 0)
+            fresh = strict_pivots(self.columns[name][begin:], kind, order)
+            self._pivots[(kind, order, name)] = np.concatenate([flags[:first], fresh[first - begin:]])
+
+        self.generation += 1
+        self.stats['extensions'] += 1
+        self.stats['rows_updated'] += len(rows)
+
+    def _trim(self, keep_from: int) -> int:
+        """Descarta velas antiguas por encima de max_candles (nunca desde keep_from)"""
+        excess = min(len(self) - self.max_candles, keep_from) if self.max_candles else 0
+        if excess <= 0:
+            return 0
+        self.times = self.times[excess:]
+        for store in (self.columns, self._rolling, self._pivots):
+            for key in store:
+                store[key] = store[key][excess:]
+        self.generation += 1
+        return excess
+
+    # ===========================================
+    # PRIMITIVAS
+    # ===========================================
+
+    def rolling(self, stat: str, column: str, window: int) -> np.ndarray:
+        """Ventana deslizante cacheada sobre todo el índice ('max', 'min', 'mean', 'sum')"""
+        key = (stat, column, window)
+        with self._lock:
+            if key not in self._rolling:
+                self._rolling[key] = rolling(self.columns[column], stat, window)
+            return self._rolling[key]
+
+    def pivots(self, kind: str, order: int, column: Optional[str] = None) -> np.ndarray:
+        """Máscara cacheada de pivotes estrictos (por defecto Low para 'low' y High para 'high')"""
+        column = column or ('Low' if kind == 'low' else 'High')
+        key = (kind, order, column)
+        with self._lock:
+            if key not in self._pivots:
+                self._pivots[key] = strict_pivots(self.columns[column], kind, order)
+            return self._pivots[key]
+
+
+class PivotView:
+    """
+    Tramo [start, stop) del índice que corresponde al DataFrame de un detector
+
+    Se crea bajo el lock del índice y captura sus columnas (los arrays nunca
+    se modifican en sitio, sólo se sustituyen). Si otro hilo sincroniza el
+    mismo índice con otra ventana, la vista deja de usar los cachés
+    compartidos y calcula sobre sus propias columnas.
+    """
+
+    def __init__(self, index: PivotIndex, start: int, stop: int):
+        self.index = index
+        self.start = start
+        self.stop = stop
+        self.generation = index.generation
+        self._columns = dict(index.columns)
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def values(self, column: str) -> np.ndarray:
+        return self._columns[column][self.start:self.stop]
+
+    def rolling(self, stat: str, column: str, window: int) -> np.ndarray:
+        """Como pandas .rolling(window).stat() sobre el DataFrame de la vista"""
+        with self.index._lock:
+            shared = self.index.rolling(stat, column, window) if self._current() else None
+        if shared is None:
+            return rolling(self.values(column), stat, window)
+        out = shared[self.start:self.stop].copy()
+        out[:window - 1] = np.nan
+        return out
+
+    def pivots(self, kind: str, order: int, column: Optional[str] = None) -> np.ndarray:
+        """Posiciones (relativas a la vista) de los pivotes con todos sus vecinos dentro"""
+        with self.index._lock:
+            shared = self.index.pivots(kind, order, column) if self._current() else None
+        if shared is None:
+            flags = strict_pivots(self.values(column or ('Low' if kind == 'low' else 'High')), kind, order)
+            return np.flatnonzero(flags)
+        flags = shared[self.start + order:self.stop - order]
+        return np.flatnonzero(flags) + order
+
+    def _current(self) -> bool:
+        """True si el índice no ha cambiado desde que se creó la vista (requiere el lock)"""
+        return self.index.generation == self.generation
+
+
+# Índices compartidos por (símbolo, intervalo)
+_indexes: Dict[Tuple[str, Optional[str]], PivotIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_pivot_view(df: pd.DataFrame, symbol: Optional[str] = None,
+                   interval: Optional[str] = None) -> PivotView:
+    """
+    Vista del índice de pivotes para df. El símbolo y el intervalo se toman
+    de df.attrs si no se pasan (CandleStore los rellena); sin símbolo se
+    construye un índice aparte para df.
+    """
+    symbol = symbol or df.attrs.get('symbol')
+    interval = interval or df.attrs.get('interval') or df.attrs.get('timeframe')
+    if symbol is None:
+        return PivotIndex(max_candles=0).view(df)
+
+    with _indexes_lock:
+        index = _indexes.setdefault((symbol, interval), PivotIndex())
+    return index.view(df)
+
+
+def reset_pivot_indexes():
+    """Olvida los índices cacheados (p.ej. al cambiar de fuente de datos)"""
+    with _indexes_lock:
+        _indexes.clear()
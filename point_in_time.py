@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Point In Time - Replay de datos históricos sin look-ahead para backtests
+
+Los backtests diarios pedían a yfinance una ventana nueva por símbolo,
+timeframe y día simulado. Aquí cada (símbolo, intervalo) se descarga una
+sola vez para todo el rango del backtest y las ventanas as-of se sirven
+como slices por búsqueda binaria sobre las marcas de tiempo: una vela sólo
+es visible cuando ya ha cerrado (open_time + duración <= as_of), así que
+ninguna ventana contiene información posterior al instante simulado.
+
+Las vistas derivadas (p.ej. 4h a partir de 1h) se remuestrean una vez
+sobre la serie completa. Con as_of alineado a la vela (medianoche en los
+backtests diarios) el slice coincide con remuestrear cada ventana.
+Opcionalmente las series se guardan en disco para repetir el backtest
+offline.
+
+Cada intervalo carga sólo su propio lookback antes del inicio. Yahoo sólo
+sirve rangos intradía acotados (15m: 60 días), así que esas series se
+descargan en tramos; los tramos que fallan o llegan vacíos quedan como
+huecos y las ventanas que caen en ellos se descargan una a una, como
+antes del replay.
+"""
+
+import os
+import threading
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Agregación OHLCV para remuestrear velas
+OHLCV_AGG = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume': 'sum'
+}
+
+# Vistas derivadas: intervalo -> (intervalo base, regla de resample)
+DERIVED_VIEWS = {
+    '4h': ('1h', '4h'),
+}
+
+# Tramo máximo por descarga intradía de Yahoo (con un día de margen)
+INTRADAY_MAX_SPAN = {
+    '1m': pd.Timedelta(days=7),
+    '2m': pd.Timedelta(days=59),
+    '5m': pd.Timedelta(days=59),
+    '15m': pd.Timedelta(days=59),
+    '30m': pd.Timedelta(days=59),
+    '90m': pd.Timedelta(days=59),
+    '60m': pd.Timedelta(days=729),
+    '1h': pd.Timedelta(days=729),
+}
+
+# fetch(symbol, interval, start, end) -> DataFrame OHLCV indexado por open time (como yfinance)
+HistoryFn = Callable[[str, str, pd.Timestamp, pd.Timestamp], pd.DataFrame]
+
+
+def resample_ohlcv(df: pd.DataFrame, rule: str) -> pd.DataFrame:
+    """Remuestrea velas OHLCV descartando los huecos sin datos"""
+    return df.resample(rule).agg(OHLCV_AGG).dropna()
+
+
+def yfinance_history(symbol: str, interval: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    """Fetcher por defecto: Ticker.history de yfinance"""
+    import yfinance as yf
+    return yf.Ticker(symbol).history(start=start, end=end, interval=interval)
+
+
+class PointInTimeSource:
+    """Series completas por (símbolo, intervalo) servidas como ventanas as-of"""
+
+    def __init__(self, start, end, fetch: Optional[HistoryFn] = None,
+                 cache_dir: Optional[str] = None, lookback: Optional[Dict[str, timedelta]] = None):
+        """
+        Args:
+            start: Primer instante que se va a consultar (sin lookback)
+            end: Último as_of que se va a consultar
+            fetch: Descarga de una serie completa (por defecto yfinance)
+            cache_dir: Directorio donde guardar las series para repetir offline
+            lookback: Historia previa a start que necesita cada intervalo
+        """
+        self.start = _naive_utc(start)
+        self.end = _naive_utc(end)
+        self.fetch = fetch or yfinance_history
+        self.cache_dir = cache_dir
+        self.lookback = {interval: pd.Timedelta(delta) for interval, delta in (lookback or {}).items()}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        # (símbolo, intervalo) -> (frame, marcas en ns, inicio cubierto, fin cubierto, huecos)
+        self._series: Dict[Tuple[str, str], Tuple[pd.DataFrame, np.ndarray, pd.Timestamp, pd.Timestamp, list]] = {}
+        self._lock = threading.RLock()
+        self.stats = {'fetches': 0, 'disk_loads': 0, 'resamples': 0, 'windows': 0, 'window_fetches': 0}
+
+    # ===========================================
+    # CARGA
+    # ===========================================
+
+    def preload(self, symbols: Iterable[str], intervals: Iterable[str]):
+        """Descarga (o lee de disco) todas las series antes de empezar el replay"""
+        for symbol in symbols:
+            for interval in intervals:
+                self._ensure(symbol, interval, self._range_start(interval), self.end)
+
+    def _range_start(self, interval: str) -> pd.Timestamp:
+        """Inicio de la serie de un intervalo: start menos su lookback"""
+        base = DERIVED_VIEWS[interval][0] if interval in DERIVED_VIEWS else interval
+        return self.start - self.lookback.get(interval, self.lookback.get(base, pd.Timedelta(0)))
+
+    def _ensure(self, symbol: str, interval: str, start: pd.Timestamp, end: pd.Timestamp):
+        """Garantiza que la serie cubre [start, end]; si no, la amplía con una descarga"""
+        key = (symbol, interval)
+        with self._lock:
+            loaded = self._series.get(key)
+            if loaded is None and interval not in DERIVED_VIEWS:
+                loaded = self._read_cache(key)
+            if loaded is not None and loaded[2] <= start and end <= loaded[3]:
+                return loaded
+
+            start = min(start, self._range_start(interval), loaded[2] if loaded else start)
+            end = max(end, self.end, loaded[3] if loaded else end)
+            if interval in DERIVED_VIEWS:
+                base, rule = DERIVED_VIEWS[interval]
+                base_frame, _, _, _, gaps = self._ensure(symbol, base, start, end)
+                frame = resample_ohlcv(base_frame, rule)
+                self.stats['resamples'] += 1
+            else:
+                # Un día extra: la última vela del rango también debe venir completa
+                frame, gaps = self._download(symbol, interval, start, end + pd.Timedelta(days=1))
+                self._write_cache(key, frame, start, end, gaps)
+
+            loaded = (frame, frame.index.asi8, start, end, gaps)
+            self._series[key] = loaded
+            # Las vistas derivadas de esta serie quedan obsoletas
+            for view, (base, _) in DERIVED_VIEWS.items():
+                if base == interval:
+                    self._series.pop((symbol, view), None)
+            return loaded
+
+    def _download(self, symbol: str, interval: str, start: pd.Timestamp, end: pd.Timestamp):
+        """
+        Serie [start, end) en tramos que Yahoo acepta; devuelve (frame, huecos)
+        con los tramos que fallaron o llegaron vacíos
+        """
+        span = INTRADAY_MAX_SPAN.get(interval)
+        if span is None:
+            self.stats['fetches'] += 1
+            return _normalize(self.fetch(symbol, interval, start, end)), []
+
+        # Tramos desde el final: los más recientes son los que Yahoo siempre sirve
+        frames, gaps = [], []
+        chunk_end = end
+        while chunk_end > start:
+            chunk_start = max(chunk_end - span, start)
+            self.stats['fetches'] += 1
+            try:
+                chunk = _normalize(self.fetch(symbol, interval, chunk_start, chunk_end))
+            except Exception:
+                chunk = None
+            if chunk is None or chunk.empty:
+                gaps.append((chunk_start, chunk_end))
+            else:
+                frames.append(chunk)
+            chunk_end = chunk_start
+
+        if not frames:
+            return _normalize(None), gaps
+        return _normalize(pd.concat(frames[::-1]) if len(frames) > 1 else frames[0]), gaps
+
+    def _cache_path(self, key: Tuple[str, str]) -> str:
+        symbol, interval = key
+        safe = ''.join(c if c.isalnum() or c in '-_' else '_' for c in symbol)
+        return os.path.join(self.cache_dir, f"{safe}_{interval}.pkl")
+
+    def _read_cache(self, key: Tuple[str, str]):
+        if not self.cache_dir or not os.path.exists(self._cache_path(key)):
+            return None
+        frame = pd.read_pickle(self._cache_path(key))
+        start, end = frame.attrs.get('covered', (None, None))
+        if start is None:
+            return None
+        self.stats['disk_loads'] += 1
+        return frame, frame.index.asi8, start, end, list(frame.attrs.get('gaps', []))
+
+    def _write_cache(self, key: Tuple[str, str], frame: pd.DataFrame, start, end, gaps):
+        if not self.cache_dir:
+            return
+        frame.attrs['covered'] = (start, end)
+        frame.attrs['gaps'] = list(gaps)
+        frame.to_pickle(self._cache_path(key))
+
+    # ===========================================
+    # VENTANAS AS-OF
+    # ===========================================
+
+    def history(self, symbol: str, interval: str, start, as_of) -> pd.DataFrame:
+        """
+        Velas con open time >= start ya cerradas en as_of (como
+        Ticker.history(start, end=as_of) pero sin velas en formación)
+        """
+        start, as_of = pd.Timestamp(start), pd.Timestamp(as_of)
+        frame, times, _, _, gaps = self._ensure(symbol, interval, _naive_utc(start), _naive_utc(as_of))
+        if any(gap_start < _naive_utc(as_of) and _naive_utc(start) < gap_end for gap_start, gap_end in gaps):
+            # La serie no cubre esta ventana: descarga por ventana
+            frame = self._window_fetch(symbol, interval, start, as_of)
+            times = frame.index.asi8
+        step = pd.Timedelta(interval).value
+        first = np.searchsorted(times, self._to_ns(start, frame), side='left')
+        last = np.searchsorted(times, self._to_ns(as_of, frame) - step, side='right')
+        self.stats['windows'] += 1
+        return frame.iloc[first:max(first, last)]
+
+    def _window_fetch(self, symbol: str, interval: str, start: pd.Timestamp, as_of: pd.Timestamp) -> pd.DataFrame:
+        self.stats['window_fetches'] += 1
+        if interval in DERIVED_VIEWS:
+            base, rule = DERIVED_VIEWS[interval]
+            return resample_ohlcv(_normalize(self.fetch(symbol, base, start, as_of)), rule)
+        return _normalize(self.fetch(symbol, interval, start, as_of))
+
+    @staticmethod
+    def _to_ns(timestamp: pd.Timestamp, frame: pd.DataFrame) -> int:
+        """Instante en ns comparable con el índice (las fechas naive se leen en la zona del índice)"""
+        tz = frame.index.tz
+        if tz is None:
+            return _naive_utc(timestamp).value
+        return (timestamp.tz_localize(tz) if timestamp.tzinfo is None else timestamp).value
+
+
+def _normalize(frame: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """Velas ordenadas y sin duplicados (un resultado sin índice temporal cuenta como vacío)"""
+    if frame is None or not isinstance(frame.index, pd.DatetimeIndex):
+        return pd.DataFrame(columns=list(OHLCV_AGG), index=pd.DatetimeIndex([]), dtype=float)
+    frame = frame.sort_index()
+    return frame[~frame.index.duplicated(keep='last')]
+
+
+def _naive_utc(timestamp) -> pd.Timestamp:
+    """Timestamp sin zona (las fechas con zona se pasan a UTC)"""
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_convert('UTC').tz_localize(None) if timestamp.tzinfo is not None else timestamp
@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+Portfolio Risk Engine - Riesgo de cartera a partir de la covarianza de retornos
+
+Mantiene una matriz de covarianza móvil de los retornos por vela de los
+símbolos seguidos, alimentada de forma incremental desde el candle store:
+cada vela cerrada nueva actualiza las sumas Σr y Σr·rᵀ de la ventana
+(O(n²) por vela, sin recorrer la historia). Sobre esa matriz, el riesgo
+de una cartera (exposición en USD por símbolo) se calcula con operaciones
+matriciales:
+
+- VaR / CVaR paramétricos: σ_p = √(wᵀΣw) escalado al horizonte
+- Contribución marginal (Σw / σ_p) y por componente (w · marginal)
+- Clusters de correlación: componentes conexas de corr > umbral
+- Correlation risk: correlación media entre posiciones ponderada por riesgo
+- VaR / Expected Shortfall Monte Carlo: escenarios correlacionados para todo
+  el universo, reutilizados por todas las carteras candidatas de la vela
+
+Los resultados se cachean por (hash de posiciones, última vela cerrada), de
+forma que las validaciones pre-trade repetidas entre cierres de vela son una
+búsqueda en diccionario. El camino caliente no sincroniza con el exchange:
+lee lo que ya hay en el store (sync=True fuerza la descarga).
+"""
+
+import time
+import threading
+import logging
+from collections import OrderedDict
+from statistics import NormalDist
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from candle_store import CandleStore, get_candle_store
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioRiskEngine:
+    """Covarianza móvil de retornos y métricas de riesgo de cartera"""
+
+    def __init__(self, store: Optional[CandleStore] = None, interval: str = '1h',
+                 window: int = 500, min_observations: int = 30,
+                 confidence: float = 0.95, horizon_bars: int = 24,
+                 cluster_threshold: float = 0.6, cache_size: int = 256):
+        """
+        Args:
+            store: Candle store del que se leen los cierres (get_candle_store por defecto)
+            interval: Intervalo de las velas usadas para los retornos
+            window: Retornos por símbolo en la ventana móvil
+            min_observations: Retornos alineados mínimos para dar resultados
+            confidence: Nivel de confianza de VaR/CVaR
+            horizon_bars: Velas del horizonte de VaR (24 x 1h = 1 día)
+            cluster_threshold: Correlación a partir de la cual dos símbolos se agrupan
+            cache_size: Resultados de cartera cacheados
+        """
+        self._store = store
+        self.interval = interval
+        self.window = window
+        self.min_observations = min_observations
+        self.confidence = confidence
+        self.horizon_bars = horizon_bars
+        self.cluster_threshold = cluster_threshold
+        self.cache_size = cache_size
+
+        self.symbols: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._buffer = np.empty((window, 0))     # ring buffer de retornos (window, n)
+        self._count = 0                          # retornos en la ventana
+        self._head = 0                           # siguiente posición a escribir
+        self._sum = np.zeros(0)
+        self._cross = np.zeros((0, 0))
+        self._last_time: Optional[int] = None    # open_time de la última vela alineada
+        self._last_close = np.zeros(0)
+        self._since_rebuild = 0
+        self._version = 0
+        self._unavailable = set()
+
+        self._cache: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'rebuilds': 0, 'updates': 0, 'cache_hits': 0, 'cache_misses': 0,
+                      'mc_simulations': 0, 'mc_reuses': 0}
+
+        # Escenarios Monte Carlo de la vela actual (se reutilizan entre trades candidatos)
+        self._mc_key: Optional[Tuple] = None
+        self._mc_scenarios: Optional[np.ndarray] = None
+        self._mc_rate = 20e6    # normales por segundo (se mide en cada simulación)
+
+    @property
+    def store(self) -> CandleStore:
+        if self._store is None:
+            self._store = get_candle_store()
+        return self._store
+
+    # ===========================================
+    # VENTANA DE RETORNOS
+    # ===========================================
+
+    def _closes(self, symbol: str, sync: bool) -> np.ndarray:
+        if sync:
+            return self.store.sync(symbol, self.interval, min_candles=self.window + 1)
+        return self.store.closed_candles(symbol, self.interval)
+
+    def _rebuild(self, symbols: List[str], sync: bool):
+        """Recalcula la ventana completa para un universo de símbolos"""
+        series = {}
+        self._unavailable.difference_update(symbols)
+        for symbol in symbols:
+            rows = self._closes(symbol, sync)
+            if len(rows) > self.min_observations:
+                series[symbol] = rows[-(self.window + 1):]
+            else:
+                self._unavailable.add(symbol)
+
+        self.symbols = list(series)
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._buffer = np.zeros((self.window, len(self.symbols)))
+        self._count = self._head = 0
+        self._sum = np.zeros(len(self.symbols))
+        self._cross = np.zeros((len(self.symbols), len(self.symbols)))
+        self._last_time = None
+        self._last_close = np.zeros(len(self.symbols))
+        self._since_rebuild = 0
+        self._version += 1
+        self._cache.clear()
+        self.stats['rebuilds'] += 1
+
+        if not series:
+            return
+        times, closes = self._align(series, None)
+        if len(times) < 2:
+            return
+        self._last_time = int(times[0])
+        self._last_close = closes[0]
+        self._append(times[1:], closes[1:])
+
+    def _align(self, series: Dict[str, np.ndarray], after: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Velas presentes en todos los símbolos (posteriores a `after`): tiempos y matriz de cierres"""
+        times = None
+        for rows in series.values():
+            t = rows[:, 0].astype(np.int64)
+            if after is not None:
+                t = t[t > after]
+            times = t if times is None else np.intersect1d(times, t, assume_unique=True)
+        closes = np.empty((len(times), len(self.symbols)))
+        for symbol, rows in series.items():
+            t = rows[:, 0].astype(np.int64)
+            closes[:, self._index[symbol]] = rows[np.searchsorted(t, times), 4]
+        return times, closes
+
+    def _append(self, times: np.ndarray, closes: np.ndarray):
+        """Incorpora cierres alineados nuevos a la ventana"""
+        prev = np.vstack([self._last_close[None, :], closes[:-1]])
+        returns = closes / prev - 1.0
+        for start in range(0, len(returns), self.window):
+            self._append_block(returns[start:start + self.window])
+        self._last_time = int(times[-1])
+        self._last_close = closes[-1].copy()
+        self._cache.clear()
+
+    def _append_block(self, returns: np.ndarray):
+        k = len(returns)
+        slots = (self._head + np.arange(k)) % self.window
+        evicted = max(0, self._count + k - self.window)
+        if evicted:
+            # Con la ventana sin llenar, los primeros huecos están vacíos
+            old = self._buffer[slots[k - evicted:]]
+            self._sum -= old.sum(axis=0)
+            self._cross -= old.T @ old
+        self._buffer[slots] = returns
+        self._sum += returns.sum(axis=0)
+        self._cross += returns.T @ returns
+        self._head = (self._head + k) % self.window
+        self._count = min(self.window, self._count + k)
+
+        # Las restas acumulan error de redondeo: se recalcula cada ventana completa
+        self._since_rebuild += k
+        if self._since_rebuild >= self.window:
+            data = self._window_returns()
+            self._sum = data.sum(axis=0)
+            self._cross = data.T @ data
+            self._since_rebuild = 0
+
+    def _window_returns(self) -> np.ndarray:
+        if self._count < self.window:
+            return self._buffer[:self._count]
+        return np.roll(self._buffer, -self._head, axis=0)
+
+    def update(self, symbols: Optional[Iterable[str]] = None, sync: bool = False) -> Optional[int]:
+        """
+        Incorpora las velas cerradas nuevas (y los símbolos nuevos)
+
+        Returns:
+            open_time de la última vela alineada (clave de la caché)
+        """
+        with self._lock:
+            return self._update(symbols, sync)
+
+    def _update(self, symbols: Optional[Iterable[str]], sync: bool) -> Optional[int]:
+        wanted = sorted(s for s in (symbols or ())
+                        if s not in self._index and (sync or s not in self._unavailable))
+        if wanted:
+            self._rebuild(self.symbols + wanted, sync)
+            return self._last_time
+        if not self.symbols:
+            return self._last_time
+
+        series = {symbol: self._closes(symbol, sync) for symbol in self.symbols}
+        if self._last_time is not None and all(
+                len(rows) and int(rows[-1, 0]) <= self._last_time for rows in series.values()):
+            return self._last_time
+
+        times, closes = self._align(series, self._last_time)
+        if len(times):
+            self._append(times, closes)
+            self.stats['updates'] += 1
+            # Con velas nuevas se reintentan los símbolos que no tenían historia
+            self._unavailable.clear()
+        return self._last_time
+
+    # ===========================================
+    # MATRICES
+    # ===========================================
+
+    def covariance(self) -> np.ndarray:
+        """Covarianza muestral de los retornos de la ventana (orden de self.symbols)"""
+        m = self._count
+        if m < 2:
+            return np.full((len(self.symbols), len(self.symbols)), np.nan)
+        return (self._cross - np.outer(self._sum, self._sum) / m) / (m - 1)
+
+    def correlation(self) -> np.ndarray:
+        cov = self.covariance()
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / np.outer(std, std)
+        np.fill_diagonal(corr, 1.0)
+        return np.nan_to_num(corr)
+
+    def correlation_clusters(self, symbols: List[str], corr: np.ndarray) -> List[List[str]]:
+        """Componentes conexas del grafo corr > umbral (clausura por cuadrados sucesivos)"""
+        reach = (corr > self.cluster_threshold) | np.eye(len(symbols), dtype=bool)
+        while True:
+            nxt = (reach.astype(np.int32) @ reach.astype(np.int32)) > 0
+            if np.array_equal(nxt, reach):
+                break
+            reach = nxt
+        clusters, seen = [], set()
+        for i in range(len(symbols)):
+            if i in seen:
+                continue
+            members = np.flatnonzero(reach[i])
+            seen.update(members.tolist())
+            if len(members) > 1:
+                clusters.append([symbols[j] for j in members])
+        return clusters
+
+    # ===========================================
+    # RIESGO DE CARTERA
+    # ===========================================
+
+    def portfolio_risk(self, exposures: Dict[str, float], sync: bool = False) -> Optional[Dict]:
+        """
+        Métricas de riesgo para exposiciones en USD por símbolo
+
+        Returns:
+            Dict con var, cvar, volatilidad, contribuciones y clusters, o None
+            si algún símbolo no tiene historia suficiente en el store
+        """
+        exposures = {s: float(v) for s, v in exposures.items() if v}
+        if not exposures:
+            return None
+
+        with self._lock:
+            close_key = self._update(exposures, sync)
+            if any(s not in self._index for s in exposures) or self._count < self.min_observations:
+                return None
+
+            key = (tuple(sorted(exposures.items())), close_key, self._version)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return cached
+            self.stats['cache_misses'] += 1
+
+            symbols = list(exposures)
+            idx = np.array([self._index[s] for s in symbols])
+            cov = self.covariance()[np.ix_(idx, idx)]
+            mean = (self._sum / self._count)[idx]
+            result = self._compute(symbols, np.array([exposures[s] for s in symbols]), cov, mean)
+
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return result
+
+    def _compute(self, symbols: List[str], w: np.ndarray, cov: np.ndarray, mean: np.ndarray) -> Dict:
+        h = self.horizon_bars
+        sigma_w = cov @ w
+        variance = max(float(w @ sigma_w), 0.0)
+        sigma = np.sqrt(variance * h)
+        mu = float(w @ mean) * h
+
+        normal = NormalDist()
+        z = normal.inv_cdf(self.confidence)
+        var = max(z * sigma - mu, 0.0)
+        cvar = max(sigma * normal.pdf(z) / (1 - self.confidence) - mu, 0.0)
+
+        marginal = sigma_w * h / sigma if sigma > 0 else np.zeros_like(w)
+        component = w * marginal
+
+        # Correlación media entre posiciones ponderada por riesgo individual
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = np.nan_to_num(cov / np.outer(std, std))
+        np.fill_diagonal(corr, 1.0)
+        risk = np.abs(w) * std
+        off_diagonal = risk.sum() ** 2 - (risk ** 2).sum()
+        weighted_corr = float((risk @ corr @ risk - (risk ** 2).sum()) / off_diagonal) if off_diagonal > 0 else 0.0
+
+        clusters = self.correlation_clusters(symbols, corr)
+        gross = np.abs(w).sum()
+        position = {s: i for i, s in enumerate(symbols)}
+
+        return {
+            'var': var,
+            'cvar': cvar,
+            'volatility': sigma,
+            'expected_return': mu,
+            'confidence': self.confidence,
+            'horizon_bars': h,
+            'interval': self.interval,
+            'observations': self._count,
+            'marginal_risk': dict(zip(symbols, marginal.tolist())),
+            'risk_contribution': dict(zip(symbols, component.tolist())),
+            'risk_contribution_pct': {s: (c / sigma * 100 if sigma > 0 else 0.0)
+                                      for s, c in zip(symbols, component.tolist())},
+            'correlation_risk': min(max(weighted_corr, 0.0), 1.0),
+            'correlation_clusters': [
+                {'symbols': cluster,
+                 'exposure_pct': float(np.abs(w[[position[s] for s in cluster]]).sum() / gross * 100)}
+                for cluster in clusters
+            ],
+            'close_time': self._last_time,
+        }
+
+    # ===========================================
+    # MONTE CARLO
+    # ===========================================
+
+    def _cholesky(self, cov: np.ndarray) -> np.ndarray:
+        """Factor de Cholesky; si la matriz no es definida positiva se recortan autovalores"""
+        try:
+            return np.linalg.cholesky(cov)
+        except np.linalg.LinAlgError:
+            values, vectors = np.linalg.eigh(cov)
+            return vectors * np.sqrt(np.clip(values, 1e-12, None))
+
+    def _scenarios(self, n_paths: int, seed: int, latency_budget: Optional[float]) -> Optional[np.ndarray]:
+        """
+        Retornos simples a horizonte (n_paths, n_símbolos) del universo completo
+
+        Cada trayectoria son horizon_bars incrementos gaussianos en log con la
+        media y covarianza de la ventana; como se suman exactamente, se
+        muestrea directamente su valor terminal. La semilla se combina con la
+        vela de cierre: misma vela y semilla -> mismos escenarios.
+        """
+        key = (self._version, self._last_time, n_paths, seed)
+        if self._mc_key == key:
+            self.stats['mc_reuses'] += 1
+            return self._mc_scenarios
+
+        n = len(self.symbols)
+        if latency_budget is not None and n_paths * n / self._mc_rate > latency_budget:
+            return None
+
+        start = time.perf_counter()
+        h = self.horizon_bars
+        cov = self.covariance()
+        mean = self._sum / self._count - np.diag(cov) / 2
+        rng = np.random.default_rng([seed, self._last_time or 0, self._version])
+        shocks = rng.standard_normal((n_paths, n)) @ self._cholesky(cov).T
+        scenarios = np.expm1(mean * h + shocks * np.sqrt(h))
+
+        elapsed = time.perf_counter() - start
+        if elapsed > 0:
+            self._mc_rate = n_paths * n / elapsed
+        self._mc_key, self._mc_scenarios = key, scenarios
+        self.stats['mc_simulations'] += 1
+        return scenarios
+
+    def monte_carlo_batch(self, portfolios: List[Dict[str, float]], n_paths: int = 10000,
+                          seed: int = 0, latency_budget: Optional[float] = None,
+                          sync: bool = False) -> List[Optional[Dict]]:
+        """
+        VaR y Expected Shortfall Monte Carlo de varias carteras a la vez
+
+        Todas las carteras se evalúan sobre los mismos escenarios (una sola
+        multiplicación escenarios x exposiciones). Con latency_budget (segundos)
+        no se simula si la estimación de coste lo supera y se devuelve None,
+        para que el llamador use el VaR paramétrico.
+        """
+        portfolios = [{s: float(v) for s, v in p.items() if v} for p in portfolios]
+        symbols = {s for p in portfolios for s in p}
+
+        with self._lock:
+            self._update(symbols, sync)
+            results: List[Optional[Dict]] = [None] * len(portfolios)
+            valid = [i for i, p in enumerate(portfolios)
+                     if p and all(s in self._index for s in p)]
+            if not valid or self._count < self.min_observations:
+                return results
+
+            start = time.perf_counter()
+            simulated = self._mc_key != (self._version, self._last_time, n_paths, seed)
+            scenarios = self._scenarios(n_paths, seed, latency_budget)
+            if scenarios is None:
+                return results
+
+            weights = np.zeros((len(self.symbols), len(valid)))
+            for column, i in enumerate(valid):
+                for symbol, exposure in portfolios[i].items():
+                    weights[self._index[symbol], column] = exposure
+            pnl = scenarios @ weights
+
+            var = -np.quantile(pnl, 1 - self.confidence, axis=0)
+            tail = pnl <= -var
+            shortfall = -(pnl * tail).sum(axis=0) / np.maximum(tail.sum(axis=0), 1)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            for column, i in enumerate(valid):
+                results[i] = {
+                    'var': max(float(var[column]), 0.0),
+                    'expected_shortfall': max(float(shortfall[column]), 0.0),
+                    'confidence': self.confidence,
+                    'horizon_bars': self.horizon_bars,
+                    'interval': self.interval,
+                    'paths': n_paths,
+                    'seed': seed,
+                    'simulated': simulated,
+                    'elapsed_ms': elapsed_ms,
+                    'close_time': self._last_time,
+                }
+            return results
+
+    def monte_carlo_risk(self, exposures: Dict[str, float], **kwargs) -> Optional[Dict]:
+        """VaR / Expected Shortfall Monte Carlo de una cartera (ver monte_carlo_batch)"""
+        return self.monte_carlo_batch([exposures], **kwargs)[0]
+
+
+_default_engine: Optional[PortfolioRiskEngine] = None
+_default_engine_lock = threading.Lock()
+
+
+def get_portfolio_risk_engine() -> PortfolioRiskEngine:
+    """Motor global sobre el candle store por defecto"""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = PortfolioRiskEngine()
+        return _default_engine
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    engine = get_portfolio_risk_engine()
+    positions = {'SOLUSDT': 2345.0, 'AVAXUSDT': 2100.0, 'DOGEUSDT': 3800.0}
+
+    engine.update(positions, sync=True)
+    result = engine.portfolio_risk(positions)
+    print(f"VaR {result['confidence']:.0%} ({result['horizon_bars']} x {result['interval']}): "
+          f"${result['var']:.2f}  CVaR: ${result['cvar']:.2f}")
+    for symbol, pct in result['risk_contribution_pct'].items():
+        print(f"  {symbol}: {pct:.1f}% del riesgo")
+    print(f"Clusters: {result['correlation_clusters']}")
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        engine.portfolio_risk(positions)
+    print(f"Consulta cacheada: {(time.perf_counter() - start):.3f} ms")
+
+    mc = engine.monte_carlo_risk(positions)
+    print(f"Monte Carlo ({mc['paths']} escenarios, {mc['elapsed_ms']:.1f} ms): "
+          f"VaR ${mc['var']:.2f}  ES: ${mc['expected_shortfall']:.2f}")
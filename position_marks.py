@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Position Marks - Mark-to-market incremental de posiciones abiertas
+
+Cada posición guarda su propia marca: último precio, P&L, extremos y el
+estado de disparo de stop loss / take profit. Un libro de posiciones
+(TradingManager, PaperTradingEnhanced...) aplica en cada tick el snapshot
+de precios compartido del price watcher; sólo se recalculan las marcas
+cuyo precio cambió, y las lecturas de estado usan las marcas en memoria
+sin tocar la red.
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+class PositionMark:
+    """Marca de una posición: P&L al último precio y disparo SL/TP"""
+
+    __slots__ = ('symbol', 'side', 'entry_price', 'exposure', 'stop_loss', 'take_profit',
+                 'price', 'pnl', 'pnl_pct', 'max_pnl', 'min_pnl', 'trigger', 'marked_at')
+
+    def __init__(self, symbol: str, side: str, entry_price: float, exposure: float,
+                 stop_loss: Optional[float] = None, take_profit: Optional[float] = None):
+        """
+        Args:
+            symbol: Símbolo tal como aparece en el snapshot de precios
+            side: 'LONG' o 'SHORT' (sin distinguir mayúsculas)
+            entry_price: Precio de entrada
+            exposure: Capital expuesto a la entrada (cantidad * precio de entrada)
+            stop_loss: Stop loss (None o <= 0: sin stop)
+            take_profit: Take profit (None o <= 0: sin objetivo)
+        """
+        self.symbol = symbol
+        self.side = side.upper()
+        self.entry_price = entry_price
+        self.exposure = exposure
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+
+        self.price: Optional[float] = None
+        self.pnl = 0.0
+        self.pnl_pct = 0.0      # en tanto por uno
+        self.max_pnl = 0.0
+        self.min_pnl = 0.0
+        self.trigger: Optional[str] = None
+        self.marked_at: Optional[float] = None
+
+    @property
+    def is_long(self) -> bool:
+        return self.side != 'SHORT'
+
+    def update(self, price: float, timestamp: Optional[float] = None) -> bool:
+        """
+        Marca la posición a price. Devuelve False si el precio no cambió
+        (la marca anterior sigue siendo válida y no hay nada que recalcular).
+        """
+        if price is None or price <= 0:
+            return False
+        self.marked_at = timestamp if timestamp is not None else time.time()
+        if price == self.price:
+            return False
+
+        self.price = price
+        move = (price - self.entry_price) / self.entry_price
+        self.pnl_pct = move if self.is_long else -move
+        self.pnl = self.exposure * self.pnl_pct
+        self.max_pnl = max(self.max_pnl, self.pnl)
+        self.min_pnl = min(self.min_pnl, self.pnl)
+        self._check_trigger()
+        return True
+
+    def set_stops(self, stop_loss: Optional[float] = None, take_profit: Optional[float] = None):
+        """Mueve SL/TP (p.ej. trailing stop) y reevalúa el disparo al último precio"""
+        if stop_loss is not None:
+            self.stop_loss = stop_loss
+        if take_profit is not None:
+            self.take_profit = take_profit
+        self._check_trigger()
+
+    def _check_trigger(self):
+        """El disparo queda fijado: la posición se cierra una sola vez"""
+        if self.trigger is not None or self.price is None:
+            return
+        price = self.price
+        stop, target = self.stop_loss, self.take_profit
+        if self.is_long:
+            if stop and stop > 0 and price <= stop:
+                self.trigger = 'STOP_LOSS'
+            elif target and target > 0 and price >= target:
+                self.trigger = 'TAKE_PROFIT'
+        else:
+            if stop and stop > 0 and price >= stop:
+                self.trigger = 'STOP_LOSS'
+            elif target and target > 0 and price <= target:
+                self.trigger = 'TAKE_PROFIT'
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class PositionMarks:
+    """Marcas de las posiciones abiertas de un libro, indexadas por id"""
+
+    def __init__(self):
+        self._marks: Dict[str, PositionMark] = {}
+        self.stats = {'ticks': 0, 'marked': 0, 'unchanged': 0}
+
+    def __len__(self):
+        return len(self._marks)
+
+    def __contains__(self, position_id) -> bool:
+        return position_id in self._marks
+
+    def track(self, position_id: str, symbol: str, side: str, entry_price: float,
+              exposure: float, stop_loss: Optional[float] = None,
+              take_profit: Optional[float] = None,
+              price: Optional[float] = None) -> PositionMark:
+        """Empieza a marcar una posición (reemplaza la marca anterior del mismo id)"""
+        mark = PositionMark(symbol, side, entry_price, exposure, stop_loss, take_profit)
+        if price is not None:
+            mark.update(price)
+        self._marks[position_id] = mark
+        return mark
+
+    def get(self, position_id: str) -> Optional[PositionMark]:
+        return self._marks.get(position_id)
+
+    def drop(self, position_id: str) -> Optional[PositionMark]:
+        return self._marks.pop(position_id, None)
+
+    def symbols(self) -> List[str]:
+        return sorted({mark.symbol for mark in self._marks.values()})
+
+    def apply(self, prices: Dict[str, float], timestamp: Optional[float] = None) -> List[str]:
+        """
+        Aplica un snapshot de precios a todas las marcas.
+
+        Returns:
+            Ids de las posiciones cuya marca cambió
+        """
+        timestamp = timestamp if timestamp is not None else time.time()
+        changed = []
+        for position_id, mark in list(self._marks.items()):
+            price = prices.get(mark.symbol)
+            if price is None:
+                continue
+            if mark.update(price, timestamp):
+                changed.append(position_id)
+            else:
+                self.stats['unchanged'] += 1
+        self.stats['ticks'] += 1
+        self.stats['marked'] += len(changed)
+        return changed
+
+    def triggered(self, position_ids: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """{id: 'STOP_LOSS' | 'TAKE_PROFIT'} de las posiciones con SL/TP disparado"""
+        ids = self._marks if position_ids is None else position_ids
+        return {pid: self._marks[pid].trigger for pid in ids
+                if pid in self._marks and self._marks[pid].trigger}
+
+    def last_mark_time(self) -> Optional[float]:
+        times = [m.marked_at for m in self._marks.values() if m.marked_at is not None]
+        return max(times) if times else None
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Price Watcher - Servicio único de precios para todo el proceso
+
+Un solo hilo consulta, en cada tick, la unión de los símbolos que necesitan
+los suscriptores (TradeTracker, MonitorDefinitivo, PaperTradingEnhanced)
+con una petición multi-símbolo por fuente: Binance para pares tipo
+'SOLUSDT' y Yahoo Finance para tickers tipo 'BTC-USD'. Cada suscriptor
+recibe sólo los precios de sus símbolos y, cada snapshot_interval, un
+aviso para persistir su estado (que mantiene en memoria entre ticks).
+
+Con dos o más pares de Binance se descarga el libro completo de
+/ticker/price (mismo peso que la consulta multi-símbolo) y el snapshot se
+guarda con su hora: los libros de posiciones que piden precios con
+snapshot_prices dentro del mismo tick lo comparten sin más peticiones.
+"""
+
+import json
+import time
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+BINANCE_PRICE_URL = "https://api.binance.com/api/v3/ticker/price"
+
+# A partir de este número de pares se pide el libro completo (sin symbol)
+FULL_BOOK_MIN_SYMBOLS = 2
+
+
+def is_binance_symbol(symbol: str) -> bool:
+    """Pares de Binance ('SOLUSDT'); el resto se consulta en Yahoo ('SOL-USD')"""
+    return '-' not in symbol and symbol.endswith(('USDT', 'BUSD', 'USDC', 'BTC'))
+
+
+def fetch_binance_prices(symbols: Optional[List[str]] = None) -> Dict[str, float]:
+    """
+    Último precio de varios pares en una sola petición. Sin symbols, o con
+    FULL_BOOK_MIN_SYMBOLS o más, devuelve el libro completo de Binance.
+    """
+    params = {}
+    if symbols and len(symbols) < FULL_BOOK_MIN_SYMBOLS:
+        params['symbols'] = json.dumps(symbols, separators=(',', ':'))
+    response = requests.get(BINANCE_PRICE_URL, timeout=10, params=params)
+    response.raise_for_status()
+    return {item['symbol']: float(item['price']) for item in response.json()}
+
+
+def fetch_yahoo_prices(symbols: List[str]) -> Dict[str, float]:
+    """Último cierre de 1m de varios tickers en una sola descarga"""
+    import yfinance as yf
+
+    data = yf.download(symbols, period='1d', interval='1m', progress=False, threads=False)
+    if data.empty:
+        return {}
+    close = data['Close']
+    if not hasattr(close, 'columns'):   # Un solo ticker en versiones antiguas
+        close = close.to_frame(symbols[0])
+
+    prices = {}
+    for symbol in symbols:
+        if symbol in close.columns:
+            series = close[symbol].dropna()
+            if not series.empty:
+                prices[symbol] = float(series.iloc[-1])
+    return prices
+
+
+def fetch_prices(symbols: Iterable[str]) -> Dict[str, float]:
+    """
+    Precios de todos los símbolos: como mucho una petición por fuente. El
+    resultado puede incluir más pares de Binance de los pedidos.
+    """
+    symbols = sorted(set(symbols))
+    binance = [s for s in symbols if is_binance_symbol(s)]
+    yahoo = [s for s in symbols if not is_binance_symbol(s)]
+
+    prices = {}
+    for fetch, group in ((fetch_binance_prices, binance), (fetch_yahoo_prices, yahoo)):
+        if not group:
+            continue
+        try:
+            prices.update(fetch(group))
+        except Exception as e:
+            logger.error(f"Error obteniendo precios de {group}: {e}")
+    return prices
+
+
+@dataclass
+class Subscription:
+    """Suscriptor del watcher"""
+    name: str
+    symbols: Callable[[], Iterable[str]]              # símbolos que necesita ahora
+    on_prices: Callable[[Dict[str, float]], None]     # precios de esos símbolos
+    on_snapshot: Optional[Callable[[], None]] = None  # persistir estado
+
+
+class PriceWatcher:
+    """Hilo único que reparte precios a todos los suscriptores"""
+
+    def __init__(self, fetcher: Callable[[Iterable[str]], Dict[str, float]] = fetch_prices,
+                 interval: float = 60, snapshot_interval: float = 300, autostart: bool = True,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            fetcher: symbols -> {symbol: price}; una petición por tick
+            interval: Segundos entre ticks
+            snapshot_interval: Segundos entre avisos de snapshot
+            autostart: Arrancar el hilo con la primera suscripción (False: ticks a mano)
+            clock: Reloj de los precios cacheados (inyectable en tests)
+        """
+        self.fetcher = fetcher
+        self.autostart = autostart
+        self.interval = interval
+        self.snapshot_interval = snapshot_interval
+
+        self._subscriptions: Dict[str, Subscription] = {}
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_snapshot = time.monotonic()
+        self.clock = clock
+        # Serializa las consultas: quien llega durante una petición reutiliza su resultado
+        self._fetch_lock = threading.Lock()
+
+        self.last_prices: Dict[str, float] = {}
+        self.price_times: Dict[str, float] = {}
+        self.stats = {
+            'ticks': 0,
+            'requests': 0,
+            'shared_hits': 0,
+            'symbols_fetched': 0,
+            'snapshots': 0,
+            'errors': 0
+        }
+
+    # ===========================================
+    # SUSCRIPCIONES
+    # ===========================================
+
+    def subscribe(self, name: str, symbols: Callable[[], Iterable[str]],
+                  on_prices: Callable[[Dict[str, float]], None],
+                  on_snapshot: Optional[Callable[[], None]] = None):
+        """Registra (o reemplaza) un suscriptor y arranca el hilo si hace falta"""
+        with self._lock:
+            self._subscriptions[name] = Subscription(name, symbols, on_prices, on_snapshot)
+        if self.autostart:
+            self.start()
+
+    def unsubscribe(self, name: str):
+        with self._lock:
+            subscription = self._subscriptions.pop(name, None)
+        if subscription and subscription.on_snapshot:
+            self._call(subscription, subscription.on_snapshot)
+
+    def is_subscribed(self, name: str) -> bool:
+        with self._lock:
+            return name in self._subscriptions
+
+    # ===========================================
+    # CICLO
+    # ===========================================
+
+    def start(self):
+        """Arranca el hilo (idempotente)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="price-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Detiene el hilo y pide un último snapshot a todos"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.snapshot()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(self.interval)
+
+    def tick(self) -> Dict[str, float]:
+        """Una ronda: una consulta para todos los símbolos y reparto"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+
+        wanted = {}
+        for subscription in subscriptions:
+            symbols = self._call(subscription, subscription.symbols)
+            wanted[subscription.name] = set(symbols or ())
+        all_symbols = set().union(*wanted.values()) if wanted else set()
+
+        prices = {}
+        if all_symbols:
+            self.stats['requests'] += 1
+            self.stats['symbols_fetched'] += len(all_symbols)
+            try:
+                with self._fetch_lock:
+                    prices = self.fetcher(all_symbols)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error en tick del price watcher: {e}")
+            self._remember(prices)
+
+        for subscription in subscriptions:
+            own = {s: prices[s] for s in wanted[subscription.name] if s in prices}
+            if own:
+                self._call(subscription, subscription.on_prices, own)
+
+        self.stats['ticks'] += 1
+        if time.monotonic() - self._last_snapshot >= self.snapshot_interval:
+            self.snapshot()
+        return prices
+
+    def snapshot(self):
+        """Pide a cada suscriptor que persista su estado en memoria"""
+        self._last_snapshot = time.monotonic()
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+        for subscription in subscriptions:
+            if subscription.on_snapshot:
+                self._call(subscription, subscription.on_snapshot)
+        self.stats['snapshots'] += 1
+
+    def get_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        """Consulta puntual (una petición por fuente) fuera del ciclo"""
+        symbols = set(symbols)
+        if not symbols:
+            return {}
+        self.stats['requests'] += 1
+        with self._fetch_lock:
+            prices = self.fetcher(symbols)
+        self._remember(prices)
+        return prices
+
+    def snapshot_prices(self, symbols: Iterable[str], max_age: Optional[float] = None) -> Dict[str, float]:
+        """
+        Precios de symbols desde el último snapshot compartido; sólo se hace
+        una petición (para los que faltan o tienen más de max_age segundos,
+        por defecto interval) si el tick en curso no los trajo ya.
+        """
+        symbols = set(symbols)
+        if not symbols:
+            return {}
+        max_age = self.interval if max_age is None else max_age
+
+        with self._fetch_lock:
+            stale = self._stale(symbols, max_age)
+            if stale:
+                self.stats['requests'] += 1
+                self.stats['symbols_fetched'] += len(stale)
+                try:
+                    self._remember(self.fetcher(stale))
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logger.error(f"Error obteniendo snapshot de precios: {e}")
+            else:
+                self.stats['shared_hits'] += 1
+        return {s: self.last_prices[s] for s in symbols if s in self.last_prices}
+
+    def _stale(self, symbols: Iterable[str], max_age: float) -> set:
+        now = self.clock()
+        return {s for s in symbols
+                if s not in self.price_times or now - self.price_times[s] > max_age}
+
+    def _remember(self, prices: Dict[str, float]):
+        """Guarda un snapshot (incluidos los pares extra del libro completo)"""
+        now = self.clock()
+        self.last_prices.update(prices)
+        self.price_times.update(dict.fromkeys(prices, now))
+
+    def _call(self, subscription: Subscription, fn: Callable, *args):
+        """Un suscriptor que falla no afecta a los demás"""
+        try:
+            return fn(*args)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Error en suscriptor {subscription.name}: {e}")
+            return None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            subscribers = list(self._subscriptions)
+        return {**self.stats, 'subscribers': subscribers,
+                'running': self._thread is not None and self._thread.is_alive()}
+
+
+# Watcher global del proceso
+_default_watcher: Optional[PriceWatcher] = None
+_default_watcher_lock = threading.Lock()
+
+
+def get_price_watcher() -> PriceWatcher:
+    """Watcher compartido por todos los módulos"""
+    global _default_watcher
+    with _default_watcher_lock:
+        if _default_watcher is None:
+            _default_watcher = PriceWatcher()
+        return _default_watcher
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    watcher = PriceWatcher(interval=10)
+    watcher.subscribe('demo', lambda: ['BTCUSDT', 'ETHUSDT', 'BTC-USD'],
+                      lambda prices: print(f"📈 {prices}"))
+    time.sleep(25)
+    watcher.stop()
+    print(watcher.get_stats())
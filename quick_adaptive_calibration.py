@@ -13,15 +13,27 @@ import warnings
 warnings.filterwarnings('ignore')
 
 from scoring_empirico_v2 import ScoringEmpiricoV2
+from calibration_engine import CalibrationEngine, checkpoint_tag, simulate_fixed_stops
 
 class QuickAdaptiveCalibration:
     """
     Calibración rápida con configuraciones preseleccionadas
+    
+    Las configuraciones se evalúan con CalibrationEngine (memo, pool de
+    procesos y checkpoint opcional).
     """
     
-    def __init__(self, initial_capital=10000):
+    def __init__(self, initial_capital=10000, workers=None, checkpoint_path=None):
+        """
+        Args:
+            initial_capital: Capital inicial
+            workers: Procesos para evaluar (1 = secuencial); por defecto os.cpu_count()
+            checkpoint_path: Fichero de checkpoint para reanudar una calibración interrumpida
+        """
         self.initial_capital = initial_capital
         self.scoring_system = ScoringEmpiricoV2()
+        self.workers = workers
+        self.checkpoint_path = checkpoint_path
         
         # Períodos de calibración
         self.calibration_periods = [
@@ -119,14 +131,14 @@ class QuickAdaptiveCalibration:
         best_config = None
         best_score = -float('inf')
         
-        for i, config in enumerate(self.test_configs, 1):
+        # Todas las configuraciones de una vez (memo + pool de procesos + checkpoint)
+        all_results = self.create_engine().evaluate(self.test_configs)
+        
+        for i, (config, results) in enumerate(zip(self.test_configs, all_results), 1):
             print(f"\n{'='*60}")
-            print(f"🔍 Probando Configuración {i}/{len(self.test_configs)}: {config['name']}")
+            print(f"🔍 Configuración {i}/{len(self.test_configs)}: {config['name']}")
             print("="*60)
             
-            # Probar configuración
-            results = self.test_configuration(config)
-            
             # Calcular score
             score = self.calculate_score(results)
             
@@ -235,25 +247,53 @@ class QuickAdaptiveCalibration:
     def test_configuration(self, config):
         """Prueba una configuración"""
         
+        unit_trades = []
+        
+        for symbol, symbol_data in self.market_data.items():
+            for period_name in symbol_data:
+                unit = (symbol, period_name)
+                unit_trades.append((unit, self.evaluate_unit(config, unit)))
+        
+        return self.summarize(config, unit_trades)
+    
+    # ===========================================
+    # INTERFAZ DEL MOTOR DE CALIBRACIÓN
+    # ===========================================
+    
+    def create_engine(self):
+        """Motor de calibración sobre self.market_data"""
+        tag = checkpoint_tag('QuickAdaptiveCalibration', self.market_data, self.calibration_periods, self.test_configs)
+        return CalibrationEngine(self, workers=self.workers, checkpoint_path=self.checkpoint_path, tag=tag)
+    
+    def calibration_units(self):
+        """(símbolo, período) en el orden en que se agregan los trades"""
+        return [(symbol, period_name)
+                for symbol, symbol_data in self.market_data.items()
+                for period_name in symbol_data]
+    
+    def evaluate_unit(self, config, unit):
+        """Trades de una configuración en un (símbolo, período)"""
+        symbol, period_name = unit
+        
+        # Obtener tipo de mercado
+        period_type = next((p['type'] for p in self.calibration_periods 
+                           if p['name'] == period_name), 'NEUTRAL')
+        
+        # Ejecutar backtest
+        return self.backtest_with_config(symbol, self.market_data[symbol][period_name], config, period_type)
+    
+    def summarize(self, config, unit_trades):
+        """Resultados de una configuración a partir de los trades por unidad"""
+        
         all_trades = []
         period_performance = {}
         
-        for symbol, symbol_data in self.market_data.items():
-            for period_name, data in symbol_data.items():
-                # Obtener tipo de mercado
-                period_type = next((p['type'] for p in self.calibration_periods 
-                                   if p['name'] == period_name), 'NEUTRAL')
-                
-                # Ejecutar backtest
-                trades = self.backtest_with_config(
-                    symbol, data, config, period_type
-                )
-                
-                all_trades.extend(trades)
-                
-                if period_name not in period_performance:
-                    period_performance[period_name] = []
-                period_performance[period_name].extend(trades)
+        for (symbol, period_name), trades in unit_trades:
+            all_trades.extend(trades)
+            
+            if period_name not in period_performance:
+                period_performance[period_name] = []
+            period_performance[period_name].extend(trades)
         
         # Calcular métricas
         metrics = self.calculate_metrics(all_trades)
@@ -274,8 +314,17 @@ class QuickAdaptiveCalibration:
             'period_performance': period_performance
         }
     
-    def backtest_with_config(self, symbol, data, config, market_type):
-        """Ejecuta backtest con configuración específica"""
+    def rank(self, results):
+        """Orden para el successive halving"""
+        return self.calculate_score(results)
+    
+    def backtest_with_config(self, symbol, data, config, market_type, vectorized=True):
+        """
+        Ejecuta backtest con configuración específica
+        
+        vectorized: True calcula las señales por arrays y simula sobre listas;
+            False el bucle por vela original (referencia de paridad)
+        """
         
         trades = []
         position = None
@@ -283,6 +332,18 @@ class QuickAdaptiveCalibration:
         # Ajustar parámetros según tipo de mercado
         adjusted_config = self.adjust_for_market(config, market_type)
         
+        # ScoringEmpiricoV2 no expone evaluar_entrada: la señal es siempre el
+        # fallback RSI + MACD de generate_signal, vectorizable
+        if vectorized and not hasattr(self.scoring_system, 'evaluar_entrada'):
+            direction = self.fallback_signals(data, adjusted_config)
+            score = np.where(direction != 0, adjusted_config['min_score'] + 0.5, 0.0)
+            return simulate_fixed_stops(
+                data, direction, score, adjusted_config['min_score'],
+                adjusted_config['stop_loss_pct'], adjusted_config['take_profit_pct'],
+                adjusted_config['leverage_base'], symbol,
+                extra_fields={'market_type': market_type}, track_duration=True
+            )
+        
         # Iterar por los datos
         for i in range(20, len(data)):
             current = data.iloc[i]
@@ -438,6 +499,17 @@ class QuickAdaptiveCalibration:
             
             return None, 0
     
+    def fallback_signals(self, data, config):
+        """Dirección por vela del fallback RSI + MACD (1 LONG, -1 SHORT, 0 nada)"""
+        
+        rsi = data['RSI'].to_numpy(dtype=float)
+        macd = data['MACD'].to_numpy(dtype=float)
+        macd_signal = data['MACD_Signal'].to_numpy(dtype=float)
+        
+        long_signal = (rsi <= config['rsi_oversold']) & (macd > macd_signal)
+        short_signal = ~long_signal & (rsi >= config['rsi_overbought']) & (macd < macd_signal)
+        return long_signal.astype(np.int8) - short_signal.astype(np.int8)
+    
     def calculate_metrics(self, trades):
         """Calcula métricas de performance"""
         
@@ -10,6 +10,7 @@ import json
 
 from symbol_manager import symbol_manager
 from error_handler import error_handler
+from portfolio_risk import PortfolioRiskEngine, get_portfolio_risk_engine
 
 class RiskCalculator:
     """
@@ -20,7 +21,9 @@ class RiskCalculator:
     - Portfolio optimization
     """
     
-    def __init__(self):
+    def __init__(self, risk_engine: Optional[PortfolioRiskEngine] = None):
+        # Motor de covarianza (se crea al primer uso sobre el candle store global)
+        self._risk_engine = risk_engine
         self.risk_limits = {
             'max_risk_per_trade': 0.02,      # 2% máximo riesgo por trade
             'max_daily_risk': 0.06,          # 6% máximo riesgo diario
@@ -29,6 +32,52 @@ class RiskCalculator:
             'min_risk_reward': 2.0,          # Mínimo R:R ratio
             'max_correlated_exposure': 0.30  # 30% máx en activos correlacionados
         }
+        
+        # VaR Monte Carlo: escenarios reutilizados durante la vela y presupuesto de latencia
+        self.monte_carlo_config = {
+            'paths': 10000,
+            'seed': 0,
+            'latency_budget_ms': 20.0
+        }
+    
+    @property
+    def risk_engine(self) -> PortfolioRiskEngine:
+        if self._risk_engine is None:
+            self._risk_engine = get_portfolio_risk_engine()
+        return self._risk_engine
+    
+    @staticmethod
+    def _signed_exposure(value: float, entry_price: float, stop_loss: float,
+                         direction: Optional[str] = None) -> float:
+        """Exposición con signo: negativa para shorts (dirección explícita o stop por encima de la entrada)"""
+        if direction is None:
+            is_short = stop_loss > entry_price
+        else:
+            is_short = direction.upper() in ('SHORT', 'SELL')
+        return -value if is_short else value
+    
+    def _position_exposure(self, pos: Dict) -> float:
+        """Exposición con signo de una posición ('direction' o 'side' si los trae)"""
+        return self._signed_exposure(pos['size'] * pos['entry_price'], pos['entry_price'], pos['stop_loss'],
+                                     pos.get('direction') or pos.get('side'))
+    
+    def _correlation_warnings(self, engine_risk: Dict, capital: float,
+                              mc_risk: Optional[Dict] = None) -> List[str]:
+        """Avisos de VaR (Monte Carlo si se indica) y de exposición en clusters correlacionados"""
+        warnings = []
+        var_source = mc_risk or engine_risk
+        var_pct = var_source['var'] / capital if capital > 0 else 0
+        if var_pct > self.risk_limits['max_daily_risk']:
+            warnings.append(
+                f"⚠️ VaR {var_source['confidence']*100:.0f}%{' Monte Carlo' if mc_risk else ''} del portfolio: "
+                f"{var_pct*100:.2f}% > {self.risk_limits['max_daily_risk']*100}% máximo"
+            )
+        for cluster in engine_risk['correlation_clusters']:
+            if cluster['exposure_pct'] > self.risk_limits['max_correlated_exposure'] * 100:
+                warnings.append(
+                    f"⚠️ Exposición correlacionada: {cluster['exposure_pct']:.1f}% en {', '.join(cluster['symbols'])}"
+                )
+        return warnings
     
     def calculate_position_size_kelly(
         self,
@@ -115,6 +164,38 @@ class RiskCalculator:
             'sample_size': len(returns)
         }
     
+    def _monte_carlo_batch(self, portfolios: List[Dict[str, float]]) -> List[Optional[Dict]]:
+        config = self.monte_carlo_config
+        return self.risk_engine.monte_carlo_batch(
+            portfolios,
+            n_paths=config['paths'],
+            seed=config['seed'],
+            latency_budget=config['latency_budget_ms'] / 1000
+        )
+    
+    def calculate_monte_carlo_var(self, exposures: Dict[str, float], capital: float = 0) -> Optional[Dict]:
+        """
+        VaR y Expected Shortfall Monte Carlo de toda la cartera
+        
+        Simula retornos correlacionados de todos los símbolos (semilla fija,
+        reproducible) y reutiliza los escenarios para cualquier otra cartera
+        evaluada antes del siguiente cierre de vela.
+        
+        Args:
+            exposures: Dict con símbolo -> exposición en USD (negativa para shorts)
+            capital: Capital para expresar los resultados en %
+        
+        Returns:
+            Dict con var/expected_shortfall en USD, o None si no hay historia
+            suficiente o la simulación no cabe en el presupuesto de latencia
+        """
+        result = self._monte_carlo_batch([exposures])[0]
+        if result and capital > 0:
+            result = dict(result,
+                          var_pct=result['var'] / capital * 100,
+                          expected_shortfall_pct=result['expected_shortfall'] / capital * 100)
+        return result
+    
     def calculate_optimal_position_size(
         self,
         entry_price: float,
@@ -217,10 +298,23 @@ class RiskCalculator:
         take_profit: float,
         position_size: float,
         capital: float,
-        symbol: str
+        symbol: str,
+        current_positions: Dict[str, float] = None,
+        var_method: str = 'parametric',
+        direction: Optional[str] = None
     ) -> Dict:
         """
         Valida que un trade cumpla con los parámetros de riesgo
+        
+        Con current_positions (símbolo -> exposición en USD, negativa para
+        shorts) se valida además el VaR de la cartera resultante con el motor
+        de covarianza (resultado cacheado hasta el siguiente cierre de vela).
+        Con var_method 'monte_carlo' el VaR/ES sale de los escenarios
+        simulados de la vela, y si la simulación no cabe en el presupuesto de
+        latencia se usa el paramétrico.
+        
+        direction: 'LONG'/'SHORT'; por defecto se deduce del stop (por encima
+            de la entrada = short)
         """
         
         validations = []
@@ -272,19 +366,38 @@ class RiskCalculator:
             is_valid = False
             validations.append(f"❌ Capital insuficiente: necesitas ${position_value:.2f}")
         
+        metrics = {
+            'position_value': position_value,
+            'risk_amount': risk_amount,
+            'risk_percentage': risk_pct * 100,
+            'risk_reward_ratio': risk_reward,
+            'stop_distance_pct': stop_distance * 100,
+            'profit_distance_pct': profit_distance * 100,
+            'position_pct_of_capital': position_pct * 100
+        }
+        
+        # Validación 6: VaR de la cartera con la nueva posición
+        if current_positions is not None:
+            exposures = dict(current_positions)
+            exposures[symbol] = exposures.get(symbol, 0) + self._signed_exposure(
+                position_value, entry_price, stop_loss, direction)
+            engine_risk = self.risk_engine.portfolio_risk(exposures)
+            mc_risk = self._monte_carlo_batch([exposures])[0] if var_method == 'monte_carlo' else None
+            if engine_risk:
+                var_source = mc_risk or engine_risk
+                warnings.extend(self._correlation_warnings(engine_risk, capital, mc_risk))
+                metrics['portfolio_var_pct'] = var_source['var'] / capital * 100 if capital > 0 else 0
+                metrics['portfolio_cvar_pct'] = (
+                    var_source['expected_shortfall'] if mc_risk else var_source['cvar']
+                ) / capital * 100 if capital > 0 else 0
+                metrics['var_method'] = 'monte_carlo' if mc_risk else 'parametric'
+                metrics['correlation_risk'] = engine_risk['correlation_risk']
+        
         return {
             'is_valid': is_valid,
             'validations': validations,
             'warnings': warnings,
-            'metrics': {
-                'position_value': position_value,
-                'risk_amount': risk_amount,
-                'risk_percentage': risk_pct * 100,
-                'risk_reward_ratio': risk_reward,
-                'stop_distance_pct': stop_distance * 100,
-                'profit_distance_pct': profit_distance * 100,
-                'position_pct_of_capital': position_pct * 100
-            }
+            'metrics': metrics
         }
     
     def calculate_portfolio_risk(
@@ -297,6 +410,10 @@ class RiskCalculator:
         
         Args:
             positions: Lista de posiciones con 'symbol', 'size', 'entry_price', 'stop_loss'
+                       (y opcionalmente 'direction'/'side'; si no, el stop indica si es short)
+        
+        La exposición total es bruta; el VaR y la correlación usan la neta por
+        símbolo, de modo que un short compensa un long correlacionado.
         """
         
         if not positions:
@@ -327,8 +444,8 @@ class RiskCalculator:
             
             total_risk += risk
             total_exposure += position_value
-            risk_by_symbol[symbol] = risk
-            exposure_by_symbol[symbol] = position_value
+            risk_by_symbol[symbol] = risk_by_symbol.get(symbol, 0) + risk
+            exposure_by_symbol[symbol] = exposure_by_symbol.get(symbol, 0) + self._position_exposure(pos)
         
         # Calcular porcentajes
         risk_pct = (total_risk / capital) * 100 if capital > 0 else 0
@@ -341,8 +458,15 @@ class RiskCalculator:
         if exposure_pct > 80:
             warnings.append(f"⚠️ Exposición alta: {exposure_pct:.2f}%")
         
-        # Calcular riesgo de correlación
-        correlation_risk = symbol_manager.calculate_portfolio_correlation_risk(exposure_by_symbol)
+        # Calcular riesgo de correlación (covarianza de retornos; tabla fija si no hay historia)
+        engine_risk = self.risk_engine.portfolio_risk(exposure_by_symbol)
+        if engine_risk:
+            correlation_risk = engine_risk['correlation_risk']
+            warnings.extend(self._correlation_warnings(engine_risk, capital))
+        else:
+            # La tabla fija sólo mide concentración: exposición bruta por símbolo
+            correlation_risk = symbol_manager.calculate_portfolio_correlation_risk(
+                {symbol: abs(exposure) for symbol, exposure in exposure_by_symbol.items()})
         
         if correlation_risk > 0.5:
             warnings.append(f"⚠️ Alto riesgo de correlación: {correlation_risk:.2f}")
@@ -358,7 +482,7 @@ class RiskCalculator:
         if max_concentration > 40:
             warnings.append(f"⚠️ Concentración de riesgo: {max_concentration:.1f}% en una posición")
         
-        return {
+        result = {
             'total_risk': total_risk,
             'total_risk_pct': risk_pct,
             'total_exposure': total_exposure,
@@ -370,19 +494,61 @@ class RiskCalculator:
             'warnings': warnings,
             'risk_score': min(risk_pct / 10 + correlation_risk * 5 + max_concentration / 100, 10)  # Score 0-10
         }
+        
+        if engine_risk:
+            result.update({
+                'var': engine_risk['var'],
+                'cvar': engine_risk['cvar'],
+                'var_pct': engine_risk['var'] / capital * 100 if capital > 0 else 0,
+                'marginal_risk': engine_risk['marginal_risk'],
+                'risk_contribution_pct': engine_risk['risk_contribution_pct'],
+                'correlation_clusters': engine_risk['correlation_clusters']
+            })
+        
+        return result
     
     def suggest_position_adjustments(
         self,
         current_positions: List[Dict],
         capital: float,
-        target_risk: float = 0.06
+        target_risk: float = 0.06,
+        var_method: str = 'parametric'
     ) -> Dict:
         """
         Sugiere ajustes para optimizar el portfolio
+        
+        Con var_method 'monte_carlo' se calcula el VaR/ES de la cartera y la
+        contribución de cada posición (VaR sin ella), todo sobre los mismos
+        escenarios simulados.
         """
         
         current_risk = self.calculate_portfolio_risk(current_positions, capital)
         suggestions = []
+        monte_carlo = None
+        
+        if var_method == 'monte_carlo' and current_positions:
+            book = {}
+            for pos in current_positions:
+                book[pos['symbol']] = book.get(pos['symbol'], 0) + self._position_exposure(pos)
+            without = [{s: v for s, v in book.items() if s != symbol} for symbol in book]
+            results = self._monte_carlo_batch([book] + without)
+            
+            if results[0]:
+                total = results[0]
+                contributions = {
+                    symbol: total['var'] - (result['var'] if result else 0)
+                    for symbol, result in zip(book, results[1:])
+                }
+                monte_carlo = dict(total,
+                                   var_pct=total['var'] / capital * 100 if capital > 0 else 0,
+                                   var_contribution=contributions)
+                
+                if monte_carlo['var_pct'] > target_risk * 100:
+                    largest = max(contributions, key=contributions.get)
+                    suggestions.append(
+                        f"VaR Monte Carlo {monte_carlo['var_pct']:.1f}% > objetivo {target_risk*100}%: "
+                        f"reducir {largest} (aporta ${contributions[largest]:.2f} al VaR)"
+                    )
         
         # Si el riesgo es muy alto
         if current_risk['total_risk_pct'] > target_risk * 100:
@@ -418,11 +584,15 @@ class RiskCalculator:
                 f"Riesgo bajo ({current_risk['total_risk_pct']:.1f}%), considerar aumentar posiciones"
             )
         
-        return {
+        result = {
             'current_risk_score': current_risk['risk_score'],
             'suggestions': suggestions,
             'optimal_adjustments': self._calculate_optimal_adjustments(current_positions, capital, target_risk)
         }
+        if monte_carlo:
+            result['monte_carlo'] = monte_carlo
+        
+        return result
     
     def _calculate_optimal_adjustments(
         self,
@@ -10,8 +10,101 @@ import yfinance as yf
 from datetime import datetime, timedelta
 import json
 import warnings
+from backtest_kernel import (MarketArrays, KernelStrategy, ExitRules, run_kernel,
+                             cross_above, cross_below, shift,
+                             EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_REVERSAL)
 warnings.filterwarnings('ignore')
 
+EXCLUDED_REGIMES = ('TIGHT_RANGE', 'VOLATILE_RANGE', 'TRANSITIONING')
+
+KERNEL_EXIT_REASONS = {
+    EXIT_STOP_LOSS: 'STOP_LOSS',
+    EXIT_TAKE_PROFIT: 'TAKE_PROFIT',
+    EXIT_REVERSAL: 'REVERSAL_SIGNAL',
+}
+
+
+class RobustV2KernelStrategy(KernelStrategy):
+    """
+    Reglas de check_entry_conditions / check_exit_conditions vectorizadas
+    para el kernel compartido
+    """
+    
+    def __init__(self, params, regimes):
+        self.params = params
+        self.regimes = np.array([r or 'NEUTRAL' for r in regimes], dtype=object)
+    
+    def confirmations(self, m):
+        close, rsi = m['Close'], m['RSI']
+        prev_close, prev_rsi = shift(close), shift(rsi)
+        ema20, prev_ema20 = m['EMA_20'], shift(m['EMA_20'])
+        volume_surge = m['Volume_Ratio'] > self.params['volume_threshold']
+        higher_high = m['Higher_High'] > 0
+        lower_low = m['Lower_Low'] > 0
+        
+        long_conf = (
+            ((prev_rsi < 30) & (rsi > prev_rsi)).astype(np.int64)
+            + cross_above(m['MACD'], m['MACD_Signal'])
+            + ((close > ema20) & (prev_close <= prev_ema20))
+            + volume_surge
+            + ((shift(m['Low']) <= shift(m['BB_Lower'])) & (close > m['BB_Lower']))
+            + (higher_high & ~lower_low)
+        )
+        short_conf = (
+            ((prev_rsi > 70) & (rsi < prev_rsi)).astype(np.int64)
+            + cross_below(m['MACD'], m['MACD_Signal'])
+            + ((close < ema20) & (prev_close >= prev_ema20))
+            + volume_surge
+            + ((shift(m['High']) >= shift(m['BB_Upper'])) & (close < m['BB_Upper']))
+            + (lower_low & ~higher_high)
+        )
+        return long_conf, short_conf
+    
+    def entry_direction(self, m):
+        close, atr_pct = m['Close'], m['ATR_Percent']
+        regimes = self.regimes
+        long_conf, short_conf = self.confirmations(m)
+        
+        tradable = ~np.isin(regimes, EXCLUDED_REGIMES)
+        tradable &= ~(atr_pct < self.params['min_atr_threshold'])
+        tradable &= ~(atr_pct > self.params['max_atr_threshold'])
+        
+        strong = np.array(['STRONG' in r for r in regimes], dtype=bool)
+        min_conf = np.where(strong, max(2, self.params['min_confirmations'] - 1),
+                            self.params['min_confirmations'])
+        neutral = regimes == 'NEUTRAL'
+        uptrend = np.array(['UPTREND' in r for r in regimes], dtype=bool)
+        downtrend = np.array(['DOWNTREND' in r for r in regimes], dtype=bool)
+        
+        long_ok = (long_conf >= min_conf) & (long_conf > short_conf)
+        short_ok = ~long_ok & (short_conf >= min_conf) & (short_conf > long_conf)
+        go_long = long_ok & (uptrend | (neutral & (close > m['EMA_50'])))
+        go_short = short_ok & (downtrend | (neutral & (close < m['EMA_50'])))
+        
+        # Confianza mínima (confirmaciones / 6 > 0.3)
+        go_long &= long_conf / 6.0 > 0.3
+        go_short &= short_conf / 6.0 > 0.3
+        
+        direction = np.zeros(len(m), dtype=np.int8)
+        direction[go_long & tradable] = 1
+        direction[go_short & tradable] = -1
+        return direction
+    
+    def exit_masks(self, m):
+        rsi, macd, signal = m['RSI'], m['MACD'], m['MACD_Signal']
+        return (rsi > 75) & (macd < signal), (rsi < 25) & (macd > signal)
+    
+    def exit_rules(self):
+        return ExitRules(
+            atr_stop_multiplier=self.params['atr_multiplier_sl'],
+            atr_target_multiplier=self.params['atr_multiplier_tp'],
+            risk_per_trade=self.params['risk_per_trade'],
+            max_position_fraction=0.2,
+            min_days_between_entries=self.params['min_days_between_trades'],
+            atr_trailing=True
+        )
+
+
 class RobustTradingSystemV2:
     """
     Sistema simplificado y robusto con validación cruzada
@@ -85,6 +178,13 @@ class RobustTradingSystemV2:
         """
         Calcula el ADX (Average Directional Index)
         """
+        adx = self.adx_series(df, period)
+        return adx.iloc[-1] if not adx.empty else 0
+    
+    def adx_series(self, df, period=14):
+        """
+        ADX de cada vela (causal: el valor en i sólo usa velas hasta i)
+        """
         high = df['High']
         low = df['Low']
         close = df['Close']
@@ -111,9 +211,7 @@ class RobustTradingSystemV2:
         
         # Calculate DX and ADX
         dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di)
-        adx = dx.rolling(period).mean()
-        
-        return adx.iloc[-1] if not adx.empty else 0
+        return dx.rolling(period).mean()
     
     def prepare_indicators(self, df):
         """
@@ -165,7 +263,40 @@ class RobustTradingSystemV2:
         
         return df
     
-    def check_entry_conditions(self, df, current_idx):
+    def precompute_regimes(self, df):
+        """
+        Régimen de mercado de cada vela (sólo depende de los datos, no de
+        los parámetros), para no recalcularlo en cada backtest
+        
+        Equivale a detect_market_regime(df.iloc[:i+1]) para cada i, pero en
+        O(n): EMAs, ADX y volatilidad se calculan una vez sobre toda la serie.
+        """
+        close = df['Close']
+        ema_20 = close.ewm(span=20).mean().to_numpy()
+        ema_50 = close.ewm(span=50).mean().to_numpy()
+        volatility = (close.pct_change().expanding().std() * np.sqrt(252)).to_numpy()
+        adx = self.adx_series(df).to_numpy()
+        price = close.to_numpy()
+        
+        strong = adx > 25
+        weak = ~strong & (adx > 15)
+        regimes = np.select(
+            [
+                strong & (price > ema_20) & (ema_20 > ema_50),
+                strong & (price < ema_20) & (ema_20 < ema_50),
+                strong,
+                weak & (price > ema_50),
+                weak,
+                volatility > 0.3,
+            ],
+            ['STRONG_UPTREND', 'STRONG_DOWNTREND', 'TRANSITIONING',
+             'WEAK_UPTREND', 'WEAK_DOWNTREND', 'VOLATILE_RANGE'],
+            default='TIGHT_RANGE'
+        ).tolist()
+        
+        return [regime if i >= 50 else None for i, regime in enumerate(regimes)]
+    
+    def check_entry_conditions(self, df, current_idx, market_regime=None):
         """
         Verifica condiciones de entrada con múltiples confirmaciones
         """
@@ -176,7 +307,8 @@ class RobustTradingSystemV2:
         prev = df.iloc[current_idx - 1]
         
         # Detectar régimen de mercado
-        market_regime = self.detect_market_regime(df.iloc[:current_idx+1])
+        if market_regime is None:
+            market_regime = self.detect_market_regime(df.iloc[:current_idx+1])
         
         # No operar en mercados desfavorables
         if market_regime in ['TIGHT_RANGE', 'VOLATILE_RANGE', 'TRANSITIONING']:
@@ -364,13 +496,19 @@ class RobustTradingSystemV2:
         
         return exit_signal, exit_price, exit_reason
     
-    def backtest(self, symbol, start_date, end_date):
+    def load_data(self, symbol, start_date, end_date):
+        """
+        Descarga velas diarias de Yahoo Finance
+        """
+        ticker = yf.Ticker(symbol)
+        return ticker.history(start=start_date, end=end_date, interval='1d')
+    
+    def backtest(self, symbol, start_date, end_date, vectorized=True):
         """
         Ejecuta backtest para un símbolo y período
         """
         # Obtener datos
-        ticker = yf.Ticker(symbol)
-        df = ticker.history(start=start_date, end=end_date, interval='1d')
+        df = self.load_data(symbol, start_date, end_date)
         
         if len(df) < 50:
             return []
@@ -378,6 +516,67 @@ class RobustTradingSystemV2:
         # Preparar indicadores
         df = self.prepare_indicators(df)
         
+        return self.run_backtest(df, symbol, vectorized=vectorized)
+    
+    def run_backtest(self, df, symbol, regimes=None, vectorized=True):
+        """
+        Ejecuta el backtest sobre velas con indicadores ya preparados
+        
+        Args:
+            df: DataFrame devuelto por prepare_indicators (no se modifica)
+            symbol: Símbolo (para etiquetar los trades)
+            regimes: Opcional, salida de precompute_regimes(df)
+            vectorized: True usa el kernel compartido; False el motor por
+                        vela original (referencia para tests de paridad)
+        """
+        if vectorized:
+            return self._run_backtest_kernel(df, symbol, regimes)
+        return self._run_backtest_per_bar(df, symbol, regimes)
+    
+    def _run_backtest_kernel(self, df, symbol, regimes=None):
+        """Backtest sobre arrays con el kernel compartido"""
+        if regimes is None:
+            regimes = self.precompute_regimes(df)
+        
+        strategy = RobustV2KernelStrategy(self.base_params, regimes)
+        m = MarketArrays.from_dataframe(df)
+        last_entry = self.last_trade_date.value if self.last_trade_date is not None else None
+        result = run_kernel(m, strategy, self.initial_capital, last_entry)
+        long_conf, short_conf = strategy.confirmations(m)
+        
+        self.trades = []
+        for k in range(len(result)):
+            i, j = result.entry_idx[k], result.exit_idx[k]
+            is_long = result.direction[k] > 0
+            entry_price, exit_price = result.entry_price[k], result.exit_price[k]
+            entry_date, exit_date = df.index[i], df.index[j]
+            self.trades.append({
+                'symbol': symbol,
+                'type': 'LONG' if is_long else 'SHORT',
+                'entry_date': entry_date,
+                'entry_price': entry_price,
+                'stop_loss': result.stop_loss[k],
+                'take_profit': result.take_profit[k],
+                'shares': result.shares[k],
+                'confidence': (long_conf[i] if is_long else short_conf[i]) / 6.0,
+                'entry_atr': m['ATR'][i],
+                'market_regime': regimes[i],
+                'exit_date': exit_date,
+                'exit_price': exit_price,
+                'exit_reason': KERNEL_EXIT_REASONS.get(result.exit_reason[k], 'END_PERIOD'),
+                'pnl': result.pnl[k],
+                'return_pct': ((exit_price / entry_price) - 1) * 100 if is_long
+                              else ((entry_price / exit_price) - 1) * 100,
+                'duration_days': (exit_date - entry_date).days
+            })
+        
+        self.current_capital = result.final_capital
+        if len(result):
+            self.last_trade_date = df.index[result.entry_idx[-1]]
+        return self.trades
+    
+    def _run_backtest_per_bar(self, df, symbol, regimes=None):
+        """Motor original vela a vela con df.iloc"""
         # Reset estado
         self.trades = []
         self.current_capital = self.initial_capital
@@ -396,7 +595,9 @@ class RobustTradingSystemV2:
                         continue
                 
                 # Verificar condiciones de entrada
-                signal_type, confidence = self.check_entry_conditions(df, i)
+                signal_type, confidence = self.check_entry_conditions(
+                    df, i, regimes[i] if regimes is not None else None
+                )
                 
                 if signal_type and confidence > 0.3:  # Requiere confianza mínima (reducida)
                     # Calcular stops
@@ -422,7 +623,7 @@ class RobustTradingSystemV2:
                             'shares': shares,
                             'confidence': confidence,
                             'entry_atr': atr,
-                            'market_regime': self.detect_market_regime(df.iloc[:i+1])
+                            'market_regime': regimes[i] if regimes is not None else self.detect_market_regime(df.iloc[:i+1])
                         }
                         
                         self.last_trade_date = current.name
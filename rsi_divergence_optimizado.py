@@ -7,6 +7,8 @@ La única confirmación que mejora el sistema - optimización específica
 import pandas as pd
 import numpy as np
 
+from pivot_index import get_pivot_view
+
 class RSIDivergenceOptimizado:
     """
     Sistema de divergencias RSI optimizado para máxima efectividad
@@ -238,59 +240,109 @@ class RSIDivergenceOptimizado:
         
         return final_score, details
     
+    def get_rsi_divergence_scores(self, df, signal_type):
+        """
+        Score de divergencia de todas las velas de df en una pasada
+
+        out[i] es igual a get_rsi_divergence_score(df.iloc[:i+1], df.iloc[i],
+        signal_type)[0]. Los pivotes de la ventana de cada vela son los
+        pivotes de la serie completa con sus vecinos dentro de la ventana, así
+        que basta con una máscara de pivotes y un searchsorted por vela.
+        """
+        n = len(df)
+        lookback = self.config['lookback_periods']
+        order = self.config['min_peak_distance']
+        scores = np.full(n, 0.5)
+        if n < lookback:
+            return scores
+
+        bullish = signal_type == 'LONG'
+        column = 'Low' if bullish else 'High'
+        view = get_pivot_view(df)
+        pivots = view.pivots('low' if bullish else 'high', order)
+        prices = view.values(column)[pivots]
+        rsi_values = df['RSI'].to_numpy(dtype=np.float64)
+        pivot_rsi = rsi_values[pivots]
+
+        # Fortaleza del par (pivote m-1, pivote m), 0 si no es divergencia significativa
+        strength = np.zeros(len(pivots))
+        valid = np.zeros(len(pivots), dtype=bool)
+        if len(pivots) > 1:
+            prev_price, curr_price = prices[:-1], prices[1:]
+            prev_rsi, curr_rsi = pivot_rsi[:-1], pivot_rsi[1:]
+            if bullish:
+                divergence = (curr_price < prev_price) & (curr_rsi > prev_rsi)
+            else:
+                divergence = (curr_price > prev_price) & (curr_rsi < prev_rsi)
+            price_diff_pct = np.abs(curr_price - prev_price) / prev_price
+            rsi_diff = np.abs(curr_rsi - prev_rsi)
+            significant = (divergence & (price_diff_pct >= self.config['price_movement_min'])
+                           & (rsi_diff >= self.config['rsi_movement_min']))
+            valid[1:] = significant
+            strength[1:] = np.where(significant,
+                                    np.minimum((price_diff_pct * 50) + (rsi_diff / 20), 1.0), 0.0)
+
+        # Pivotes de la ventana de cada vela: posiciones [i-lookback+1+order, i-order]
+        rows = np.arange(lookback - 1, n)
+        lo = np.searchsorted(pivots, rows - lookback + 1 + order, side='left')
+        hi = np.searchsorted(pivots, rows - order, side='right')
+        count = hi - lo
+        enough = count >= 2
+
+        # Pares de los últimos 2-3 pivotes, sumados en el mismo orden que el bucle
+        last = np.where(enough, hi - 1, 0)
+        middle = np.where(count >= 3, hi - 2, 0)
+        has_middle = count >= 3
+        divergence_strength = 0.0 + np.where(has_middle, strength[middle], 0.0) + strength[last]
+        divergences = np.where(has_middle, valid[middle], False).astype(int) + valid[last]
+
+        score = np.zeros(len(rows))
+        found = enough & (divergences > 0)
+        avg_strength = divergence_strength / np.maximum(divergences, 1)
+        score += np.where(divergences >= 2, 0.6, 0.4)
+        score += avg_strength * 0.3
+
+        current_rsi = rsi_values[rows]
+        if bullish:
+            zone = current_rsi <= self.config['bullish_rsi_threshold']
+            score += np.select([zone & (current_rsi <= 25), zone & (current_rsi <= 30), zone],
+                               [0.3, 0.2, 0.1], 0.0)
+        else:
+            zone = current_rsi >= self.config['bearish_rsi_threshold']
+            score += np.select([zone & (current_rsi >= 75), zone & (current_rsi >= 70), zone],
+                               [0.3, 0.2, 0.1], 0.0)
+
+        recency = (lookback - (pivots[last] - (rows - lookback + 1))) / lookback
+        score += np.select([recency <= 0.2, recency <= 0.4], [0.2, 0.1], 0.0)
+
+        scores[lookback - 1:] = np.where(found, np.minimum(score, 1.0), np.where(enough, 0.0, 0.3))
+        return scores
+
     def _find_price_troughs(self, df):
-        """Encuentra mínimos significativos en precio"""
-        
-        troughs = []
-        min_distance = self.config['min_peak_distance']
-        
-        for i in range(min_distance, len(df) - min_distance):
-            current_low = df.iloc[i]['Low']
-            current_rsi = df.iloc[i]['RSI']
-            
-            # Verificar si es un mínimo local
-            is_trough = True
-            for j in range(i - min_distance, i + min_distance + 1):
-                if j != i and df.iloc[j]['Low'] <= current_low:
-                    is_trough = False
-                    break
-            
-            if is_trough:
-                troughs.append({
-                    'index': i,
-                    'price': current_low,
-                    'rsi': current_rsi,
-                    'timestamp': df.index[i] if hasattr(df.index[i], 'strftime') else i
-                })
-        
-        return troughs
+        """Encuentra mínimos significativos en precio (pivotes del índice compartido)"""
+        return self._price_pivots(df, 'low', 'Low')
     
     def _find_price_peaks(self, df):
-        """Encuentra máximos significativos en precio"""
-        
-        peaks = []
-        min_distance = self.config['min_peak_distance']
-        
-        for i in range(min_distance, len(df) - min_distance):
-            current_high = df.iloc[i]['High']
-            current_rsi = df.iloc[i]['RSI']
-            
-            # Verificar si es un máximo local
-            is_peak = True
-            for j in range(i - min_distance, i + min_distance + 1):
-                if j != i and df.iloc[j]['High'] >= current_high:
-                    is_peak = False
-                    break
-            
-            if is_peak:
-                peaks.append({
-                    'index': i,
-                    'price': current_high,
-                    'rsi': current_rsi,
-                    'timestamp': df.index[i] if hasattr(df.index[i], 'strftime') else i
-                })
-        
-        return peaks
+        """Encuentra máximos significativos en precio (pivotes del índice compartido)"""
+        return self._price_pivots(df, 'high', 'High')
+    
+    def _price_pivots(self, df, kind, column):
+        """Pivotes estrictos: el extremo supera a min_peak_distance velas por cada lado"""
+        view = get_pivot_view(df)
+        prices = view.values(column)
+        rsi = df['RSI'].to_numpy()
+        
+        pivots = []
+        for i in view.pivots(kind, self.config['min_peak_distance']):
+            i = int(i)
+            pivots.append({
+                'index': i,
+                'price': prices[i],
+                'rsi': rsi[i],
+                'timestamp': df.index[i] if hasattr(df.index[i], 'strftime') else i
+            })
+        
+        return pivots
     
     def validate_divergence_signal(self, score, details):
         """Valida si la señal de divergencia es suficientemente fuerte"""
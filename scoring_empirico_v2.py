@@ -7,6 +7,8 @@ Basado en análisis de componentes efectivos
 import pandas as pd
 import numpy as np
 
+from rsi_divergence_optimizado import RSIDivergenceOptimizado
+
 class ScoringEmpiricoV2:
     """
     Nuevo sistema de scoring basado en evidencia empírica
@@ -43,7 +45,10 @@ class ScoringEmpiricoV2:
         if self.config['liquidity_enabled']:
             from liquidez_validator import LiquidezValidator
             self.liquidity_validator = LiquidezValidator()
-    
+
+        # Detector de divergencias compartido (antes se creaba en cada llamada)
+        self.rsi_divergence = RSIDivergenceOptimizado()
+
     def calculate_empirical_score_long(self, df, current, prev=None):
         """Calcula score empírico para señales LONG"""
         
@@ -76,10 +81,7 @@ class ScoringEmpiricoV2:
         details['risk_component'] = risk_score * self.config['risk_structure_weight'] * 10
         
         # 5. RSI DIVERGENCE OPTIMIZADO (20% del score total - NUEVO)
-        from rsi_divergence_optimizado import RSIDivergenceOptimizado
-        rsi_div_system = RSIDivergenceOptimizado()
-        
-        divergence_score, divergence_details = rsi_div_system.get_rsi_divergence_score(df, current, 'LONG')
+        divergence_score, divergence_details = self.rsi_divergence.get_rsi_divergence_score(df, current, 'LONG')
         score += divergence_score * 2.0  # 2.0 para que sea 20% del score total
         details['rsi_divergence_component'] = divergence_score * 2.0
         details['rsi_divergence_details'] = divergence_details
@@ -127,10 +129,7 @@ class ScoringEmpiricoV2:
         details['risk_component'] = risk_score * self.config['risk_structure_weight'] * 10
         
         # 5. RSI DIVERGENCE OPTIMIZADO para SHORT (20% del score total)
-        from rsi_divergence_optimizado import RSIDivergenceOptimizado
-        rsi_div_system = RSIDivergenceOptimizado()
-        
-        divergence_score, divergence_details = rsi_div_system.get_rsi_divergence_score(df, current, 'SHORT')
+        divergence_score, divergence_details = self.rsi_divergence.get_rsi_divergence_score(df, current, 'SHORT')
         score += divergence_score * 2.0  # 2.0 para que sea 20% del score total
         details['rsi_divergence_component'] = divergence_score * 2.0
         details['rsi_divergence_details'] = divergence_details
@@ -142,9 +141,110 @@ class ScoringEmpiricoV2:
         
         final_score = max(0, min(score, self.config['max_score']))
         details['final_score'] = final_score
-        
+
         return final_score, details
-    
+
+    def calculate_empirical_scores(self, df, signal_type='LONG'):
+        """
+        Score empírico de todas las velas de df en una pasada vectorizada
+
+        La fila i coincide con calculate_empirical_score_long/_short(
+        df.iloc[:i+1], df.iloc[i]) (prev = vela anterior): mismas
+        condiciones y mismas operaciones en el mismo orden. Los indicadores
+        deben ser causales, como los de calculate_indicators.
+
+        Returns:
+            DataFrame con el índice de df y una columna por componente
+            numérico de los detalles más final_score
+        """
+        long = signal_type == 'LONG'
+        close = df['Close'].to_numpy(dtype=np.float64)
+        open_ = df['Open'].to_numpy(dtype=np.float64)
+        high = df['High'].to_numpy(dtype=np.float64)
+        low = df['Low'].to_numpy(dtype=np.float64)
+        rsi = df['RSI'].to_numpy(dtype=np.float64)
+        volume_ratio = df['Volume_Ratio'].to_numpy(dtype=np.float64)
+        prev_close = np.concatenate([close[:1], close[:-1]])
+
+        # 1. RSI
+        if long:
+            rsi_score = np.select([rsi <= 20, rsi <= 30, rsi <= 40, rsi <= 50, rsi <= 60],
+                                  [1.0, 0.9, 0.7, 0.4, 0.2], 0.0)
+        else:
+            rsi_score = np.select([rsi >= 80, rsi >= 70, rsi >= 60, rsi >= 50, rsi >= 40],
+                                  [1.0, 0.9, 0.7, 0.4, 0.2], 0.0)
+
+        # 2. Acción del precio
+        up, down = (np.greater, np.less) if long else (np.less, np.greater)
+        price_action = np.zeros(len(df))
+        price_action += np.where(up(close, prev_close), 0.3, 0.0)
+
+        recent_high = df['High'].rolling(20).max().to_numpy()
+        recent_low = df['Low'].rolling(20).min().to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            position_in_range = (close - recent_low) / (recent_high - recent_low)
+            body_ratio = np.abs(close - open_) / (high - low)
+        in_range = recent_high > recent_low
+        if long:
+            price_action += np.select([in_range & (position_in_range < 0.3),
+                                       in_range & (position_in_range < 0.5)], [0.4, 0.2], 0.0)
+        else:
+            price_action += np.select([in_range & (position_in_range > 0.7),
+                                       in_range & (position_in_range > 0.5)], [0.4, 0.2], 0.0)
+
+        with_direction = (high - low > 0) & up(close, open_)
+        price_action += np.select([with_direction & (body_ratio > 0.6), with_direction], [0.3, 0.15], 0.0)
+        price_action = np.minimum(price_action, 1.0)
+
+        # 3. Momentum (close[i-3] y consistencia de las 3 últimas velas)
+        close_3 = df['Close'].shift(3).to_numpy()
+        close_1 = df['Close'].shift(1).to_numpy()
+        close_2 = df['Close'].shift(2).to_numpy()
+        price_momentum = (close - close_3) / close_3 if long else (close_3 - close) / close_3
+        momentum = np.zeros(len(df))
+        momentum += np.select([price_momentum > 0.02, price_momentum > 0], [0.4, 0.2], 0.0)
+        momentum += np.where(volume_ratio <= 2.0, 0.3, 0.0)
+        momentum += np.select([up(close_1, close_2) & up(close, close_1), up(close, close_2)], [0.3, 0.15], 0.0)
+        momentum = np.minimum(momentum, 1.0)
+
+        # 4. Estructura de riesgo (ATR opcional, como el try/except por fila)
+        risk = np.zeros(len(df))
+        if 'ATR' in df.columns:
+            atr_pct = df['ATR'].to_numpy(dtype=np.float64) / close
+            risk += np.select([(0.015 <= atr_pct) & (atr_pct <= 0.04), (0.01 <= atr_pct) & (atr_pct <= 0.06),
+                               atr_pct > 0.08], [0.6, 0.3, -0.2], 0.0)
+        daily_range = (high - low) / close
+        risk += np.where((0.01 <= daily_range) & (daily_range <= 0.05), 0.4, 0.0)
+        risk = np.maximum(0, np.minimum(risk, 1.0))
+
+        # 5. Divergencia RSI
+        divergence = self.rsi_divergence.get_rsi_divergence_scores(df, signal_type)
+
+        # 6. Penalizaciones
+        penalties = np.zeros(len(df))
+        if self.config['volume_penalty']:
+            penalties -= np.select([volume_ratio >= 4.0, volume_ratio >= 3.0], [1.0, 0.5], 0.0)
+        if self.config['macd_penalty'] and {'MACD', 'MACD_Signal'} <= set(df.columns):
+            macd = df['MACD'].to_numpy(dtype=np.float64)
+            macd_signal = df['MACD_Signal'].to_numpy(dtype=np.float64)
+            against = macd > macd_signal * 1.5 if long else macd < macd_signal * 1.5
+            penalties -= np.where(against, 0.3, 0.0)
+
+        components = {
+            'rsi_component': rsi_score * self.config['rsi_weight'] * 10,
+            'price_action_component': price_action * self.config['price_action_weight'] * 10,
+            'momentum_component': momentum * self.config['momentum_weight'] * 10,
+            'risk_component': risk * self.config['risk_structure_weight'] * 10,
+            'rsi_divergence_component': divergence * 2.0,
+            'penalties': penalties,
+        }
+        score = np.zeros(len(df))
+        for values in components.values():
+            score += values
+        components['final_score'] = np.maximum(0, np.minimum(score, self.config['max_score']))
+
+        return pd.DataFrame(components, index=df.index)
+
     def _calculate_rsi_score_long(self, rsi):
         """RSI score para LONG (basado en datos empíricos)"""
         
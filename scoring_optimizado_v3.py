@@ -88,7 +88,7 @@ class ScoringOptimizadoV3:
         if self.config['liquidity_enabled']:
             liquidity_score, liquidity_details = self.liquidity_validator.analyze_liquidity_coherence(
                 df, 'LONG', current['Close']
-            )
+            ) or (None, None)
             if liquidity_score:
                 score += liquidity_score * self.config['liquidity_weight'] * 10
                 details['liquidity_component'] = liquidity_score * self.config['liquidity_weight'] * 10
@@ -149,7 +149,7 @@ class ScoringOptimizadoV3:
         if self.config['liquidity_enabled']:
             liquidity_score, liquidity_details = self.liquidity_validator.analyze_liquidity_coherence(
                 df, 'SHORT', current['Close']
-            )
+            ) or (None, None)
             if liquidity_score:
                 score += liquidity_score * self.config['liquidity_weight'] * 10
                 details['liquidity_component'] = liquidity_score * self.config['liquidity_weight'] * 10
@@ -171,9 +171,143 @@ class ScoringOptimizadoV3:
         
         final_score = max(0, min(score, self.config['max_score']))
         details['final_score'] = final_score
-        
+
         return final_score, details
-    
+
+    def calculate_optimized_scores(self, df, signal_type='LONG'):
+        """
+        Score optimizado de todas las velas de df en una pasada vectorizada
+
+        La fila i coincide con calculate_optimized_score_long/_short(
+        df.iloc[:i+1], df.iloc[i]) (prev = vela anterior). La liquidez se
+        toma del batch del validador con la entrada al cierre de cada vela.
+
+        Returns:
+            DataFrame con el índice de df y una columna por componente
+            numérico de los detalles más final_score
+        """
+        long = signal_type == 'LONG'
+        n = len(df)
+        position = np.arange(n)
+        close = df['Close'].to_numpy(dtype=np.float64)
+        open_ = df['Open'].to_numpy(dtype=np.float64)
+        rsi = df['RSI'].to_numpy(dtype=np.float64)
+        volume_ratio = df['Volume_Ratio'].to_numpy(dtype=np.float64)
+        up = np.greater if long else np.less
+
+        def lag(periods):
+            return df['Close'].shift(periods).to_numpy()
+
+        # 1. RSI potenciado
+        if long:
+            rsi_score = np.select([rsi <= 18, rsi <= 25, rsi <= 32, rsi <= 38, rsi <= 45, rsi <= 55],
+                                  [1.0, 0.95, 0.85, 0.65, 0.45, 0.25], 0.0)
+        else:
+            rsi_score = np.select([rsi >= 82, rsi >= 75, rsi >= 68, rsi >= 62, rsi >= 55, rsi >= 45],
+                                  [1.0, 0.95, 0.85, 0.65, 0.45, 0.25], 0.0)
+
+        # 2. Price action refinado
+        price_action = np.zeros(n)
+        body_strength = (close - open_) / open_ if long else (open_ - close) / open_
+        price_action += np.where(up(close, open_),
+                                 np.select([body_strength >= 0.02, body_strength >= 0.01], [0.4, 0.25], 0.1),
+                                 0.0)
+        close_1, close_2 = lag(1), lag(2)
+        price_action += np.select([up(close, close_1) & up(close_1, close_2), up(close, close_2)], [0.3, 0.15], 0.0)
+
+        recent_high = df['High'].rolling(14).max().to_numpy()
+        recent_low = df['Low'].rolling(14).min().to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            range_position = (close - recent_low) / (recent_high - recent_low)
+        in_range = (position >= 13) & (recent_high > recent_low)
+        if long:
+            price_action += np.select([in_range & (range_position <= 0.25), in_range & (range_position <= 0.4)],
+                                      [0.3, 0.15], 0.0)
+        else:
+            price_action += np.select([in_range & (range_position >= 0.75), in_range & (range_position >= 0.6)],
+                                      [0.3, 0.15], 0.0)
+        price_action = np.minimum(price_action, 1.0)
+
+        # 3. Momentum optimizado
+        close_4, close_6 = lag(4), lag(6)
+        if long:
+            price_change = (close - close_4) / close_4
+            momentum_recent = (close - close_2) / close_2
+            momentum_older = (close_2 - close_6) / close_6
+        else:
+            price_change = (close_4 - close) / close_4
+            momentum_recent = (close_2 - close) / close_2
+            momentum_older = (close_6 - close_2) / close_6
+        momentum = np.zeros(n)
+        momentum += np.select([price_change >= 0.03, price_change >= 0.015, price_change >= 0.005],
+                              [0.6, 0.4, 0.2], 0.0)
+        accelerating = position >= 6
+        momentum += np.select([accelerating & (momentum_recent > momentum_older) & (momentum_recent > 0),
+                               accelerating & (momentum_recent > 0)], [0.4, 0.2], 0.0)
+        momentum = np.minimum(momentum, 1.0)
+
+        # 4. Risk structure básico (0.3 sin ATR, como el except por fila)
+        if 'ATR' in df.columns:
+            atr_pct = df['ATR'].to_numpy(dtype=np.float64) / close
+            risk = 0.0 + np.select([(0.01 <= atr_pct) & (atr_pct <= 0.04), (0.005 <= atr_pct) & (atr_pct <= 0.06)],
+                                   [1.0, 0.5], 0.0)
+        else:
+            risk = np.full(n, 0.3)
+
+        components = {
+            'rsi_component': rsi_score * self.config['rsi_weight'] * 10,
+            'price_action_component': price_action * self.config['price_action_weight'] * 10,
+            'momentum_component': momentum * self.config['momentum_weight'] * 10,
+            'risk_component': risk * self.config['risk_structure_weight'] * 10,
+        }
+
+        # 5. Liquidez (None o 0 por fila no suma)
+        if self.config['liquidity_enabled']:
+            liquidity = self.liquidity_validator.analyze_liquidity_coherence_batch(df, signal_type)
+            has_liquidity = (position >= 9) & (liquidity != 0)
+            components['liquidity_component'] = np.where(
+                has_liquidity, liquidity * self.config['liquidity_weight'] * 10, 0.0)
+
+        # 6. Confirmación multi-timeframe
+        if self.config['confirmation_enabled']:
+            confirmation = np.zeros(n)
+            sma_50 = df['Close'].rolling(50).mean().to_numpy()
+            trend_strength = (close - sma_50) / sma_50 if long else (sma_50 - close) / sma_50
+            trending = (position >= 49) & up(close, sma_50)
+            confirmation += np.select([trending & (trend_strength >= 0.05), trending & (trend_strength >= 0.02),
+                                       trending & (trend_strength > 0)], [0.4, 0.25, 0.1], 0.0)
+
+            checks = np.zeros(n, dtype=int)
+            hits = np.zeros(n, dtype=int)
+            for periods, threshold in ((3, 0.01), (8, 0.02), (21, 0.03)):
+                past = lag(periods)
+                change = (close - past) / past if long else (past - close) / past
+                available = position >= periods
+                checks += available
+                hits += available & (change > threshold)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                confirmation += np.where(checks > 0, hits / checks * 0.4, 0.0)
+
+            rsi_4 = df['RSI'].shift(4).to_numpy()
+            rsi_turn = (rsi > rsi_4) & (rsi < 70) if long else (rsi < rsi_4) & (rsi > 30)
+            confirmation += np.where((position >= 13) & rsi_turn, 0.2, 0.0)
+            confirmation = np.minimum(confirmation, 1.0)
+            components['confirmation_component'] = confirmation * self.config['confirmation_weight'] * 10
+
+        # 7. Penalizaciones
+        penalties = np.zeros(n)
+        if self.config['volume_penalty']:
+            limits = [5.0, 3.5, 2.5] if long else [6.0, 4.0, 3.0]
+            penalties -= np.select([volume_ratio >= limit for limit in limits], [1.5, 0.8, 0.3], 0.0)
+        components['penalties'] = penalties
+
+        score = np.zeros(n)
+        for values in components.values():
+            score += values
+        components['final_score'] = np.maximum(0, np.minimum(score, self.config['max_score']))
+
+        return pd.DataFrame(components, index=df.index)
+
     def _calculate_rsi_score_enhanced_long(self, rsi):
         """RSI score mejorado para LONG (más granular)"""
         
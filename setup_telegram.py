@@ -200,7 +200,7 @@ def send_test_signal():
         print("📤 Enviando señal de trading de prueba...")
         
         # Enviar la señal
-        results = manager.broadcast_signal(test_signal)
+        results = manager.broadcast_signal(test_signal, wait=True)
         
         if results.get('TelegramNotifier', False):
             print("✅ ¡Señal de trading enviada a Telegram!")
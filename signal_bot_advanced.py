@@ -78,7 +78,7 @@ class AdvancedTradingBot:
                 results['signal'] = signal
                 
                 # 2. Análisis de liquidez
-                liquidity_data = self.liquidity_detector.detect_liquidity_pools(df, current_price)
+                liquidity_data = self.liquidity_detector.detect_liquidity_pools(df, current_price, symbol=ticker)
                 results['liquidity'] = liquidity_data
                 
                 # 3. Análisis de riesgo basado en liquidez
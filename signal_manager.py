@@ -7,7 +7,6 @@ Proporciona múltiples canales de notificación para señales en tiempo real
 import json
 import os
 import time
-import requests
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import pandas as pd
@@ -18,6 +17,10 @@ from dataclasses import dataclass, asdict
 # from concurrent.futures import ThreadPoolExecutor
 
 # Importar módulos del sistema
+from notification_dispatcher import (
+    DISCORD_LIMITS, EMAIL_LIMITS, TELEGRAM_LIMITS, TELEGRAM_MAX_TEXT, WEBHOOK_LIMITS,
+    get_notification_dispatcher, make_session
+)
 from motor_trading import (
     obtener_datos,
     calcular_indicadores,
@@ -71,96 +74,138 @@ class TradingSignal:
         return message
 
 class NotificationChannel:
-    """Clase base para canales de notificación"""
+    """
+    Clase base para canales de notificación
+    
+    El despachador llama a render() al encolar (el mensaje queda fijado en
+    ese momento) y a deliver()/build_request() con 1..N items al enviar.
+    Un canal que sólo implemente send() sigue funcionando, sin agrupar.
+    """
+    
+    limits = WEBHOOK_LIMITS
+    
+    def render(self, signal: TradingSignal):
+        return signal
+    
+    def deliver(self, items: list) -> bool:
+        return all(self.send(item) for item in items)
     
     def send(self, signal: TradingSignal) -> bool:
         raise NotImplementedError
 
-class TelegramNotifier(NotificationChannel):
+class HttpNotificationChannel(NotificationChannel):
+    """Canal HTTP: sesión propia con pool de conexiones y timeout"""
+    
+    success_statuses = (200,)
+    
+    def __init__(self):
+        self.session = make_session()
+    
+    def build_request(self, items: list) -> dict:
+        raise NotImplementedError
+    
+    def send(self, signal: TradingSignal) -> bool:
+        """Envío síncrono directo (sin pasar por el despachador)"""
+        try:
+            response = self.session.post(timeout=10, **self.build_request([self.render(signal)]))
+            return response.status_code in self.success_statuses
+        except Exception as e:
+            print(f"Error enviando por {self.__class__.__name__}: {e}")
+            return False
+
+class TelegramNotifier(HttpNotificationChannel):
     """Envía señales por Telegram"""
     
+    limits = TELEGRAM_LIMITS
+    
     def __init__(self, bot_token: str, chat_id: str):
+        super().__init__()
         self.bot_token = bot_token
         self.chat_id = chat_id
         self.base_url = f"https://api.telegram.org/bot{bot_token}"
     
-    def send(self, signal: TradingSignal) -> bool:
-        """Envía señal por Telegram"""
-        try:
-            message = signal.format_message()
-            
-            # Agregar botones inline para copiar valores
-            keyboard = {
-                "inline_keyboard": [
-                    [
-                        {"text": "📋 Copiar Entry", "callback_data": f"copy_entry_{signal.price}"},
-                        {"text": "📋 Copiar SL", "callback_data": f"copy_sl_{signal.stop_loss}"}
-                    ],
-                    [
-                        {"text": "📋 Copiar TP", "callback_data": f"copy_tp_{signal.take_profit}"},
-                        {"text": "✅ Aplicar Trade", "callback_data": f"apply_{signal.ticker}"}
-                    ]
+    def render(self, signal: TradingSignal) -> dict:
+        # Agregar botones inline para copiar valores
+        keyboard = {
+            "inline_keyboard": [
+                [
+                    {"text": "📋 Copiar Entry", "callback_data": f"copy_entry_{signal.price}"},
+                    {"text": "📋 Copiar SL", "callback_data": f"copy_sl_{signal.stop_loss}"}
+                ],
+                [
+                    {"text": "📋 Copiar TP", "callback_data": f"copy_tp_{signal.take_profit}"},
+                    {"text": "✅ Aplicar Trade", "callback_data": f"apply_{signal.ticker}"}
                 ]
-            }
-            
-            payload = {
-                'chat_id': self.chat_id,
-                'text': message,
-                'parse_mode': 'Markdown',
-                'reply_markup': json.dumps(keyboard)
-            }
-            
-            response = requests.post(
-                f"{self.base_url}/sendMessage",
-                json=payload
-            )
-            
-            return response.status_code == 200
-            
-        except Exception as e:
-            print(f"Error enviando a Telegram: {e}")
-            return False
+            ]
+        }
+        return {'text': signal.format_message(), 'keyboard': keyboard}
+    
+    def digest_text(self, items: list) -> str:
+        # Digest: los botones son por señal, así que se omiten
+        return "\n".join([f"📦 *{len(items)} señales*"] + [item['text'] for item in items])
+    
+    def fits(self, items: list) -> bool:
+        """El despachador corta los digest entre señales para no pasar del límite de Telegram"""
+        return len(items) == 1 or len(self.digest_text(items)) <= TELEGRAM_MAX_TEXT
+    
+    def build_request(self, items: list) -> dict:
+        payload = {
+            'chat_id': self.chat_id,
+            'parse_mode': 'Markdown'
+        }
+        if len(items) == 1:
+            payload['text'] = items[0]['text']
+            payload['reply_markup'] = json.dumps(items[0]['keyboard'])
+        else:
+            payload['text'] = self.digest_text(items)
+        
+        return {'url': f"{self.base_url}/sendMessage", 'json': payload}
 
-class DiscordWebhook(NotificationChannel):
+class DiscordWebhook(HttpNotificationChannel):
     """Envía señales por Discord Webhook"""
     
+    limits = DISCORD_LIMITS
+    success_statuses = (200, 204)
+    
     def __init__(self, webhook_url: str):
+        super().__init__()
         self.webhook_url = webhook_url
     
-    def send(self, signal: TradingSignal) -> bool:
-        """Envía señal por Discord"""
-        try:
-            # Crear embed para Discord
-            embed = {
-                "title": f"{signal.direccion} Signal - {signal.ticker}",
-                "color": 0x00ff00 if signal.direccion == "LONG" else 0xff0000,
-                "fields": [
-                    {"name": "💰 Entry Price", "value": f"${signal.price:.4f}", "inline": True},
-                    {"name": "🛑 Stop Loss", "value": f"${signal.stop_loss:.4f}", "inline": True},
-                    {"name": "🎯 Take Profit", "value": f"${signal.take_profit:.4f}", "inline": True},
-                    {"name": "📊 Score", "value": f"{signal.score:.1f}/10", "inline": True},
-                    {"name": "⚡ Leverage", "value": f"{signal.leverage}x", "inline": True},
-                    {"name": "📏 Size", "value": f"{signal.position_size_pct}%", "inline": True}
-                ],
-                "footer": {"text": f"Signal generated at {signal.timestamp}"},
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            payload = {
-                "embeds": [embed],
-                "content": f"@everyone New {signal.confidence} confidence signal!"
-            }
-            
-            response = requests.post(self.webhook_url, json=payload)
-            return response.status_code == 204
-            
-        except Exception as e:
-            print(f"Error enviando a Discord: {e}")
-            return False
+    def render(self, signal: TradingSignal) -> dict:
+        # Crear embed para Discord
+        embed = {
+            "title": f"{signal.direccion} Signal - {signal.ticker}",
+            "color": 0x00ff00 if signal.direccion == "LONG" else 0xff0000,
+            "fields": [
+                {"name": "💰 Entry Price", "value": f"${signal.price:.4f}", "inline": True},
+                {"name": "🛑 Stop Loss", "value": f"${signal.stop_loss:.4f}", "inline": True},
+                {"name": "🎯 Take Profit", "value": f"${signal.take_profit:.4f}", "inline": True},
+                {"name": "📊 Score", "value": f"{signal.score:.1f}/10", "inline": True},
+                {"name": "⚡ Leverage", "value": f"{signal.leverage}x", "inline": True},
+                {"name": "📏 Size", "value": f"{signal.position_size_pct}%", "inline": True}
+            ],
+            "footer": {"text": f"Signal generated at {signal.timestamp}"},
+            "timestamp": datetime.now().isoformat()
+        }
+        return {'embed': embed, 'confidence': signal.confidence}
+    
+    def build_request(self, items: list) -> dict:
+        # Hasta 10 embeds por mensaje
+        if len(items) == 1:
+            content = f"@everyone New {items[0]['confidence']} confidence signal!"
+        else:
+            content = f"@everyone {len(items)} new signals!"
+        payload = {
+            "embeds": [item['embed'] for item in items],
+            "content": content
+        }
+        return {'url': self.webhook_url, 'json': payload}
 
 class EmailNotifier(NotificationChannel):
     """Envía señales por Email (usando servicio SMTP)"""
     
+    limits = EMAIL_LIMITS
+    
     def __init__(self, smtp_server: str, smtp_port: int, email: str, password: str, to_email: str):
         import smtplib
         from email.mime.text import MIMEText
@@ -175,18 +220,27 @@ class EmailNotifier(NotificationChannel):
         self.MIMEText = MIMEText
         self.MIMEMultipart = MIMEMultipart
     
-    def send(self, signal: TradingSignal) -> bool:
-        """Envía señal por Email"""
+    def render(self, signal: TradingSignal) -> dict:
+        return {
+            'subject': f"🚨 Trading Signal: {signal.direccion} {signal.ticker}",
+            'body': signal.format_message()
+        }
+    
+    def deliver(self, items: list) -> bool:
+        """Un solo correo (digest si hay varias señales)"""
         try:
             msg = self.MIMEMultipart()
             msg['From'] = self.email
             msg['To'] = self.to_email
-            msg['Subject'] = f"🚨 Trading Signal: {signal.direccion} {signal.ticker}"
+            if len(items) == 1:
+                msg['Subject'] = items[0]['subject']
+            else:
+                msg['Subject'] = f"🚨 {len(items)} Trading Signals"
             
-            body = signal.format_message()
+            body = "\n".join(item['body'] for item in items)
             msg.attach(self.MIMEText(body, 'plain'))
             
-            server = self.smtplib.SMTP(self.smtp_server, self.smtp_port)
+            server = self.smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
             server.starttls()
             server.login(self.email, self.password)
             server.send_message(msg)
@@ -197,47 +251,43 @@ class EmailNotifier(NotificationChannel):
         except Exception as e:
             print(f"Error enviando Email: {e}")
             return False
+    
+    def send(self, signal: TradingSignal) -> bool:
+        """Envía señal por Email"""
+        return self.deliver([self.render(signal)])
 
-class WebhookNotifier(NotificationChannel):
+class WebhookNotifier(HttpNotificationChannel):
     """Envía señales a un webhook personalizado (para automatización)"""
     
+    limits = WEBHOOK_LIMITS
+    success_statuses = (200, 201, 204)
+    
     def __init__(self, webhook_url: str, api_key: Optional[str] = None):
+        super().__init__()
         self.webhook_url = webhook_url
         self.api_key = api_key
     
-    def send(self, signal: TradingSignal) -> bool:
-        """Envía señal al webhook"""
-        try:
-            headers = {'Content-Type': 'application/json'}
-            if self.api_key:
-                headers['X-API-Key'] = self.api_key
-            
-            # Formato para trading bots (TradingView, 3Commas, etc)
-            payload = {
-                "symbol": signal.ticker,
-                "side": "buy" if "BUY" in signal.action else "sell",
-                "type": "market",
-                "leverage": signal.leverage,
-                "position_size_percent": signal.position_size_pct,
-                "entry_price": signal.price,
-                "stop_loss": signal.stop_loss,
-                "take_profit": signal.take_profit,
-                "comment": f"Score: {signal.score}, Direction: {signal.direccion}",
-                "timestamp": signal.timestamp
-            }
-            
-            response = requests.post(
-                self.webhook_url,
-                json=payload,
-                headers=headers,
-                timeout=5
-            )
-            
-            return response.status_code in [200, 201, 204]
-            
-        except Exception as e:
-            print(f"Error enviando al webhook: {e}")
-            return False
+    def render(self, signal: TradingSignal) -> dict:
+        # Formato para trading bots (TradingView, 3Commas, etc)
+        return {
+            "symbol": signal.ticker,
+            "side": "buy" if "BUY" in signal.action else "sell",
+            "type": "market",
+            "leverage": signal.leverage,
+            "position_size_percent": signal.position_size_pct,
+            "entry_price": signal.price,
+            "stop_loss": signal.stop_loss,
+            "take_profit": signal.take_profit,
+            "comment": f"Score: {signal.score}, Direction: {signal.direccion}",
+            "timestamp": signal.timestamp
+        }
+    
+    def build_request(self, items: list) -> dict:
+        """Una orden por petición (max_batch=1)"""
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['X-API-Key'] = self.api_key
+        return {'url': self.webhook_url, 'json': items[0], 'headers': headers}
 
 class SignalManager:
     """Gestor principal de señales de trading"""
@@ -247,6 +297,8 @@ class SignalManager:
         self.channels: List[NotificationChannel] = []
         self.signal_history: List[TradingSignal] = []
         self.active_signals: Dict[str, TradingSignal] = {}
+        # Envío asíncrono: colas, rate limit y reintentos por canal
+        self.dispatcher = get_notification_dispatcher()
         self.load_config()
     
     def load_config(self):
@@ -299,6 +351,8 @@ class SignalManager:
     
     def setup_channels(self, config: dict):
         """Configura los canales de notificación activos"""
+        for channel in self.channels:
+            self.dispatcher.remove_channel(channel)
         self.channels = []
         
         # Telegram
@@ -413,8 +467,13 @@ class SignalManager:
             print(f"Error generando señal para {ticker}: {e}")
             return None
     
-    def broadcast_signal(self, signal: TradingSignal) -> dict:
-        """Envía la señal a todos los canales activos"""
+    def broadcast_signal(self, signal: TradingSignal, wait: bool = False, timeout: float = 30.0) -> dict:
+        """
+        Envía la señal a todos los canales activos
+        
+        Por defecto sólo encola en el despachador (results indica si quedó
+        encolada); con wait=True espera la entrega y devuelve su resultado.
+        """
         results = {}
         
         # Guardar en historial
@@ -423,8 +482,8 @@ class SignalManager:
         
         # NUEVO: Registrar en Trade Tracker
         try:
-            from trade_tracker import TradeTracker
-            tracker = TradeTracker()
+            from trade_tracker import get_trade_tracker
+            tracker = get_trade_tracker()
             
             # Convertir señal a formato para tracker
             trade_signal = {
@@ -443,25 +502,33 @@ class SignalManager:
             trade_id = tracker.open_trade(trade_signal)
             print(f"📊 Trade registrado: {trade_id}")
             
-            # Iniciar monitoreo si no está activo
+            # Iniciar monitoreo si no está activo (suscripción al price watcher compartido)
             tracker.start_monitoring()
             
         except Exception as e:
             print(f"⚠️ Error registrando trade: {e}")
         
-        # Enviar a cada canal
-        for channel in self.channels:
+        # Encolar para cada canal (el formato se fija ahora, el envío es asíncrono)
+        futures = self.dispatcher.dispatch(signal, self.channels)
+        for channel, future in futures.items():
             channel_name = channel.__class__.__name__
-            try:
-                success = channel.send(signal)
-                results[channel_name] = success
+            if wait:
+                try:
+                    success = future.result(timeout)
+                except Exception as e:
+                    print(f"❌ Error en {channel_name}: {e}")
+                    success = False
                 if success:
                     print(f"✅ Señal enviada por {channel_name}")
                 else:
                     print(f"❌ Error enviando por {channel_name}")
-            except Exception as e:
-                print(f"❌ Error en {channel_name}: {e}")
-                results[channel_name] = False
+            else:
+                success = not (future.done() and not future.result())
+                if success:
+                    print(f"📨 Señal encolada para {channel_name}")
+                else:
+                    print(f"❌ Error encolando para {channel_name}")
+            results[channel_name] = success
         
         # Guardar señal en archivo
         self.save_signal_to_file(signal)
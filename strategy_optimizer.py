@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Strategy Optimizer - Búsqueda de parámetros de estrategia
+Rejilla completa o TPE (Tree-structured Parzen Estimator) con workers
+
+El modo 'grid' evalúa todas las combinaciones de parameter_ranges. El modo
+'tpe' es una búsqueda bayesiana secuencial: tras unas pruebas aleatorias
+iniciales separa las mejores (fracción gamma) del resto, modela cada
+parámetro con un estimador de Parzen sobre los valores permitidos en cada
+grupo y propone el candidato que maximiza l(x)/g(x). Cada combinación se
+evalúa como mucho una vez y cada trial registra su duración y el proceso
+que lo ejecutó.
+
+La evaluación es una función de módulo (picklable) que recibe los
+parámetros; con workers > 1 corre en un pool de procesos cuyo initializer
+prepara una sola vez los datos compartidos.
+"""
+
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# evaluate(params) -> (score o None si el trial falla, payload)
+EvaluateFn = Callable[[Dict[str, Any]], Tuple[Optional[float], Any]]
+
+
+@dataclass
+class Trial:
+    """Una evaluación de parámetros"""
+    number: int
+    params: Dict[str, Any]
+    score: Optional[float] = None
+    payload: Any = None
+    duration: float = 0.0          # segundos dentro de evaluate
+    worker: int = 0                # pid del proceso que lo evaluó
+    error: Optional[str] = None
+
+
+def _timed_trial(task):
+    """Ejecuta evaluate(params) midiendo su duración (en el worker)"""
+    evaluate, params = task
+    start = time.perf_counter()
+    try:
+        score, payload = evaluate(params)
+        error = None
+    except Exception as e:
+        score, payload, error = None, None, f"{type(e).__name__}: {e}"
+    return score, payload, time.perf_counter() - start, os.getpid(), error
+
+
+class StrategyOptimizer:
+    """Optimizador de parámetros sobre listas de valores permitidos"""
+
+    def __init__(self, evaluate: EvaluateFn, parameter_ranges: Dict[str, Sequence],
+                 workers: int = 1, seed: Optional[int] = None,
+                 initializer: Optional[Callable] = None, initargs: tuple = (),
+                 n_startup_trials: int = 10, gamma: float = 0.25, n_ei_candidates: int = 24):
+        """
+        Args:
+            evaluate: Función de módulo params -> (score, payload); mayor score es mejor
+            parameter_ranges: Valores permitidos por parámetro
+            workers: Procesos en paralelo (1 = en este proceso)
+            seed: Semilla del muestreo TPE
+            initializer, initargs: Preparación de cada worker (y del proceso actual si workers=1)
+            n_startup_trials: Trials aleatorios antes de usar el modelo TPE
+            gamma: Fracción de trials que forman el grupo "bueno"
+            n_ei_candidates: Candidatos muestreados de l(x) por propuesta
+        """
+        if not parameter_ranges or any(len(values) == 0 for values in parameter_ranges.values()):
+            raise ValueError("parameter_ranges necesita al menos un valor por parámetro")
+
+        self.evaluate = evaluate
+        self.names = list(parameter_ranges)
+        self.values = [list(parameter_ranges[name]) for name in self.names]
+        self.workers = max(1, workers or 1)
+        self.rng = np.random.default_rng(seed)
+        self.initializer = initializer
+        self.initargs = initargs
+        self.n_startup_trials = n_startup_trials
+        self.gamma = gamma
+        self.n_ei_candidates = n_ei_candidates
+
+        self.trials: List[Trial] = []
+        self._seen = set()
+        self.wall_time = 0.0
+
+    @property
+    def space_size(self) -> int:
+        return math.prod(len(values) for values in self.values)
+
+    # ===========================================
+    # MODOS
+    # ===========================================
+
+    def grid(self) -> List[Trial]:
+        """Evalúa todas las combinaciones (en el orden de itertools.product)"""
+        candidates = (indices for indices in itertools.product(*(range(len(v)) for v in self.values))
+                      if indices not in self._seen)
+        return self._run(lambda n: [list(indices) for indices in itertools.islice(candidates, n)],
+                         self.space_size - len(self._seen))
+
+    def tpe(self, n_trials: int) -> List[Trial]:
+        """Búsqueda TPE de como mucho n_trials combinaciones distintas"""
+        n_trials = min(n_trials, self.space_size)
+        return self._run(self._suggest, n_trials)
+
+    @property
+    def best_trial(self) -> Optional[Trial]:
+        """Mejor trial (el primero en caso de empate)"""
+        best = None
+        for trial in self.trials:
+            if trial.score is not None and (best is None or trial.score > best.score):
+                best = trial
+        return best
+
+    # ===========================================
+    # EJECUCIÓN
+    # ===========================================
+
+    def _run(self, suggest: Callable[[int], List[List[int]]], n_trials: int) -> List[Trial]:
+        start = time.perf_counter()
+        pool = None
+        try:
+            if self.workers > 1:
+                pool = ProcessPoolExecutor(max_workers=self.workers, initializer=self.initializer,
+                                           initargs=self.initargs)
+            elif self.initializer is not None:
+                self.initializer(*self.initargs)
+
+            target = len(self.trials) + n_trials
+            while len(self.trials) < target:
+                batch = suggest(min(self.workers, target - len(self.trials)))
+                if not batch:
+                    break  # espacio agotado
+
+                tasks = [(self.evaluate, self._params(indices)) for indices in batch]
+                outcomes = pool.map(_timed_trial, tasks) if pool else map(_timed_trial, tasks)
+                for indices, (_, params), (score, payload, duration, worker, error) in zip(batch, tasks, outcomes):
+                    self._seen.add(tuple(indices))
+                    self.trials.append(Trial(len(self.trials), params, score, payload, duration, worker, error))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            self.wall_time += time.perf_counter() - start
+        return self.trials
+
+    def _params(self, indices) -> Dict[str, Any]:
+        return {name: values[i] for name, values, i in zip(self.names, self.values, indices)}
+
+    # ===========================================
+    # TPE
+    # ===========================================
+
+    def _suggest(self, n: int) -> List[List[int]]:
+        """n combinaciones nuevas y distintas entre sí"""
+        proposals = []
+        pending = set()
+        attempts = 0
+        while len(proposals) < n and len(self._seen) + len(pending) < self.space_size:
+            attempts += 1
+            scored = [t for t in self.trials if t.score is not None]
+            if len(self.trials) < self.n_startup_trials or len(scored) < 2 or attempts > 50:
+                indices = [int(self.rng.integers(len(values))) for values in self.values]
+            else:
+                indices = self._tpe_candidate()
+            key = tuple(indices)
+            if key in self._seen or key in pending:
+                if attempts > 200:
+                    indices = self._first_unseen(pending)
+                    key = tuple(indices)
+                else:
+                    continue
+            pending.add(key)
+            proposals.append(indices)
+            attempts = 0
+        return proposals
+
+    def _tpe_candidate(self) -> List[int]:
+        """Candidato que maximiza l(x)/g(x), parámetro a parámetro"""
+        # Trials fallidos cuentan como los peores
+        ranked = sorted(self.trials, key=lambda t: (t.score is None, -(t.score or 0), t.number))
+        n_good = max(1, math.ceil(self.gamma * len(ranked)))
+        good = [[self._value_index(p, t.params[name]) for t in ranked[:n_good]] for p, name in enumerate(self.names)]
+        bad = [[self._value_index(p, t.params[name]) for t in ranked[n_good:]] for p, name in enumerate(self.names)]
+
+        candidates = np.empty((self.n_ei_candidates, len(self.names)), dtype=int)
+        log_ratio = np.zeros(self.n_ei_candidates)
+        for p in range(len(self.names)):
+            l_density = self._parzen(p, good[p])
+            g_density = self._parzen(p, bad[p])
+            draws = self.rng.choice(len(l_density), size=self.n_ei_candidates, p=l_density)
+            candidates[:, p] = draws
+            log_ratio += np.log(l_density[draws]) - np.log(g_density[draws])
+
+        # Preferir candidatos no evaluados
+        order = np.argsort(-log_ratio, kind='stable')
+        for c in order:
+            if tuple(candidates[c]) not in self._seen:
+                return [int(i) for i in candidates[c]]
+        return [int(i) for i in candidates[order[0]]]
+
+    def _parzen(self, p: int, observed: List[int]) -> np.ndarray:
+        """Densidad sobre los valores del parámetro p (prior uniforme + kernels)"""
+        n_values = len(self.values[p])
+        density = np.full(n_values, 1.0 / n_values)
+        if observed:
+            positions = np.arange(n_values)
+            if self._is_ordered(p):
+                # Kernel gaussiano sobre la posición del valor en la lista ordenada
+                bandwidth = max(0.5, (n_values - 1) / (1 + len(observed)) ** 0.5)
+                for i in observed:
+                    density += np.exp(-0.5 * ((positions - i) / bandwidth) ** 2) / (bandwidth * 2.5066282746310002)
+            else:
+                density += np.bincount(observed, minlength=n_values)
+        return density / density.sum()
+
+    def _is_ordered(self, p: int) -> bool:
+        values = self.values[p]
+        return all(isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool)
+                   for v in values) and values == sorted(values)
+
+    def _value_index(self, p: int, value) -> int:
+        return self.values[p].index(value)
+
+    def _first_unseen(self, pending) -> List[int]:
+        for indices in itertools.product(*(range(len(v)) for v in self.values)):
+            if indices not in self._seen and indices not in pending:
+                return list(indices)
+        raise RuntimeError("espacio de parámetros agotado")
+
+    # ===========================================
+    # INSTRUMENTACIÓN
+    # ===========================================
+
+    def timing(self) -> Dict[str, Any]:
+        """Duración por trial, tiempo total y reparto entre workers"""
+        durations = np.array([t.duration for t in self.trials]) if self.trials else np.zeros(0)
+        per_worker: Dict[int, int] = {}
+        for trial in self.trials:
+            per_worker[trial.worker] = per_worker.get(trial.worker, 0) + 1
+        return {
+            'trials': len(self.trials),
+            'failed': sum(1 for t in self.trials if t.score is None),
+            'wall_time_s': self.wall_time,
+            'eval_time_s': float(durations.sum()),
+            'avg_trial_ms': float(durations.mean() * 1000) if len(durations) else 0.0,
+            'p50_trial_ms': float(np.median(durations) * 1000) if len(durations) else 0.0,
+            'max_trial_ms': float(durations.max() * 1000) if len(durations) else 0.0,
+            'trials_per_s': len(self.trials) / self.wall_time if self.wall_time > 0 else 0.0,
+            'trials_per_worker': per_worker
+        }
@@ -14,15 +14,31 @@ import warnings
 warnings.filterwarnings('ignore')
 
 from scoring_empirico_v2 import ScoringEmpiricoV2
+from calibration_engine import CalibrationEngine, checkpoint_tag, rungs_by_period, simulate_fixed_stops
 
 class SystemCalibrator:
     """
     Calibrador automático que encuentra los mejores parámetros
+    
+    La rejilla se evalúa con CalibrationEngine: cada (combinación, símbolo,
+    período) se simula una sola vez, en un pool de procesos y con
+    checkpoint opcional para reanudar.
     """
     
-    def __init__(self, initial_capital=10000):
+    def __init__(self, initial_capital=10000, workers=None, checkpoint_path=None, halving_eta=None):
+        """
+        Args:
+            initial_capital: Capital inicial
+            workers: Procesos para evaluar la rejilla (1 = secuencial); por defecto os.cpu_count()
+            checkpoint_path: Fichero de checkpoint para reanudar una calibración interrumpida
+            halving_eta: Successive halving por períodos (None = rejilla completa)
+        """
         self.initial_capital = initial_capital
         self.scoring_system = ScoringEmpiricoV2()
+        self.workers = workers
+        self.checkpoint_path = checkpoint_path
+        self.halving_eta = halving_eta
+        self.market_data = None
         
         # Períodos de calibración
         self.calibration_periods = [
@@ -93,23 +109,22 @@ class SystemCalibrator:
         print("\n🔍 Iniciando calibración...")
         print("-"*60)
         
-        tested_combinations = 0
         best_combinations = []
         
         # Generar todas las combinaciones
         param_combinations = self.generate_param_combinations()
-        total_combinations = len(param_combinations)
         
-        for i, params in enumerate(param_combinations):
-            tested_combinations += 1
-            
-            # Mostrar progreso cada 10%
-            if tested_combinations % max(1, total_combinations // 10) == 0:
-                progress = (tested_combinations / total_combinations) * 100
-                print(f"📈 Progreso: {progress:.0f}% ({tested_combinations}/{total_combinations})")
-            
-            # Probar configuración
-            results = self.test_configuration(params, market_data)
+        # Evaluar la rejilla (memo + pool de procesos + checkpoint)
+        self.market_data = market_data
+        engine = self.create_engine()
+        all_results = engine.evaluate(
+            param_combinations,
+            rungs=rungs_by_period(self.calibration_units(), [p['name'] for p in self.calibration_periods])
+        )
+        
+        for params, results in zip(param_combinations, all_results):
+            if results is None:  # Podada por el successive halving
+                continue
             
             # Evaluar resultados
             score = self.evaluate_results(results)
@@ -231,12 +246,40 @@ class SystemCalibrator:
     def test_configuration(self, params, market_data):
         """Prueba una configuración específica"""
         
-        all_trades = []
+        unit_trades = []
         
         for symbol, symbol_data in market_data.items():
             for period_name, data in symbol_data.items():
                 trades = self.backtest_with_params(symbol, data, params)
-                all_trades.extend(trades)
+                unit_trades.append(((symbol, period_name), trades))
+        
+        return self.summarize(params, unit_trades)
+    
+    # ===========================================
+    # INTERFAZ DEL MOTOR DE CALIBRACIÓN
+    # ===========================================
+    
+    def create_engine(self):
+        """Motor de calibración sobre self.market_data"""
+        tag = checkpoint_tag('SystemCalibrator', self.market_data, self.calibration_periods, self.param_ranges)
+        return CalibrationEngine(self, workers=self.workers, checkpoint_path=self.checkpoint_path,
+                                 halving_eta=self.halving_eta, tag=tag)
+    
+    def calibration_units(self):
+        """(símbolo, período) en el orden en que se agregan los trades"""
+        return [(symbol, period_name)
+                for symbol, symbol_data in self.market_data.items()
+                for period_name in symbol_data]
+    
+    def evaluate_unit(self, params, unit):
+        """Trades de una combinación en un (símbolo, período)"""
+        symbol, period_name = unit
+        return self.backtest_with_params(symbol, self.market_data[symbol][period_name], params)
+    
+    def summarize(self, params, unit_trades):
+        """Resultados de una configuración a partir de los trades por unidad"""
+        
+        all_trades = [trade for _, trades in unit_trades for trade in trades]
         
         # Calcular métricas
         if all_trades:
@@ -257,8 +300,27 @@ class SystemCalibrator:
             'metrics': metrics
         }
     
-    def backtest_with_params(self, symbol, data, params):
-        """Ejecuta backtest con parámetros específicos"""
+    def rank(self, results):
+        """Orden para el successive halving"""
+        return self.evaluate_results(results)
+    
+    def backtest_with_params(self, symbol, data, params, vectorized=True):
+        """
+        Ejecuta backtest con parámetros específicos
+        
+        vectorized: True calcula las señales por arrays y simula sobre listas;
+            False el bucle por vela original (referencia de paridad)
+        """
+        
+        # ScoringEmpiricoV2 no expone evaluar_entrada: la señal es siempre el
+        # fallback RSI + MACD de generate_signal_with_params, vectorizable
+        if vectorized and not hasattr(self.scoring_system, 'evaluar_entrada'):
+            direction = self.fallback_signals(data, params['rsi_oversold'], params['rsi_overbought'])
+            return simulate_fixed_stops(
+                data, direction, np.where(direction != 0, 6.0, 0.0), params['min_score'],
+                params['stop_loss_pct'], params['take_profit_pct'], params['leverage_base'],
+                symbol, extra_fields={'params': params}
+            )
         
         trades = []
         position = None
@@ -400,6 +462,17 @@ class SystemCalibrator:
             
             return None, 0
     
+    def fallback_signals(self, data, rsi_oversold, rsi_overbought):
+        """Dirección por vela del fallback RSI + MACD (1 LONG, -1 SHORT, 0 nada)"""
+        
+        rsi = data['RSI'].to_numpy(dtype=float)
+        macd = data['MACD'].to_numpy(dtype=float)
+        macd_signal = data['MACD_Signal'].to_numpy(dtype=float)
+        
+        long_signal = (rsi <= rsi_oversold) & (macd > macd_signal)
+        short_signal = ~long_signal & (rsi >= rsi_overbought) & (macd < macd_signal)
+        return long_signal.astype(np.int8) - short_signal.astype(np.int8)
+    
     def calculate_metrics(self, trades):
         """Calcula métricas de performance"""
         
@@ -603,7 +676,9 @@ def main():
     print("🚀 INICIANDO CALIBRACIÓN DEL SISTEMA")
     print("="*80)
     
-    calibrator = SystemCalibrator(initial_capital=10000)
+    # Poda por períodos (eta=3) y checkpoint para poder reanudar
+    calibrator = SystemCalibrator(initial_capital=10000, halving_eta=3,
+                                  checkpoint_path='calibration_checkpoint.pkl')
     
     # Ejecutar calibración
     best_params, best_results = calibrator.run_calibration()
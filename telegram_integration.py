@@ -3,10 +3,11 @@
 Integración con Telegram para recibir señales directamente en tu móvil
 """
 
-import requests
 import json
 from datetime import datetime
 
+from notification_dispatcher import TelegramChatChannel, get_notification_dispatcher
+
 class TelegramNotifier:
     """
     Envía notificaciones a Telegram
@@ -16,22 +17,14 @@ class TelegramNotifier:
         self.bot_token = bot_token
         self.chat_id = chat_id
         self.base_url = f"https://api.telegram.org/bot{bot_token}"
+        self.channel = TelegramChatChannel(bot_token, chat_id, base_url=self.base_url)
     
-    def send_message(self, message, parse_mode="HTML"):
-        """Envía mensaje básico"""
-        url = f"{self.base_url}/sendMessage"
-        payload = {
-            "chat_id": self.chat_id,
-            "text": message,
-            "parse_mode": parse_mode
-        }
-        
-        try:
-            response = requests.post(url, json=payload)
-            return response.status_code == 200
-        except Exception as e:
-            print(f"Error enviando a Telegram: {e}")
-            return False
+    def send_message(self, message, parse_mode="HTML", wait=False, timeout=30.0):
+        """Envía mensaje básico (con wait=True espera la entrega y devuelve su resultado)"""
+        # Encolado en el despachador compartido: sesión reutilizada, timeout,
+        # rate limit de Telegram, reintentos y digest en ráfagas
+        return get_notification_dispatcher().send(
+            self.channel, self.channel.render(message, parse_mode), wait=wait, timeout=timeout)
     
     def send_signal_alert(self, trade_data):
         """Envía alerta de nueva señal"""
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests del log de auditoría append-only: escritura en lote, rotación diaria,
+compresión de días cerrados y consultas indexadas por tiempo y símbolo
+"""
+
+import gzip
+import json
+import threading
+from datetime import datetime, timedelta
+
+from audit_log import AuditLog
+
+DAY = datetime(2024, 3, 10, 12, 0, 0)
+
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_batches_append_one_line_per_action(tmp_path):
+    audit = AuditLog(str(tmp_path), flush_interval=60)
+    for i in range(5):
+        audit.append("SIGNAL_GENERATED", "BTCUSDT", {'price': 100 + i}, timestamp=DAY + timedelta(seconds=i))
+    assert audit.pending() == 5
+    audit.flush()
+
+    entries = read_lines(tmp_path / "trading_audit_20240310.jsonl")
+    assert [e['details']['price'] for e in entries] == [100, 101, 102, 103, 104]
+    assert entries[0] == {'timestamp': DAY.isoformat(), 'action': 'SIGNAL_GENERATED',
+                          'symbol': 'BTCUSDT', 'details': {'price': 100}}
+    assert audit.stats['batches'] == 1
+    audit.close()
+
+
+def test_existing_lines_are_never_rewritten(tmp_path):
+    audit = AuditLog(str(tmp_path))
+    audit.append("OPEN", "ETHUSDT", {'qty': 1}, timestamp=DAY)
+    audit.flush()
+    path = tmp_path / "trading_audit_20240310.jsonl"
+    first = path.read_bytes()
+
+    audit.append("CLOSE", "ETHUSDT", {'qty': 1}, timestamp=DAY + timedelta(hours=1))
+    audit.close()
+    assert path.read_bytes().startswith(first)
+    assert len(read_lines(path)) == 2
+
+
+def test_rotation_and_compression_of_closed_days(tmp_path):
+    audit = AuditLog(str(tmp_path), compress_closed_days=True)
+    audit.append("OPEN", "SOLUSDT", {}, timestamp=DAY)
+    audit.flush()
+    audit.append("CLOSE", "SOLUSDT", {}, timestamp=DAY + timedelta(days=1))
+    audit.close()
+
+    assert not (tmp_path / "trading_audit_20240310.jsonl").exists()
+    with gzip.open(tmp_path / "trading_audit_20240310.jsonl.gz", 'rt') as f:
+        assert json.loads(f.readline())['action'] == 'OPEN'
+    assert (tmp_path / "trading_audit_20240311.jsonl").exists()
+    assert [e['action'] for e in audit.query()] == ['OPEN', 'CLOSE']
+
+
+def test_query_by_time_range_and_symbol(tmp_path):
+    audit = AuditLog(str(tmp_path), max_batch=10)
+    symbols = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT']
+    for i in range(90):
+        audit.append("SIGNAL", symbols[i % 3], {'i': i}, timestamp=DAY + timedelta(minutes=i))
+        if i % 10 == 9:
+            audit.flush()
+    audit.append("SIGNAL", "DOGEUSDT", {'i': 90}, timestamp=DAY + timedelta(days=2))
+    audit.close()
+
+    window = audit.query(start=DAY + timedelta(minutes=20), end=DAY + timedelta(minutes=39))
+    assert [e['details']['i'] for e in window] == list(range(20, 40))
+
+    eth = audit.query(symbol='ETHUSDT', end=DAY + timedelta(minutes=30))
+    assert [e['details']['i'] for e in eth] == [1, 4, 7, 10, 13, 16, 19, 22, 25, 28]
+
+    doge = audit.query(symbol='DOGEUSDT')
+    assert len(doge) == 1 and doge[0]['details']['i'] == 90
+
+    # El índice permite saltar los bloques sin el símbolo
+    blocks, _ = audit._blocks('20240312')
+    assert blocks == [{'offset': 0, 'length': blocks[0]['length'], 'count': 1,
+                       'start': (DAY + timedelta(days=2)).isoformat(),
+                       'end': (DAY + timedelta(days=2)).isoformat(), 'symbols': ['DOGEUSDT']}]
+
+
+def test_reads_legacy_json_and_unindexed_files(tmp_path):
+    legacy = [{'timestamp': DAY.isoformat(), 'action': 'OLD', 'symbol': 'BTCUSDT', 'details': {}}]
+    (tmp_path / "trading_audit_20240310.json").write_text(json.dumps(legacy, indent=2))
+    (tmp_path / "trading_audit_20240311.jsonl").write_text(json.dumps(
+        {'timestamp': (DAY + timedelta(days=1)).isoformat(), 'action': 'RAW', 'symbol': 'BTCUSDT', 'details': {}}) + '\n')
+
+    assert [e['action'] for e in AuditLog(str(tmp_path)).query(symbol='BTCUSDT')] == ['OLD', 'RAW']
+
+
+def test_concurrent_writers_do_not_lose_entries(tmp_path):
+    audit = AuditLog(str(tmp_path), max_batch=50)
+
+    def worker(n):
+        for i in range(200):
+            audit.append("TICK", f"S{n}", {'i': i}, timestamp=DAY)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    audit.close()
+
+    entries = read_lines(tmp_path / "trading_audit_20240310.jsonl")
+    assert len(entries) == 800
+    assert sum(b['count'] for b in audit._blocks('20240310')[0]) == 800
+    assert [e['details']['i'] for e in audit.query(symbol='S2')] == list(range(200))
+
+
+def test_late_writer_after_compression_keeps_archived_entries(tmp_path):
+    first = AuditLog(str(tmp_path), compress_closed_days=True)
+    second = AuditLog(str(tmp_path), compress_closed_days=True)
+    for i in range(3):
+        first.append("OPEN", "BTCUSDT", {'i': i}, timestamp=DAY + timedelta(minutes=i))
+    first.flush()
+    first.append("NEXT", "BTCUSDT", {}, timestamp=DAY + timedelta(days=1))
+    first.flush()
+    assert not (tmp_path / "trading_audit_20240310.jsonl").exists()
+
+    # Otro escritor llega tarde al día ya comprimido: nuevo .jsonl, offsets a continuación del .gz
+    second.append("LATE", "ETHUSDT", {'n': 1}, timestamp=DAY + timedelta(hours=5))
+    second.flush()
+    day = DAY.replace(hour=0)
+    expected = ['OPEN', 'OPEN', 'OPEN', 'LATE']
+    assert [e['action'] for e in first.query(start=day, end=day + timedelta(hours=23))] == expected
+
+    # Su rotación añade el segmento al .gz sin truncarlo
+    second.append("NEXT", "ETHUSDT", {}, timestamp=DAY + timedelta(days=1, hours=1))
+    second.close()
+    first.close()
+    assert not (tmp_path / "trading_audit_20240310.jsonl").exists()
+    with gzip.open(tmp_path / "trading_audit_20240310.jsonl.gz", 'rt') as f:
+        assert [json.loads(line)['action'] for line in f] == expected
+
+    assert [e['action'] for e in first.query(start=day, end=day + timedelta(hours=23))] == expected
+    assert [e['details'] for e in first.query(symbol='ETHUSDT', end=day + timedelta(hours=23))] == [{'n': 1}]
+    assert [e['details']['i'] for e in first.query(start=DAY + timedelta(minutes=1),
+                                                   end=DAY + timedelta(minutes=2))] == [1, 2]
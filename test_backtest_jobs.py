@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests de los trabajos de backtest en segundo plano (pool de procesos,
+caché por versión de datos, single-flight, stream y cancelación)
+"""
+
+import asyncio
+import threading
+
+import pandas as pd
+import pytest
+
+import backtest_jobs
+from backtest_jobs import BacktestJobManager, run_strategy_backtest, simulate_windows, window_chunks
+from cache_manager import CacheManager
+
+CONFIG = {'SOLUSDT': {'strategy': 'mean_reversion', 'timeframe': '1h'},
+          'AVAXUSDT': {'strategy': 'avax_optimized', 'timeframe': '1h'}}
+
+
+def klines(ohlcv, n, seed=0):
+    return ohlcv(n, seed, price=30, wick=0.003)
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    cache = CacheManager(cache_dir=str(tmp_path / "cache"))
+    monkeypatch.setattr(backtest_jobs, 'cache_manager', cache)
+    return cache
+
+
+@pytest.fixture
+def manager(ohlcv):
+    calls = []
+
+    def fetch(symbol, interval, limit):
+        calls.append((symbol, interval, limit))
+        return klines(ohlcv, limit)
+
+    jobs = BacktestJobManager(fetch_klines=fetch, strategy_config=CONFIG, max_workers=2, chunk_windows=4)
+    jobs.calls = calls
+    yield jobs
+    jobs.shutdown()
+
+
+@pytest.mark.parametrize('strategy', ['mean_reversion', 'avax_optimized', 'trend_following', 'momentum'])
+def test_chunking_does_not_change_signals(ohlcv, strategy):
+    df = klines(ohlcv, 1500, seed=4)
+    whole = [i for chunk in window_chunks(df, 'SOLUSDT', strategy) for i in chunk]
+    expected = simulate_windows(df, 'SOLUSDT', strategy, whole)
+
+    chunked = []
+    for chunk in window_chunks(df, 'SOLUSDT', strategy, chunk_windows=3):
+        chunked.extend(simulate_windows(df, 'SOLUSDT', strategy, chunk))
+    assert chunked == expected
+
+
+def test_job_matches_inline_backtest_and_is_cached(ohlcv, manager):
+    async def run():
+        job = await manager.submit('SOLUSDT', 30)
+        assert job.status == 'queued'
+        await manager.wait(job)
+        again = await manager.submit('SOLUSDT', 30)
+        return job, again
+
+    job, again = asyncio.run(run())
+
+    expected = run_strategy_backtest(klines(ohlcv, 720), 'SOLUSDT', 'mean_reversion', 30)
+    assert job.status == 'done' and not job.cached
+    assert job.result == expected
+    assert again.cached and again.status == 'done' and again.result == expected
+    assert manager.calls == [('SOLUSDT', '1h', 720)]
+    assert manager.stats['cache_hits'] == 1
+
+
+def test_identical_jobs_coalesce_and_stream_progress(manager):
+    async def run():
+        job = await manager.submit('AVAXUSDT', 30)
+        assert await manager.submit('AVAXUSDT', 30) is job
+        states = [state async for state in manager.stream(job)]
+        return job, states
+
+    job, states = asyncio.run(run())
+
+    progress = [s['progress'] for s in states]
+    assert progress == sorted(progress)
+    assert states[-1]['status'] == 'done' and states[-1]['result'] == job.result
+    assert 'result' not in states[0]
+    assert len(manager.calls) == 1 and manager.stats['coalesced'] == 1
+
+
+def test_cancel_running_job(ohlcv, isolated_cache):
+    release = threading.Event()
+
+    def slow_fetch(symbol, interval, limit):
+        release.wait(5)
+        return klines(ohlcv, limit)
+
+    jobs = BacktestJobManager(fetch_klines=slow_fetch, strategy_config=CONFIG, max_workers=1)
+
+    async def run():
+        job = await jobs.submit('SOLUSDT', 7)
+        await asyncio.sleep(0.05)
+        assert jobs.cancel(job.id)
+        await jobs.wait(job)
+        release.set()
+        return job
+
+    job = asyncio.run(run())
+    jobs.shutdown()
+
+    assert job.status == 'cancelled' and job.result is None
+    assert not jobs.cancel(job.id)
+    assert isolated_cache.get(job.cache_key) is None
+
+
+def test_empty_data_fails_job(isolated_cache):
+    jobs = BacktestJobManager(fetch_klines=lambda *args: pd.DataFrame(), strategy_config=CONFIG)
+
+    async def run():
+        job = await jobs.submit('SOLUSDT', 7)
+        await jobs.wait(job)
+        return job
+
+    job = asyncio.run(run())
+    assert job.status == 'failed' and job.error == "No historical data available"
+
+
+def test_job_registry_skips_unfinished_jobs_when_evicting(manager):
+    manager.max_jobs = 3
+
+    async def run():
+        first = backtest_jobs.BacktestJob(id='running', symbol='SOLUSDT', period_days=7,
+                                          strategy='mean_reversion', timeframe='1h', cache_key='k')
+        manager._remember(first)
+        for i in range(10):
+            job = backtest_jobs.BacktestJob(id=f"done-{i}", symbol='SOLUSDT', period_days=7,
+                                            strategy='mean_reversion', timeframe='1h', cache_key='k')
+            manager._remember(job)
+            manager._finish(job, 'done', result={})
+        return first
+
+    first = asyncio.run(run())
+    assert len(manager.jobs) == 3
+    assert manager.get(first.id) is first and not first.finished
+    assert list(manager.jobs) == ['running', 'done-8', 'done-9']
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Paridad del kernel vectorizado de backtesting con los motores por vela
+originales, sobre velas sintéticas sin red
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_kernel import (MarketArrays, KernelStrategy, ExitRules, run_kernel,
+                             EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_END)
+from backtesting_integration import BacktestingIntegrado
+from final_robust_system import FinalRobustSystem
+from robust_trading_system_v2 import RobustTradingSystemV2
+
+
+def candles(ohlcv, n, freq='D', seed=0, vol=0.025):
+    """Tendencias alternas de 60 velas con índice tz-aware 'Date' (formato yfinance)"""
+    return ohlcv(n, seed, start='2021-01-01', freq=freq, tz='UTC', name='Date', price=20000,
+                 vol=vol, drift=vol / 6, regime=60, wick=vol * 0.8)
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('params', [{}, {'min_confirmations': 2, 'volume_threshold': 1.0}])
+def test_robust_v2_matches_per_bar(seed, params, ohlcv):
+    reference = RobustTradingSystemV2(10000)
+    reference.base_params.update(params)
+    df = reference.prepare_indicators(candles(ohlcv, 500, seed=seed))
+    expected = reference.run_backtest(df, 'BTC-USD', vectorized=False)
+
+    system = RobustTradingSystemV2(10000)
+    system.base_params.update(params)
+    trades = system.run_backtest(df, 'BTC-USD')
+
+    assert trades == expected
+    assert system.current_capital == reference.current_capital
+    assert system.last_trade_date == reference.last_trade_date
+
+
+def test_robust_v2_regimes_match_prefix_detection(ohlcv):
+    system = RobustTradingSystemV2()
+    df = system.prepare_indicators(candles(ohlcv, 300, seed=7))
+    expected = [system.detect_market_regime(df.iloc[:i+1]) if i >= 50 else None
+                for i in range(len(df))]
+    assert system.precompute_regimes(df) == expected
+
+
+def test_robust_v2_keeps_trade_interval_across_calls(ohlcv):
+    df = RobustTradingSystemV2().prepare_indicators(candles(ohlcv, 400, seed=2))
+    first, second = df.iloc[:250], df.iloc[200:]
+
+    reference = RobustTradingSystemV2()
+    reference.base_params['min_confirmations'] = 2
+    reference.run_backtest(first, 'X', vectorized=False)
+    expected = reference.run_backtest(second, 'X', vectorized=False)
+
+    system = RobustTradingSystemV2()
+    system.base_params['min_confirmations'] = 2
+    system.run_backtest(first, 'X')
+    assert system.run_backtest(second, 'X') == expected
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('freq', ['D', 'h'])
+def test_final_system_matches_per_bar(seed, freq, ohlcv):
+    system = FinalRobustSystem(10000)
+    df = system.calculate_indicators(candles(ohlcv, 600, freq=freq, seed=seed))
+
+    expected = system.run_backtest(df, 'ETH-USD', vectorized=False)
+    assert expected
+    assert system.run_backtest(df, 'ETH-USD') == expected
+
+
+def test_integrado_candidates_cover_every_signal(ohlcv):
+    backtester = BacktestingIntegrado()
+    df = backtester.calculate_indicators(candles(ohlcv, 600, freq='h', seed=1, vol=0.01))
+    candidates = backtester.candidate_mask(df)
+
+    signals = [i for i in range(50, len(df))
+               if backtester.generate_signal(df.iloc[:i+1].copy(), 'BTC-USD')]
+    assert signals
+    assert all(candidates[i] for i in signals)
+    assert candidates.sum() < len(df) / 2
+
+
+class AlwaysLong(KernelStrategy):
+    warmup = 1
+
+    def entry_direction(self, m):
+        direction = np.zeros(len(m), dtype=np.int8)
+        direction[1] = 1
+        return direction
+
+    def exit_rules(self):
+        return ExitRules(atr_stop_multiplier=1.0, atr_target_multiplier=1.0,
+                         risk_per_trade=0.01, max_position_fraction=1.0)
+
+
+def kernel_frame(highs, lows):
+    n = len(highs)
+    index = pd.date_range('2024-01-01', periods=n, freq='D', tz='UTC')
+    return MarketArrays.from_dataframe(pd.DataFrame({
+        'High': highs, 'Low': lows, 'Close': [100.0] * n, 'ATR': [5.0] * n
+    }, index=index))
+
+
+def test_kernel_stop_checked_before_target():
+    # La vela 2 toca stop (95) y target (105): gana el stop, como en los motores por vela
+    result = run_kernel(kernel_frame([100, 100, 106, 100], [100, 100, 94, 100]), AlwaysLong(), 10000)
+    assert list(result.exit_reason) == [EXIT_STOP_LOSS]
+    assert result.exit_price[0] == 95.0
+    assert result.final_capital == pytest.approx(10000 - 100)
+
+
+def test_kernel_closes_open_position_at_end():
+    result = run_kernel(kernel_frame([100, 100, 101, 102], [100, 100, 99, 98]), AlwaysLong(), 10000)
+    assert list(result.exit_reason) == [EXIT_END]
+    assert result.exit_idx[0] == 3
+    assert result.final_capital == 10000
+
+    result = run_kernel(kernel_frame([100, 100, 105], [100, 100, 99]), AlwaysLong(), 10000)
+    assert list(result.exit_reason) == [EXIT_TAKE_PROFIT]
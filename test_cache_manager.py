@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Tests del CacheManager: claves estables, LRU y límite de disco"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import cache_manager as cm
+from cache_manager import CacheManager, cached
+
+
+class Fetcher:
+    def __init__(self):
+        self.calls = 0
+
+    def fetch(self, symbol, interval, days_back):
+        self.calls += 1
+        return f"{symbol}-{interval}-{days_back}"
+
+
+def test_method_keys_ignore_self(tmp_path, monkeypatch):
+    monkeypatch.setattr(cm, 'cache_manager', CacheManager(cache_dir=str(tmp_path)))
+    Fetcher.cached_fetch = cached(ttl=3600)(Fetcher.fetch)
+
+    first, second = Fetcher(), Fetcher()
+    assert first.cached_fetch('BTCUSDT', '1h', 30) == second.cached_fetch('BTCUSDT', '1h', 30)
+    assert first.calls + second.calls == 1
+    assert Fetcher.cached_fetch.cache_key(first, 'BTCUSDT', '1h', 30) == \
+        Fetcher.cached_fetch.cache_key(second, 'BTCUSDT', '1h', 30)
+
+
+def test_key_func(tmp_path, monkeypatch):
+    monkeypatch.setattr(cm, 'cache_manager', CacheManager(cache_dir=str(tmp_path)))
+    calls = []
+
+    @cached(ttl=30, key_func=lambda symbol, verbose=False: symbol)
+    def load(symbol, verbose=False):
+        calls.append(symbol)
+        return symbol.lower()
+
+    assert load('ETHUSDT') == load('ETHUSDT', verbose=True) == 'ethusdt'
+    assert calls == ['ETHUSDT']
+
+
+def test_unstable_arguments_require_key_func(tmp_path, monkeypatch):
+    monkeypatch.setattr(cm, 'cache_manager', CacheManager(cache_dir=str(tmp_path)))
+
+    @cached(ttl=30)
+    def describe(obj):
+        return id(obj)
+
+    with pytest.raises(TypeError, match='key_func'):
+        describe(object())
+
+    keyed = cached(ttl=30, key_func=lambda obj: id(obj))(describe.__wrapped__)
+    first, second = object(), object()
+    assert keyed(first) == id(first) and keyed(second) == id(second)
+
+
+def test_sweeper_starts_on_first_disk_write(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path), sweep_interval=300)
+    cache.set('memory-only', 1, ttl=30)
+    assert cache._sweeper is None
+
+    cache.set('on-disk', 1, ttl=3600)
+    assert cache._sweeper is not None and cache._sweeper.is_alive()
+    cache.stop_sweeper()
+    assert cache._sweeper is None
+
+    cache.set('again', 1, ttl=3600)
+    assert cache._sweeper is None
+
+
+def test_memory_lru_eviction(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path), max_memory_entries=2)
+    cache.set('a', 1, ttl=30)
+    cache.set('b', 2, ttl=30)
+    assert cache.get('a') == 1  # 'a' pasa a ser la más reciente
+    cache.set('c', 3, ttl=30)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_memory_byte_bound(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path), max_memory_bytes=1000)
+    for i in range(5):
+        cache.set(f"k{i}", b'x' * 400, ttl=30)
+    stats = cache.get_stats()
+    assert stats['memory_bytes'] <= 1000
+    assert stats['memory_entries'] == 2
+
+
+def test_disk_cap_and_expiry_sweep(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path), max_disk_bytes=3000)
+    for i in range(5):
+        cache.set(f"k{i}", b'x' * 1000, ttl=120)
+    stats = cache.get_stats()
+    assert stats['disk_bytes'] <= 3000
+    assert stats['disk_evictions'] >= 2
+
+    cache.set('old', 'v', ttl=120)
+    cache.memory_cache.clear()
+    path = tmp_path / 'old.cache'
+    data = bytearray(path.read_bytes())
+    data[4:12] = cm.DISK_HEADER.pack(cm.DISK_MAGIC, time.time() - 1)[4:]
+    path.write_bytes(bytes(data))
+
+    cache.cleanup_expired()
+    assert not path.exists()
+    assert cache.get('old') is None
+
+
+def test_disk_roundtrip(tmp_path):
+    CacheManager(cache_dir=str(tmp_path)).set('df', {'rows': [1, 2, 3]}, ttl=3600)
+    assert CacheManager(cache_dir=str(tmp_path)).get('df') == {'rows': [1, 2, 3]}
+
+
+def test_single_flight_threads(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path))
+    calls = []
+    gate = threading.Event()
+
+    def compute():
+        calls.append(1)
+        gate.wait(1)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', compute, 30)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert results == ['value'] * 8
+    assert len(calls) == 1
+    assert cache.get_stats()['coalesced'] == 7
+
+
+def test_single_flight_async_and_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(cm, 'cache_manager', CacheManager(cache_dir=str(tmp_path)))
+    calls = []
+
+    @cached(ttl=30)
+    async def indicators(symbol):
+        calls.append(symbol)
+        await asyncio.sleep(0.01)
+        if symbol == 'BAD':
+            raise ValueError(symbol)
+        return {'symbol': symbol}
+
+    async def run():
+        ok = await asyncio.gather(*(indicators('BTCUSDT') for _ in range(10)))
+        bad = await asyncio.gather(*(indicators('BAD') for _ in range(3)), return_exceptions=True)
+        return ok, bad
+
+    ok, bad = asyncio.run(run())
+    assert ok == [{'symbol': 'BTCUSDT'}] * 10
+    assert all(isinstance(e, ValueError) for e in bad)
+    assert calls == ['BTCUSDT', 'BAD']
+    assert cm.cache_manager.get_stats()['coalesced'] == 11
+
+
+def test_stale_while_revalidate(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path))
+    versions = iter(['v1', 'v2'])
+    refreshed = threading.Event()
+
+    def compute():
+        value = next(versions)
+        if value == 'v2':
+            refreshed.set()
+        return value
+
+    assert cache.get_or_compute('k', compute, ttl=30, stale_ttl=60) == 'v1'
+    cache.memory_cache['k']['expires'] = time.time() - 1
+
+    assert cache.get_or_compute('k', compute, ttl=30, stale_ttl=60) == 'v1'
+    assert refreshed.wait(1)
+    for _ in range(100):
+        if cache.get('k') == 'v2':
+            break
+        time.sleep(0.01)
+    assert cache.get('k') == 'v2'
+    stats = cache.get_stats()
+    assert stats['stale_served'] == 1 and stats['refreshes'] == 1
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Tests del motor de calibración: paridad de los tres calibradores con sus
+bucles por vela originales, tabla memo, pool de procesos, checkpoint /
+reanudación y successive halving, con velas sintéticas sin red
+"""
+
+from itertools import product
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from adaptive_calibration_system import AdaptiveCalibrationSystem
+from calibration_engine import CHECKPOINT_VERSION, CalibrationEngine, rungs_by_period
+from quick_adaptive_calibration import QuickAdaptiveCalibration
+from system_calibration import SystemCalibrator
+
+SYMBOLS = ['BTC-USD', 'ETH-USD']
+
+
+def with_market_data(calibrator, ohlcv):
+    """market_data como lo deja load_market_data: (símbolo -> período -> velas con indicadores)"""
+    calibrator.market_data = {}
+    for seed, symbol in enumerate(SYMBOLS, 1):
+        # Velas diarias de yfinance con tendencias alternas de 25 días
+        df = ohlcv(seed=seed, start='2024-01-01', end='2024-09-30', freq='D', tz='UTC', name='Date',
+                   vol=0.03, drift=0.006, regime=25, wick=0.03)
+        calibrator.market_data[symbol] = {
+            period['name']: calibrator.prepare_indicators(
+                df[(df.index >= pd.Timestamp(period['start'], tz='UTC')) &
+                   (df.index < pd.Timestamp(period['end'], tz='UTC'))].copy())
+            for period in calibrator.calibration_periods
+        }
+    return calibrator
+
+
+def small_grid():
+    ranges = {
+        'min_score': [4.0, 6.0, 6.5],
+        'stop_loss_pct': [0.03, 0.05],
+        'take_profit_pct': [0.10, 0.20],
+        'position_size_pct': [0.02],
+        'leverage_base': [1, 3],
+        'rsi_oversold': [30, 40],
+        'rsi_overbought': [60, 70],
+    }
+    return [dict(zip(ranges, values)) for values in product(*ranges.values())]
+
+
+def reference(calibrator, params, unit):
+    """Bucle por vela original de cada calibrador"""
+    symbol, period_name = unit
+    data = calibrator.market_data[symbol][period_name]
+    if isinstance(calibrator, SystemCalibrator):
+        return calibrator.backtest_with_params(symbol, data, params, vectorized=False)
+    if isinstance(calibrator, AdaptiveCalibrationSystem):
+        return calibrator.backtest_with_params(symbol, data, params, period_name, vectorized=False)
+    market_type = next(p['type'] for p in calibrator.calibration_periods if p['name'] == period_name)
+    return calibrator.backtest_with_config(symbol, data, params, market_type, vectorized=False)
+
+
+@pytest.mark.parametrize('calibrator_class', [SystemCalibrator, AdaptiveCalibrationSystem, QuickAdaptiveCalibration])
+@pytest.mark.parametrize('workers', [1, 2])
+def test_engine_matches_per_bar_loops(ohlcv, calibrator_class, workers):
+    calibrator = with_market_data(calibrator_class(workers=workers), ohlcv)
+    grid = calibrator.test_configs if calibrator_class is QuickAdaptiveCalibration else small_grid()
+    engine = CalibrationEngine(calibrator, workers=workers, verbose=False)
+
+    results = engine.evaluate(grid)
+
+    units = calibrator.calibration_units()
+    assert len(units) == len(SYMBOLS) * 3
+    total_trades = 0
+    for params, result in zip(grid, results):
+        expected = calibrator.summarize(params, [(unit, reference(calibrator, params, unit)) for unit in units])
+        assert result['trades'] == expected['trades']
+        assert result['metrics'] == expected['metrics']
+        total_trades += len(result['trades'])
+    assert total_trades > 0
+    assert engine.stats['evaluated'] == len(grid) * len(units)
+
+
+def test_memo_shared_across_adaptive_iterations(ohlcv):
+    calibrator = with_market_data(AdaptiveCalibrationSystem(workers=1), ohlcv)
+    engine = CalibrationEngine(calibrator, workers=1, verbose=False)
+    grid = small_grid()
+    first = engine.evaluate(grid)
+    evaluated = engine.stats['evaluated']
+
+    # Un rango refinado que repite la mitad de las combinaciones
+    refined = grid[::2] + [dict(grid[0], stop_loss_pct=0.04)]
+    again = engine.evaluate(refined)
+    assert engine.stats['evaluated'] == evaluated + len(calibrator.calibration_units())
+    assert again[:-1] == first[::2]
+
+    # run_iteration con el motor compartido no re-simula nada ya evaluado
+    config = {'iteration': 2, 'param_ranges': {k: sorted({p[k] for p in grid}) for k in grid[0]},
+              'target_metrics': {'min_win_rate': 0, 'min_profit_factor': 0, 'min_trades': 1, 'min_return': -1e9}}
+    best = calibrator.run_iteration(config, engine)
+    assert engine.stats['evaluated'] == evaluated + len(calibrator.calibration_units())
+    assert best and best == sorted(best, key=lambda c: c['score'], reverse=True)
+
+
+def test_checkpoint_resume(ohlcv, tmp_path):
+    path = str(tmp_path / 'calibration.pkl')
+    calibrator = with_market_data(SystemCalibrator(workers=1), ohlcv)
+    grid = small_grid()
+    units = len(calibrator.calibration_units())
+
+    partial = CalibrationEngine(calibrator, workers=1, checkpoint_path=path, tag='t', verbose=False)
+    partial.evaluate(grid[:10])
+
+    # Interrupción a mitad de un bloque: bytes sueltos al final del fichero
+    with open(path, 'ab') as f:
+        f.write(b'\x80\x05\x95garbage')
+
+    resumed = CalibrationEngine(calibrator, workers=2, checkpoint_path=path, tag='t', verbose=False)
+    assert resumed.stats['resumed'] == 10 * units
+    results = resumed.evaluate(grid)
+    assert resumed.stats['evaluated'] == (len(grid) - 10) * units
+
+    fresh = CalibrationEngine(calibrator, workers=1, verbose=False).evaluate(grid)
+    assert [r['metrics'] for r in results] == [r['metrics'] for r in fresh]
+
+    complete = CalibrationEngine(calibrator, workers=1, checkpoint_path=path, tag='t', verbose=False)
+    assert complete.stats['resumed'] == len(grid) * units
+    complete.evaluate(grid)
+    assert complete.stats['evaluated'] == 0
+
+    with pytest.raises(ValueError):
+        CalibrationEngine(calibrator, checkpoint_path=path, tag='otro', verbose=False)
+
+
+def test_checkpoint_tag_covers_grid_periods_and_version(ohlcv, tmp_path):
+    path = str(tmp_path / 'calibration.pkl')
+    calibrator = with_market_data(SystemCalibrator(workers=1, checkpoint_path=path), ohlcv)
+    engine = calibrator.create_engine()
+    assert engine.tag.startswith(f"v{CHECKPOINT_VERSION}:SystemCalibrator:")
+    engine.evaluate(small_grid()[:2])
+
+    calibrator.param_ranges = dict(calibrator.param_ranges, min_score=[5.0])
+    with pytest.raises(ValueError):
+        calibrator.create_engine()
+
+    calibrator.param_ranges = SystemCalibrator().param_ranges
+    calibrator.calibration_periods[0] = dict(calibrator.calibration_periods[0], end='2024-03-15')
+    with pytest.raises(ValueError):
+        calibrator.create_engine()
+
+
+def test_successive_halving_prunes_after_first_period(ohlcv):
+    calibrator = with_market_data(SystemCalibrator(workers=1), ohlcv)
+    grid = small_grid()
+    units = calibrator.calibration_units()
+    periods = [p['name'] for p in calibrator.calibration_periods]
+    rungs = rungs_by_period(units, periods)
+    assert [len(r) for r in rungs] == [2, 4, 6]
+
+    engine = CalibrationEngine(calibrator, workers=1, halving_eta=3, verbose=False)
+    results = engine.evaluate(grid, rungs=rungs)
+    survivors = [i for i, r in enumerate(results) if r is not None]
+    assert len(survivors) == int(np.ceil(np.ceil(len(grid) / 3) / 3))
+    assert engine.stats['pruned'] == len(grid) - len(survivors)
+    assert engine.stats['evaluated'] < len(grid) * len(units) / 2
+
+    # Los supervivientes son los mejores del primer período y su resultado es el completo
+    first_period = CalibrationEngine(calibrator, workers=1, verbose=False)
+    first_period.evaluate(grid)
+    scores = [calibrator.rank(first_period._summarize(params, rungs[0])) for params in grid]
+    cutoff = sorted(scores, reverse=True)[int(np.ceil(len(grid) / 3)) - 1]
+    assert all(scores[i] >= cutoff for i in survivors)
+    full = first_period.evaluate(grid)
+    assert all(results[i] == full[i] for i in survivors)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests del candle store con un exchange simulado (sin red)
+"""
+
+import numpy as np
+
+from candle_store import CandleStore, MAX_LIMIT, interval_to_ms
+
+STEP = interval_to_ms('15m')
+T0 = 1_700_000_100_000 - 1_700_000_100_000 % STEP
+
+
+class FakeExchange:
+    """Serie sintética de velas de 15m con contador de requests"""
+
+    def __init__(self):
+        self.now = (T0 + 3000 * STEP) / 1000 + 60  # 1 min dentro de la vela 3000
+        self.calls = []
+
+    def clock(self):
+        return self.now
+
+    def fetch(self, symbol, interval, start_ms, limit):
+        self.calls.append((start_ms, limit))
+        now_ms = int(self.now * 1000)
+        rows = []
+        t = max(start_ms, T0)
+        t += (-(t - T0)) % STEP
+        while t <= now_ms and len(rows) < limit:
+            i = (t - T0) // STEP
+            price = 100.0 + i
+            rows.append([t, price, price + 1, price - 1, price + 0.5, 10.0 + i])
+            t += STEP
+        return rows
+
+
+def make_store(tmp_path, exchange):
+    return CandleStore(exchange.fetch, data_dir=str(tmp_path), live_ttl=5.0, clock=exchange.clock)
+
+
+def test_initial_sync_pages_past_limit(tmp_path):
+    exchange = FakeExchange()
+    store = make_store(tmp_path, exchange)
+
+    df = store.get_dataframe('BTCUSDT', '15m', 2500)
+
+    assert len(df) == 2500
+    assert len(exchange.calls) == 3
+    assert all(limit == MAX_LIMIT for _, limit in exchange.calls)
+    assert np.all(np.diff(df.index.asi8 // 1_000_000) == STEP)
+    # La última fila es la vela en formación
+    assert df.index[-1].value // 1_000_000 == T0 + 3000 * STEP
+
+
+def test_incremental_tail_and_live_ttl(tmp_path):
+    exchange = FakeExchange()
+    store = make_store(tmp_path, exchange)
+    store.get_window('BTCUSDT', '15m', 500)
+    calls_after_first = len(exchange.calls)
+
+    # Dentro de live_ttl no se consulta el exchange
+    exchange.now += 2
+    store.get_window('BTCUSDT', '15m', 500)
+    assert len(exchange.calls) == calls_after_first
+
+    # Cierra una vela: sólo se pide la cola desde la última cerrada
+    exchange.now += STEP / 1000
+    window = store.get_window('BTCUSDT', '15m', 500)
+    assert len(exchange.calls) == calls_after_first + 1
+    assert exchange.calls[-1][0] == T0 + 3000 * STEP
+    assert window[-1, 0] == T0 + 3000 * STEP
+    assert store.last_closed_time('BTCUSDT', '15m') == T0 + 3000 * STEP
+
+
+def test_persistence_and_backfill(tmp_path):
+    exchange = FakeExchange()
+    make_store(tmp_path, exchange).get_window('BTCUSDT', '15m', 100)
+
+    reopened = make_store(tmp_path, exchange)
+    window = reopened.get_window('BTCUSDT', '15m', 300)
+
+    assert len(window) == 300
+    assert np.all(np.diff(window[:, 0]) == STEP)
+    # Los valores coinciden con la serie original
+    first_index = (window[0, 0] - T0) // STEP
+    assert window[0, 1] == 100.0 + first_index
+
+
+def test_window_is_zero_copy_view(tmp_path):
+    exchange = FakeExchange()
+    store = make_store(tmp_path, exchange)
+
+    window = store.get_window('BTCUSDT', '15m', 200)
+
+    assert isinstance(window.base, np.memmap) or isinstance(window, np.memmap)
+    assert not window.flags.writeable
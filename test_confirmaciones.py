@@ -133,6 +133,7 @@ class TesterConfirmaciones:
         try:
             # Ejecutar backtesting
             backtest = BacktestingIntegrado(capital_inicial=10000)
+            backtest.config['batch_scoring'] = False  # El batch no pasa por los métodos parcheados
             trades = backtest.run_backtest(tickers=tickers, periods_days=periods_days)
             
             if trades:
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests del perfil de volumen vectorizado y del detector de pools de liquidez:
+paridad con los cálculos bucle a bucle y actualización incremental
+"""
+
+import numpy as np
+import pytest
+
+from liquidity_pools import LiquidityPoolDetector
+from volume_profile import RollingVolumeProfile, volume_profile
+
+
+def with_flat_candles(df, step=37):
+    """Velas sin rango (High == Low) cada `step` velas"""
+    df.iloc[::step, df.columns.get_loc('High')] = df['Low'].iloc[::step].to_numpy()
+    return df
+
+
+def naive_profile(df, n_bins=50):
+    """Reparto proporcional vela a vela y bin a bin"""
+    lo, hi = df['Low'].min(), df['High'].max()
+    edges = lo + np.arange(n_bins + 1) * ((hi - lo) / n_bins)
+    volumes = np.zeros(n_bins)
+    for low, high, volume in zip(df['Low'], df['High'], df['Volume']):
+        if high == low:
+            volumes[min(np.searchsorted(edges, low, side='right') - 1, n_bins - 1)] += volume
+            continue
+        for b in range(n_bins):
+            overlap = min(high, edges[b + 1]) - max(low, edges[b])
+            if overlap > 0:
+                volumes[b] += volume * overlap / (high - low)
+    return (edges[:-1] + edges[1:]) / 2, volumes
+
+
+def loop_pools(detector, volume_nodes, current_price):
+    """Cálculo anterior de las liquidaciones (bucle nodos x leverages)"""
+    pools = {'above_price': [], 'below_price': []}
+    for node in volume_nodes:
+        for leverage in detector.common_leverages:
+            for side, direction in [('below_price', 'LONG'), ('above_price', 'SHORT')]:
+                liq = detector.calculate_liquidation_levels(node['price'], leverage, direction)
+                if abs(liq - current_price) / current_price < 0.20:
+                    pools[side].append({'price': liq, 'leverage': leverage, 'entry_price': node['price'],
+                                        'strength': node['normalized'] * (100 / leverage),
+                                        'type': f'{direction}_LIQUIDATION',
+                                        'distance_pct': ((liq - current_price) / current_price) * 100})
+    return pools
+
+
+def loop_cluster(prices, tolerance):
+    """Cálculo anterior del clustering (media recalculada en cada paso)"""
+    prices = sorted(prices)
+    clusters, current = [], [prices[0]]
+    for price in prices[1:]:
+        avg = sum(current) / len(current)
+        if abs(price - avg) / avg < tolerance:
+            current.append(price)
+        else:
+            if len(current) >= 2:
+                clusters.append(current)
+            current = [price]
+    if len(current) >= 2:
+        clusters.append(current)
+    return clusters
+
+
+def test_profile_matches_proportional_loop(ohlcv):
+    df = with_flat_candles(ohlcv(300, seed=3, wick=0.015))
+    prices, volumes = volume_profile(df['Low'], df['High'], df['Volume'])
+    expected_prices, expected_volumes = naive_profile(df)
+
+    np.testing.assert_allclose(prices, expected_prices)
+    np.testing.assert_allclose(volumes, expected_volumes, rtol=1e-9, atol=1e-6)
+    assert volumes.sum() == pytest.approx(df['Volume'].sum())
+
+
+def test_rolling_profile_matches_full_rebuild(ohlcv):
+    df = with_flat_candles(ohlcv(400, seed=3, wick=0.015))
+    rolling = RollingVolumeProfile(50)
+    assert not rolling.sync(df.iloc[:200])
+
+    for end in range(201, 400, 7):
+        window = df.iloc[end - 150:end] if end > 300 else df.iloc[:end]
+        assert rolling.sync(window)
+        prices, volumes = rolling.profile()
+        expected_prices, expected_volumes = volume_profile(window['Low'], window['High'], window['Volume'])
+        np.testing.assert_allclose(prices, expected_prices)
+        np.testing.assert_allclose(volumes, expected_volumes, rtol=1e-9, atol=1e-6)
+    assert rolling.stats['rebuilds'] == 1
+
+    # Tick: sólo cambia la vela en formación
+    ticked = window.copy()
+    ticked.iloc[-1, ticked.columns.get_loc('High')] += 5
+    ticked.iloc[-1, ticked.columns.get_loc('Volume')] += 500
+    assert rolling.sync(ticked)
+    np.testing.assert_allclose(rolling.profile()[1],
+                               volume_profile(ticked['Low'], ticked['High'], ticked['Volume'])[1],
+                               rtol=1e-9, atol=1e-6)
+
+    # Serie distinta (no continúa la ventana): se reconstruye
+    assert not rolling.sync(df.iloc[:100])
+
+
+def test_pools_match_loop_and_incremental_detector(ohlcv):
+    df = with_flat_candles(ohlcv(300, seed=3, wick=0.015))
+    detector = LiquidityPoolDetector()
+    current_price = float(df['Close'].iloc[-1])
+    nodes = detector.find_volume_nodes(df)
+    assert nodes and all(n['normalized'] > 0.5 for n in nodes)
+    assert [n['volume'] for n in nodes] == sorted((n['volume'] for n in nodes), reverse=True)
+    assert detector.liquidation_pools(nodes, current_price) == loop_pools(detector, nodes, current_price)
+
+    full = detector.detect_liquidity_pools(df, current_price)
+    detector.detect_liquidity_pools(df.iloc[:250], current_price, symbol='BTC-USD')
+    incremental = detector.detect_liquidity_pools(df, current_price, symbol='BTC-USD')
+    for key in ['volume_nodes', 'heatmap']:
+        assert [p['price'] for p in incremental[key]] == pytest.approx([p['price'] for p in full[key]])
+    assert detector._profiles['BTC-USD'].stats['rebuilds'] == 1
+
+
+def test_cluster_sweep_matches_running_mean_loop():
+    rng = np.random.default_rng(11)
+    prices = list(100 * (1 + np.cumsum(rng.uniform(0, 0.004, 200))))
+    rng.shuffle(prices)
+    pools = {'above_price': [{'price': p, 'strength': 1.0, 'leverage': 10, 'distance_pct': 0.0}
+                             for p in prices],
+             'below_price': []}
+
+    clustered = LiquidityPoolDetector().cluster_liquidity_levels(pools, tolerance=0.005)
+    expected = loop_cluster(prices, 0.005)
+    assert [c['num_levels'] for c in clustered['above_price']] == [len(c) for c in expected]
+    assert [c['price'] for c in clustered['above_price']] == [sum(c) / len(c) for c in expected]
+    assert clustered['below_price'] == []
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Tests del despachador de notificaciones contra un servidor HTTP local:
+encolado sin bloquear, digest en ráfagas, rate limit, reintentos y 429
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import trade_tracker
+from notification_dispatcher import ChannelLimits, NotificationDispatcher, TelegramChatChannel, TokenBucket
+from price_watcher import PriceWatcher
+from signal_manager import DiscordWebhook, SignalManager, TelegramNotifier, TradingSignal
+
+
+class StubServer:
+    """Servidor HTTP local: registra peticiones y responde según un guion"""
+
+    def __init__(self, responses=None, delay=0.0):
+        self.requests = []
+        self.responses = list(responses or [])
+        self.delay = delay
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stub.requests.append((self.path, body, time.monotonic()))
+                time.sleep(stub.delay)
+                status, payload, headers = stub.responses.pop(0) if stub.responses else (200, {'ok': True}, {})
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(json.dumps(payload).encode())
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def make_signal(ticker='BTC-USD'):
+    return TradingSignal(timestamp='2024-01-01T00:00:00', ticker=ticker, action='BUY_LONG', price=100.0,
+                         stop_loss=99.0, take_profit=102.5, score=7.5, direccion='LONG', timeframe='1H')
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = NotificationDispatcher(timeout=2, backoff_base=0.01)
+    yield dispatcher
+    dispatcher.close()
+
+
+def test_submit_does_not_wait_for_slow_endpoint(dispatcher):
+    stub = StubServer(delay=0.3)
+    channel = TelegramChatChannel('T', '1', base_url=f"{stub.url}/botT")
+    start = time.perf_counter()
+    future = dispatcher.submit(channel, channel.render('hola'))
+    assert time.perf_counter() - start < 0.1
+
+    assert future.result(5) is True
+    assert stub.requests[0][:2] == ('/botT/sendMessage', {'chat_id': '1', 'text': 'hola', 'parse_mode': 'HTML'})
+    stub.close()
+
+
+def test_burst_is_rate_limited_and_batched_into_digests(dispatcher):
+    stub = StubServer()
+    channel = TelegramChatChannel('T', '1', base_url=f"{stub.url}/botT")
+    channel.limits = ChannelLimits(rate=5.0, burst=1, max_batch=4)
+    futures = [dispatcher.submit(channel, channel.render(f"msg {i}")) for i in range(9)]
+    assert dispatcher.flush(10)
+
+    assert all(f.result() for f in futures)
+    texts = [body['text'] for _, body, _ in stub.requests]
+    assert 3 <= len(texts) <= 4 and any(t.startswith('📦 4 notificaciones') for t in texts)
+    delivered = [line for t in texts for line in t.split('\n\n') if line.startswith('msg')]
+    assert delivered == [f"msg {i}" for i in range(9)]
+    gaps = [b[2] - a[2] for a, b in zip(stub.requests, stub.requests[1:])]
+    assert min(gaps) >= 0.15
+    stub.close()
+
+
+def test_parse_modes_are_not_mixed_in_a_digest(dispatcher):
+    stub = StubServer(delay=0.2)
+    channel = TelegramChatChannel('T', '1', base_url=f"{stub.url}/botT")
+    channel.limits = ChannelLimits(rate=100.0, burst=1, max_batch=10)
+    dispatcher.submit(channel, channel.render('first'))
+    time.sleep(0.1)   # 'first' en vuelo: el resto se acumula
+    for i, mode in enumerate(['HTML', 'HTML', 'Markdown', 'HTML']):
+        dispatcher.submit(channel, channel.render(f"m{i}", mode))
+    dispatcher.flush(10)
+
+    assert [body['parse_mode'] for _, body, _ in stub.requests] == ['HTML', 'HTML', 'Markdown', 'HTML']
+    assert stub.requests[1][1]['text'] == '📦 2 notificaciones\n\nm0\n\nm1'
+    stub.close()
+
+
+def test_retries_server_errors_and_honours_retry_after(dispatcher):
+    stub = StubServer(responses=[(500, {}, {}),
+                                 (429, {'ok': False, 'parameters': {'retry_after': 0.3}}, {}),
+                                 (200, {'ok': True}, {})])
+    channel = TelegramChatChannel('T', '1', base_url=f"{stub.url}/botT")
+    assert dispatcher.submit(channel, channel.render('x')).result(5) is True
+
+    assert len(stub.requests) == 3
+    assert stub.requests[2][2] - stub.requests[1][2] >= 0.3
+    stats = dispatcher.get_stats()['channels'][0]
+    assert stats['retries'] == 2 and stats['rate_limited'] == 1 and stats['sent'] == 1
+    stub.close()
+
+
+def test_client_errors_are_not_retried(dispatcher):
+    stub = StubServer(responses=[(400, {'ok': False}, {})])
+    channel = TelegramChatChannel('T', '1', base_url=f"{stub.url}/botT")
+    assert dispatcher.submit(channel, channel.render('x')).result(5) is False
+    assert len(stub.requests) == 1
+    stub.close()
+
+
+def test_bounded_queue_drops_oldest(dispatcher):
+    stub = StubServer(delay=0.3)
+    channel = TelegramChatChannel('T', '1', base_url=f"{stub.url}/botT")
+    channel.limits = ChannelLimits(rate=100.0, burst=1, max_batch=1, queue_size=2)
+    first = dispatcher.submit(channel, channel.render('first'))
+    time.sleep(0.1)   # 'first' en vuelo
+    futures = [dispatcher.submit(channel, channel.render(f"m{i}")) for i in range(4)]
+    dispatcher.flush(10)
+
+    assert first.result() is True
+    assert [f.result() for f in futures] == [False, False, True, True]
+    assert [body['text'] for _, body, _ in stub.requests] == ['first', 'm2', 'm3']
+    stub.close()
+
+
+def test_token_bucket_pause():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.delay() == 0
+    bucket.pause(1.0)
+    assert 0.9 < bucket.delay() <= 1.0
+
+
+def test_signal_manager_broadcast_is_async_and_renders_at_enqueue(tmp_path, monkeypatch, dispatcher):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(trade_tracker, 'get_price_watcher', lambda: PriceWatcher(dict, autostart=False))
+    tracker = trade_tracker.TradeTracker()
+    monkeypatch.setattr(trade_tracker, 'get_trade_tracker', lambda: tracker)
+    stub = StubServer(delay=0.2)
+    config = tmp_path / 'signal_config.json'
+    config.write_text(json.dumps({'telegram': {'enabled': True, 'bot_token': 'T', 'chat_id': '9'},
+                                  'discord': {'enabled': True, 'webhook_url': f"{stub.url}/discord"}}))
+    manager = SignalManager(str(config))
+    manager.dispatcher = dispatcher
+    telegram = next(c for c in manager.channels if isinstance(c, TelegramNotifier))
+    telegram.base_url = f"{stub.url}/botT"
+    assert any(isinstance(c, DiscordWebhook) for c in manager.channels)
+
+    signal = make_signal()
+    signal.format_message = lambda: "formato personalizado"
+    start = time.perf_counter()
+    results = manager.broadcast_signal(signal)
+    assert time.perf_counter() - start < 0.15
+    assert results == {'TelegramNotifier': True, 'DiscordWebhook': True}
+    del signal.format_message   # como signal_bot_advanced: se restaura tras encolar
+
+    dispatcher.flush(10)
+    bodies = {path: body for path, body, _ in stub.requests}
+    assert bodies['/botT/sendMessage']['text'] == "formato personalizado"
+    assert 'reply_markup' in bodies['/botT/sendMessage']
+    assert bodies['/discord']['embeds'][0]['title'] == 'LONG Signal - BTC-USD'
+
+    waited = manager.broadcast_signal(make_signal('ETH-USD'), wait=True)
+    assert waited == {'TelegramNotifier': True, 'DiscordWebhook': True}
+    stub.close()
+
+
+def test_digests_split_between_messages_under_telegram_limit(dispatcher):
+    stub = StubServer(delay=0.2)
+    channel = TelegramChatChannel('T', '1', base_url=f"{stub.url}/botT")
+    channel.limits = ChannelLimits(rate=100.0, burst=1, max_batch=8)
+    dispatcher.submit(channel, channel.render('first'))
+    time.sleep(0.1)   # 'first' en vuelo: el resto se acumula
+    messages = [f"<b>{i}</b> " + "x" * 1500 for i in range(6)]
+    futures = [dispatcher.submit(channel, channel.render(m)) for m in messages]
+    dispatcher.flush(10)
+
+    assert all(f.result() for f in futures)
+    texts = [body['text'] for _, body, _ in stub.requests[1:]]
+    assert len(texts) == 3 and all(len(t) <= 4096 for t in texts)
+    delivered = [part for t in texts for part in t.split('\n\n') if part.startswith('<b>')]
+    assert delivered == messages
+
+
+def test_signal_digest_header_and_split(dispatcher):
+    notifier = TelegramNotifier('T', '1')
+    items = [notifier.render(make_signal(f"T{i}")) for i in range(8)]
+    assert notifier.build_request(items[:2])['json']['text'].startswith('📦 *2 señales*\n')
+    assert notifier.fits(items[:8]) is (len(notifier.digest_text(items)) <= 4096)
+
+    items[0]['text'] = 'y' * 4000
+    assert notifier.fits(items[:1]) and not notifier.fits(items[:2])
+
+
+def test_send_message_can_wait_for_delivery(dispatcher, monkeypatch):
+    import telegram_integration
+    monkeypatch.setattr(telegram_integration, 'get_notification_dispatcher', lambda: dispatcher)
+    stub = StubServer(responses=[(400, {'ok': False}, {})])
+    notifier = telegram_integration.TelegramNotifier('T', '1')
+    notifier.channel.base_url = f"{stub.url}/botT"
+
+    assert notifier.send_message('<b>roto', wait=True) is False
+    assert notifier.send_message('ok', wait=True) is True
+    assert notifier.send_message('encolado') is True
+    dispatcher.flush(10)
+    assert len(stub.requests) == 3
+    stub.close()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Tests del índice de pivotes compartido: primitivas vectorizadas, paridad de
+los detectores con sus bucles originales y extensión incremental por símbolo
+"""
+
+import numpy as np
+import pytest
+
+from advanced_signals import AdvancedSignalDetector
+from confirmaciones_sistema import ConfirmacionesModulares
+from entry_signals_optimizer import EntrySignalsOptimizer
+from pivot_index import PivotIndex, get_pivot_view, reset_pivot_indexes, strict_pivots
+from rsi_divergence_optimizado import RSIDivergenceOptimizado
+
+
+def candles(ohlcv, n=400):
+    """Velas sintéticas con un RSI aleatorio (lo leen los detectores de divergencias)"""
+    df = ohlcv(n, seed=7, vol=0.012, wick=0.008)
+    df['RSI'] = np.random.default_rng(7).uniform(20, 80, n)
+    return df
+
+
+@pytest.fixture(autouse=True)
+def fresh_indexes():
+    reset_pivot_indexes()
+    yield
+    reset_pivot_indexes()
+
+
+# Bucles de referencia (implementaciones anteriores a los detectores vectorizados)
+
+def loop_pivots(values, kind, order):
+    found = []
+    for i in range(order, len(values) - order):
+        others = [values[j] for j in range(i - order, i + order + 1) if j != i]
+        if (kind == 'low' and all(values[i] < o for o in others)) or \
+           (kind == 'high' and all(values[i] > o for o in others)):
+            found.append(i)
+    return found
+
+
+def loop_confirmation_blocks(df):
+    volume_ma = df['Volume'].rolling(20).mean()
+    blocks = []
+    for i in range(10, len(df) - 5):
+        bar, future = df.iloc[i], df.iloc[i + 1:i + 6]
+        if not bar['Volume'] > volume_ma.iloc[i] * 1.5:
+            continue
+        if future['Close'].iloc[-1] > bar['Close'] and future['Close'].min() >= bar['Low'] * 0.998:
+            kind = 'bullish'
+        elif future['Close'].iloc[-1] < bar['Close'] and future['Close'].max() <= bar['High'] * 1.002:
+            kind = 'bearish'
+        else:
+            continue
+        ratio = bar['Volume'] / volume_ma.iloc[i]
+        strength = 0.4 if ratio >= 3 else 0.25 if ratio >= 2 else 0.1 if ratio >= 1.5 else 0
+        reaction = abs(future['Close'].iloc[-1] - bar['Close']) / bar['Close']
+        strength += 0.3 if reaction >= 0.03 else 0.2 if reaction >= 0.015 else 0.1 if reaction >= 0.005 else 0
+        if kind == 'bullish' and bar['High'] > df['High'].iloc[i - 10:i].max() * 1.001:
+            strength += 0.3
+        if kind == 'bearish' and bar['Low'] < df['Low'].iloc[i - 10:i].min() * 0.999:
+            strength += 0.3
+        blocks.append((min(strength, 1.0), i, kind))
+    return sorted(blocks, reverse=True)[:5]
+
+
+def loop_structure_counts(df):
+    recent = df.tail(20)
+    hh = sum(recent['High'].iloc[i] > recent['High'].iloc[i - 3:i].max() for i in range(3, 17))
+    ll = sum(recent['Low'].iloc[i] < recent['Low'].iloc[i - 3:i].min() for i in range(3, 17))
+    return 'bullish_structure' if hh > ll + 1 else 'bearish_structure' if ll > hh + 1 else 'neutral'
+
+
+def loop_advanced_blocks(df):
+    blocks = []
+    for i in range(10, len(df) - 1):
+        exit_close = df.iloc[i + 1:i + 4]['Close'].iloc[-1]
+        close, open_ = df['Close'].iloc[i], df['Open'].iloc[i]
+        if close < open_ and (exit_close - close) / close > 0.02:
+            blocks.append(('BULLISH_OB', i, (exit_close - close) / close * 100))
+        if close > open_ and (close - exit_close) / close > 0.02:
+            blocks.append(('BEARISH_OB', i, (close - exit_close) / close * 100))
+    price = df['Close'].iloc[-1]
+    blocks.sort(key=lambda b: abs((df['High'].iloc[b[1]] + df['Low'].iloc[b[1]]) / 2 - price))
+    return blocks[:3]
+
+
+def loop_sweeps_and_gaps(df):
+    recent = df.tail(10)
+    sweeps = []
+    for i in range(3, len(recent) - 1):
+        bar, prev = recent.iloc[i], recent.iloc[i - 3:i]
+        if bar['High'] > prev['High'].max() and bar['Close'] < bar['Open']:
+            sweeps.append(('bullish_sweep', i))
+        if bar['Low'] < prev['Low'].min() and bar['Close'] > bar['Open']:
+            sweeps.append(('bearish_sweep', i))
+    gaps = []
+    for i in range(1, len(recent) - 1):
+        prev, nxt = recent.iloc[i - 1], recent.iloc[i + 1]
+        if prev['High'] < nxt['Low']:
+            gaps.append(('bullish_fvg', i))
+        elif prev['Low'] > nxt['High']:
+            gaps.append(('bearish_fvg', i))
+    return sweeps, gaps
+
+
+def test_primitives_match_pandas_and_loops(ohlcv):
+    df = candles(ohlcv, 200)
+    index = PivotIndex()
+    view = index.sync(df)
+    for stat in ['max', 'min', 'mean']:
+        np.testing.assert_allclose(view.rolling(stat, 'Volume', 20),
+                                   getattr(df['Volume'].rolling(20), stat)(), rtol=1e-12)
+    for kind, column in [('low', 'Low'), ('high', 'High')]:
+        for order in [1, 3, 5]:
+            expected = loop_pivots(list(df[column]), kind, order)
+            assert list(np.flatnonzero(strict_pivots(df[column].to_numpy(), kind, order))) == expected
+            assert list(view.pivots(kind, order)) == expected
+
+    # Ventana interior: mismos resultados que calcularla sobre el propio tramo
+    window = df.iloc[50:90]
+    inner = index.sync(window)
+    assert inner.start == 50 and list(inner.pivots('low', 3)) == loop_pivots(list(window['Low']), 'low', 3)
+    assert np.isnan(inner.rolling('max', 'High', 10)[:9]).all()
+
+
+def test_detectors_match_original_loops(ohlcv):
+    df = candles(ohlcv)
+    for end in [40, 120, 400]:
+        part = df.iloc[:end]
+        rsi = RSIDivergenceOptimizado()
+        tail = part.tail(20)
+        assert [t['index'] for t in rsi._find_price_troughs(tail)] == loop_pivots(list(tail['Low']), 'low', 3)
+        assert [p['index'] for p in rsi._find_price_peaks(tail)] == loop_pivots(list(tail['High']), 'high', 3)
+
+        confirmations = ConfirmacionesModulares()
+        blocks = confirmations._identify_order_blocks(part)
+        assert [(b['strength'], b['index'], b['type']) for b in blocks] == \
+            [(pytest.approx(s), i, k) for s, i, k in loop_confirmation_blocks(part)]
+        assert confirmations._analyze_market_structure(part) == loop_structure_counts(part)
+
+        advanced = AdvancedSignalDetector().find_order_blocks(part)
+        assert [(b['type'], b['index'], b['strength']) for b in advanced] == loop_advanced_blocks(part)
+
+        optimizer = EntrySignalsOptimizer()
+        sweeps, gaps = loop_sweeps_and_gaps(part)
+        result = optimizer._identify_liquidity_sweeps(part)
+        assert result['sweeps_count'] == len(sweeps)
+        assert (result['latest_sweep'] and (result['latest_sweep']['type'], result['latest_sweep']['index'])) == \
+            (sweeps[-1] if sweeps else None)
+        result = optimizer._identify_fair_value_gaps(part)
+        assert result['gaps_count'] == len(gaps)
+        assert (result['latest_gap'] and (result['latest_gap']['type'], result['latest_gap']['index'])) == \
+            (gaps[-1] if gaps else None)
+
+
+def test_index_extends_incrementally_per_symbol(ohlcv):
+    df = candles(ohlcv, 600)
+    df.attrs.update(symbol='SOLUSDT', interval='1h')
+    confirmations = ConfirmacionesModulares()
+
+    for i in range(150, 600, 3):
+        window = df.iloc[max(0, i - 100):i + 1]
+        cached = confirmations._identify_order_blocks(window)
+        plain = window.copy()
+        plain.attrs = {}
+        assert cached == confirmations._identify_order_blocks(plain)
+        # Vista de la cola dentro de la misma vela: sin recalcular
+        RSIDivergenceOptimizado()._find_price_troughs(window.tail(20))
+
+    view = get_pivot_view(window)
+    stats = view.index.stats
+    assert stats['rebuilds'] == 1 and stats['extensions'] == len(range(153, 600, 3))
+    assert stats['rows_updated'] == 3 * stats['extensions']
+
+    # Vela en formación: sólo se recalcula la última fila
+    live = window.copy()
+    live.iloc[-1, live.columns.get_loc('High')] *= 1.05
+    updated = get_pivot_view(live)
+    assert updated.values('High')[-1] == live['High'].iloc[-1]
+    assert stats['extensions'] == len(range(153, 600, 3)) + 1 and stats['rebuilds'] == 1
+
+    # Otra serie con las mismas marcas de tiempo: se reconstruye
+    other = window * 2
+    other.attrs.update(symbol='SOLUSDT', interval='1h')
+    assert get_pivot_view(other).values('Close')[-1] == other['Close'].iloc[-1]
+    assert stats['rebuilds'] == 2
+
+
+def test_view_survives_concurrent_resync_of_its_index(ohlcv):
+    df = candles(ohlcv)
+    index = PivotIndex()
+    first = df.iloc[:300]
+    view = index.view(first)
+    expected_max = first['High'].rolling(10).max().to_numpy()
+    shared_pivots = view.pivots('low', 3)
+
+    # Otro hilo sincroniza el mismo índice con otra ventana antes de la consulta
+    index.view(df.iloc[200:] * 1.1)
+    assert index.generation != view.generation
+
+    np.testing.assert_array_equal(view.values('Close'), first['Close'].to_numpy())
+    np.testing.assert_allclose(view.rolling('max', 'High', 10), expected_max, equal_nan=True)
+    np.testing.assert_array_equal(view.pivots('low', 3), shared_pivots)
+    assert list(view.pivots('low', 3)) == loop_pivots(first['Low'].to_numpy(), 'low', 3)
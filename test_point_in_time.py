@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Tests del replay point-in-time: ventanas as-of sin velas futuras, vista 4h
+precalculada, paridad del backtest V3 con las descargas por ventana y
+repetición offline desde disco
+"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import daily_trading_system_v3
+from daily_trading_system_v3 import DailyTradingSystemV3
+from point_in_time import PointInTimeSource, resample_ohlcv
+
+FIRST = pd.Timestamp('2024-09-01', tz='UTC')
+LAST = pd.Timestamp('2024-11-20', tz='UTC')
+STEPS = {'15m': '15min', '1h': 'h', '1d': 'D'}
+
+
+def make_series(symbol, interval):
+    """Velas sintéticas con tramos de tendencia fuerte (deterministas por símbolo)"""
+    index = pd.date_range(FIRST, LAST, freq=STEPS[interval], inclusive='left')
+    rng = np.random.default_rng(abs(hash((symbol, interval))) % 2**32)
+    hours = (index - FIRST) / pd.Timedelta(hours=1)
+    trend = 0.004 * np.sin(hours / 200 + len(symbol))
+    close = 100 * np.exp(np.cumsum(trend + rng.normal(0, 0.002, len(index))))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * 1.002,
+        'Low': np.minimum(open_, close) * 0.998,
+        'Close': close,
+        'Volume': rng.lognormal(10, 0.7, len(index)),
+    }, index=index)
+
+
+class FakeYahoo:
+    """Ticker.history de yfinance: velas con open time en [start, end)"""
+
+    def __init__(self):
+        self.series = {}
+        self.calls = 0
+        # Límites intradía de Yahoo: tramo máximo por petición y primer día servido
+        self.max_intraday_span = None
+        self.intraday_since = None
+
+    def frame(self, symbol, interval):
+        if (symbol, interval) not in self.series:
+            self.series[(symbol, interval)] = make_series(symbol, interval)
+        return self.series[(symbol, interval)]
+
+    def history(self, symbol, interval, start, end):
+        self.calls += 1
+        df = self.frame(symbol, interval)
+        start, end = (pd.Timestamp(t).tz_localize('UTC') if pd.Timestamp(t).tzinfo is None else pd.Timestamp(t)
+                      for t in (start, end))
+        if interval == '15m' and self.max_intraday_span is not None and end - start > self.max_intraday_span:
+            raise ValueError('15m data not available: the requested range must be within 60 days')
+        if interval == '15m' and self.intraday_since is not None and start < self.intraday_since:
+            return pd.DataFrame()   # yfinance devuelve un frame vacío
+        return df[(df.index >= start) & (df.index < end)]
+
+    def Ticker(self, symbol):
+        yahoo = self
+
+        class Ticker:
+            def history(self, start, end, interval):
+                return yahoo.history(symbol, interval, start, end)
+
+        return Ticker()
+
+
+@pytest.fixture
+def yahoo(monkeypatch):
+    fake = FakeYahoo()
+    monkeypatch.setattr(daily_trading_system_v3.yf, 'Ticker', fake.Ticker)
+    return fake
+
+
+def test_windows_only_contain_closed_candles(yahoo):
+    source = PointInTimeSource('2024-09-05', '2024-11-10', fetch=yahoo.history)
+    midnight = pd.Timestamp('2024-10-07')
+    start = midnight - timedelta(days=20)
+
+    hourly = source.history('BTC-USD', '1h', start, midnight)
+    pd.testing.assert_frame_equal(hourly, yahoo.history('BTC-USD', '1h', start, midnight))
+    pd.testing.assert_frame_equal(source.history('BTC-USD', '4h', start, midnight), resample_ohlcv(hourly, '4h'))
+
+    # As-of a mitad de vela: la vela en formación todavía no es visible
+    intraday = midnight + timedelta(hours=10, minutes=30)
+    window = source.history('BTC-USD', '1h', start, intraday)
+    assert window.index[-1] == pd.Timestamp('2024-10-07 09:00', tz='UTC')
+    assert source.history('BTC-USD', '4h', start, intraday).index[-1] == pd.Timestamp('2024-10-07 04:00', tz='UTC')
+    assert (source.history('BTC-USD', '1d', start, intraday).index < midnight.tz_localize('UTC')).all()
+
+    # Una descarga por serie; el 4h se remuestrea una sola vez
+    for day in range(30):
+        source.history('BTC-USD', '4h', start + timedelta(days=day), midnight + timedelta(days=day))
+    assert source.stats['fetches'] == 2 and source.stats['resamples'] == 1
+
+    # Fuera del rango cargado: se amplía con una descarga más
+    source.history('BTC-USD', '1h', '2024-09-02', '2024-09-04')
+    assert source.stats['fetches'] == 3
+
+
+def test_backtest_replay_matches_window_downloads(yahoo):
+    symbols = ['BTC-USD', 'ETH-USD', 'SOL-USD']
+    start, end = pd.Timestamp('2024-10-01'), pd.Timestamp('2024-11-15')
+
+    def run(system, **kwargs):
+        # Filtros relajados para que el replay genere operaciones comparables
+        system.params.update(min_momentum_strength=0.5, min_score=4)
+        np.random.seed(7)
+        return system.backtest_ultra_conservative(symbols, start, end, **kwargs)
+
+    per_window = DailyTradingSystemV3()
+    expected = run(per_window)
+    downloads = yahoo.calls
+    assert expected and downloads > 150
+
+    for day in [start + timedelta(days=d) for d in (0, 12, 33)]:
+        for symbol in symbols:
+            assert DailyTradingSystemV3(data_source=PointInTimeSource(
+                start - timedelta(days=30), end, fetch=yahoo.history)).calculate_multi_timeframe_indicators(
+                    symbol, day) == per_window.calculate_multi_timeframe_indicators(symbol, day)
+
+    source = PointInTimeSource(start, end, fetch=yahoo.history, lookback=DailyTradingSystemV3.REPLAY_LOOKBACK)
+    yahoo.calls = 0
+    replayed = run(DailyTradingSystemV3(data_source=source))
+    assert replayed == expected
+    assert yahoo.calls == len(symbols) * 3 and source.stats['fetches'] == len(symbols) * 3
+
+
+def test_intraday_limits_split_ranges_and_fall_back_per_window(yahoo, monkeypatch):
+    yahoo.max_intraday_span = timedelta(days=60)
+    yahoo.intraday_since = pd.Timestamp('2024-09-17', tz='UTC')   # "hoy" = 2024-11-16
+    symbols = ['BTC-USD', 'ETH-USD', 'SOL-USD']
+    start, end = pd.Timestamp('2024-09-20'), pd.Timestamp('2024-11-15')
+
+    def run(system, **kwargs):
+        system.params.update(min_momentum_strength=0.5, min_score=4)
+        np.random.seed(7)
+        return system.backtest_ultra_conservative(symbols, start, end, **kwargs)
+
+    expected = run(DailyTradingSystemV3())
+    monkeypatch.setattr('point_in_time.yfinance_history', yahoo.history)
+    system = DailyTradingSystemV3()
+    assert run(system, replay=True) == expected and expected
+
+    # Cada intervalo carga sólo su lookback; 15m llega en tramos de <= 60 días
+    source = system.data_source
+    assert source._series[('BTC-USD', '15m')][2] == start - timedelta(days=5)
+    assert source._series[('BTC-USD', '1h')][2] == start - timedelta(days=20)
+    gaps = source._series[('BTC-USD', '15m')][4]
+    assert len(gaps) == 1 and gaps[0][0] == start - timedelta(days=5)
+
+    # Ventanas recientes salen de la serie; las del hueco se descargan una a una
+    fetched = source.stats['window_fetches']
+    recent = source.history('BTC-USD', '15m', '2024-11-01', '2024-11-06')
+    pd.testing.assert_frame_equal(recent, yahoo.history('BTC-USD', '15m', '2024-11-01', '2024-11-06'))
+    assert source.stats['window_fetches'] == fetched
+    early = source.history('BTC-USD', '15m', '2024-09-17', '2024-09-19')
+    assert len(early) == 2 * 96 and source.stats['window_fetches'] == fetched + 1
+
+
+def test_cached_series_replay_offline(yahoo, tmp_path):
+    source = PointInTimeSource('2024-10-01', '2024-10-20', fetch=yahoo.history, cache_dir=str(tmp_path))
+    source.preload(['BTC-USD', 'ETH-USD'], ['1h', '15m'])
+    window = source.history('ETH-USD', '4h', '2024-10-05', '2024-10-15')
+
+    def offline(*args):
+        raise ConnectionError('sin red')
+
+    again = PointInTimeSource('2024-10-01', '2024-10-20', fetch=offline, cache_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(again.history('ETH-USD', '4h', '2024-10-05', '2024-10-15'), window)
+    assert again.stats['disk_loads'] == 1 and again.stats['fetches'] == 0
+
+    # Un rango que el disco no cubre sí necesita red
+    with pytest.raises(ConnectionError):
+        again.history('BTC-USD', '1h', '2024-09-10', '2024-10-02')
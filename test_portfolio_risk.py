@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Tests del motor de riesgo de cartera sobre un candle store simulado:
+covarianza incremental, VaR/CVaR, contribuciones, clusters y caché
+"""
+
+import time
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+from candle_store import CandleStore, interval_to_ms
+from portfolio_risk import PortfolioRiskEngine
+from risk_calculator import RiskCalculator
+from symbol_manager import symbol_manager
+
+STEP = interval_to_ms('1h')
+T0 = 1_700_000_000_000 - 1_700_000_000_000 % STEP
+HOURS = 900
+
+
+class FakeMarket:
+    """Cierres de 1h sintéticos: SOL y AVAX comparten factor, DOGE es independiente"""
+
+    def __init__(self):
+        rng = np.random.default_rng(5)
+        common = rng.normal(0, 0.01, HOURS + 400)
+        returns = {
+            'SOLUSDT': common + rng.normal(0, 0.004, len(common)),
+            'AVAXUSDT': common + rng.normal(0, 0.004, len(common)),
+            'DOGEUSDT': rng.normal(0, 0.015, len(common)),
+        }
+        self.closes = {s: 100 * np.cumprod(1 + r) for s, r in returns.items()}
+        self.now = (T0 + HOURS * STEP + 60_000) / 1000
+
+    def clock(self):
+        return self.now
+
+    def fetch(self, symbol, interval, start_ms, limit):
+        now_ms = int(self.now * 1000)
+        rows = []
+        t = max(start_ms, T0)
+        while t <= now_ms and len(rows) < limit:
+            if symbol in self.closes:
+                close = self.closes[symbol][(t - T0) // STEP]
+                rows.append([t, close, close, close, close, 1.0])
+            t += STEP
+        return rows
+
+
+@pytest.fixture
+def market(tmp_path):
+    market = FakeMarket()
+    store = CandleStore(market.fetch, data_dir=str(tmp_path), live_ttl=0, clock=market.clock)
+    for symbol in market.closes:
+        store.sync(symbol, '1h', min_candles=HOURS)
+    return market, store
+
+
+def aligned_returns(store, symbols, window):
+    closes = np.column_stack([np.asarray(store.closed_candles(s, '1h'))[:, 4] for s in symbols])
+    return (closes[1:] / closes[:-1] - 1)[-window:]
+
+
+def test_incremental_covariance_matches_full_window(market):
+    market, store = market
+    symbols = ['SOLUSDT', 'AVAXUSDT', 'DOGEUSDT']
+    engine = PortfolioRiskEngine(store, window=200)
+    engine.update(symbols)
+    symbols = engine.symbols
+    np.testing.assert_allclose(engine.covariance(), np.cov(aligned_returns(store, symbols, 200).T), rtol=1e-8)
+
+    for _ in range(250):   # más de una ventana completa de actualizaciones
+        market.now += 3600
+        for symbol in symbols:
+            store.sync(symbol, '1h')
+        engine.update()
+    np.testing.assert_allclose(engine.covariance(), np.cov(aligned_returns(store, symbols, 200).T), rtol=1e-8)
+    assert engine.stats['rebuilds'] == 1 and engine.stats['updates'] == 250
+
+
+def test_var_cvar_and_risk_contributions(market):
+    _, store = market
+    engine = PortfolioRiskEngine(store, window=300, horizon_bars=24)
+    exposures = {'SOLUSDT': 3000.0, 'AVAXUSDT': 2000.0, 'DOGEUSDT': -1500.0}
+    risk = engine.portfolio_risk(exposures)
+
+    returns = aligned_returns(store, list(exposures), 300)
+    w = np.array(list(exposures.values()))
+    sigma = np.sqrt(w @ np.cov(returns.T) @ w * 24)
+    mu = w @ returns.mean(axis=0) * 24
+    z = NormalDist().inv_cdf(0.95)
+    assert risk['volatility'] == pytest.approx(sigma)
+    assert risk['var'] == pytest.approx(z * sigma - mu)
+    assert risk['cvar'] == pytest.approx(sigma * NormalDist().pdf(z) / 0.05 - mu)
+    assert risk['cvar'] > risk['var']
+    assert sum(risk['risk_contribution'].values()) == pytest.approx(sigma)
+    assert sum(risk['risk_contribution_pct'].values()) == pytest.approx(100)
+
+    assert [c['symbols'] for c in risk['correlation_clusters']] == [['SOLUSDT', 'AVAXUSDT']]
+    assert risk['correlation_clusters'][0]['exposure_pct'] == pytest.approx(5000 / 6500 * 100)
+    assert engine.portfolio_risk({'DOGEUSDT': 1000.0})['correlation_risk'] == 0
+
+
+def test_results_are_cached_until_next_close(market):
+    market, store = market
+    engine = PortfolioRiskEngine(store)
+    exposures = {'SOLUSDT': 3000.0, 'AVAXUSDT': 2000.0}
+    first = engine.portfolio_risk(exposures)
+    assert engine.portfolio_risk(dict(reversed(list(exposures.items())))) is first
+    assert engine.stats['cache_hits'] == 1
+
+    market.now += 3600
+    for symbol in exposures:
+        store.sync(symbol, '1h')
+    refreshed = engine.portfolio_risk(exposures)
+    assert refreshed is not first and refreshed['close_time'] == first['close_time'] + STEP
+
+    assert engine.portfolio_risk({'SOLUSDT': 1.0, 'UNKNOWNUSDT': 1.0}) is None
+
+
+def test_risk_calculator_uses_engine_and_keeps_fallback(market):
+    _, store = market
+    calculator = RiskCalculator(PortfolioRiskEngine(store))
+    positions = [
+        {'symbol': 'SOLUSDT', 'size': 10, 'entry_price': 234.50, 'stop_loss': 228.00},
+        {'symbol': 'AVAXUSDT', 'size': 50, 'entry_price': 42.00, 'stop_loss': 40.00},
+    ]
+    risk = calculator.calculate_portfolio_risk(positions, 10000)
+    assert risk['correlation_risk'] > 0.8 and 'var' in risk
+    assert any('Exposición correlacionada' in w for w in risk['warnings'])
+
+    # Sin historia en el store: tabla de correlaciones de SymbolManager
+    fallback = calculator.calculate_portfolio_risk(
+        [{'symbol': 'LINKUSDT', 'size': 10, 'entry_price': 15.0, 'stop_loss': 14.0}], 10000)
+    assert 'var' not in fallback
+    assert fallback['correlation_risk'] == symbol_manager.calculate_portfolio_correlation_risk({'LINKUSDT': 150.0})
+
+    current = {'SOLUSDT': 2345.0, 'DOGEUSDT': 1000.0}
+    args = dict(entry_price=42.0, stop_loss=40.0, take_profit=48.0, position_size=50, capital=10000,
+                symbol='AVAXUSDT', current_positions=current)
+    validation = calculator.validate_trade_risk(**args)
+    assert validation['metrics']['portfolio_var_pct'] > 0
+
+    start = time.perf_counter()
+    for _ in range(200):
+        calculator.validate_trade_risk(**args)
+    assert (time.perf_counter() - start) / 200 < 0.001
+
+
+def test_short_trade_hedges_portfolio_var(market):
+    _, store = market
+    engine = PortfolioRiskEngine(store)
+    calculator = RiskCalculator(engine)
+    current = {'SOLUSDT': 4000.0, 'AVAXUSDT': 2000.0}
+    base_var = engine.portfolio_risk(current)['var'] / 10000 * 100
+    args = dict(entry_price=42.0, position_size=50, capital=10000, symbol='AVAXUSDT', current_positions=current)
+
+    long = calculator.validate_trade_risk(stop_loss=40.0, take_profit=48.0, **args)
+    short = calculator.validate_trade_risk(stop_loss=44.0, take_profit=36.0, **args)
+    assert short['metrics']['portfolio_var_pct'] < base_var < long['metrics']['portfolio_var_pct']
+
+    explicit = calculator.validate_trade_risk(stop_loss=44.0, take_profit=36.0, direction='SHORT', **args)
+    assert explicit['metrics']['portfolio_var_pct'] == short['metrics']['portfolio_var_pct']
+
+
+def test_hedged_book_nets_exposure_per_symbol(market):
+    _, store = market
+    calculator = RiskCalculator(PortfolioRiskEngine(store))
+    sol = {'symbol': 'SOLUSDT', 'size': 10, 'entry_price': 200.0, 'stop_loss': 190.0}
+    long_avax = {'symbol': 'AVAXUSDT', 'size': 50, 'entry_price': 40.0, 'stop_loss': 38.0}
+    short_avax = dict(long_avax, stop_loss=42.0)
+
+    unhedged = calculator.calculate_portfolio_risk([sol, long_avax], 10000)
+    hedged = calculator.calculate_portfolio_risk([sol, short_avax], 10000)
+    assert hedged['var'] < unhedged['var']
+    assert hedged['total_exposure'] == unhedged['total_exposure'] == 4000.0
+
+    # Dirección explícita por encima del stop; varias posiciones del mismo símbolo se suman
+    explicit = calculator.calculate_portfolio_risk([sol, dict(long_avax, side='SHORT')], 10000)
+    assert explicit['var'] == hedged['var']
+    split = calculator.calculate_portfolio_risk([dict(sol, size=4), dict(sol, size=6), short_avax], 10000)
+    assert split['var'] == pytest.approx(hedged['var'])
+    assert split['risk_distribution']['SOLUSDT'] == pytest.approx(hedged['risk_distribution']['SOLUSDT'])
+
+    # El libro Monte Carlo usa el mismo signo
+    mc_unhedged = calculator.suggest_position_adjustments([sol, long_avax], 10000, var_method='monte_carlo')
+    mc_hedged = calculator.suggest_position_adjustments([sol, short_avax], 10000, var_method='monte_carlo')
+    assert mc_hedged['monte_carlo']['var'] < mc_unhedged['monte_carlo']['var']
+
+
+def test_monte_carlo_matches_parametric_and_reuses_draws(market):
+    _, store = market
+    engine = PortfolioRiskEngine(store, window=300)
+    exposures = {'SOLUSDT': 3000.0, 'AVAXUSDT': 2000.0, 'DOGEUSDT': -1500.0}
+    parametric = engine.portfolio_risk(exposures)
+    mc = engine.monte_carlo_risk(exposures, n_paths=200_000, seed=1)
+
+    assert mc['simulated'] and mc['var'] == pytest.approx(parametric['var'], rel=0.03)
+    assert mc['expected_shortfall'] == pytest.approx(parametric['cvar'], rel=0.03)
+
+    # Misma vela: los trades candidatos reutilizan los escenarios
+    candidates = [dict(exposures, LINKUSDT=0), dict(exposures, SOLUSDT=4000.0), {'DOGEUSDT': 500.0}]
+    batch = engine.monte_carlo_batch(candidates, n_paths=200_000, seed=1)
+    assert not any(r['simulated'] for r in batch) and engine.stats['mc_simulations'] == 1
+    assert batch[0]['var'] == mc['var'] and batch[1]['var'] > mc['var']
+
+    # Reproducible: otra instancia con la misma semilla da los mismos escenarios
+    again = PortfolioRiskEngine(store, window=300).monte_carlo_risk(exposures, n_paths=200_000, seed=1)
+    assert again['var'] == mc['var']
+    assert engine.monte_carlo_risk(exposures, n_paths=200_000, seed=2)['var'] != mc['var']
+
+    # Presupuesto de latencia insuficiente: no se simula
+    assert engine.monte_carlo_risk(exposures, n_paths=10_000_000, seed=3, latency_budget=1e-4) is None
+
+
+def test_risk_calculator_monte_carlo_mode(market):
+    _, store = market
+    calculator = RiskCalculator(PortfolioRiskEngine(store))
+    current = {'SOLUSDT': 4000.0, 'DOGEUSDT': 1000.0}
+    args = dict(entry_price=42.0, stop_loss=40.0, take_profit=48.0, position_size=50, capital=10000,
+                symbol='AVAXUSDT', current_positions=current, var_method='monte_carlo')
+    validation = calculator.validate_trade_risk(**args)
+    assert validation['metrics']['var_method'] == 'monte_carlo'
+
+    start = time.perf_counter()
+    for _ in range(100):
+        calculator.validate_trade_risk(**args)
+    assert (time.perf_counter() - start) / 100 < calculator.monte_carlo_config['latency_budget_ms'] / 1000
+
+    positions = [
+        {'symbol': 'SOLUSDT', 'size': 20, 'entry_price': 234.50, 'stop_loss': 228.00},
+        {'symbol': 'AVAXUSDT', 'size': 100, 'entry_price': 42.00, 'stop_loss': 40.00},
+        {'symbol': 'DOGEUSDT', 'size': 5000, 'entry_price': 0.38, 'stop_loss': 0.36},
+    ]
+    adjustments = calculator.suggest_position_adjustments(positions, 10000, target_risk=0.01,
+                                                          var_method='monte_carlo')
+    monte_carlo = adjustments['monte_carlo']
+    assert set(monte_carlo['var_contribution']) == {'SOLUSDT', 'AVAXUSDT', 'DOGEUSDT'}
+    assert max(monte_carlo['var_contribution'], key=monte_carlo['var_contribution'].get) == 'SOLUSDT'
+    assert any('VaR Monte Carlo' in s for s in adjustments['suggestions'])
+    assert calculator.risk_engine.stats['mc_simulations'] == 1
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests del mark-to-market incremental: marcas por posición con disparo
+SL/TP, snapshot de precios compartido por tick y estado del portfolio
+leído de las marcas sin red
+"""
+
+import pytest
+
+from audit_log import AuditLog
+from error_handler import error_handler
+from paper_trading_enhanced import PaperTradingEnhanced
+from position_marks import PositionMark, PositionMarks
+from price_watcher import PriceWatcher
+
+
+class FakeFetcher:
+    """Devuelve el libro completo, como /ticker/price sin symbol"""
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+
+    def __call__(self, symbols):
+        self.calls.append(sorted(symbols))
+        return dict(self.prices)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    audit = AuditLog(str(tmp_path / 'logs'))
+    monkeypatch.setattr(error_handler, 'audit_log', audit)
+    yield tmp_path
+    audit.close()
+
+
+def test_mark_pnl_and_latched_triggers():
+    long = PositionMark('SOLUSDT', 'long', 100.0, 1000.0, stop_loss=95.0, take_profit=110.0)
+    assert long.update(104.0) and long.pnl == pytest.approx(40.0) and long.trigger is None
+    assert not long.update(104.0)   # mismo precio: nada que recalcular
+    long.set_stops(stop_loss=104.5)
+    assert long.trigger == 'STOP_LOSS'
+    long.update(120.0)
+    assert long.trigger == 'STOP_LOSS' and long.max_pnl == pytest.approx(200.0)
+
+    short = PositionMark('SOLUSDT', 'SHORT', 100.0, 1000.0, stop_loss=105.0, take_profit=90.0)
+    short.update(97.0)
+    assert short.pnl == pytest.approx(30.0) and short.trigger is None
+    short.update(89.0)
+    assert short.trigger == 'TAKE_PROFIT'
+
+    # Stop a 0 (sin definir) no dispara en cortos
+    assert PositionMarks().track('x', 'SOLUSDT', 'SHORT', 100.0, 1.0, 0, 0, price=150.0).trigger is None
+
+
+def test_books_share_one_snapshot_per_tick():
+    clock = FakeClock()
+    fetcher = FakeFetcher({'SOLUSDT': 100.0, 'AVAXUSDT': 40.0, 'DOGEUSDT': 0.3})
+    watcher = PriceWatcher(fetcher, interval=10, autostart=False, clock=clock)
+
+    assert watcher.snapshot_prices(['SOLUSDT', 'AVAXUSDT']) == {'SOLUSDT': 100.0, 'AVAXUSDT': 40.0}
+    assert watcher.snapshot_prices(['DOGEUSDT']) == {'DOGEUSDT': 0.3}   # otro libro, mismo tick
+    assert len(fetcher.calls) == 1 and watcher.stats['shared_hits'] == 1
+
+    clock.now += 11
+    fetcher.prices['SOLUSDT'] = 101.0
+    assert watcher.snapshot_prices(['SOLUSDT']) == {'SOLUSDT': 101.0}
+    assert len(fetcher.calls) == 2
+
+    # Un tick del watcher también alimenta el snapshot compartido
+    watcher.subscribe('book', lambda: ['AVAXUSDT'], lambda prices: None)
+    clock.now += 11
+    watcher.tick()
+    watcher.snapshot_prices(['SOLUSDT', 'DOGEUSDT'])
+    assert len(fetcher.calls) == 3
+
+
+def test_paper_trading_marks_once_and_status_reads_cache(workdir):
+    clock = FakeClock()
+    fetcher = FakeFetcher({'SOLUSDT': 100.0, 'AVAXUSDT': 40.0})
+    trader = PaperTradingEnhanced(initial_capital=10000)
+    trader.watcher = PriceWatcher(fetcher, interval=10, autostart=False, clock=clock)
+    trader.data_fetcher.check_symbol_status = lambda symbol: None
+
+    sol = trader.open_position('SOLUSDT', 'LONG', 100.0, 97.0, 109.0)['position_id']
+    avax = trader.open_position('AVAXUSDT', 'SHORT', 40.0, 42.0, 36.0)['position_id']
+
+    fetcher.prices.update(SOLUSDT=104.0, AVAXUSDT=41.0)
+    clock.now += 11
+    trader.update_positions()
+    assert len(fetcher.calls) == 1
+    assert trader.positions[sol]['pnl_pct'] == pytest.approx(4.0)
+    assert trader.positions[avax]['pnl_pct'] == pytest.approx(-2.5)
+
+    # Leer el estado no consulta precios
+    status = trader.get_portfolio_status()
+    assert len(fetcher.calls) == 1 and status['open_positions'] == 2
+    assert status['unrealized_pnl'] == pytest.approx(
+        trader.positions[sol]['pnl'] + trader.positions[avax]['pnl'])
+    assert status['last_mark'] is not None
+
+    # Precio sin cambios: no se recalcula ninguna marca
+    trader.update_positions({'SOLUSDT': 104.0, 'AVAXUSDT': 41.0})
+    assert trader.marks.stats['unchanged'] == 2
+
+    # Take profit del corto: se cierra una vez al precio de la marca
+    trader.update_positions({'SOLUSDT': 104.0, 'AVAXUSDT': 35.5})
+    assert avax not in trader.positions and avax not in trader.marks
+    assert trader.trade_history[-1]['exit_reason'] == 'TAKE_PROFIT'
+    assert trader.trade_history[-1]['exit_price'] == 35.5
+    trader.update_positions({'AVAXUSDT': 35.0})
+    assert len(trader.trade_history) == 1
+
+    # Las marcas se reconstruyen al cargar el estado guardado
+    reloaded = PaperTradingEnhanced(initial_capital=10000)
+    assert sol in reloaded.marks and reloaded.marks.get(sol).stop_loss == 97.0
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests del price watcher compartido: una petición por tick para todos los
+suscriptores, reparto por símbolo y estado en memoria con snapshots
+"""
+
+import json
+
+import pytest
+
+from monitor_definitivo import MonitorDefinitivo
+from price_watcher import PriceWatcher, is_binance_symbol
+from trade_tracker import TradeTracker
+
+
+class FakeFetcher:
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+
+    def __call__(self, symbols):
+        self.calls.append(sorted(symbols))
+        return {s: self.prices[s] for s in symbols if s in self.prices}
+
+
+def make_signal(ticker, price=100.0):
+    return {'ticker': ticker, 'direccion': 'LONG', 'price': price,
+            'stop_loss': price * 0.95, 'take_profit': price * 1.10, 'score': 7}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_one_request_per_tick_and_fan_out():
+    fetcher = FakeFetcher({'BTC-USD': 1.0, 'ETH-USD': 2.0, 'SOLUSDT': 3.0})
+    watcher = PriceWatcher(fetcher, autostart=False)
+    received = {}
+    for name, symbols in [('a', ['BTC-USD', 'ETH-USD']), ('b', ['ETH-USD', 'SOLUSDT']), ('c', [])]:
+        watcher.subscribe(name, lambda s=symbols: s, lambda p, n=name: received.__setitem__(n, p))
+
+    watcher.tick()
+
+    assert fetcher.calls == [['BTC-USD', 'ETH-USD', 'SOLUSDT']]
+    assert received == {'a': {'BTC-USD': 1.0, 'ETH-USD': 2.0},
+                        'b': {'ETH-USD': 2.0, 'SOLUSDT': 3.0}}
+
+
+def test_failing_subscriber_does_not_block_others():
+    watcher = PriceWatcher(FakeFetcher({'X-USD': 1.0}), autostart=False)
+    seen = []
+
+    def broken(prices):
+        raise RuntimeError("boom")
+
+    watcher.subscribe('broken', lambda: ['X-USD'], broken)
+    watcher.subscribe('ok', lambda: ['X-USD'], seen.append)
+    watcher.tick()
+
+    assert seen == [{'X-USD': 1.0}]
+    assert watcher.stats['errors'] == 1
+
+
+def test_tracker_keeps_ticks_in_memory_until_snapshot(workdir):
+    fetcher = FakeFetcher({'BTC-USD': 101.0, 'ETH-USD': 50.0})
+    watcher = PriceWatcher(fetcher, snapshot_interval=3600, autostart=False)
+    tracker = TradeTracker()
+    btc = tracker.open_trade(make_signal('BTC-USD'))
+    tracker.open_trade(make_signal('ETH-USD', 50.0))
+
+    tracker.start_monitoring(watcher)
+    on_disk = json.loads((workdir / 'active_trades.json').read_text())
+
+    watcher.tick()
+    assert tracker.active_trades[btc]['current_price'] == 101.0
+    assert json.loads((workdir / 'active_trades.json').read_text()) == on_disk
+
+    watcher.snapshot()
+    assert json.loads((workdir / 'active_trades.json').read_text())[btc]['current_price'] == 101.0
+
+    # Take profit: el cierre se persiste al momento
+    fetcher.prices['BTC-USD'] = 111.0
+    watcher.tick()
+    assert btc not in json.loads((workdir / 'active_trades.json').read_text())
+    assert tracker.get_trade_history()[0]['result'] == 'TAKE_PROFIT'
+    assert [e['type'] for e in map(json.loads, (workdir / 'trade_events.jsonl').read_text().splitlines())
+            if e['trade_id'] == btc] == ['open', 'close']
+    assert fetcher.calls[-1] == ['BTC-USD', 'ETH-USD']
+
+
+def test_trackers_on_same_file_share_one_subscription(workdir):
+    watcher = PriceWatcher(FakeFetcher({}), autostart=False)
+    first, second = TradeTracker(), TradeTracker()
+    first.start_monitoring(watcher)
+    second.start_monitoring(watcher)
+
+    assert len(watcher.get_stats()['subscribers']) == 1
+
+
+def test_monitor_cycle_batches_all_tickers():
+    fetcher = FakeFetcher({'DOGE-USD': 0.2290, 'ADA-USD': 0.5})
+    monitor = MonitorDefinitivo(watcher=PriceWatcher(fetcher, autostart=False))
+    monitor.active_trades.append({**monitor.active_trades[0], 'id': 2, 'ticker': 'ADA-USD',
+                                  'entry_price': 0.5, 'stop_loss': 0.51,
+                                  'partial_target': 0.49, 'main_target': 0.48})
+    monitor.monitor_cycle()
+
+    assert fetcher.calls == [['ADA-USD', 'DOGE-USD']]
+
+
+def test_symbol_routing():
+    assert is_binance_symbol('SOLUSDT')
+    assert not is_binance_symbol('SOL-USD')
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests del scoring por lotes: cada fila del batch debe ser idéntica a la
+llamada por vela (df.iloc[:i+1], df.iloc[i]) de ScoringEmpiricoV2,
+ScoringOptimizadoV3, RSIDivergenceOptimizado y LiquidezValidator
+"""
+
+import numpy as np
+import pytest
+
+from backtesting_integration import BacktestingIntegrado
+from liquidez_validator import LiquidezValidator
+from pivot_index import reset_pivot_indexes
+from rsi_divergence_optimizado import RSIDivergenceOptimizado
+from scoring_empirico_v2 import ScoringEmpiricoV2
+from scoring_optimizado_v3 import ScoringOptimizadoV3
+
+
+def scoring_frame(ohlcv, n=160, seed=3, with_atr=True):
+    """Velas sintéticas con indicadores aleatorios en todo su rango"""
+    df = ohlcv(n, seed, vol=0.015, wick=0.012)
+    rng = np.random.default_rng(seed)
+    df['RSI'] = rng.uniform(10, 90, n)
+    df['Volume_Ratio'] = rng.uniform(0.3, 6.5, n)
+    df['MACD'] = rng.normal(0, 1, n)
+    df['MACD_Signal'] = rng.normal(0, 1, n)
+    if with_atr:
+        df['ATR'] = df['Close'] * rng.uniform(0.003, 0.1, n)
+    return df
+
+
+@pytest.fixture(autouse=True)
+def fresh_indexes():
+    reset_pivot_indexes()
+    yield
+    reset_pivot_indexes()
+
+
+def per_row(df, score_fn):
+    rows = []
+    for i in range(len(df)):
+        _, details = score_fn(df.iloc[:i + 1], df.iloc[i])
+        rows.append(details)
+    return rows
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+@pytest.mark.parametrize('signal_type', ['LONG', 'SHORT'])
+def test_empirical_batch_matches_per_row(ohlcv, seed, signal_type):
+    df = scoring_frame(ohlcv, seed=seed, with_atr=seed != 3)
+    scoring = ScoringEmpiricoV2()
+    batch = scoring.calculate_empirical_scores(df, signal_type)
+    score_fn = (scoring.calculate_empirical_score_long if signal_type == 'LONG'
+                else scoring.calculate_empirical_score_short)
+
+    expected = per_row(df, score_fn)
+    for column in batch.columns:
+        assert batch[column].tolist() == [details[column] for details in expected], column
+    assert list(batch.index) == list(df.index)
+
+
+@pytest.mark.parametrize('seed', [4, 5])
+@pytest.mark.parametrize('signal_type', ['LONG', 'SHORT'])
+def test_optimized_batch_matches_per_row(ohlcv, seed, signal_type):
+    df = scoring_frame(ohlcv, seed=seed, with_atr=seed != 5)
+    scoring = ScoringOptimizadoV3()
+    batch = scoring.calculate_optimized_scores(df, signal_type)
+    score_fn = (scoring.calculate_optimized_score_long if signal_type == 'LONG'
+                else scoring.calculate_optimized_score_short)
+
+    expected = per_row(df, score_fn)
+    for column in batch.columns:
+        assert batch[column].tolist() == [details[column] for details in expected], column
+
+
+def test_divergence_and_liquidity_batches_match_per_row(ohlcv):
+    df = scoring_frame(ohlcv, n=400, seed=8)
+    # RSI con tendencia opuesta al precio para que aparezcan divergencias válidas
+    df['RSI'] = np.clip(50 - (df['Close'] - df['Close'].rolling(10, min_periods=1).mean()) * 8, 5, 95)
+    divergence = RSIDivergenceOptimizado()
+    validator = LiquidezValidator()
+
+    for signal_type in ['LONG', 'SHORT']:
+        scores = divergence.get_rsi_divergence_scores(df, signal_type)
+        expected = [divergence.get_rsi_divergence_score(df.iloc[:i + 1], df.iloc[i], signal_type)[0]
+                    for i in range(len(df))]
+        assert scores.tolist() == expected
+        assert (scores > 0.3).any()   # hay velas con divergencias significativas
+
+        liquidity = validator.analyze_liquidity_coherence_batch(df, signal_type)
+        assert np.isnan(liquidity[:9]).all()
+        expected = [validator.analyze_liquidity_coherence(df.iloc[:i + 1], signal_type, df['Close'].iloc[i])[0]
+                    for i in range(9, len(df))]
+        assert liquidity[9:].tolist() == expected
+
+
+def test_integrado_uses_batch_scores(ohlcv):
+    backtester = BacktestingIntegrado()
+    df = backtester.calculate_indicators(ohlcv(600, seed=9, vol=0.015, wick=0.012))
+    candidates = [i for i in np.flatnonzero(backtester.candidate_mask(df)) if i >= 50]
+
+    expected = [backtester.generate_signal(df.iloc[:i + 1].copy(), 'BTC-USD') for i in candidates]
+    assert any(expected)
+
+    backtester._batch_scores = {
+        signal_type: backtester.scoring_system.calculate_empirical_scores(df, signal_type)['final_score']
+        for signal_type in ('LONG', 'SHORT')
+    }
+    assert [backtester.generate_signal(df.iloc[:i + 1].copy(), 'BTC-USD') for i in candidates] == expected
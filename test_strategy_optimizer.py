@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests del optimizador de BacktestSystemV2: los parámetros llegan a
+generate_signals, la rejilla es idéntica con 1 y 2 workers y el modo TPE
+encuentra óptimos comparables con una fracción de las evaluaciones
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import backtest_system_v2
+from backtest_system_v2 import BacktestSystemV2
+from binance_data_fetcher import BinanceDataFetcher
+from strategy_optimizer import StrategyOptimizer
+
+RANGES = {
+    'ema_fast': [3, 5, 7, 9, 12],
+    'ema_medium': [13, 17, 20, 26, 30],
+    'ema_slow': [40, 50, 60, 80, 100],
+    'volume_multiplier': [0.0, 0.6, 0.9, 1.1, 1.3],
+}
+
+
+def trending_candles(ohlcv, seed=5):
+    """1000 velas de 1h con tendencias alternas de 120 velas e indicadores calculados"""
+    df = ohlcv(1000, seed, vol=0.008, drift=0.001, regime=120, wick=0.004)
+    return BinanceDataFetcher.calculate_indicators(df)
+
+
+@pytest.fixture(scope='module')
+def candles(ohlcv):
+    return trending_candles(ohlcv)
+
+
+@pytest.fixture
+def system(candles, monkeypatch):
+    downloads = []
+
+    def fetch(self, symbol, interval, days_back):
+        downloads.append(symbol)
+        return candles
+
+    monkeypatch.setattr(BacktestSystemV2, 'fetch_historical_data', fetch)
+    system = BacktestSystemV2()
+    system.downloads = downloads
+    return system
+
+
+@pytest.fixture(scope='module')
+def grid_scores(candles):
+    """Score de todas las combinaciones (referencia para el TPE)"""
+    optimizer = StrategyOptimizer(
+        backtest_system_v2._evaluate_parameters, RANGES,
+        initializer=backtest_system_v2._init_optimizer,
+        initargs=(BacktestSystemV2, BacktestSystemV2().config, candles, 'SOLUSDT', 'trend_following', 10000)
+    )
+    optimizer.grid()
+    return np.array([trial.score for trial in optimizer.trials])
+
+
+def test_parameters_reach_generate_signals(system):
+    fast = system.run_backtest('SOLUSDT', 'trend_following', params={'ema_fast': 3, 'ema_slow': 40})
+    slow = system.run_backtest('SOLUSDT', 'trend_following', params={'ema_fast': 12, 'ema_slow': 100})
+    default = system.run_backtest('SOLUSDT', 'trend_following')
+    assert fast['metrics']['trades'] != slow['metrics']['trades']
+    assert fast['parameters'] == {'ema_fast': 3, 'ema_slow': 40} and 'parameters' not in default
+
+    # Los parámetros del asset (LARGE_CAP) se conservan si no se sobrescriben
+    same = system.run_backtest('SOLUSDT', 'trend_following', params={'ema_fast': 9})
+    assert same['metrics']['trades'] == default['metrics']['trades']
+
+
+def test_grid_is_identical_with_workers(system):
+    ranges = {'ema_fast': [3, 9], 'ema_slow': [40, 100], 'volume_multiplier': [0.0, 1.3]}
+    sequential = system.optimize_strategy('SOLUSDT', 'trend_following', ranges)
+    parallel = system.optimize_strategy('SOLUSDT', 'trend_following', ranges, workers=2)
+
+    assert sequential['total_combinations_tested'] == parallel['total_combinations_tested'] == 8
+    assert sequential['best_parameters'] == parallel['best_parameters']
+    for a, b in zip(sequential['all_results'], parallel['all_results']):
+        assert a['parameters'] == b['parameters']
+        assert a['optimization_score'] == b['optimization_score']
+    assert len(system.downloads) == 2   # una descarga por optimización
+
+    # Cada trial es un backtest real con sus parámetros
+    best = sequential['best_result']
+    rerun = system.run_backtest('SOLUSDT', 'trend_following', params=best['parameters'])
+    assert BacktestSystemV2.optimization_score(rerun['metrics']) == best['optimization_score']
+
+    timing = parallel['timing']
+    assert timing['trials'] == 8 and timing['failed'] == 0
+    assert sum(timing['trials_per_worker'].values()) == 8
+    assert all(result['trial_ms'] > 0 for result in parallel['all_results'])
+
+
+def test_concurrent_in_process_optimizations_do_not_share_state(ohlcv, candles, monkeypatch):
+    other = trending_candles(ohlcv, seed=11)
+    monkeypatch.setattr(BacktestSystemV2, 'fetch_historical_data',
+                        lambda self, symbol, interval, days_back: candles if symbol == 'SOLUSDT' else other)
+    ranges = {'ema_fast': [3, 9], 'ema_slow': [40, 100], 'volume_multiplier': [0.0, 1.3]}
+
+    def scores(symbol):
+        result = BacktestSystemV2().optimize_strategy(symbol, 'trend_following', ranges)
+        return [r['optimization_score'] for r in result['all_results']]
+
+    expected = {symbol: scores(symbol) for symbol in ('SOLUSDT', 'AVAXUSDT')}
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        runs = list(pool.map(scores, ['SOLUSDT', 'AVAXUSDT'] * 4))
+    assert runs == [expected['SOLUSDT'], expected['AVAXUSDT']] * 4
+    assert expected['SOLUSDT'] != expected['AVAXUSDT']
+
+
+@pytest.mark.parametrize('seed', [0, 4, 5])
+def test_tpe_finds_comparable_optimum(system, grid_scores, seed):
+    result = system.optimize_strategy('SOLUSDT', 'trend_following', RANGES, mode='tpe', n_trials=60, seed=seed)
+
+    assert result['total_combinations_tested'] == 60 and result['search_space_size'] == 625
+    best = result['best_result']['optimization_score']
+    # Dentro del 1% superior de la rejilla con menos del 10% de las evaluaciones
+    assert (grid_scores > best).sum() <= 6
+    assert best >= np.sort(grid_scores)[-1] - 0.5
+
+
+def test_tpe_never_repeats_and_stops_when_exhausted():
+    optimizer = StrategyOptimizer(_quadratic, {'x': list(range(6)), 'kind': ['a', 'b']},
+                                  seed=1, n_startup_trials=3)
+    optimizer.tpe(50)
+    calls = [tuple(t.params.values()) for t in optimizer.trials]
+    assert len(calls) == len(set(calls)) == 12
+    assert optimizer.best_trial.params == {'x': 4, 'kind': 'b'}
+
+    failing = StrategyOptimizer(_failing, {'x': [1, 2, 3]})
+    failing.grid()
+    assert failing.best_trial is None and failing.timing()['failed'] == 3
+    assert failing.trials[0].error.startswith('ValueError')
+
+
+def _quadratic(params):
+    return -(params['x'] - 4) ** 2 + (1 if params['kind'] == 'b' else 0), None
+
+
+def _failing(params):
+    raise ValueError('sin datos')
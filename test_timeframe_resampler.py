@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests del resampler de temporalidades con un exchange simulado (sin red):
+paridad con el resample de pandas, vela en formación, actualización
+incremental y una sola sincronización para todas las temporalidades
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from candle_store import CandleStore, interval_to_ms
+from timeframe_resampler import TimeframeResampler, aggregate
+
+STEP = interval_to_ms('1h')
+DAY = interval_to_ms('1d')
+T0 = 1_700_000_000_000 - 1_700_000_000_000 % DAY
+
+
+class FakeExchange:
+    """Serie sintética de velas de 1h (paseo aleatorio) con contador de requests"""
+
+    def __init__(self, hours=2000):
+        rng = np.random.default_rng(7)
+        close = 100 + np.cumsum(rng.normal(0, 1, hours + 500))
+        self.rows = np.column_stack([
+            T0 + np.arange(len(close)) * STEP,
+            close - rng.normal(0, 0.3, len(close)),
+            close + rng.uniform(0.5, 2, len(close)),
+            close - rng.uniform(0.5, 2, len(close)),
+            close,
+            rng.uniform(10, 100, len(close)),
+        ])
+        self.now = (T0 + hours * STEP + 17 * 60_000) / 1000   # 17 min dentro de la vela `hours`
+        self.calls = []
+
+    def clock(self):
+        return self.now
+
+    def fetch(self, symbol, interval, start_ms, limit):
+        self.calls.append((interval, start_ms, limit))
+        now_ms = int(self.now * 1000)
+        mask = (self.rows[:, 0] >= start_ms) & (self.rows[:, 0] <= now_ms)
+        return self.rows[mask][:limit].tolist()
+
+
+def make_resampler(tmp_path, exchange):
+    store = CandleStore(exchange.fetch, data_dir=str(tmp_path), live_ttl=5.0, clock=exchange.clock)
+    return TimeframeResampler(store, '1h')
+
+
+def pandas_resample(rows, rule):
+    df = pd.DataFrame(rows[:, 1:], index=pd.to_datetime(rows[:, 0].astype(np.int64), unit='ms'),
+                      columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+    return df.resample(rule).agg({'Open': 'first', 'High': 'max', 'Low': 'min',
+                                  'Close': 'last', 'Volume': 'sum'})
+
+
+def test_aggregation_matches_pandas_resample(tmp_path):
+    exchange = FakeExchange()
+    resampler = make_resampler(tmp_path, exchange)
+
+    frames = resampler.get_timeframes('BTCUSDT', {'1h': 200, '4h': 200, '1d': 50}, include_live=False)
+
+    known = exchange.rows[exchange.rows[:, 0] + STEP <= exchange.now * 1000]
+    for interval, rule in [('4h', '4h'), ('1d', '1D')]:
+        expected = pandas_resample(known, rule)
+        # Sólo bloques cerrados (cubiertos por la última vela base cerrada)
+        covered = pd.Timestamp(int(known[-1, 0]) + STEP, unit='ms')
+        expected = expected[expected.index + pd.Timedelta(rule) <= covered].tail(len(frames[interval]))
+        pd.testing.assert_frame_equal(frames[interval], expected, check_freq=False, check_names=False)
+    assert len(frames['4h']) == 200 and len(frames['1d']) == 50
+
+
+@pytest.mark.parametrize('hours', [2000, 2002, 2003])
+def test_live_candle_is_partial_bucket(tmp_path, hours):
+    exchange = FakeExchange(hours)
+    resampler = make_resampler(tmp_path, exchange)
+    df = resampler.get_dataframe('BTCUSDT', '4h', 10)
+
+    now_ms = int(exchange.now * 1000)
+    bucket = now_ms - now_ms % interval_to_ms('4h')
+    assert df.index[-1].value // 1_000_000 == bucket
+
+    partial = exchange.rows[(exchange.rows[:, 0] >= bucket) & (exchange.rows[:, 0] <= now_ms)]
+    last = df.iloc[-1]
+    assert last['Open'] == partial[0, 1] and last['Close'] == partial[-1, 4]
+    assert last['High'] == partial[:, 2].max() and last['Low'] == partial[:, 3].min()
+    assert last['Volume'] == pytest.approx(partial[:, 5].sum())
+    assert np.all(np.diff(df.index.asi8 // 1_000_000) == interval_to_ms('4h'))
+
+
+def test_single_base_sync_serves_every_timeframe(tmp_path):
+    exchange = FakeExchange()
+    resampler = make_resampler(tmp_path, exchange)
+    frames = resampler.get_timeframes('BTCUSDT', {'1h': 200, '4h': 200, '1d': 30})
+
+    assert {interval for interval, _, _ in exchange.calls} == {'1h'}
+    # Coherencia: el último close es el mismo precio en todas las temporalidades
+    assert len({df['Close'].iloc[-1] for df in frames.values()}) == 1
+    assert frames['1d']['High'].iloc[-1] == frames['4h']['High'].iloc[-6:].max()
+
+    # Ciclo siguiente: una sola request de cola para las tres temporalidades
+    exchange.now += 3600
+    calls_before = len(exchange.calls)
+    frames = resampler.get_timeframes('BTCUSDT', {'1h': 200, '4h': 200, '1d': 30})
+    assert len(exchange.calls) - calls_before == 1
+    assert len({df['Close'].iloc[-1] for df in frames.values()}) == 1
+
+
+def test_incremental_update_matches_full_rebuild(tmp_path):
+    exchange = FakeExchange()
+    resampler = make_resampler(tmp_path, exchange)
+    resampler.get_window('BTCUSDT', '4h', 100)
+    for _ in range(7):
+        exchange.now += 3600 * 1.5
+        incremental = np.array(resampler.get_window('BTCUSDT', '4h', 100))
+
+    fresh = TimeframeResampler(resampler.store, '1h')
+    np.testing.assert_allclose(incremental, fresh.get_window('BTCUSDT', '4h', 100, sync=False))
+    assert resampler.stats['rebuilds'] == 1 and resampler.stats['incremental_updates'] == 7
+
+
+def test_backfill_triggers_rebuild_and_drops_leading_partial_bucket(tmp_path):
+    exchange = FakeExchange()
+    resampler = make_resampler(tmp_path, exchange)
+    resampler.get_window('BTCUSDT', '1d', 5)
+    window = resampler.get_window('BTCUSDT', '1d', 40, include_live=False)
+
+    assert resampler.stats['rebuilds'] == 2
+    assert len(window) == 40
+    assert np.all(window[:, 0] % DAY == 0)
+    assert np.all(np.diff(window[:, 0]) == DAY)
+
+
+def test_weekly_buckets_open_on_monday_and_invalid_ratio():
+    rows = FakeExchange().rows[:24 * 21]
+    weeks = aggregate(rows, '1w')
+    assert all(pd.Timestamp(int(t), unit='ms').dayofweek == 0 for t in weeks[:, 0])
+
+    with pytest.raises(ValueError):
+        TimeframeResampler(CandleStore(lambda *a: [], data_dir=None), '4h').ratio('1h')
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Tests del almacenamiento de trades: log append-only con snapshots
+compactados, trayectorias de precio en arrays y estadísticas incrementales
+"""
+
+import json
+import math
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from trade_store import PricePathStore, TradeStore
+from trade_tracker import TradeTracker
+
+
+def make_signal(ticker, price=100.0, direction='LONG'):
+    sign = 1 if direction == 'LONG' else -1
+    return {'ticker': ticker, 'direccion': direction, 'price': price,
+            'stop_loss': price * (1 - sign * 0.05), 'take_profit': price * (1 + sign * 0.10), 'score': 7}
+
+
+def closed_trade(trade_id, ticker, pnl, closed_at):
+    return {'id': trade_id, 'ticker': ticker, 'result': 'TAKE_PROFIT' if pnl > 0 else 'STOP_LOSS',
+            'timestamp_close': closed_at.isoformat(), 'pnl_percent': pnl, 'pnl_usd': pnl * 10,
+            'duration_hours': 2.0}
+
+
+def csv_statistics(csv_file, active):
+    """Cálculo anterior de get_statistics (pandas sobre el CSV completo)"""
+    closed = pd.read_csv(csv_file)
+    wins, losses = closed[closed['PnL_Percent'] > 0], closed[closed['PnL_Percent'] < 0]
+    return {
+        'total_trades': len(closed), 'active_trades': active,
+        'winning_trades': len(wins), 'losing_trades': len(losses),
+        'win_rate': len(wins) / len(closed) * 100,
+        'avg_win': wins['PnL_Percent'].mean(), 'avg_loss': losses['PnL_Percent'].mean(),
+        'total_pnl': closed['PnL_USD'].sum(), 'avg_duration': closed['Duration_Hours'].mean(),
+        'best_trade': closed['PnL_Percent'].max(), 'worst_trade': closed['PnL_Percent'].min(),
+        'profit_factor': abs(wins['PnL_Percent'].sum() / losses['PnL_Percent'].sum()) if len(losses) else float('inf')
+    }
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_close_appends_and_compaction_rewrites_snapshot(tmp_path):
+    history, events = tmp_path / 'history.json', tmp_path / 'events.jsonl'
+    store = TradeStore(str(history), str(events), compact_every=3)
+    store.record_open({'id': 'live', 'ticker': 'ETH-USD'})
+    start = datetime(2024, 1, 1)
+    for i in range(2):
+        store.record_close(closed_trade(f't{i}', 'BTC-USD', 1.0, start + timedelta(hours=i)))
+
+    assert not history.exists()
+    assert [json.loads(line)['type'] for line in events.read_text().splitlines()] == ['open', 'close', 'close']
+
+    store.record_close(closed_trade('t2', 'BTC-USD', -1.0, start + timedelta(hours=2)))
+    assert [t['id'] for t in json.loads(history.read_text())] == ['t0', 't1', 't2']
+    assert [json.loads(line)['trade_id'] for line in events.read_text().splitlines()] == ['live']
+
+    store.record_close(closed_trade('t3', 'SOL-USD', 2.0, start + timedelta(hours=3)))
+    reloaded = TradeStore(str(history), str(events))
+    assert [t['id'] for t in reloaded.trades] == ['t0', 't1', 't2', 't3']
+    assert reloaded.open_trades() == {'live': {'id': 'live', 'ticker': 'ETH-USD'}}
+    assert reloaded.get_statistics() == store.get_statistics()
+
+
+def test_replay_ignores_duplicated_and_truncated_events(tmp_path):
+    history, events = tmp_path / 'history.json', tmp_path / 'events.jsonl'
+    trade = closed_trade('t0', 'BTC-USD', 1.0, datetime(2024, 1, 1))
+    history.write_text(json.dumps([trade]))
+    events.write_text(json.dumps({'type': 'close', 'trade_id': 't0', 'trade': trade}) + '\n' + '{"type": "clo')
+
+    store = TradeStore(str(history), str(events))
+    assert len(store.trades) == 1 and store.get_statistics()['total_trades'] == 1
+
+
+def test_query_by_ticker_and_close_time(tmp_path):
+    store = TradeStore(str(tmp_path / 'h.json'), str(tmp_path / 'e.jsonl'))
+    start = datetime(2024, 1, 1)
+    for i, (ticker, hours) in enumerate([('BTC-USD', 5), ('ETH-USD', 1), ('BTC-USD', 3), ('BTC-USD', 9)]):
+        store.record_close(closed_trade(f't{i}', ticker, 1.0 - i, start + timedelta(hours=hours)))
+
+    assert [t['id'] for t in store.query()] == ['t1', 't2', 't0', 't3']
+    assert [t['id'] for t in store.query('BTC-USD', start + timedelta(hours=2), start + timedelta(hours=5))] == ['t2', 't0']
+    assert [t['id'] for t in store.query(result='TAKE_PROFIT')] == ['t0']
+    assert store.query('DOGE-USD') == []
+
+
+def test_price_paths_are_columnar_and_persisted(tmp_path):
+    paths = PricePathStore(str(tmp_path / 'paths'))
+    for i in range(5):
+        paths.append('BTC-USD_1', 1_700_000_000 + i, 100.0 + i, float(i))
+    paths.flush()
+    paths.append('BTC-USD_1', 1_700_000_005, 105.0, 5.0)
+
+    samples = paths.get('BTC-USD_1')
+    assert list(samples['price']) == [100.0, 101.0, 102.0, 103.0, 104.0, 105.0]
+    assert paths.count('BTC-USD_1') == 6
+    assert (tmp_path / 'paths' / 'BTC-USD_1.bin').stat().st_size == 5 * 24
+    assert PricePathStore(str(tmp_path / 'paths')).count('BTC-USD_1') == 5
+
+
+def test_tracker_statistics_match_csv_scan(workdir):
+    tracker = TradeTracker()
+    moves = [('BTC-USD', 'LONG', 111), ('ETH-USD', 'SHORT', 106), ('SOL-USD', 'LONG', 94),
+             ('BTC-USD', 'SHORT', 89), ('ADA-USD', 'LONG', 103)]
+    for ticker, direction, exit_price in moves:
+        trade_id = tracker.open_trade(make_signal(ticker, direction=direction))
+        tracker.update_trade_price(trade_id, 101.0, persist=False)
+        if trade_id in tracker.active_trades:
+            tracker.close_trade(trade_id, exit_price)
+    active = tracker.open_trade(make_signal('DOGE-USD'))
+
+    stats = tracker.get_statistics()
+    expected = csv_statistics('trade_results.csv', 1)
+    assert stats.keys() == expected.keys()
+    for key, value in expected.items():
+        assert stats[key] == pytest.approx(value, abs=0.01) or (math.isnan(stats[key]) and math.isnan(value))
+
+    assert 'price_history' not in json.loads((workdir / 'active_trades.json').read_text())[active]
+    assert len(tracker.get_trade_history(ticker='BTC-USD')) == 2
+
+
+def test_tracker_migrates_legacy_price_history_and_recovers(workdir):
+    tracker = TradeTracker()
+    trade_id = tracker.open_trade(make_signal('BTC-USD'))
+    active = json.loads((workdir / 'active_trades.json').read_text())
+    active[trade_id]['price_history'] = [{'timestamp': '2024-01-01T00:00:00', 'price': 101.0, 'pnl': 1.0}]
+    (workdir / 'active_trades.json').write_text(json.dumps(active))
+
+    reopened = TradeTracker()
+    assert reopened.get_price_history(trade_id) == active[trade_id]['price_history']
+    assert 'price_history' not in json.loads((workdir / 'active_trades.json').read_text())[trade_id]
+
+    # Cierre registrado en el log pero activos sin guardar (corte a mitad)
+    reopened.update_trade_price(trade_id, 102.0)
+    reopened.history.record_close({**reopened.active_trades[trade_id], 'result': 'MANUAL',
+                                   'timestamp_close': datetime.now().isoformat()})
+    recovered = TradeTracker()
+    assert trade_id not in recovered.active_trades
+    assert [s['price'] for s in recovered.get_price_history(trade_id)] == [101.0, 102.0]
+
+
+def test_wrapped_snapshot_layout_is_preserved(tmp_path):
+    history = tmp_path / 'history.json'
+    history.write_text(json.dumps({'history': [], 'statistics': {'total_trades': 0}}))
+    store = TradeStore(str(history), str(tmp_path / 'e.jsonl'), compact_every=1)
+    store.record_close(closed_trade('t0', 'BTC-USD', 1.0, datetime(2024, 1, 1)))
+
+    snapshot = json.loads(history.read_text())
+    assert [t['id'] for t in snapshot['history']] == ['t0'] and 'statistics' in snapshot
+    assert len(TradeStore(str(history), str(tmp_path / 'e.jsonl')).trades) == 1
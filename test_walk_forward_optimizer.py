@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Paridad del optimizador walk-forward (datos una vez + pool de procesos)
+con el bucle secuencial original, usando velas sintéticas sin red
+"""
+
+import pandas as pd
+import pytest
+
+from robust_trading_system_v2 import RobustTradingSystemV2
+from walk_forward_validation import WalkForwardAnalysis
+
+TRAIN = ('2023-01-01', '2023-09-30')
+TEST = ('2023-10-01', '2023-12-31')
+
+
+@pytest.fixture
+def downloads(ohlcv, monkeypatch):
+    # Velas diarias con el índice de yfinance y tendencias alternas de 60 días
+    data = ohlcv(seed=3, start='2022-12-01', end='2024-01-31', freq='D', tz='UTC', name='Date',
+                 price=20000, vol=0.025, drift=0.004, regime=60, wick=0.02)
+    calls = []
+
+    def fake_load(self, symbol, start_date, end_date):
+        calls.append((symbol, start_date, end_date))
+        lower, upper = pd.Timestamp(start_date, tz='UTC'), pd.Timestamp(end_date, tz='UTC')
+        return data[(data.index >= lower) & (data.index < upper)].copy()
+
+    monkeypatch.setattr(RobustTradingSystemV2, 'load_data', fake_load)
+    return calls
+
+
+def small_grid(analyzer):
+    analyzer.param_ranges = {
+        'min_confirmations': [2, 3],
+        'atr_multiplier_sl': [1.0, 2.0],
+        'atr_multiplier_tp': [2.0, 3.0],
+        'volume_threshold': [1.0, 1.2],
+    }
+    return analyzer
+
+
+def sequential_reference(analyzer, start, end, symbol='BTC-USD'):
+    """Bucle original: un sistema y una descarga por combinación"""
+    best = (None, None, -float('inf'))
+    for params in analyzer.generate_param_combinations():
+        system = RobustTradingSystemV2(analyzer.initial_capital)
+        system.base_params.update(params)
+        trades = system.backtest(symbol, start, end)
+        if trades:
+            metrics = system.calculate_metrics(trades)
+            score = analyzer.calculate_optimization_score(metrics)
+            if score > best[2]:
+                best = (params, metrics, score)
+    return best
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_optimizer_matches_sequential(downloads, workers):
+    expected = sequential_reference(small_grid(WalkForwardAnalysis(workers=1)), *TRAIN)
+    reference_downloads = len(downloads)
+    assert reference_downloads == 16
+
+    analyzer = small_grid(WalkForwardAnalysis(workers=workers))
+    result = analyzer.optimize_parameters(*TRAIN)
+
+    assert result[0] == expected[0]
+    assert result[2] == expected[2]
+    assert result[1] == expected[1]
+    assert len(downloads) == reference_downloads + 1
+
+
+def test_validation_reuses_prefetched_data(downloads):
+    analyzer = small_grid(WalkForwardAnalysis(workers=1))
+    analyzer.walk_forward_periods = [{'train_start': TRAIN[0], 'train_end': TRAIN[1],
+                                      'test_start': TEST[0], 'test_end': TEST[1], 'name': 'P1'}]
+    analyzer.prefetch('BTC-USD')
+    params = analyzer.generate_param_combinations()[0]
+
+    trades, metrics = analyzer.validate_parameters(params, *TEST)
+
+    system = RobustTradingSystemV2(analyzer.initial_capital)
+    system.base_params.update(params)
+    expected = system.backtest('BTC-USD', *TEST)
+    assert len(downloads) == 2  # prefetch + referencia
+    assert [(t['entry_date'], t['exit_price']) for t in trades] == \
+        [(t['entry_date'], t['exit_price']) for t in expected]
+    if expected:
+        assert metrics == system.calculate_metrics(expected)
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Timeframe Resampler - Varias temporalidades a partir de un único intervalo base
+
+En lugar de descargar 1h, 4h y 1d por separado, se sincroniza una sola
+serie base por símbolo en el candle store (una request de cola por ciclo)
+y las temporalidades superiores se agregan localmente:
+
+    open = primer open del bloque, high = máximo, low = mínimo,
+    close = último close, volume = suma
+
+Los bloques se alinean como en Binance (épocas UTC; semanas en lunes). Un
+bloque está cerrado cuando la serie base cubre su final; el bloque en curso
+se sirve como vela en formación (incluyendo la vela base viva). Las vistas
+derivadas se actualizan de forma incremental: cada sincronización sólo
+agrega las velas base cerradas desde la anterior. Como todas salen del
+mismo snapshot de la serie base, las temporalidades son coherentes entre sí.
+"""
+
+import threading
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from candle_store import CandleStore, N_COLS, get_candle_store, interval_to_ms, window_to_dataframe
+
+logger = logging.getLogger(__name__)
+
+# Las velas semanales de Binance abren el lunes (el epoch fue jueves)
+WEEK_OFFSET_MS = 4 * 86_400_000
+
+
+def bucket_offset(interval: str) -> int:
+    return WEEK_OFFSET_MS if interval == '1w' else 0
+
+
+def bucket_starts(open_times: np.ndarray, interval: str) -> np.ndarray:
+    """open_time del bloque de `interval` al que pertenece cada vela"""
+    step = interval_to_ms(interval)
+    offset = bucket_offset(interval)
+    open_times = open_times.astype(np.int64)
+    return (open_times - offset) // step * step + offset
+
+
+def aggregate(rows: np.ndarray, interval: str) -> np.ndarray:
+    """Agrega velas (N, 6) ordenadas en bloques de `interval` (sin decidir cierre)"""
+    if len(rows) == 0:
+        return np.empty((0, N_COLS), dtype=np.float64)
+
+    starts = bucket_starts(rows[:, 0], interval)
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:] - 1, len(rows) - 1]
+
+    out = np.empty((len(first), N_COLS), dtype=np.float64)
+    out[:, 0] = starts[first]
+    out[:, 1] = rows[first, 1]
+    out[:, 2] = np.maximum.reduceat(rows[:, 2], first)
+    out[:, 3] = np.minimum.reduceat(rows[:, 3], first)
+    out[:, 4] = rows[last, 4]
+    out[:, 5] = np.add.reduceat(rows[:, 5], first)
+    return out
+
+
+class _DerivedSeries:
+    """Estado incremental de una temporalidad derivada"""
+
+    def __init__(self):
+        self.closed = np.empty((0, N_COLS), dtype=np.float64)
+        self.partial: Optional[np.ndarray] = None     # bloque en curso (sólo velas base cerradas)
+        self.first_base_open: Optional[int] = None
+        self.last_base_open: Optional[int] = None
+
+
+class TimeframeResampler:
+    """Temporalidades derivadas de una serie base del candle store"""
+
+    def __init__(self, store: CandleStore, base_interval: str = '1h'):
+        self.store = store
+        self.base_interval = base_interval
+        self.base_ms = interval_to_ms(base_interval)
+        self._series: Dict[Tuple[str, str], _DerivedSeries] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'base_syncs': 0,
+            'rebuilds': 0,
+            'incremental_updates': 0,
+        }
+
+    def ratio(self, interval: str) -> int:
+        """Velas base por vela de `interval`"""
+        step = interval_to_ms(interval)
+        if step < self.base_ms or step % self.base_ms:
+            raise ValueError(f"{interval} no es múltiplo del intervalo base {self.base_interval}")
+        return step // self.base_ms
+
+    def base_candles_needed(self, interval: str, limit: int) -> int:
+        """Historia base para `limit` velas de `interval` (+1 bloque para alinear el inicio)"""
+        ratio = self.ratio(interval)
+        return limit * ratio + (ratio if ratio > 1 else 0)
+
+    # ===========================================
+    # ACTUALIZACIÓN INCREMENTAL
+    # ===========================================
+
+    def _update(self, symbol: str, interval: str, base: np.ndarray) -> _DerivedSeries:
+        """Incorpora a la serie derivada las velas base cerradas que aún no ha visto"""
+        key = (symbol, interval)
+        series = self._series.get(key)
+        if len(base) == 0:
+            return series or _DerivedSeries()
+
+        # Historia base ampliada hacia atrás (backfill): se recalcula desde cero
+        if series is None or series.first_base_open is None or base[0, 0] < series.first_base_open:
+            series = _DerivedSeries()
+            self._series[key] = series
+            self.stats['rebuilds'] += 1
+            # Se descarta el bloque inicial si la serie empieza a mitad de él
+            starts = bucket_starts(base[:, 0], interval)
+            aligned = np.flatnonzero(starts == base[:, 0].astype(np.int64))
+            if len(aligned) == 0:
+                return series
+            new = base[aligned[0]:]
+            series.first_base_open = int(base[0, 0])
+        else:
+            new = base[base[:, 0] > series.last_base_open]
+            if len(new) == 0:
+                return series
+            self.stats['incremental_updates'] += 1
+
+        if series.partial is not None:
+            new = np.vstack([series.partial[None, :], new])
+        blocks = aggregate(np.asarray(new), interval)
+
+        # El último bloque está cerrado sólo si la serie base cubre su final
+        last_base_close = int(new[-1, 0]) + self.base_ms
+        if int(blocks[-1, 0]) + interval_to_ms(interval) <= last_base_close:
+            done, series.partial = blocks, None
+        else:
+            done, series.partial = blocks[:-1], blocks[-1].copy()
+
+        if len(done):
+            series.closed = np.vstack([series.closed, done])
+        series.last_base_open = int(new[-1, 0])
+        return series
+
+    # ===========================================
+    # LECTURA
+    # ===========================================
+
+    def get_window(self, symbol: str, interval: str, limit: int,
+                   include_live: bool = True, sync: bool = True) -> np.ndarray:
+        """Últimas `limit` velas de `interval` como matriz (N, 6)"""
+        if sync:
+            self.sync(symbol, self.base_candles_needed(interval, limit))
+
+        if interval == self.base_interval:
+            return self.store.get_window(symbol, interval, limit, include_live=include_live, sync=False)
+
+        base = self.store.closed_candles(symbol, self.base_interval)
+        with self._lock:
+            series = self._update(symbol, interval, base)
+            closed = series.closed
+            partial = series.partial
+
+        live_row = None
+        if include_live:
+            live_base = self.store.live_candle(symbol, self.base_interval)
+            if live_base is not None:
+                pieces = [p for p in (partial, live_base) if p is not None]
+                if partial is not None and bucket_starts(live_base[:1], interval)[0] != int(partial[0]):
+                    # La vela viva abre un bloque nuevo: el anterior ya está completo en la base
+                    pieces = [live_base]
+                live_row = aggregate(np.vstack(pieces), interval)[-1]
+            elif partial is not None:
+                live_row = partial
+
+        if live_row is None:
+            return closed[-limit:] if limit else closed[:0]
+        head = closed[-(limit - 1):] if limit > 1 else closed[:0]
+        return np.vstack([head, live_row[None, :]])
+
+    def get_dataframe(self, symbol: str, interval: str, limit: int,
+                      include_live: bool = True, sync: bool = True) -> pd.DataFrame:
+        """Ventana con el formato de CandleStore.get_dataframe"""
+        df = window_to_dataframe(self.get_window(symbol, interval, limit, include_live, sync))
+        df.attrs.update(symbol=symbol, interval=interval)
+        return df
+
+    def get_timeframes(self, symbol: str, limits: Dict[str, int],
+                       include_live: bool = True) -> Dict[str, pd.DataFrame]:
+        """
+        Varias temporalidades con una sola sincronización de la serie base
+
+        Args:
+            limits: {intervalo: velas}, p.ej. {'1h': 200, '4h': 200, '1d': 100}
+        """
+        needed = max(self.base_candles_needed(interval, limit) for interval, limit in limits.items())
+        self.sync(symbol, needed)
+        return {interval: self.get_dataframe(symbol, interval, limit, include_live, sync=False)
+                for interval, limit in limits.items()}
+
+    def sync(self, symbol: str, min_candles: int) -> np.ndarray:
+        self.stats['base_syncs'] += 1
+        return self.store.sync(symbol, self.base_interval, min_candles=min_candles)
+
+
+_default_resamplers: Dict[str, TimeframeResampler] = {}
+_default_resamplers_lock = threading.Lock()
+
+
+def get_timeframe_resampler(base_interval: str = '1h') -> TimeframeResampler:
+    """Resampler global sobre el candle store por defecto (uno por intervalo base)"""
+    with _default_resamplers_lock:
+        if base_interval not in _default_resamplers:
+            _default_resamplers[base_interval] = TimeframeResampler(get_candle_store(), base_interval)
+        return _default_resamplers[base_interval]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    resampler = get_timeframe_resampler('1h')
+    store = resampler.store
+
+    for attempt in range(2):
+        requests_before = store.stats['requests']
+        frames = resampler.get_timeframes('BTCUSDT', {'1h': 200, '4h': 200, '1d': 100})
+        print(f"Intento {attempt + 1}: {store.stats['requests'] - requests_before} requests")
+        for interval, df in frames.items():
+            print(f"  {interval}: {len(df)} velas, última {df.index[-1]} close={df['Close'].iloc[-1]:.2f}")
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Trade Store - Almacenamiento del ciclo de vida de los trades
+
+- TradeStore: log append-only de eventos (open/close) en trade_events.jsonl
+  y snapshot compactado de los trades cerrados en trade_history.json (mismo
+  formato de lista que antes, para los lectores existentes). Cerrar un trade
+  es un append; la reescritura del snapshot ocurre sólo al compactar.
+  Mantiene índices por ticker y por fecha de cierre y agregados que se
+  actualizan con cada cierre, sin volver a recorrer el historial.
+- PricePathStore: muestras de precio (timestamp, precio, pnl) en arrays
+  columnares en memoria, volcadas como registros binarios de ancho fijo a
+  price_paths/<trade_id>.bin en lugar de listas de dicts dentro del JSON.
+"""
+
+import os
+import re
+import json
+import bisect
+import logging
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PRICE_SAMPLE_DTYPE = np.dtype([('timestamp', '<f8'), ('price', '<f8'), ('pnl', '<f8')])
+
+
+class TradeAggregates:
+    """Estadísticas de trades cerrados mantenidas de forma incremental"""
+
+    def __init__(self):
+        self.total = 0
+        self.wins = 0
+        self.losses = 0
+        self.win_pct_sum = 0.0
+        self.loss_pct_sum = 0.0
+        self.pnl_usd_sum = 0.0
+        self.duration_sum = 0.0
+        self.best = float('-inf')
+        self.worst = float('inf')
+
+    def add(self, trade: Dict):
+        pnl = trade.get('pnl_percent', 0) or 0
+        self.total += 1
+        if pnl > 0:
+            self.wins += 1
+            self.win_pct_sum += pnl
+        elif pnl < 0:
+            self.losses += 1
+            self.loss_pct_sum += pnl
+        self.pnl_usd_sum += trade.get('pnl_usd', 0) or 0
+        self.duration_sum += trade.get('duration_hours', 0) or 0
+        self.best = max(self.best, pnl)
+        self.worst = min(self.worst, pnl)
+
+    def as_dict(self, active_trades: int = 0) -> Dict:
+        """Mismo contrato que TradeTracker.get_statistics (NaN sin ganadores/perdedores)"""
+        if not self.total:
+            return {}
+        nan = float('nan')
+        return {
+            'total_trades': self.total,
+            'active_trades': active_trades,
+            'winning_trades': self.wins,
+            'losing_trades': self.losses,
+            'win_rate': self.wins / self.total * 100,
+            'avg_win': self.win_pct_sum / self.wins if self.wins else nan,
+            'avg_loss': self.loss_pct_sum / self.losses if self.losses else nan,
+            'total_pnl': self.pnl_usd_sum,
+            'avg_duration': self.duration_sum / self.total,
+            'best_trade': self.best,
+            'worst_trade': self.worst,
+            'profit_factor': abs(self.win_pct_sum / self.loss_pct_sum) if self.losses else float('inf')
+        }
+
+
+class TradeStore:
+    """Log de eventos append-only + snapshot compactado de trades cerrados"""
+
+    def __init__(self, history_file: str = 'trade_history.json',
+                 events_file: str = 'trade_events.jsonl', compact_every: int = 50):
+        """
+        Args:
+            history_file: Snapshot compactado (lista JSON de trades cerrados)
+            events_file: Log append-only de eventos posteriores al snapshot
+            compact_every: Cierres acumulados en el log que fuerzan compactar
+        """
+        self.history_file = history_file
+        self.events_file = events_file
+        self.compact_every = compact_every
+
+        self.trades: List[Dict] = []
+        self.aggregates = TradeAggregates()
+        self._by_id: Dict[str, int] = {}
+        self._by_ticker: Dict[str, List[int]] = {}
+        self._close_times: List[str] = []   # ordenado (índice temporal)
+        self._close_order: List[int] = []   # posición en self.trades para cada _close_times
+        self._open_events: Dict[str, Dict] = {}
+        self._pending_closes = 0
+        self._snapshot_wrapper: Optional[Dict] = None
+
+        self._load()
+
+    # ===========================================
+    # CARGA / RECUPERACIÓN
+    # ===========================================
+
+    def _load(self):
+        if os.path.exists(self.history_file):
+            try:
+                with open(self.history_file, 'r') as f:
+                    snapshot = json.load(f)
+            except json.JSONDecodeError as e:
+                logger.error(f"Snapshot {self.history_file} ilegible: {e}")
+                snapshot = []
+            if isinstance(snapshot, dict):
+                # Variante {'history': [...], 'statistics': ...}: se conserva al compactar
+                self._snapshot_wrapper = snapshot
+                snapshot = snapshot.get('history', [])
+            for trade in snapshot:
+                if isinstance(trade, dict) and 'id' in trade:
+                    self._index(trade)
+
+        for event in self._read_events():
+            if event['type'] == 'open':
+                self._open_events[event['trade_id']] = event
+            elif event['type'] == 'close':
+                self._open_events.pop(event['trade_id'], None)
+                # Un corte entre snapshot y truncado deja cierres duplicados
+                if event['trade_id'] not in self._by_id:
+                    self._index(event['trade'])
+                    self._pending_closes += 1
+
+    def _read_events(self) -> Iterable[Dict]:
+        if not os.path.exists(self.events_file):
+            return
+        with open(self.events_file, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Última línea a medio escribir: se ignora
+                    logger.warning(f"Evento truncado en {self.events_file}")
+
+    def _index(self, trade: Dict):
+        position = len(self.trades)
+        self.trades.append(trade)
+        self._by_id[trade['id']] = position
+        self._by_ticker.setdefault(trade['ticker'], []).append(position)
+
+        closed_at = trade.get('timestamp_close') or ''
+        slot = bisect.bisect_right(self._close_times, closed_at)
+        self._close_times.insert(slot, closed_at)
+        self._close_order.insert(slot, position)
+
+        self.aggregates.add(trade)
+
+    # ===========================================
+    # EVENTOS
+    # ===========================================
+
+    def _append_event(self, event_type: str, trade: Dict):
+        event = {
+            'type': event_type,
+            'trade_id': trade['id'],
+            'timestamp': datetime.now().isoformat(),
+            'trade': dict(trade)
+        }
+        with open(self.events_file, 'a') as f:
+            f.write(json.dumps(event, default=str) + '\n')
+        return event
+
+    def record_open(self, trade: Dict):
+        """Registra la apertura (append)"""
+        self._open_events[trade['id']] = self._append_event('open', trade)
+
+    def record_close(self, trade: Dict):
+        """Registra el cierre (append) y actualiza índices y agregados"""
+        self._append_event('close', trade)
+        self._open_events.pop(trade['id'], None)
+        self._index(trade)
+        self._pending_closes += 1
+        if self._pending_closes >= self.compact_every:
+            self.compact()
+
+    def open_trades(self) -> Dict[str, Dict]:
+        """Trades con apertura registrada y sin cierre (para reconciliar)"""
+        return {trade_id: event['trade'] for trade_id, event in self._open_events.items()}
+
+    def compact(self):
+        """Reescribe el snapshot con todos los cierres y deja en el log sólo las aperturas vivas"""
+        tmp = f"{self.history_file}.tmp"
+        snapshot = self.trades
+        if self._snapshot_wrapper is not None:
+            snapshot = {**self._snapshot_wrapper, 'history': self.trades,
+                         'last_update': datetime.now().isoformat()}
+        with open(tmp, 'w') as f:
+            json.dump(snapshot, f, indent=2, default=str)
+        os.replace(tmp, self.history_file)
+
+        tmp = f"{self.events_file}.tmp"
+        with open(tmp, 'w') as f:
+            for event in self._open_events.values():
+                f.write(json.dumps(event, default=str) + '\n')
+        os.replace(tmp, self.events_file)
+        self._pending_closes = 0
+
+    def pending_closes(self) -> int:
+        return self._pending_closes
+
+    # ===========================================
+    # CONSULTAS
+    # ===========================================
+
+    def get(self, trade_id: str) -> Optional[Dict]:
+        position = self._by_id.get(trade_id)
+        return self.trades[position] if position is not None else None
+
+    def query(self, ticker: Optional[str] = None, start: Optional[datetime] = None,
+              end: Optional[datetime] = None, result: Optional[str] = None) -> List[Dict]:
+        """Trades cerrados por ticker y/o rango de cierre, ordenados por fecha de cierre"""
+        lo = bisect.bisect_left(self._close_times, start.isoformat()) if start else 0
+        hi = bisect.bisect_right(self._close_times, end.isoformat()) if end else len(self._close_times)
+        positions = self._close_order[lo:hi]
+
+        if ticker is not None:
+            wanted = set(self._by_ticker.get(ticker, ()))
+            positions = [p for p in positions if p in wanted]
+
+        trades = [self.trades[p] for p in positions]
+        if result is not None:
+            trades = [t for t in trades if t.get('result') == result]
+        return trades
+
+    def get_statistics(self, active_trades: int = 0) -> Dict:
+        return self.aggregates.as_dict(active_trades)
+
+
+class PricePathStore:
+    """Trayectorias de precio por trade en arrays columnares"""
+
+    def __init__(self, directory: str = 'price_paths'):
+        self.directory = directory
+        # trade_id -> (timestamps, precios, pnl) aún no volcados
+        self._pending: Dict[str, Tuple[array, array, array]] = {}
+
+    def _path(self, trade_id: str) -> str:
+        return os.path.join(self.directory, re.sub(r'[^A-Za-z0-9_.-]', '_', trade_id) + '.bin')
+
+    def append(self, trade_id: str, timestamp: float, price: float, pnl: float):
+        columns = self._pending.get(trade_id)
+        if columns is None:
+            columns = self._pending[trade_id] = (array('d'), array('d'), array('d'))
+        columns[0].append(timestamp)
+        columns[1].append(price)
+        columns[2].append(pnl)
+
+    def extend(self, trade_id: str, samples: Iterable[Dict]):
+        """Importa el formato antiguo (lista de dicts con timestamp ISO)"""
+        for sample in samples:
+            self.append(trade_id, datetime.fromisoformat(sample['timestamp']).timestamp(),
+                        sample['price'], sample['pnl'])
+
+    def flush(self, trade_id: Optional[str] = None):
+        """Vuelca al disco las muestras pendientes (de un trade o de todos)"""
+        trade_ids = [trade_id] if trade_id is not None else list(self._pending)
+        for tid in trade_ids:
+            columns = self._pending.pop(tid, None)
+            if columns is None or not len(columns[0]):
+                continue
+            records = np.empty(len(columns[0]), dtype=PRICE_SAMPLE_DTYPE)
+            for name, column in zip(PRICE_SAMPLE_DTYPE.names, columns):
+                records[name] = np.frombuffer(column, dtype='<f8')
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(tid), 'ab') as f:
+                f.write(records.tobytes())
+
+    def get(self, trade_id: str) -> np.ndarray:
+        """Trayectoria completa como array estructurado (timestamp, price, pnl)"""
+        parts = []
+        path = self._path(trade_id)
+        if os.path.exists(path):
+            parts.append(np.fromfile(path, dtype=PRICE_SAMPLE_DTYPE))
+        columns = self._pending.get(trade_id)
+        if columns is not None and len(columns[0]):
+            pending = np.empty(len(columns[0]), dtype=PRICE_SAMPLE_DTYPE)
+            for name, column in zip(PRICE_SAMPLE_DTYPE.names, columns):
+                pending[name] = np.frombuffer(column, dtype='<f8')
+            parts.append(pending)
+        if not parts:
+            return np.empty(0, dtype=PRICE_SAMPLE_DTYPE)
+        return np.concatenate(parts)
+
+    def count(self, trade_id: str) -> int:
+        path = self._path(trade_id)
+        on_disk = os.path.getsize(path) // PRICE_SAMPLE_DTYPE.itemsize if os.path.exists(path) else 0
+        columns = self._pending.get(trade_id)
+        return on_disk + (len(columns[0]) if columns is not None else 0)
+
+    def as_records(self, trade_id: str) -> List[Dict]:
+        """Formato antiguo de price_history (lista de dicts)"""
+        return [{'timestamp': datetime.fromtimestamp(ts).isoformat(), 'price': float(price), 'pnl': float(pnl)}
+                for ts, price, pnl in self.get(trade_id)]
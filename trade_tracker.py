@@ -8,12 +8,13 @@ import json
 import os
 import csv
 from datetime import datetime, timedelta
-import pandas as pd
-import yfinance as yf
 from typing import Dict, List, Optional
 import time
 import threading
 
+from price_watcher import get_price_watcher
+from trade_store import TradeStore, PricePathStore
+
 class TradeTracker:
     """Sistema completo de tracking de trades"""
     
@@ -21,6 +22,11 @@ class TradeTracker:
         self.trades_file = 'trade_history.json'
         self.csv_file = 'trade_results.csv'
         self.active_trades_file = 'active_trades.json'
+        self.events_file = 'trade_events.jsonl'
+        self.price_paths_dir = 'price_paths'
+        
+        self._lock = threading.RLock()
+        self._dirty = False
         
         # Cargar trades activos
         self.active_trades = self.load_active_trades()
@@ -28,9 +34,14 @@ class TradeTracker:
         # Crear archivos si no existen
         self._initialize_files()
         
-        # Thread para monitoreo automático
+        # Historial: log de eventos + snapshot compactado; trayectorias en arrays
+        self.history = TradeStore(self.trades_file, self.events_file)
+        self.price_paths = PricePathStore(self.price_paths_dir)
+        self._recover_state()
+        
+        # Monitoreo vía price watcher compartido (sin hilo propio)
         self.monitoring = False
-        self.monitor_thread = None
+        self.watcher = None
     
     def _initialize_files(self):
         """Inicializa los archivos de tracking"""
@@ -57,10 +68,36 @@ class TradeTracker:
                 return json.load(f)
         return {}
     
+    def _recover_state(self):
+        """Migra price_history antiguos y descarta activos ya cerrados en el log"""
+        changed = False
+        for trade_id, trade in list(self.active_trades.items()):
+            legacy = trade.pop('price_history', None)
+            if legacy:
+                self.price_paths.extend(trade_id, legacy)
+            changed = changed or legacy is not None
+            # Corte entre el evento de cierre y el guardado de activos
+            if self.history.get(trade_id) is not None:
+                del self.active_trades[trade_id]
+                changed = True
+        if changed:
+            self.save_active_trades()
+    
     def save_active_trades(self):
         """Guarda los trades activos"""
-        with open(self.active_trades_file, 'w') as f:
-            json.dump(self.active_trades, f, indent=2)
+        with self._lock:
+            self.price_paths.flush()
+            with open(self.active_trades_file, 'w') as f:
+                json.dump(self.active_trades, f, indent=2)
+            self._dirty = False
+    
+    def snapshot(self):
+        """Persiste el estado en memoria si cambió y compacta el historial"""
+        with self._lock:
+            if self._dirty:
+                self.save_active_trades()
+            if self.history.pending_closes():
+                self.history.compact()
     
     def open_trade(self, signal: dict) -> str:
         """Registra un nuevo trade basado en una señal"""
@@ -85,13 +122,14 @@ class TradeTracker:
             'duration_hours': 0,
             'max_favorable': 0,  # Máximo profit durante el trade
             'max_adverse': 0,     # Máximo drawdown durante el trade
-            'price_history': [],  # Historial de precios
             'notes': signal.get('notes', '')
         }
         
         # Guardar en trades activos
-        self.active_trades[trade_id] = trade
-        self.save_active_trades()
+        with self._lock:
+            self.active_trades[trade_id] = trade
+            self.save_active_trades()
+            self.history.record_open(trade)
         
         # Log
         print(f"📊 Trade abierto: {trade_id}")
@@ -100,8 +138,20 @@ class TradeTracker:
         
         return trade_id
     
-    def update_trade_price(self, trade_id: str, current_price: float):
-        """Actualiza el precio actual y estadísticas del trade"""
+    def update_trade_price(self, trade_id: str, current_price: float, persist: bool = True):
+        """
+        Actualiza el precio actual y estadísticas del trade
+        
+        Con persist=False (ticks del price watcher) el cambio queda en
+        memoria hasta el siguiente snapshot; abrir y cerrar siempre persisten.
+        """
+        with self._lock:
+            self._update_trade_price(trade_id, current_price)
+            self._dirty = True
+            if persist:
+                self.save_active_trades()
+    
+    def _update_trade_price(self, trade_id: str, current_price: float):
         if trade_id not in self.active_trades:
             return
         
@@ -117,11 +167,7 @@ class TradeTracker:
         # Actualizar estadísticas
         trade['current_price'] = current_price
         trade['pnl_percent'] = pnl_pct
-        trade['price_history'].append({
-            'timestamp': datetime.now().isoformat(),
-            'price': current_price,
-            'pnl': pnl_pct
-        })
+        self.price_paths.append(trade_id, time.time(), current_price, pnl_pct)
         
         # Actualizar máximos
         if pnl_pct > trade['max_favorable']:
@@ -140,11 +186,13 @@ class TradeTracker:
                 self.close_trade(trade_id, trade['take_profit'], 'TAKE_PROFIT')
             elif current_price >= trade['stop_loss']:
                 self.close_trade(trade_id, trade['stop_loss'], 'STOP_LOSS')
-        
-        self.save_active_trades()
     
     def close_trade(self, trade_id: str, exit_price: float, result: str = 'MANUAL'):
         """Cierra un trade y calcula resultados finales"""
+        with self._lock:
+            return self._close_trade(trade_id, exit_price, result)
+    
+    def _close_trade(self, trade_id: str, exit_price: float, result: str):
         if trade_id not in self.active_trades:
             print(f"❌ Trade {trade_id} no encontrado")
             return
@@ -173,6 +221,7 @@ class TradeTracker:
         close_time = datetime.fromisoformat(trade['timestamp_close'])
         duration = (close_time - open_time).total_seconds() / 3600
         trade['duration_hours'] = round(duration, 2)
+        trade['price_samples'] = self.price_paths.count(trade_id)
         
         # Guardar en historial
         self._save_to_history(trade)
@@ -194,14 +243,8 @@ class TradeTracker:
         return trade
     
     def _save_to_history(self, trade: dict):
-        """Guarda el trade en el historial JSON"""
-        with open(self.trades_file, 'r') as f:
-            history = json.load(f)
-        
-        history.append(trade)
-        
-        with open(self.trades_file, 'w') as f:
-            json.dump(history, f, indent=2)
+        """Registra el cierre en el log de eventos (el snapshot se compacta aparte)"""
+        self.history.record_close(trade)
     
     def _save_to_csv(self, trade: dict):
         """Guarda el trade en CSV para análisis"""
@@ -228,84 +271,62 @@ class TradeTracker:
                 trade['position_size_pct']
             ])
     
-    def monitor_active_trades(self):
-        """Monitorea los trades activos y actualiza precios"""
-        print("🔍 Iniciando monitoreo de trades activos...")
-        
-        while self.monitoring:
-            if self.active_trades:
-                for trade_id, trade in list(self.active_trades.items()):
-                    try:
-                        # Obtener precio actual
-                        ticker = yf.Ticker(trade['ticker'])
-                        data = ticker.history(period='1d', interval='1m')
-                        
-                        if not data.empty:
-                            current_price = float(data['Close'].iloc[-1])
-                            self.update_trade_price(trade_id, current_price)
-                            
-                            # Log
-                            pnl = trade.get('pnl_percent', 0)
-                            emoji = "🟢" if pnl > 0 else "🔴" if pnl < 0 else "⚪"
-                            print(f"{emoji} {trade['ticker']}: ${current_price:.2f} ({pnl:+.2f}%)")
-                    
-                    except Exception as e:
-                        print(f"Error monitoreando {trade_id}: {e}")
+    def watched_tickers(self) -> List[str]:
+        """Tickers con trades activos (los que pide al price watcher)"""
+        with self._lock:
+            return [trade['ticker'] for trade in self.active_trades.values()]
+    
+    def on_prices(self, prices: Dict[str, float]):
+        """Tick del price watcher: actualiza en memoria los trades activos"""
+        for trade_id, trade in list(self.active_trades.items()):
+            current_price = prices.get(trade['ticker'])
+            if current_price is None:
+                continue
+            try:
+                self.update_trade_price(trade_id, current_price, persist=False)
+                
+                # Log
+                pnl = trade.get('pnl_percent', 0)
+                emoji = "🟢" if pnl > 0 else "🔴" if pnl < 0 else "⚪"
+                print(f"{emoji} {trade['ticker']}: ${current_price:.2f} ({pnl:+.2f}%)")
             
-            # Esperar antes del siguiente check
-            time.sleep(60)  # Check cada minuto
+            except Exception as e:
+                print(f"Error monitoreando {trade_id}: {e}")
     
-    def start_monitoring(self):
-        """Inicia el monitoreo automático en background"""
+    def start_monitoring(self, watcher=None):
+        """Suscribe los trades activos al price watcher compartido"""
         if not self.monitoring:
             self.monitoring = True
-            self.monitor_thread = threading.Thread(target=self.monitor_active_trades)
-            self.monitor_thread.daemon = True
-            self.monitor_thread.start()
+            self.watcher = watcher or get_price_watcher()
+            # Un suscriptor por fichero: otra instancia sobre el mismo fichero lo reemplaza
+            self.watcher.subscribe(f"trade_tracker:{os.path.abspath(self.active_trades_file)}",
+                                   self.watched_tickers, self.on_prices, self.snapshot)
             print("✅ Monitoreo automático iniciado")
     
     def stop_monitoring(self):
         """Detiene el monitoreo automático"""
         self.monitoring = False
-        if self.monitor_thread:
-            self.monitor_thread.join()
+        if self.watcher:
+            self.watcher.unsubscribe(f"trade_tracker:{os.path.abspath(self.active_trades_file)}")
+            self.watcher = None
+        self.snapshot()
         print("🛑 Monitoreo detenido")
     
     def get_statistics(self) -> dict:
-        """Calcula estadísticas de trading"""
-        if not os.path.exists(self.csv_file):
-            return {}
-        
-        df = pd.read_csv(self.csv_file)
-        
-        if df.empty:
-            return {}
-        
-        # Filtrar trades cerrados
-        closed_trades = df[df['Result'].notna()]
-        
-        if closed_trades.empty:
-            return {}
-        
-        stats = {
-            'total_trades': len(closed_trades),
-            'active_trades': len(self.active_trades),
-            'winning_trades': len(closed_trades[closed_trades['PnL_Percent'] > 0]),
-            'losing_trades': len(closed_trades[closed_trades['PnL_Percent'] < 0]),
-            'win_rate': (len(closed_trades[closed_trades['PnL_Percent'] > 0]) / len(closed_trades) * 100),
-            'avg_win': closed_trades[closed_trades['PnL_Percent'] > 0]['PnL_Percent'].mean(),
-            'avg_loss': closed_trades[closed_trades['PnL_Percent'] < 0]['PnL_Percent'].mean(),
-            'total_pnl': closed_trades['PnL_USD'].sum(),
-            'avg_duration': closed_trades['Duration_Hours'].mean(),
-            'best_trade': closed_trades['PnL_Percent'].max(),
-            'worst_trade': closed_trades['PnL_Percent'].min(),
-            'profit_factor': abs(
-                closed_trades[closed_trades['PnL_Percent'] > 0]['PnL_Percent'].sum() /
-                closed_trades[closed_trades['PnL_Percent'] < 0]['PnL_Percent'].sum()
-            ) if len(closed_trades[closed_trades['PnL_Percent'] < 0]) > 0 else float('inf')
-        }
-        
-        return stats
+        """Calcula estadísticas de trading (agregados incrementales)"""
+        with self._lock:
+            return self.history.get_statistics(len(self.active_trades))
+    
+    def get_trade_history(self, ticker: Optional[str] = None, start: Optional[datetime] = None,
+                          end: Optional[datetime] = None, result: Optional[str] = None) -> List[dict]:
+        """Trades cerrados por ticker, rango de cierre y/o resultado"""
+        with self._lock:
+            return self.history.query(ticker, start, end, result)
+    
+    def get_price_history(self, trade_id: str) -> List[dict]:
+        """Trayectoria de precios de un trade (activo o cerrado)"""
+        with self._lock:
+            return self.price_paths.as_records(trade_id)
     
     def print_report(self):
         """Imprime un reporte de performance"""
@@ -340,6 +361,19 @@ class TradeTracker:
                 emoji = "🟢" if pnl > 0 else "🔴" if pnl < 0 else "⚪"
                 print(f"   {emoji} {trade['ticker']} ({trade['direction']}): {pnl:+.2f}%")
 
+# Tracker compartido del proceso
+_default_tracker: Optional[TradeTracker] = None
+_default_tracker_lock = threading.Lock()
+
+
+def get_trade_tracker() -> TradeTracker:
+    """Tracker único: todas las señales comparten estado y suscripción"""
+    global _default_tracker
+    with _default_tracker_lock:
+        if _default_tracker is None:
+            _default_tracker = TradeTracker()
+        return _default_tracker
+
 # Funciones de utilidad
 def test_system():
     """Prueba el sistema con un trade de ejemplo"""
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark de TradingDatabase: acceso antiguo vs pool WAL con índices
+
+"Antes": una conexión nueva por llamada, journal por defecto y sin índices
+(como estaba database.py). "Después": conexión por hilo en WAL, índices y
+escritura en lote. Usa una base temporal, no toca trading_bot.db.
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+import numpy as np
+
+from database import TradingDatabase, INDEXES, SIGNAL_INSERT, _signal_row
+
+USERS = 100
+ROWS = 50_000        # señales de fondo para medir consultas
+INSERTS = 2_000      # señales insertadas en la prueba de escritura
+QUERIES = 300
+
+
+def make_signals(n, offset=0):
+    rng = np.random.default_rng(offset)
+    return [{
+        'id': f"sig_{offset + i}",
+        'user_id': f"user_{rng.integers(USERS)}",
+        'symbol': ["BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT"][i % 4],
+        'action': "BUY" if i % 2 else "SELL",
+        'confidence': float(rng.uniform(70, 95)),
+        'entry_price': float(rng.uniform(1, 100)),
+    } for i in range(n)]
+
+
+class LegacyAccess:
+    """Patrón anterior: sqlite3.connect en cada llamada, sin índices"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        TradingDatabase(db_path).close()
+        conn = sqlite3.connect(db_path)
+        for index in INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {index.split()[5]}")
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.commit()
+        conn.close()
+
+    def save_signal(self, signal):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(SIGNAL_INSERT, _signal_row(signal))
+        conn.commit()
+        conn.close()
+
+    def save_signals(self, signals):
+        for signal in signals:
+            self.save_signal(signal)
+
+    def get_recent_signals(self, limit, user_id):
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(
+            "SELECT * FROM signals WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?", (user_id, limit)
+        ).fetchall()
+        conn.close()
+        return rows
+
+
+def seed(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(SIGNAL_INSERT, [_signal_row(s) for s in make_signals(ROWS, offset=10**6)])
+    conn.commit()
+    conn.close()
+
+
+def measure(label, backend):
+    signals = make_signals(INSERTS)
+
+    start = time.perf_counter()
+    for signal in signals[:INSERTS // 2]:
+        backend.save_signal(signal)
+    single_rate = (INSERTS // 2) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    backend.save_signals(signals[INSERTS // 2:])
+    batch_rate = (INSERTS // 2) / (time.perf_counter() - start)
+
+    latencies = []
+    for i in range(QUERIES):
+        t0 = time.perf_counter()
+        backend.get_recent_signals(20, user_id=f"user_{i % USERS}")
+        latencies.append((time.perf_counter() - t0) * 1000)
+    p50, p99 = np.percentile(latencies, [50, 99])
+
+    print(f"{label:<8} insert={single_rate:>9.0f}/s  lote={batch_rate:>9.0f}/s  "
+          f"consulta p50={p50:.3f}ms p99={p99:.3f}ms")
+
+
+def run():
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        pooled_path = os.path.join(tmp, "pooled.db")
+
+        legacy = LegacyAccess(legacy_path)
+        seed(legacy_path)
+
+        pooled = TradingDatabase(pooled_path)
+        seed(pooled_path)
+
+        print(f"{ROWS} señales de fondo, {USERS} usuarios, {INSERTS} inserciones")
+        measure("Antes", legacy)
+        measure("Después", pooled)
+        pooled.close()
+
+
+if __name__ == "__main__":
+    run()
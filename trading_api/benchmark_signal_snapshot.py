@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark del snapshot de señales: 100 usuarios concurrentes
+
+Objetivo: p99 de la proyección por usuario (ruta de /api/signals/all)
+por debajo de 20 ms con el snapshot caliente. Usa velas sintéticas, así
+que no necesita red ni base de datos.
+"""
+
+import asyncio
+import time
+import numpy as np
+import pandas as pd
+
+from signal_snapshot import SignalSnapshotService, DEFAULT_SYMBOLS
+
+USERS = 100
+ROUNDS = 20
+P99_TARGET_MS = 20.0
+
+
+def synthetic_candles(symbol: str, limit: int) -> pd.DataFrame:
+    rng = np.random.default_rng(abs(hash(symbol)) % 2**32)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, limit)))
+    now = pd.Timestamp.utcnow().tz_localize(None).floor('15min')
+    index = pd.date_range(end=now, periods=limit, freq='15min', name='timestamp')
+    return pd.DataFrame({
+        'open': close, 'high': close * 1.003, 'low': close * 0.997,
+        'close': close, 'volume': rng.uniform(100, 1000, limit)
+    }, index=index)
+
+
+async def fake_fetch_all(symbols, interval, limit):
+    await asyncio.sleep(0.3)  # descarga simulada
+    return {symbol: synthetic_candles(symbol, limit) for symbol in symbols}
+
+
+async def run():
+    service = SignalSnapshotService(fake_fetch_all, symbols=DEFAULT_SYMBOLS)
+
+    # Arranque en frío: 100 usuarios a la vez comparten un único cálculo
+    start = time.perf_counter()
+    await asyncio.gather(*(service.get_signals_for_user(f"user_{i}") for i in range(USERS)))
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+
+    async def timed(user_id):
+        t0 = time.perf_counter()
+        await service.get_signals_for_user(user_id)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    for _ in range(ROUNDS):
+        await asyncio.gather(*(timed(f"user_{i}") for i in range(USERS)))
+
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"Arranque en frío ({USERS} usuarios): {cold_ms:.1f}ms, cálculos: {service.stats['computes']}")
+    print(f"Proyección por usuario ({USERS * ROUNDS} peticiones): p50={p50:.3f}ms p99={p99:.3f}ms")
+    print(f"{'✅' if p99 < P99_TARGET_MS else '❌'} Objetivo p99 < {P99_TARGET_MS:.0f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
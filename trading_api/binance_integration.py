@@ -18,8 +18,13 @@ import json
 import logging
 from dataclasses import dataclass, asdict
 import os
+import sys
 from enum import Enum
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from candle_store import CandleStore, ccxt_fetcher
+from timeframe_resampler import TimeframeResampler
+
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -134,6 +139,13 @@ class BinanceConnector:
             })
             logger.info("🚀 Usando Binance MAINNET")
         
+        # Almacén local de velas: sólo se descarga la cola que falta
+        store_dir = os.path.join(os.getenv('CANDLE_STORE_DIR', 'candles'),
+                                 'ccxt_testnet' if testnet else 'ccxt')
+        self.candle_store = CandleStore(ccxt_fetcher(self.exchange), data_dir=store_dir)
+        # 4h se agrega desde la serie de 1h en lugar de descargarse aparte
+        self.resampler = TimeframeResampler(self.candle_store, '1h')
+        
         # Cache de datos
         self.market_cache = {}
         self.positions = {}
@@ -151,49 +163,40 @@ class BinanceConnector:
         Args:
             symbol: Símbolo (ej: 'BTC/USDT')
             timeframe: Temporalidad ('1m', '5m', '15m', '1h', '4h', '1d')
-            limit: Número de velas (máx 1000)
+            limit: Número de velas (se pagina por encima de 1000)
             
         Returns:
             DataFrame con OHLCV
         """
         
         try:
-            # Obtener datos OHLCV
-            ohlcv = self.exchange.fetch_ohlcv(
-                symbol=symbol,
-                timeframe=timeframe,
-                limit=limit
-            )
-            
-            # Convertir a DataFrame
-            df = pd.DataFrame(
-                ohlcv,
-                columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']
-            )
-            
-            # Convertir timestamp a datetime
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
-            
-            # Agregar metadatos
-            df.attrs['symbol'] = symbol
-            df.attrs['timeframe'] = timeframe
-            
-            # Cachear
-            cache_key = f"{symbol}_{timeframe}"
-            self.market_cache[cache_key] = {
-                'data': df,
-                'updated': datetime.now()
-            }
-            
-            logger.info(f"📊 Datos obtenidos: {symbol} {timeframe} ({len(df)} velas)")
-            
-            return df
+            # Velas cerradas desde el store local + cola incremental
+            df = self.candle_store.get_dataframe(symbol, timeframe, limit)
+            return self._register_market_data(df, symbol, timeframe)
             
         except Exception as e:
             logger.error(f"❌ Error obteniendo datos: {e}")
             return pd.DataFrame()
     
+    def _register_market_data(self, df: pd.DataFrame, symbol: str, timeframe: str) -> pd.DataFrame:
+        """Normaliza columnas, añade metadatos y cachea una ventana de velas"""
+        df.columns = ['open', 'high', 'low', 'close', 'volume']
+        
+        # Agregar metadatos
+        df.attrs['symbol'] = symbol
+        df.attrs['timeframe'] = timeframe
+        
+        # Cachear
+        cache_key = f"{symbol}_{timeframe}"
+        self.market_cache[cache_key] = {
+            'data': df,
+            'updated': datetime.now()
+        }
+        
+        logger.info(f"📊 Datos obtenidos: {symbol} {timeframe} ({len(df)} velas)")
+        
+        return df
+    
     def get_multiple_timeframes(self, symbol: str) -> Dict[str, pd.DataFrame]:
         """
         Obtiene datos en múltiples timeframes para análisis
@@ -203,15 +206,27 @@ class BinanceConnector:
             
         Returns:
             Dict con DataFrames por timeframe
+        
+        Se sincroniza una sola serie (1h) y 4h se agrega a partir de ella.
+        1d sigue siendo su propia serie del store: agregarla desde 1h
+        obligaría a paginar ~12.000 velas horarias en la primera llamada.
+        Como en el análisis multi-timeframe sólo cuentan velas cerradas,
+        ninguna temporalidad incluye la vela en formación.
         """
         
-        timeframes = ['1h', '4h', '1d']
+        timeframes = {'1h': 500, '4h': 500}
         data = {}
         
-        for tf in timeframes:
-            df = self.get_historical_data(symbol, tf)
+        try:
+            frames = self.resampler.get_timeframes(symbol, timeframes, include_live=False)
+            frames['1d'] = self.candle_store.get_dataframe(symbol, '1d', 500, include_live=False)
+        except Exception as e:
+            logger.error(f"❌ Error obteniendo datos: {e}")
+            return data
+        
+        for tf, df in frames.items():
             if not df.empty:
-                data[tf] = df
+                data[tf] = self._register_market_data(df, symbol, tf)
         
         return data
     
@@ -233,6 +248,27 @@ class BinanceConnector:
             logger.error(f"Error obteniendo precio: {e}")
             return 0.0
     
+    def get_current_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Obtiene el precio actual de varios símbolos en una sola petición
+        
+        Args:
+            symbols: Símbolos (ej: ['BTC/USDT', 'ETH/USDT'])
+            
+        Returns:
+            Dict {símbolo: precio}
+        """
+        
+        if not symbols:
+            return {}
+        try:
+            tickers = self.exchange.fetch_tickers(list(symbols))
+            return {symbol: ticker['last'] for symbol, ticker in tickers.items()
+                    if ticker.get('last')}
+        except Exception as e:
+            logger.error(f"Error obteniendo precios: {e}")
+            return {}
+    
     def get_orderbook(self, symbol: str, limit: int = 10) -> Dict:
         """
         Obtiene libro de órdenes
@@ -419,33 +455,36 @@ class BinanceConnector:
         
         # Obtener balance actual
         balance = self.get_balance()
+        holdings = {f"{currency}/USDT": amount for currency, amount in balance.items()
+                    if currency != 'USDT' and amount > 0}
+        # Un solo snapshot de precios para todas las posiciones
+        prices = self.get_current_prices(list(holdings))
         
-        for currency, amount in balance.items():
-            if currency != 'USDT' and amount > 0:
-                symbol = f"{currency}/USDT"
-                current_price = self.get_current_price(symbol)
+        for symbol, amount in holdings.items():
+            currency = symbol.split('/')[0]
+            current_price = prices.get(symbol, 0.0)
+            
+            # Buscar precio de entrada en historial
+            entry_price = self._find_entry_price(currency)
+            
+            if current_price > 0:
+                pnl = (current_price - entry_price) * amount
+                pnl_pct = ((current_price / entry_price) - 1) * 100 if entry_price > 0 else 0
                 
-                # Buscar precio de entrada en historial
-                entry_price = self._find_entry_price(currency)
+                position = Position(
+                    symbol=symbol,
+                    side='long',  # Simplificado para spot
+                    amount=amount,
+                    entry_price=entry_price,
+                    current_price=current_price,
+                    pnl=pnl,
+                    pnl_percentage=pnl_pct,
+                    timestamp=datetime.now(),
+                    project_id=project_id or 'DEFAULT',
+                    philosopher='UNKNOWN'
+                )
                 
-                if current_price > 0:
-                    pnl = (current_price - entry_price) * amount
-                    pnl_pct = ((current_price / entry_price) - 1) * 100 if entry_price > 0 else 0
-                    
-                    position = Position(
-                        symbol=symbol,
-                        side='long',  # Simplificado para spot
-                        amount=amount,
-                        entry_price=entry_price,
-                        current_price=current_price,
-                        pnl=pnl,
-                        pnl_percentage=pnl_pct,
-                        timestamp=datetime.now(),
-                        project_id=project_id or 'DEFAULT',
-                        philosopher='UNKNOWN'
-                    )
-                    
-                    positions.append(position)
+                positions.append(position)
         
         self.positions[project_id or 'DEFAULT'] = positions
         return positions
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""Los tests de trading_api se ejecutan desde este directorio: reutiliza los fixtures del conftest raíz"""
+
+import importlib.util
+import os
+
+_spec = importlib.util.spec_from_file_location(
+    'root_conftest', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'conftest.py'))
+_root = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_root)
+
+ohlcv = _root.ohlcv
@@ -1,23 +1,179 @@
 """
 Sistema de Base de Datos para Trading Bot
 Gestiona la persistencia de señales y posiciones
+
+Cada hilo reutiliza una única conexión (pool thread-local) en modo WAL,
+de modo que las lecturas del dashboard no esperan a las escrituras y no
+se abre un fichero por llamada. Las escrituras pueden agruparse en una
+sola transacción con `transaction()` o con los métodos *_many / save_signals.
 """
 
 import sqlite3
 import json
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from typing import List, Dict, Optional
 import os
 
+# Pragmas aplicados a cada conexión del pool
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",      # seguro con WAL, sin fsync por commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",       # ~16 MB de caché de páginas
+    "PRAGMA mmap_size=134217728",     # 128 MB mapeados
+    "PRAGMA foreign_keys=ON",
+)
+
+# Índices según las consultas reales (dashboard, posiciones abiertas, stats)
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_signals_user_ts ON signals (user_id, timestamp DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_signals_ts ON signals (timestamp DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_signals_symbol_ts ON signals (symbol, timestamp DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_signals_executed ON signals (executed)",
+    "CREATE INDEX IF NOT EXISTS idx_positions_status_open ON positions (status, open_time DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_positions_user_status_open ON positions (user_id, status, open_time DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_positions_symbol ON positions (symbol)",
+    "CREATE INDEX IF NOT EXISTS idx_performance_ts ON performance (timestamp DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts (timestamp DESC)",
+)
+
+SIGNAL_INSERT = """
+    INSERT INTO signals 
+    (id, user_id, symbol, action, confidence, entry_price, stop_loss, 
+     take_profit, philosopher, reasoning, market_trend, rsi, volume_ratio)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+POSITION_UPSERT = """
+    INSERT OR REPLACE INTO positions 
+    (id, user_id, symbol, type, entry_price, current_price, quantity, 
+     stop_loss, take_profit, pnl, pnl_percentage, status, strategy)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _signal_row(signal: Dict) -> tuple:
+    return (
+        signal['id'],
+        signal['user_id'],
+        signal['symbol'],
+        signal['action'],
+        signal['confidence'],
+        signal.get('entry_price'),
+        signal.get('stop_loss'),
+        signal.get('take_profit'),
+        signal.get('philosopher', 'System'),
+        signal.get('reasoning', ''),
+        signal.get('market_trend'),
+        signal.get('rsi'),
+        signal.get('volume_ratio')
+    )
+
+
+def _position_row(position: Dict) -> tuple:
+    return (
+        position['id'],
+        position['user_id'],
+        position['symbol'],
+        position['type'],
+        position['entry_price'],
+        position.get('current_price', position['entry_price']),
+        position['quantity'],
+        position.get('stop_loss'),
+        position.get('take_profit'),
+        position.get('pnl', 0),
+        position.get('pnl_percentage', 0),
+        position.get('status', 'OPEN'),
+        position.get('strategy', 'Manual')
+    )
+
+
+def _rows_to_dicts(cursor) -> List[Dict]:
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
 class TradingDatabase:
-    def __init__(self, db_path: str = "trading_bot.db"):
-        """Inicializa la conexión a la base de datos"""
+    def __init__(self, db_path: str = "trading_bot.db", timeout: float = 10):
+        """
+        Inicializa la conexión a la base de datos
+
+        Args:
+            timeout: Segundos que una escritura espera a un lock ajeno
+        """
         self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
         self.init_database()
     
+    # === CONEXIONES ===
+    
+    def get_connection(self) -> sqlite3.Connection:
+        """Conexión del hilo actual (se crea y configura una sola vez)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout)
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Transacción sobre la conexión del hilo
+
+        Es anidable: dentro de `with db.transaction():` las llamadas a
+        save_signal/save_position/... no hacen commit propio, y todo se
+        confirma (o se deshace) una sola vez al salir del bloque exterior.
+        Dentro de ese bloque los save_* propagan sus errores en lugar de
+        devolver False/0, para que el llamador sepa que nada se guardó.
+        """
+        conn = self.get_connection()
+        outermost = self._local.depth == 0
+        if outermost:
+            conn.execute("BEGIN")
+        self._local.depth += 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth -= 1
+            if outermost:
+                conn.rollback()
+            raise
+        else:
+            self._local.depth -= 1
+            if outermost:
+                conn.commit()
+    
+    def _in_outer_transaction(self) -> bool:
+        """
+        True si la llamada está dentro de un `with db.transaction()` ajeno:
+        el error debe propagarse para que el bloque exterior lo deshaga
+        """
+        return getattr(self._local, 'depth', 0) > 0
+    
+    def close(self):
+        """Cierra todas las conexiones del pool"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass  # creada en otro hilo ya terminado
+        self._local = threading.local()
+    
     def init_database(self):
-        """Crea las tablas si no existen"""
-        conn = sqlite3.connect(self.db_path)
+        """Crea las tablas e índices si no existen"""
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         # Tabla de posiciones
@@ -92,49 +248,43 @@ class TradingDatabase:
             )
         """)
         
+        for index in INDEXES:
+            cursor.execute(index)
+        cursor.execute("PRAGMA optimize")
+        
         conn.commit()
-        conn.close()
     
     # === POSICIONES ===
     
     def save_position(self, position: Dict) -> bool:
         """Guarda una nueva posición"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT OR REPLACE INTO positions 
-                (id, user_id, symbol, type, entry_price, current_price, quantity, 
-                 stop_loss, take_profit, pnl, pnl_percentage, status, strategy)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                position['id'],
-                position['user_id'],
-                position['symbol'],
-                position['type'],
-                position['entry_price'],
-                position.get('current_price', position['entry_price']),
-                position['quantity'],
-                position.get('stop_loss'),
-                position.get('take_profit'),
-                position.get('pnl', 0),
-                position.get('pnl_percentage', 0),
-                position.get('status', 'OPEN'),
-                position.get('strategy', 'Manual')
-            ))
-            
-            conn.commit()
-            conn.close()
+            with self.transaction() as conn:
+                conn.execute(POSITION_UPSERT, _position_row(position))
             return True
         except Exception as e:
+            if self._in_outer_transaction():
+                raise
             print(f"Error saving position: {e}")
             return False
     
+    def save_positions(self, positions: List[Dict]) -> int:
+        """Guarda varias posiciones en una sola transacción; devuelve cuántas"""
+        if not positions:
+            return 0
+        try:
+            with self.transaction() as conn:
+                conn.executemany(POSITION_UPSERT, [_position_row(p) for p in positions])
+            return len(positions)
+        except Exception as e:
+            if self._in_outer_transaction():
+                raise
+            print(f"Error saving positions: {e}")
+            return 0
+    
     def get_open_positions(self, user_id: str = None) -> List[Dict]:
         """Obtiene las posiciones abiertas (opcionalmente filtradas por usuario)"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
         
         if user_id:
             cursor.execute("""
@@ -149,32 +299,21 @@ class TradingDatabase:
                 ORDER BY open_time DESC
             """)
         
-        columns = [col[0] for col in cursor.description]
-        positions = []
-        for row in cursor.fetchall():
-            positions.append(dict(zip(columns, row)))
-        
-        conn.close()
-        return positions
+        return _rows_to_dicts(cursor)
     
     def update_position(self, position_id: str, updates: Dict) -> bool:
         """Actualiza una posición existente"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Construir la consulta dinámicamente
             set_clause = ", ".join([f"{k} = ?" for k in updates.keys()])
             values = list(updates.values()) + [position_id]
             
-            cursor.execute(f"""
-                UPDATE positions 
-                SET {set_clause}
-                WHERE id = ?
-            """, values)
-            
-            conn.commit()
-            conn.close()
+            with self.transaction() as conn:
+                conn.execute(f"""
+                    UPDATE positions 
+                    SET {set_clause}
+                    WHERE id = ?
+                """, values)
             return True
         except Exception as e:
             print(f"Error updating position: {e}")
@@ -194,41 +333,59 @@ class TradingDatabase:
     def save_signal(self, signal: Dict) -> bool:
         """Guarda una nueva señal"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO signals 
-                (id, user_id, symbol, action, confidence, entry_price, stop_loss, 
-                 take_profit, philosopher, reasoning, market_trend, rsi, volume_ratio)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                signal['id'],
-                signal['user_id'],
-                signal['symbol'],
-                signal['action'],
-                signal['confidence'],
-                signal.get('entry_price'),
-                signal.get('stop_loss'),
-                signal.get('take_profit'),
-                signal.get('philosopher', 'System'),
-                signal.get('reasoning', ''),
-                signal.get('market_trend'),
-                signal.get('rsi'),
-                signal.get('volume_ratio')
-            ))
-            
-            conn.commit()
-            conn.close()
+            with self.transaction() as conn:
+                conn.execute(SIGNAL_INSERT, _signal_row(signal))
             return True
         except Exception as e:
+            if self._in_outer_transaction():
+                raise
             print(f"Error saving signal: {e}")
             return False
     
+    def save_signals(self, signals: List[Dict]) -> int:
+        """
+        Guarda varias señales en una sola transacción
+
+        Las señales con id repetido o datos inválidos se descartan una a una
+        sin deshacer el resto del lote.
+
+        Returns:
+            Número de señales guardadas
+        """
+        if not signals:
+            return 0
+        try:
+            with self.transaction() as conn:
+                conn.execute("SAVEPOINT signal_batch")
+                try:
+                    conn.executemany(SIGNAL_INSERT, [_signal_row(s) for s in signals])
+                    conn.execute("RELEASE signal_batch")
+                    return len(signals)
+                except (sqlite3.IntegrityError, KeyError):
+                    conn.execute("ROLLBACK TO signal_batch")
+                    conn.execute("RELEASE signal_batch")
+                # Alguna fila falló: insertarlas de una en una con SAVEPOINT
+                saved = 0
+                for signal in signals:
+                    conn.execute("SAVEPOINT signal_row")
+                    try:
+                        conn.execute(SIGNAL_INSERT, _signal_row(signal))
+                        conn.execute("RELEASE signal_row")
+                        saved += 1
+                    except (sqlite3.IntegrityError, KeyError) as e:
+                        conn.execute("ROLLBACK TO signal_row")
+                        conn.execute("RELEASE signal_row")
+                        print(f"Error saving signal {signal.get('id')}: {e}")
+                return saved
+        except Exception as e:
+            if self._in_outer_transaction():
+                raise
+            print(f"Error saving signals: {e}")
+            return 0
+    
     def get_recent_signals(self, limit: int = 20, user_id: str = None) -> List[Dict]:
         """Obtiene las señales más recientes (opcionalmente filtradas por usuario)"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
         
         if user_id:
             cursor.execute("""
@@ -244,28 +401,17 @@ class TradingDatabase:
                 LIMIT ?
             """, (limit,))
         
-        columns = [col[0] for col in cursor.description]
-        signals = []
-        for row in cursor.fetchall():
-            signals.append(dict(zip(columns, row)))
-        
-        conn.close()
-        return signals
+        return _rows_to_dicts(cursor)
     
     def mark_signal_executed(self, signal_id: str) -> bool:
         """Marca una señal como ejecutada"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                UPDATE signals 
-                SET executed = 1
-                WHERE id = ?
-            """, (signal_id,))
-            
-            conn.commit()
-            conn.close()
+            with self.transaction() as conn:
+                conn.execute("""
+                    UPDATE signals 
+                    SET executed = 1
+                    WHERE id = ?
+                """, (signal_id,))
             return True
         except Exception as e:
             print(f"Error marking signal as executed: {e}")
@@ -276,26 +422,21 @@ class TradingDatabase:
     def save_performance_metrics(self, metrics: Dict) -> bool:
         """Guarda métricas de performance"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO performance 
-                (total_pnl, daily_pnl, win_rate, total_trades, 
-                 winning_trades, losing_trades, open_positions)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                metrics.get('total_pnl', 0),
-                metrics.get('daily_pnl', 0),
-                metrics.get('win_rate', 0),
-                metrics.get('total_trades', 0),
-                metrics.get('winning_trades', 0),
-                metrics.get('losing_trades', 0),
-                metrics.get('open_positions', 0)
-            ))
-            
-            conn.commit()
-            conn.close()
+            with self.transaction() as conn:
+                conn.execute("""
+                    INSERT INTO performance 
+                    (total_pnl, daily_pnl, win_rate, total_trades, 
+                     winning_trades, losing_trades, open_positions)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    metrics.get('total_pnl', 0),
+                    metrics.get('daily_pnl', 0),
+                    metrics.get('win_rate', 0),
+                    metrics.get('total_trades', 0),
+                    metrics.get('winning_trades', 0),
+                    metrics.get('losing_trades', 0),
+                    metrics.get('open_positions', 0)
+                ))
             return True
         except Exception as e:
             print(f"Error saving performance metrics: {e}")
@@ -303,8 +444,7 @@ class TradingDatabase:
     
     def get_latest_performance(self) -> Optional[Dict]:
         """Obtiene las métricas de performance más recientes"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
         
         cursor.execute("""
             SELECT * FROM performance 
@@ -319,37 +459,34 @@ class TradingDatabase:
         else:
             performance = None
         
-        conn.close()
         return performance
     
     # === ALERTAS ===
     
-    def save_alert(self, alert_type: str, message: str, data: Dict = None) -> bool:
+    def save_alert(self, alert_type: str, message: str, data: Dict = None,
+                   user_id: str = 'system') -> bool:
         """Guarda una alerta"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO alerts (type, message, data)
-                VALUES (?, ?, ?)
-            """, (
-                alert_type,
-                message,
-                json.dumps(data) if data else None
-            ))
-            
-            conn.commit()
-            conn.close()
+            with self.transaction() as conn:
+                conn.execute("""
+                    INSERT INTO alerts (user_id, type, message, data)
+                    VALUES (?, ?, ?, ?)
+                """, (
+                    user_id,
+                    alert_type,
+                    message,
+                    json.dumps(data) if data else None
+                ))
             return True
         except Exception as e:
+            if self._in_outer_transaction():
+                raise
             print(f"Error saving alert: {e}")
             return False
     
     def get_recent_alerts(self, limit: int = 50) -> List[Dict]:
         """Obtiene las alertas más recientes"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
         
         cursor.execute("""
             SELECT * FROM alerts 
@@ -365,15 +502,13 @@ class TradingDatabase:
                 alert['data'] = json.loads(alert['data'])
             alerts.append(alert)
         
-        conn.close()
         return alerts
     
     # === ESTADÍSTICAS ===
     
     def get_statistics(self) -> Dict:
         """Obtiene estadísticas generales del sistema"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
         
         stats = {}
         
@@ -398,7 +533,6 @@ class TradingDatabase:
         result = cursor.fetchone()[0]
         stats['total_pnl'] = result if result else 0
         
-        conn.close()
         return stats
 
 # Instancia global de la base de datos
@@ -25,7 +25,13 @@ from enum import Enum
 from philosophers import PhilosophicalTradingSystem
 from philosophers_extended import register_extended_philosophers
 from binance_integration import BinanceConnector, MultiProjectManager
+from market_data_service import AsyncMarketDataFetcher
+from signal_snapshot import SignalSnapshotService
+from cache_manager import cached  # raíz del repo, vía binance_integration
 from database import db  # Importar la instancia de base de datos
+from persistence_queue import WriteBehindQueue
+from price_watcher import get_price_watcher  # raíz del repo, vía binance_integration
+from position_marks import PositionMarks
 from auth_manager import auth_manager  # Importar gestor de autenticación
 # import yfinance as yf  # Reemplazado por Binance API
 
@@ -85,6 +91,7 @@ class Position(BaseModel):
     stop_loss: float
     take_profit: float
     status: str  # OPEN, CLOSED
+    close_time: Optional[str] = None
 
 class PerformanceMetric(BaseModel):
     total_pnl: float
@@ -127,7 +134,18 @@ class TradingManager:
         self.config = BotConfig()
         self.philosophy_system = register_extended_philosophers()
         self.binance = BinanceConnector(testnet=True)
+        self.market_data = AsyncMarketDataFetcher(self.binance, max_concurrency=4)
+        # Escrituras diferidas: el bucle de trading no espera a SQLite
+        self.persistence = WriteBehindQueue(db, max_batch=200, flush_interval=0.5)
+        self.persistence.start()
+        self.signal_snapshot = SignalSnapshotService(
+            self.market_data.fetch_all, interval='15m', limit=100,
+            persist=self.persistence.enqueue_signals
+        )
         self.project_manager = MultiProjectManager(self.binance)
+        # Un snapshot de precios por tick compartido con el resto de libros
+        self.price_watcher = get_price_watcher()
+        self.marks = PositionMarks()
         
         # Estado - cargar desde base de datos
         self.positions: List[Position] = self._load_positions()
@@ -242,23 +260,23 @@ class TradingManager:
                 await asyncio.sleep(60)
     
     async def fetch_market_data(self) -> Dict:
-        """Obtiene datos de mercado desde Binance"""
+        """Obtiene datos de mercado desde Binance (todos los símbolos en paralelo)"""
         market_data = {}
         
-        for symbol in self.config.symbols:
-            try:
-                # Usar Binance Connector que ya tenemos
-                df = self.binance.get_historical_data(symbol, '1m', 100)
-                
-                if df is not None and not df.empty:
-                    # Los datos de Binance ya vienen normalizados
-                    market_data[symbol] = df
-                    print(f"✅ Datos obtenidos para {symbol}: {len(df)} velas")
-                else:
-                    print(f"⚠️ Sin datos para {symbol}")
-                    
-            except Exception as e:
-                print(f"❌ Error obteniendo datos de {symbol}: {e}")
+        fetched = await self.market_data.fetch_all(self.config.symbols, '1m', 100)
+        latency = self.market_data.symbol_latency_ms
+        
+        for symbol, df in fetched.items():
+            if df is not None and not df.empty:
+                # Los datos de Binance ya vienen normalizados
+                market_data[symbol] = df
+                print(f"✅ Datos obtenidos para {symbol}: {len(df)} velas ({latency.get(symbol, 0):.0f}ms)")
+            else:
+                print(f"⚠️ Sin datos para {symbol}")
+        
+        report = self.market_data.get_latency_report()
+        print(f"⏱️ Ciclo de datos: {report['cycle_ms']:.0f}ms "
+              f"(secuencial: {report['sum_ms']:.0f}ms, más lento: {report['slowest_symbol']})")
         
         return market_data
     
@@ -348,43 +366,66 @@ class TradingManager:
                 {"price": signal.entry_price, "confidence": signal.confidence}
             )
     
+    @staticmethod
+    def _binance_symbol(symbol: str) -> str:
+        """Convierte el símbolo de la posición al formato de Binance"""
+        binance_symbol = symbol.replace("/", "")
+        if not binance_symbol.endswith("USDT"):
+            binance_symbol = binance_symbol + "USDT"
+        return binance_symbol
+    
+    def _mark(self, position: Position):
+        """Marca de la posición (se crea la primera vez que se ve abierta)"""
+        mark = self.marks.get(position.id)
+        if mark is None:
+            mark = self.marks.track(
+                position.id, self._binance_symbol(position.symbol), position.type,
+                position.entry_price, position.quantity * position.entry_price,
+                position.stop_loss, position.take_profit
+            )
+        return mark
+    
     async def update_positions(self):
-        """Actualiza el estado de las posiciones"""
-        for position in self.positions:
-            if position.status == "OPEN":
-                # Obtener precio actual desde Binance
-                try:
-                    # Convertir símbolo al formato de Binance
-                    binance_symbol = position.symbol.replace("/", "")
-                    if not binance_symbol.endswith("USDT"):
-                        binance_symbol = binance_symbol + "USDT"
-                    
-                    # Obtener precio actual desde Binance
-                    current_price = self.binance.get_current_price(binance_symbol)
-                    if current_price:
-                        position.current_price = current_price
-                        
-                        # Calcular P&L
-                        if position.type == "LONG":
-                            position.pnl = (current_price - position.entry_price) * position.quantity
-                            position.pnl_percentage = ((current_price / position.entry_price) - 1) * 100
-                            
-                            # Check stop loss y take profit
-                            if current_price <= position.stop_loss:
-                                await self.close_position(position, "STOP_LOSS")
-                            elif current_price >= position.take_profit:
-                                await self.close_position(position, "TAKE_PROFIT")
-                    
-                except Exception as e:
-                    print(f"Error actualizando posición {position.id}: {e}")
+        """Marca las posiciones abiertas con un único snapshot de precios por tick"""
+        open_positions = {p.id: p for p in self.positions if p.status == "OPEN"}
+        for position in open_positions.values():
+            self._mark(position)
+        
+        if open_positions:
+            try:
+                symbols = {self.marks.get(pid).symbol for pid in open_positions}
+                prices = await asyncio.to_thread(self.price_watcher.snapshot_prices, symbols)
+                
+                # Sólo se recalculan y encolan las posiciones cuyo precio cambió
+                for position_id in self.marks.apply(prices):
+                    position = open_positions.get(position_id)
+                    if position is None:
+                        self.marks.drop(position_id)
+                        continue
+                    mark = self.marks.get(position_id)
+                    position.current_price = mark.price
+                    position.pnl = mark.pnl
+                    position.pnl_percentage = mark.pnl_pct * 100
+                    # Encolar estado (se fusiona con el anterior de la misma posición)
+                    self.save_position(position)
+                
+                # Check stop loss y take profit
+                for position_id, reason in self.marks.triggered(open_positions).items():
+                    await self.close_position(open_positions[position_id], reason)
+                
+            except Exception as e:
+                print(f"Error actualizando posiciones: {e}")
         
         # Actualizar métricas de performance después de actualizar posiciones
         self.update_performance_metrics()
     
     async def close_position(self, position: Position, reason: str):
         """Cierra una posición"""
-        # Obtener precio actual para calcular PnL final
-        current_price = self.binance.get_current_price(position.symbol)
+        # Precio de cierre: la marca del último tick (sin volver a la red)
+        mark = self.marks.drop(position.id)
+        current_price = mark.price if mark is not None and mark.price else None
+        if not current_price:
+            current_price = await asyncio.to_thread(self.binance.get_current_price, position.symbol)
         if current_price:
             position.current_price = current_price
             
@@ -398,6 +439,7 @@ class TradingManager:
         
         position.status = "CLOSED"
         position.close_time = datetime.now().isoformat()
+        self.save_position(position)
         
         if position.pnl > 0:
             self.performance.winning_trades += 1
@@ -519,6 +561,7 @@ class TradingManager:
         )
         
         self.alerts.append(alert)
+        self.persistence.enqueue_alert(alert_type, message, details)
         
         # Mantener solo las últimas 100 alertas
         if len(self.alerts) > 100:
@@ -574,10 +617,11 @@ class TradingManager:
             return []
     
     def save_position(self, position: Position) -> bool:
-        """Guarda una posición en la base de datos"""
+        """Encola una posición para guardarla en la base de datos"""
         try:
             position_dict = {
                 'id': position.id,
+                'user_id': 'system',
                 'symbol': position.symbol,
                 'type': position.type,
                 'entry_price': position.entry_price,
@@ -590,16 +634,17 @@ class TradingManager:
                 'status': position.status,
                 'strategy': 'Philosophical'
             }
-            return db.save_position(position_dict)
+            return self.persistence.enqueue_position(position_dict)
         except Exception as e:
             print(f"❌ Error guardando posición: {e}")
             return False
     
     def save_signal(self, signal: TradingSignal) -> bool:
-        """Guarda una señal en la base de datos"""
+        """Encola una señal para guardarla en la base de datos"""
         try:
             signal_dict = {
                 'id': f"{signal.symbol}_{signal.timestamp}_{signal.philosopher}",
+                'user_id': 'system',
                 'symbol': signal.symbol,
                 'action': signal.action,
                 'confidence': signal.confidence,
@@ -612,276 +657,20 @@ class TradingManager:
                 'rsi': None,
                 'volume_ratio': None
             }
-            return db.save_signal(signal_dict)
+            return self.persistence.enqueue_signal(signal_dict)
         except Exception as e:
             print(f"❌ Error guardando señal: {e}")
             return False
     
     async def get_high_quality_signals(self) -> List[Dict]:
         """Obtiene señales de alta calidad (+70% confianza) - Lógica compartida con /api/signals/all"""
-        high_quality_signals = []
-        symbols = ["SOLUSDT", "XRPUSDT", "ADAUSDT", "DOGEUSDT", "AVAXUSDT", "LINKUSDT", "DOTUSDT", "PEPEUSDT"]
-        
-        for symbol in symbols:
-            try:
-                # Obtener datos históricos para análisis completo
-                df = self.binance.get_historical_data(symbol, "15m", 100)
-                
-                if df is not None and not df.empty:
-                    current_price = float(df['close'].iloc[-1])
-                    
-                    # Calcular indicadores técnicos
-                    # RSI
-                    delta = df['close'].diff()
-                    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-                    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-                    rs = gain / loss
-                    rsi = 100 - (100 / (1 + rs))
-                    rsi_value = float(rsi.iloc[-1]) if not rsi.empty else 50
-                    
-                    # Medias móviles
-                    ma20 = df['close'].rolling(20).mean().iloc[-1]
-                    ma50 = df['close'].rolling(50).mean().iloc[-1] if len(df) >= 50 else ma20
-                    
-                    # MACD
-                    exp1 = df['close'].ewm(span=12, adjust=False).mean()
-                    exp2 = df['close'].ewm(span=26, adjust=False).mean()
-                    macd = exp1 - exp2
-                    signal_line = macd.ewm(span=9, adjust=False).mean()
-                    macd_value = float(macd.iloc[-1])
-                    macd_signal = float(signal_line.iloc[-1])
-                    
-                    # Volumen
-                    volume_avg = df['volume'].rolling(20).mean().iloc[-1]
-                    volume_current = df['volume'].iloc[-1]
-                    volume_ratio = volume_current / volume_avg if volume_avg > 0 else 1
-                    
-                    # Determinar tendencia del mercado
-                    if current_price > ma20 > ma50:
-                        market_trend = "BULLISH"
-                    elif current_price < ma20 < ma50:
-                        market_trend = "BEARISH"
-                    else:
-                        market_trend = "NEUTRAL"
-                    
-                    # Calcular confianza basada en múltiples factores
-                    confidence_score = 50  # Base
-                    action = None
-                    reasoning = []
-                    
-                    # Análisis para señal de VENTA (más común en mercado actual)
-                    if market_trend == "BEARISH" or (market_trend == "NEUTRAL" and current_price < ma20):
-                        action = "SELL"
-                        if rsi_value > 70:  # Sobrecompra
-                            confidence_score += 25
-                            reasoning.append("RSI en zona de distribución")
-                        elif 40 <= rsi_value <= 70:  # RSI favorable para venta
-                            confidence_score += 15
-                            reasoning.append("RSI en zona de distribución")
-                        
-                        if macd_value < macd_signal:  # MACD negativo
-                            confidence_score += 15
-                            reasoning.append("MACD con cruce bajista")
-                        
-                        if volume_ratio > 1.5:  # Volumen alto
-                            confidence_score += 10
-                            reasoning.append("Volumen elevado confirma venta")
-                        
-                        if current_price < ma20:  # Precio bajo MA20
-                            confidence_score += 10
-                            reasoning.append("Precio bajo media móvil 20")
-                    
-                    # Análisis para señal de COMPRA
-                    elif market_trend == "BULLISH" or (market_trend == "NEUTRAL" and current_price > ma20):
-                        action = "BUY"
-                        if rsi_value < 30:  # Sobreventa
-                            confidence_score += 25
-                            reasoning.append("RSI sobreventa en tendencia alcista")
-                        elif 30 <= rsi_value <= 60:  # RSI favorable
-                            confidence_score += 15
-                            reasoning.append("RSI en zona de acumulación")
-                        
-                        if macd_value > macd_signal:  # MACD positivo
-                            confidence_score += 15
-                            reasoning.append("MACD con cruce alcista")
-                        
-                        if volume_ratio > 1.5:  # Volumen alto
-                            confidence_score += 10
-                            reasoning.append("Volumen elevado confirma movimiento")
-                        
-                        if current_price > ma20:  # Precio sobre MA20
-                            confidence_score += 10
-                            reasoning.append("Precio sobre media móvil 20")
-                    
-                    # Solo crear señal si hay acción clara y confianza >= 70%
-                    if action and confidence_score >= 70:
-                        # Calcular niveles
-                        atr = (df['high'] - df['low']).rolling(14).mean().iloc[-1]
-                        
-                        signal = {
-                            "id": f"{symbol}_{datetime.now().timestamp()}",
-                            "symbol": symbol,
-                            "action": action,
-                            "confidence": min(confidence_score, 95),  # Cap at 95%
-                            "entry_price": current_price,
-                            "stop_loss": current_price - (atr * 1.5) if action == "BUY" else current_price + (atr * 1.5),
-                            "take_profit": current_price + (atr * 3) if action == "BUY" else current_price - (atr * 3),
-                            "philosopher": "Sistema Avanzado",
-                            "timestamp": datetime.now().isoformat(),
-                            "reasoning": " + ".join(reasoning[:3]),  # Top 3 razones
-                            "market_trend": market_trend,
-                            "rsi": round(rsi_value, 1),
-                            "volume_ratio": round(volume_ratio, 2)
-                        }
-                        high_quality_signals.append(signal)
-                        
-                        # Guardar señal en base de datos
-                        try:
-                            db.save_signal(signal)
-                        except Exception as save_error:
-                            print(f"Error saving signal to database: {save_error}")
-                        
-            except Exception as e:
-                print(f"Error analyzing {symbol}: {e}")
-                continue
-        
-        # Ordenar por confianza (mayor a menor)
-        high_quality_signals.sort(key=lambda x: x['confidence'], reverse=True)
-        return high_quality_signals[:5]  # Top 5
+        # Se calculan una vez por cierre de vela de 15m en el snapshot compartido
+        return await self.signal_snapshot.get_signals()
     
     async def get_high_quality_signals_for_user(self, user_id: str) -> List[Dict]:
         """Obtiene señales de alta calidad para un usuario específico"""
-        # Generar señales usando la misma lógica que get_high_quality_signals
-        high_quality_signals = []
-        symbols = ["SOLUSDT", "XRPUSDT", "ADAUSDT", "DOGEUSDT", "AVAXUSDT", "LINKUSDT", "DOTUSDT", "PEPEUSDT"]
-        
-        for symbol in symbols:
-            try:
-                # Obtener datos históricos para análisis completo
-                df = self.binance.get_historical_data(symbol, "15m", 100)
-                
-                if df is not None and not df.empty:
-                    current_price = float(df['close'].iloc[-1])
-                    
-                    # Calcular indicadores técnicos (mismo código que get_high_quality_signals)
-                    # RSI
-                    delta = df['close'].diff()
-                    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-                    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-                    rs = gain / loss
-                    rsi = 100 - (100 / (1 + rs))
-                    rsi_value = float(rsi.iloc[-1]) if not rsi.empty else 50
-                    
-                    # Medias móviles
-                    ma20 = df['close'].rolling(20).mean().iloc[-1]
-                    ma50 = df['close'].rolling(50).mean().iloc[-1] if len(df) >= 50 else ma20
-                    
-                    # MACD
-                    exp1 = df['close'].ewm(span=12, adjust=False).mean()
-                    exp2 = df['close'].ewm(span=26, adjust=False).mean()
-                    macd = exp1 - exp2
-                    signal_line = macd.ewm(span=9, adjust=False).mean()
-                    macd_value = float(macd.iloc[-1])
-                    macd_signal = float(signal_line.iloc[-1])
-                    
-                    # Volumen
-                    volume_avg = df['volume'].rolling(20).mean().iloc[-1]
-                    volume_current = df['volume'].iloc[-1]
-                    volume_ratio = volume_current / volume_avg if volume_avg > 0 else 1
-                    
-                    # Determinar tendencia del mercado
-                    if current_price > ma20 > ma50:
-                        market_trend = "BULLISH"
-                    elif current_price < ma20 < ma50:
-                        market_trend = "BEARISH"
-                    else:
-                        market_trend = "NEUTRAL"
-                    
-                    # Calcular confianza basada en múltiples factores
-                    confidence_score = 50  # Base
-                    action = None
-                    reasoning = []
-                    
-                    # Análisis para señal de VENTA
-                    if market_trend == "BEARISH" or (market_trend == "NEUTRAL" and current_price < ma20):
-                        action = "SELL"
-                        if rsi_value > 70:  # Sobrecompra
-                            confidence_score += 25
-                            reasoning.append("RSI en zona de distribución")
-                        elif 40 <= rsi_value <= 70:  # RSI favorable para venta
-                            confidence_score += 15
-                            reasoning.append("RSI en zona de distribución")
-                        
-                        if macd_value < macd_signal:  # MACD negativo
-                            confidence_score += 15
-                            reasoning.append("MACD con cruce bajista")
-                        
-                        if volume_ratio > 1.5:  # Volumen alto
-                            confidence_score += 10
-                            reasoning.append("Volumen elevado confirma venta")
-                        
-                        if current_price < ma20:  # Precio bajo MA20
-                            confidence_score += 10
-                            reasoning.append("Precio bajo media móvil 20")
-                    
-                    # Análisis para señal de COMPRA
-                    elif market_trend == "BULLISH" or (market_trend == "NEUTRAL" and current_price > ma20):
-                        action = "BUY"
-                        if rsi_value < 30:  # Sobreventa
-                            confidence_score += 25
-                            reasoning.append("RSI sobreventa en tendencia alcista")
-                        elif 30 <= rsi_value <= 60:  # RSI favorable
-                            confidence_score += 15
-                            reasoning.append("RSI en zona de acumulación")
-                        
-                        if macd_value > macd_signal:  # MACD positivo
-                            confidence_score += 15
-                            reasoning.append("MACD con cruce alcista")
-                        
-                        if volume_ratio > 1.5:  # Volumen alto
-                            confidence_score += 10
-                            reasoning.append("Volumen elevado confirma movimiento")
-                        
-                        if current_price > ma20:  # Precio sobre MA20
-                            confidence_score += 10
-                            reasoning.append("Precio sobre media móvil 20")
-                    
-                    # Solo crear señal si hay acción clara y confianza >= 70%
-                    if action and confidence_score >= 70:
-                        # Calcular niveles
-                        atr = (df['high'] - df['low']).rolling(14).mean().iloc[-1]
-                        
-                        signal = {
-                            "id": f"{symbol}_{user_id}_{datetime.now().timestamp()}",
-                            "user_id": user_id,  # Importante: incluir user_id
-                            "symbol": symbol,
-                            "action": action,
-                            "confidence": min(confidence_score, 95),  # Cap at 95%
-                            "entry_price": current_price,
-                            "stop_loss": current_price - (atr * 1.5) if action == "BUY" else current_price + (atr * 1.5),
-                            "take_profit": current_price + (atr * 3) if action == "BUY" else current_price - (atr * 3),
-                            "philosopher": "Sistema Avanzado",
-                            "timestamp": datetime.now().isoformat(),
-                            "reasoning": " + ".join(reasoning[:3]),  # Top 3 razones
-                            "market_trend": market_trend,
-                            "rsi": round(rsi_value, 1),
-                            "volume_ratio": round(volume_ratio, 2)
-                        }
-                        high_quality_signals.append(signal)
-                        
-                        # Guardar señal en base de datos con user_id
-                        try:
-                            db.save_signal(signal)
-                        except Exception as save_error:
-                            print(f"Error saving user signal to database: {save_error}")
-                        
-            except Exception as e:
-                print(f"Error analyzing {symbol} for user {user_id}: {e}")
-                continue
-        
-        # Ordenar por confianza (mayor a menor)
-        high_quality_signals.sort(key=lambda x: x['confidence'], reverse=True)
-        return high_quality_signals[:5]  # Top 5
+        # Proyección del snapshot compartido (sin descargas ni recálculo por usuario)
+        return await self.signal_snapshot.get_signals_for_user(user_id)
 
 # ===========================================
 # INSTANCIA GLOBAL
@@ -905,6 +694,10 @@ async def lifespan(app: FastAPI):
     print("🛑 Shutting down...")
     if trading_manager.trading_task:
         trading_manager.trading_task.cancel()
+    
+    # Volcar escrituras pendientes antes de salir
+    await asyncio.to_thread(trading_manager.persistence.close)
+    print(f"💾 Cola de persistencia vaciada: {trading_manager.persistence.get_stats()}")
 
 # ===========================================
 # FASTAPI APP
@@ -1028,6 +821,8 @@ async def get_system_status():
         "total_signals_generated": len(trading_manager.recent_signals),
         "last_signal": trading_manager.recent_signals[-1].dict() if trading_manager.recent_signals else None,
         "alerts_count": len(trading_manager.alerts),
+        "market_data_latency": trading_manager.market_data.get_latency_report(),
+        "persistence_queue": trading_manager.persistence.get_stats(),
         "performance_summary": {
             "balance": trading_manager.performance.current_balance,
             "total_pnl": trading_manager.performance.total_pnl,
@@ -1201,106 +996,117 @@ async def get_chart_data(symbol: str, interval: str = "1m", limit: int = 100):
 async def get_market_indicators(symbol: str, interval: str = "15m"):
     """Calcula indicadores de mercado reales para un símbolo"""
     try:
-        # Obtener datos históricos (necesitamos más datos para calcular indicadores)
-        df = trading_manager.binance.get_historical_data(symbol, interval, 200)
-        
-        if df is None or df.empty:
-            return {"error": "No data available"}
-        
-        # Calcular RSI
-        def calculate_rsi(df, period=14):
-            delta = df['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            return rsi.iloc[-1]
-        
-        # Calcular MACD
-        def calculate_macd(df):
-            exp1 = df['close'].ewm(span=12, adjust=False).mean()
-            exp2 = df['close'].ewm(span=26, adjust=False).mean()
-            macd = exp1 - exp2
-            signal = macd.ewm(span=9, adjust=False).mean()
-            histogram = macd - signal
-            return {
-                "value": float(macd.iloc[-1]),
-                "signal": float(signal.iloc[-1]),
-                "histogram": float(histogram.iloc[-1])
-            }
-        
-        # Calcular volatilidad (desviación estándar del retorno)
-        returns = df['close'].pct_change()
-        volatility = returns.std() * 100  # Convertir a porcentaje
-        
-        # Calcular momentum
-        momentum = ((df['close'].iloc[-1] / df['close'].iloc[-20]) - 1) * 100
-        
-        # Calcular volumen promedio
-        volume_avg = df['volume'].rolling(window=20).mean().iloc[-1]
-        volume_current = df['volume'].iloc[-1]
-        volume_ratio = volume_current / volume_avg if volume_avg > 0 else 1
-        
-        # Identificar soportes y resistencias simples
-        recent_high = df['high'].tail(20).max()
-        recent_low = df['low'].tail(20).min()
-        current_price = df['close'].iloc[-1]
-        
-        # Determinar fase del mercado
-        rsi_value = calculate_rsi(df)
-        macd_data = calculate_macd(df)
-        
-        if rsi_value > 70:
-            market_phase = "OVERBOUGHT"
-        elif rsi_value < 30:
-            market_phase = "OVERSOLD"
-        elif abs(momentum) < 2:
-            market_phase = "CONSOLIDATION"
-        elif momentum > 5:
-            market_phase = "BULLISH_TREND"
-        elif momentum < -5:
-            market_phase = "BEARISH_TREND"
-        else:
-            market_phase = "NEUTRAL"
-        
-        # Determinar condición del mercado
-        if rsi_value > 70 and volume_ratio > 1.5:
-            market_condition = "EXPLOSIVE"
-        elif rsi_value > 60 and momentum > 5:
-            market_condition = "BULLISH"
-        elif rsi_value < 40 and momentum < -5:
-            market_condition = "BEARISH"
-        elif volume_ratio < 0.5:
-            market_condition = "ACCUMULATION"
-        elif volume_ratio > 2:
-            market_condition = "DISTRIBUTION"
-        else:
-            market_condition = "NEUTRAL"
-        
-        return {
-            "rsi": float(rsi_value),
-            "macd": macd_data,
-            "volume": {
-                "current": float(volume_current),
-                "average": float(volume_avg),
-                "ratio": float(volume_ratio)
-            },
-            "volatility": float(volatility),
-            "momentum": float(momentum),
-            "trend_strength": abs(float(momentum)),
-            "support_resistance": {
-                "support": float(recent_low),
-                "resistance": float(recent_high),
-                "current_price": float(current_price)
-            },
-            "market_phase": market_phase,
-            "market_condition": market_condition,
-            "volume_profile": "HIGH" if volume_ratio > 1.5 else "NORMAL" if volume_ratio > 0.5 else "LOW"
-        }
+        return await compute_market_indicators(symbol, interval)
     except Exception as e:
         print(f"Error calculando indicadores para {symbol}: {e}")
         return {"error": str(e)}
 
+@cached(ttl=15, stale_ttl=60)
+async def compute_market_indicators(symbol: str, interval: str) -> Dict:
+    """
+    Indicadores de un símbolo, compartidos entre clientes del dashboard
+
+    Las peticiones simultáneas del mismo símbolo/intervalo esperan a una
+    única descarga; pasado el TTL se sirve el último valor mientras se
+    refresca en segundo plano.
+    """
+    # Obtener datos históricos (necesitamos más datos para calcular indicadores)
+    df = await asyncio.to_thread(trading_manager.binance.get_historical_data, symbol, interval, 200)
+    
+    if df is None or df.empty:
+        raise ValueError("No data available")  # no se cachea
+    
+    # Calcular RSI
+    def calculate_rsi(df, period=14):
+        delta = df['close'].diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        rs = gain / loss
+        rsi = 100 - (100 / (1 + rs))
+        return rsi.iloc[-1]
+    
+    # Calcular MACD
+    def calculate_macd(df):
+        exp1 = df['close'].ewm(span=12, adjust=False).mean()
+        exp2 = df['close'].ewm(span=26, adjust=False).mean()
+        macd = exp1 - exp2
+        signal = macd.ewm(span=9, adjust=False).mean()
+        histogram = macd - signal
+        return {
+            "value": float(macd.iloc[-1]),
+            "signal": float(signal.iloc[-1]),
+            "histogram": float(histogram.iloc[-1])
+        }
+    
+    # Calcular volatilidad (desviación estándar del retorno)
+    returns = df['close'].pct_change()
+    volatility = returns.std() * 100  # Convertir a porcentaje
+    
+    # Calcular momentum
+    momentum = ((df['close'].iloc[-1] / df['close'].iloc[-20]) - 1) * 100
+    
+    # Calcular volumen promedio
+    volume_avg = df['volume'].rolling(window=20).mean().iloc[-1]
+    volume_current = df['volume'].iloc[-1]
+    volume_ratio = volume_current / volume_avg if volume_avg > 0 else 1
+    
+    # Identificar soportes y resistencias simples
+    recent_high = df['high'].tail(20).max()
+    recent_low = df['low'].tail(20).min()
+    current_price = df['close'].iloc[-1]
+    
+    # Determinar fase del mercado
+    rsi_value = calculate_rsi(df)
+    macd_data = calculate_macd(df)
+    
+    if rsi_value > 70:
+        market_phase = "OVERBOUGHT"
+    elif rsi_value < 30:
+        market_phase = "OVERSOLD"
+    elif abs(momentum) < 2:
+        market_phase = "CONSOLIDATION"
+    elif momentum > 5:
+        market_phase = "BULLISH_TREND"
+    elif momentum < -5:
+        market_phase = "BEARISH_TREND"
+    else:
+        market_phase = "NEUTRAL"
+    
+    # Determinar condición del mercado
+    if rsi_value > 70 and volume_ratio > 1.5:
+        market_condition = "EXPLOSIVE"
+    elif rsi_value > 60 and momentum > 5:
+        market_condition = "BULLISH"
+    elif rsi_value < 40 and momentum < -5:
+        market_condition = "BEARISH"
+    elif volume_ratio < 0.5:
+        market_condition = "ACCUMULATION"
+    elif volume_ratio > 2:
+        market_condition = "DISTRIBUTION"
+    else:
+        market_condition = "NEUTRAL"
+    
+    return {
+        "rsi": float(rsi_value),
+        "macd": macd_data,
+        "volume": {
+            "current": float(volume_current),
+            "average": float(volume_avg),
+            "ratio": float(volume_ratio)
+        },
+        "volatility": float(volatility),
+        "momentum": float(momentum),
+        "trend_strength": abs(float(momentum)),
+        "support_resistance": {
+            "support": float(recent_low),
+            "resistance": float(recent_high),
+            "current_price": float(current_price)
+        },
+        "market_phase": market_phase,
+        "market_condition": market_condition,
+        "volume_profile": "HIGH" if volume_ratio > 1.5 else "NORMAL" if volume_ratio > 0.5 else "LOW"
+    }
+
 @app.post("/api/positions/open")
 async def open_position_manually(position_data: dict):
     """Abre una posición manualmente desde una señal"""
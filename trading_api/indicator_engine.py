@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+===========================================
+MOTOR DE INDICADORES COMPARTIDO
+===========================================
+
+Calcula una sola vez por (símbolo, intervalo, última vela) los indicadores
+que usan todos los filósofos (RSI, MACD, Bollinger, ATR, volumen) y entrega
+el mismo DataFrame de solo lectura a cada uno de ellos.
+
+Cuando llega una vela nueva (o se actualiza la vela en formación) el estado
+EMA/rolling se avanza en O(1) en lugar de recalcular toda la ventana.
+"""
+
+import threading
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Columnas añadidas por PhilosopherTrader.calculate_indicators (mismo orden)
+INDICATOR_COLUMNS = [
+    'RSI', 'EMA_12', 'EMA_26', 'MACD', 'MACD_Signal',
+    'BB_Middle', 'BB_Upper', 'BB_Lower', 'ATR', 'Volume_SMA', 'Volume_Ratio'
+]
+
+# Marca en df.attrs de un frame ya enriquecido por el motor
+ENGINE_ATTR = 'indicator_engine'
+
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+BB_PERIOD = 20
+VOLUME_PERIOD = 20
+
+# Columnas internas de estado: gain/loss/true range y numerador/denominador
+# de cada EMA (ewm con adjust=True, igual que pandas)
+STATE_COLUMNS = ['gain', 'loss', 'tr', 'n12', 'd12', 'n26', 'd26', 'n9', 'd9']
+BUFFER_COLUMNS = OHLCV_COLUMNS + INDICATOR_COLUMNS + STATE_COLUMNS
+COL = {name: i for i, name in enumerate(BUFFER_COLUMNS)}
+OUTPUT_SLICE = slice(0, len(OHLCV_COLUMNS) + len(INDICATOR_COLUMNS))
+
+EMA_DECAY = {span: 1 - 2 / (span + 1) for span in (12, 26, 9)}
+
+
+def compute_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cálculo completo (vectorizado) de los indicadores universales
+
+    Devuelve un DataFrame nuevo; el frame recibido no se modifica.
+    """
+    out = df.copy()
+
+    # RSI
+    delta = out['close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=RSI_PERIOD).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=RSI_PERIOD).mean()
+    rs = gain / loss
+    out['RSI'] = 100 - (100 / (1 + rs))
+
+    # MACD
+    out['EMA_12'] = out['close'].ewm(span=12).mean()
+    out['EMA_26'] = out['close'].ewm(span=26).mean()
+    out['MACD'] = out['EMA_12'] - out['EMA_26']
+    out['MACD_Signal'] = out['MACD'].ewm(span=9).mean()
+
+    # Bollinger Bands
+    out['BB_Middle'] = out['close'].rolling(BB_PERIOD).mean()
+    bb_std = out['close'].rolling(BB_PERIOD).std()
+    out['BB_Upper'] = out['BB_Middle'] + (bb_std * 2)
+    out['BB_Lower'] = out['BB_Middle'] - (bb_std * 2)
+
+    # ATR
+    high_low = out['high'] - out['low']
+    high_close = np.abs(out['high'] - out['close'].shift())
+    low_close = np.abs(out['low'] - out['close'].shift())
+    ranges = pd.concat([high_low, high_close, low_close], axis=1)
+    out['ATR'] = ranges.max(axis=1).rolling(ATR_PERIOD).mean()
+
+    # Volume Profile
+    out['Volume_SMA'] = out['volume'].rolling(VOLUME_PERIOD).mean()
+    out['Volume_Ratio'] = out['volume'] / out['Volume_SMA']
+
+    return out
+
+
+def has_indicators(df: pd.DataFrame) -> bool:
+    """True si el frame ya viene enriquecido por el motor"""
+    return bool(df.attrs.get(ENGINE_ATTR)) and all(c in df.columns for c in INDICATOR_COLUMNS)
+
+
+class _SeriesState:
+    """Buffer contiguo con OHLCV, indicadores y estado incremental de una serie"""
+
+    def __init__(self, max_rows: int):
+        self.max_rows = max_rows
+        self.buf = np.empty((2 * max_rows, len(BUFFER_COLUMNS)), dtype=np.float64)
+        self.ts = np.empty(2 * max_rows, dtype=np.int64)
+        self.n = 0
+        self.base = 0  # posición global de la fila 0 del buffer
+        self.frames: Dict[int, pd.DataFrame] = {}
+        self.fingerprint: Optional[Tuple] = None
+        self.tz = None
+
+    def seed(self, df: pd.DataFrame, ts: np.ndarray):
+        """Inicializa el estado con un cálculo completo vectorizado"""
+        full = compute_indicators(df[OHLCV_COLUMNS].astype(np.float64))
+        m = min(len(full), self.max_rows)
+
+        close = full['close'].to_numpy()
+        delta = np.diff(close, prepend=np.nan)
+        high_low = full['high'].to_numpy() - full['low'].to_numpy()
+        prev_close = np.concatenate([[np.nan], close[:-1]])
+        tr = np.fmax(high_low, np.fmax(np.abs(full['high'].to_numpy() - prev_close),
+                                       np.abs(full['low'].to_numpy() - prev_close)))
+
+        state = np.empty((len(full), len(STATE_COLUMNS)))
+        state[:, 0] = np.where(delta > 0, delta, 0)
+        state[:, 1] = np.where(delta < 0, -delta, 0)
+        state[:, 2] = tr
+
+        # Estado EMA: den_i = sum(beta^k), num_i = ema_i * den_i
+        positions = np.arange(1, len(full) + 1)
+        for offset, (span, column) in enumerate([(12, 'EMA_12'), (26, 'EMA_26'), (9, 'MACD_Signal')]):
+            beta = EMA_DECAY[span]
+            den = (1 - beta ** positions) / (1 - beta)
+            state[:, 3 + 2 * offset] = full[column].to_numpy() * den
+            state[:, 4 + 2 * offset] = den
+
+        values = np.hstack([full[OHLCV_COLUMNS + INDICATOR_COLUMNS].to_numpy(), state])
+        self.buf[:m] = values[-m:]
+        self.ts[:m] = ts[-m:]
+        self.n = m
+        self.base = len(full) - m
+        self.frames.clear()
+
+    def _compact(self):
+        """Descarta filas antiguas cuando el buffer se llena (amortizado O(1))"""
+        keep = self.max_rows
+        self.buf[:keep] = self.buf[self.n - keep:self.n]
+        self.ts[:keep] = self.ts[self.n - keep:self.n]
+        self.base += self.n - keep
+        self.n = keep
+
+    def _window(self, i: int, column: str, period: int) -> Optional[np.ndarray]:
+        if self.base + i + 1 < period or i + 1 < period:
+            return None
+        return self.buf[i - period + 1:i + 1, COL[column]]
+
+    def write_row(self, i: int, ts: int, ohlcv: np.ndarray):
+        """Escribe la fila i y calcula sus indicadores a partir de la fila i-1"""
+        if i == len(self.buf):
+            self._compact()
+            i = self.n
+
+        row = self.buf[i]
+        row[:len(OHLCV_COLUMNS)] = ohlcv
+        self.ts[i] = ts
+        self.n = i + 1
+        prev = self.buf[i - 1]
+
+        close, high, low, volume = row[COL['close']], row[COL['high']], row[COL['low']], row[COL['volume']]
+        prev_close = prev[COL['close']]
+
+        delta = close - prev_close
+        row[COL['gain']] = delta if delta > 0 else 0.0
+        row[COL['loss']] = -delta if delta < 0 else 0.0
+        row[COL['tr']] = max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+        # EMAs (adjust=True): num_i = x_i + beta*num_{i-1}, den_i = 1 + beta*den_{i-1}
+        for span, n_col, d_col, source, target in [
+            (12, 'n12', 'd12', close, 'EMA_12'),
+            (26, 'n26', 'd26', close, 'EMA_26'),
+        ]:
+            beta = EMA_DECAY[span]
+            row[COL[n_col]] = source + beta * prev[COL[n_col]]
+            row[COL[d_col]] = 1 + beta * prev[COL[d_col]]
+            row[COL[target]] = row[COL[n_col]] / row[COL[d_col]]
+
+        row[COL['MACD']] = row[COL['EMA_12']] - row[COL['EMA_26']]
+        beta = EMA_DECAY[9]
+        row[COL['n9']] = row[COL['MACD']] + beta * prev[COL['n9']]
+        row[COL['d9']] = 1 + beta * prev[COL['d9']]
+        row[COL['MACD_Signal']] = row[COL['n9']] / row[COL['d9']]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gains = self._window(i, 'gain', RSI_PERIOD)
+            if gains is None:
+                row[COL['RSI']] = np.nan
+            else:
+                rs = np.float64(gains.mean()) / np.float64(self._window(i, 'loss', RSI_PERIOD).mean())
+                row[COL['RSI']] = 100 - (100 / (1 + rs))
+
+            closes = self._window(i, 'close', BB_PERIOD)
+            if closes is None:
+                row[COL['BB_Middle']] = row[COL['BB_Upper']] = row[COL['BB_Lower']] = np.nan
+            else:
+                middle = closes.mean()
+                std = closes.std(ddof=1)
+                row[COL['BB_Middle']] = middle
+                row[COL['BB_Upper']] = middle + std * 2
+                row[COL['BB_Lower']] = middle - std * 2
+
+            trs = self._window(i, 'tr', ATR_PERIOD)
+            row[COL['ATR']] = np.nan if trs is None else trs.mean()
+
+            volumes = self._window(i, 'volume', VOLUME_PERIOD)
+            if volumes is None:
+                row[COL['Volume_SMA']] = row[COL['Volume_Ratio']] = np.nan
+            else:
+                row[COL['Volume_SMA']] = volumes.mean()
+                row[COL['Volume_Ratio']] = volume / np.float64(row[COL['Volume_SMA']])
+
+    def frame(self, rows: int, attrs: Dict) -> pd.DataFrame:
+        """DataFrame de solo lectura con las últimas `rows` filas"""
+        if rows not in self.frames:
+            values = self.buf[self.n - rows:self.n, OUTPUT_SLICE].copy()
+            values.flags.writeable = False
+            frame = pd.DataFrame(
+                values,
+                index=pd.DatetimeIndex(self.ts[self.n - rows:self.n].copy(), tz=self.tz, name='timestamp'),
+                columns=OHLCV_COLUMNS + INDICATOR_COLUMNS,
+                copy=False,
+            )
+            frame.attrs.update(attrs)
+            frame.attrs[ENGINE_ATTR] = True
+            self.frames[rows] = frame
+        return self.frames[rows]
+
+
+class IndicatorEngine:
+    """
+    Motor de indicadores compartido por todos los filósofos
+
+    Mantiene un estado por (símbolo, intervalo) con hasta max_rows velas de
+    histórico. Si el DataFrame recibido empieza en una vela guardada y sólo
+    añade velas nuevas (o actualiza la vela en formación), como las ventanas
+    de longitud fija que se deslizan con cada kline, se avanza el estado fila
+    a fila y se devuelven sus últimas len(df) filas; si no encaja (huecos,
+    velas anteriores al estado, otro histórico) se vuelve a sembrar con la
+    ventana recibida.
+
+    El resultado es el de compute_indicators sobre todo el histórico
+    retenido desde la siembra, recortado a len(df) filas: las ventanas rolling
+    coinciden con un cálculo sobre df en cuanto se llenan, y las EMAs arrastran
+    el histórico anterior a df en lugar de arrancar en su primera vela.
+    """
+
+    def __init__(self, max_rows: int = 2000, max_incremental_rows: int = 50):
+        """
+        Args:
+            max_rows: Filas retenidas por serie
+            max_incremental_rows: Máximo de velas nuevas a avanzar fila a fila
+                                  antes de preferir un recálculo completo
+        """
+        self.max_rows = max_rows
+        self.max_incremental_rows = max_incremental_rows
+        self._states: Dict[Tuple[str, str], _SeriesState] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'incremental_rows': 0,
+            'full_recomputes': 0,
+        }
+
+    @staticmethod
+    def _interval_of(df: pd.DataFrame) -> str:
+        """Intervalo a partir de attrs o del espaciado del índice"""
+        timeframe = df.attrs.get('timeframe')
+        if timeframe:
+            return str(timeframe)
+        if len(df) > 1:
+            return f"{int((df.index[-1] - df.index[-2]).total_seconds())}s"
+        return 'unknown'
+
+    def compute(self, df: pd.DataFrame, symbol: str, interval: Optional[str] = None) -> pd.DataFrame:
+        """
+        Devuelve el frame con OHLCV + indicadores (solo lectura y compartido)
+
+        Args:
+            df: Velas con columnas open/high/low/close/volume e índice temporal
+            symbol: Símbolo de la serie
+            interval: Intervalo; por defecto df.attrs['timeframe'] o el inferido
+        """
+        if df.empty or not isinstance(df.index, pd.DatetimeIndex):
+            return compute_indicators(df)
+
+        key = (symbol, interval or self._interval_of(df))
+        attrs = df.attrs
+        if len(df) > self.max_rows:
+            df = df.iloc[-self.max_rows:]
+        ts = df.index.as_unit('ns').asi8
+        last = df.iloc[-1]
+        fingerprint = (int(ts[-1]),) + tuple(float(last[c]) for c in OHLCV_COLUMNS)
+        rows = len(df)
+
+        with self._lock:
+            state = self._states.get(key)
+
+            if (state is not None and state.fingerprint == fingerprint and rows <= state.n
+                    and state.ts[state.n - rows] == ts[0]):
+                self.stats['hits'] += 1
+                return state.frame(rows, attrs)
+
+            if state is None or not self._advance(state, df, ts):
+                state = state or _SeriesState(self.max_rows)
+                state.seed(df, ts)
+                state.tz = df.index.tz
+                self._states[key] = state
+                self.stats['full_recomputes'] += 1
+
+            state.fingerprint = fingerprint
+            state.frames.clear()
+            return state.frame(rows, attrs)
+
+    def _advance(self, state: _SeriesState, df: pd.DataFrame, ts: np.ndarray) -> bool:
+        """Avanza el estado con las velas nuevas de df; False si no encaja"""
+        if state.n < 2 or len(df) > self.max_rows or state.tz != df.index.tz:
+            return False
+
+        # Posición en df de la última vela guardada (puede haber sido la vela en formación)
+        last_stored = state.ts[state.n - 1]
+        q = int(np.searchsorted(ts, last_stored))
+        if q >= len(ts) or ts[q] != last_stored:
+            return False
+
+        new_rows = len(df) - 1 - q
+        if new_rows > self.max_incremental_rows:
+            return False
+
+        # df debe empezar en una vela guardada y continuar sin huecos hasta la última
+        p = int(np.searchsorted(state.ts[:state.n], ts[0]))
+        if p >= state.n or state.ts[p] != ts[0] or state.n - 1 - p != q:
+            return False
+
+        values = df[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+        for j in range(q, len(df)):
+            state.write_row(state.n - 1 if j == q else state.n, int(ts[j]), values[j])
+        self.stats['incremental_rows'] += new_rows + 1
+        return True
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """Descarta el estado de un símbolo (o de todos)"""
+        with self._lock:
+            if symbol is None:
+                self._states.clear()
+            else:
+                for key in [k for k in self._states if k[0] == symbol]:
+                    del self._states[key]
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+===========================================
+CAPA ASÍNCRONA DE DATOS DE MERCADO
+===========================================
+
+Descarga velas de varios símbolos en paralelo sin bloquear el event loop:
+cada llamada bloqueante de ccxt corre en un hilo (asyncio.to_thread), con
+un límite de concurrencia y un espaciado mínimo entre requests derivado del
+rateLimit del exchange. Registra la latencia por símbolo y del ciclo.
+"""
+
+import asyncio
+import time
+import logging
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncMarketDataFetcher:
+    """Fan-out concurrente de get_historical_data sobre un BinanceConnector"""
+
+    def __init__(self, connector, max_concurrency: int = 4,
+                 min_request_interval: Optional[float] = None):
+        """
+        Args:
+            connector: BinanceConnector (o cualquier objeto con get_historical_data)
+            max_concurrency: Requests simultáneas como máximo
+            min_request_interval: Segundos mínimos entre inicios de request;
+                                  por defecto exchange.rateLimit
+        """
+        self.connector = connector
+        self.max_concurrency = max_concurrency
+
+        if min_request_interval is None:
+            exchange = getattr(connector, 'exchange', None)
+            min_request_interval = getattr(exchange, 'rateLimit', 0) / 1000 if exchange else 0
+        self.min_request_interval = min_request_interval
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._throttle_lock: Optional[asyncio.Lock] = None
+        self._next_slot = 0.0
+        self._markets_loaded = False
+
+        self.symbol_latency_ms: Dict[str, float] = {}
+        self.last_cycle: Dict = {}
+
+    def _primitives(self):
+        """Semáforo y lock se crean dentro del event loop que los usa"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._throttle_lock = asyncio.Lock()
+        return self._semaphore, self._throttle_lock
+
+    async def _throttle(self):
+        """Espacia los inicios de request según el rate limit del exchange"""
+        if self.min_request_interval <= 0:
+            return
+        _, lock = self._primitives()
+        async with lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.min_request_interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _ensure_markets(self):
+        """Carga los mercados una sola vez antes del primer fan-out"""
+        if self._markets_loaded:
+            return
+        exchange = getattr(self.connector, 'exchange', None)
+        if exchange is not None and hasattr(exchange, 'load_markets'):
+            try:
+                await asyncio.to_thread(exchange.load_markets)
+            except Exception as e:
+                logger.warning(f"No se pudieron precargar mercados: {e}")
+                return
+        self._markets_loaded = True
+
+    async def fetch_one(self, symbol: str, timeframe: str, limit: int) -> pd.DataFrame:
+        """Descarga un símbolo en un hilo respetando concurrencia y rate limit"""
+        semaphore, _ = self._primitives()
+        async with semaphore:
+            await self._throttle()
+            start = time.perf_counter()
+            try:
+                df = await asyncio.to_thread(self.connector.get_historical_data, symbol, timeframe, limit)
+            finally:
+                self.symbol_latency_ms[symbol] = (time.perf_counter() - start) * 1000
+            return df
+
+    async def fetch_all(self, symbols: List[str], timeframe: str = '1m',
+                        limit: int = 100) -> Dict[str, pd.DataFrame]:
+        """
+        Descarga todos los símbolos en paralelo
+
+        Returns:
+            Dict símbolo -> DataFrame (vacío si hubo error en ese símbolo)
+        """
+        await self._ensure_markets()
+
+        cycle_start = time.perf_counter()
+        results = await asyncio.gather(
+            *(self.fetch_one(symbol, timeframe, limit) for symbol in symbols),
+            return_exceptions=True
+        )
+        cycle_ms = (time.perf_counter() - cycle_start) * 1000
+
+        market_data = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ Error obteniendo datos de {symbol}: {result}")
+                market_data[symbol] = pd.DataFrame()
+            else:
+                market_data[symbol] = result
+
+        per_symbol = {s: round(self.symbol_latency_ms.get(s, 0.0), 1) for s in symbols}
+        slowest = max(per_symbol.items(), key=lambda x: x[1]) if per_symbol else (None, 0.0)
+        self.last_cycle = {
+            'timestamp': time.time(),
+            'timeframe': timeframe,
+            'symbols': len(symbols),
+            'cycle_ms': round(cycle_ms, 1),
+            'sum_ms': round(sum(per_symbol.values()), 1),
+            'slowest_symbol': slowest[0],
+            'slowest_ms': slowest[1],
+            'per_symbol_ms': per_symbol,
+        }
+
+        return market_data
+
+    def get_latency_report(self) -> Dict:
+        """Último ciclo: latencia total vs suma secuencial y por símbolo"""
+        return dict(self.last_cycle)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+===========================================
+COLA DE PERSISTENCIA WRITE-BEHIND
+===========================================
+
+El bucle de trading encola posiciones, señales y alertas sin tocar SQLite;
+un hilo escritor dedicado las vuelca en lote (una transacción por vaciado)
+cuando se alcanza un tamaño o un tiempo máximo. Las actualizaciones de una
+misma posición se fusionan: sólo se escribe su último estado.
+
+Si el vaciado falla (p.ej. 'database is locked') el lote vuelve a la cola,
+fusionado con lo encolado mientras tanto, y se reintenta con backoff
+exponencial; sólo tras agotar los reintentos se descarta.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Cola de escritura diferida sobre un TradingDatabase"""
+
+    def __init__(self, database, max_batch: int = 200, flush_interval: float = 0.5,
+                 max_retries: int = 5, retry_backoff: float = 0.1, retry_backoff_max: float = 5.0):
+        """
+        Args:
+            database: TradingDatabase (save_positions, save_signals, save_alert, transaction)
+            max_batch: Elementos pendientes que disparan un vaciado inmediato
+            flush_interval: Segundos máximos que un elemento espera en la cola
+            max_retries: Reintentos de un lote fallido antes de descartarlo
+            retry_backoff: Espera del primer reintento (se duplica en cada uno)
+            retry_backoff_max: Espera máxima entre reintentos
+        """
+        self.database = database
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+
+        self._cond = threading.Condition()
+        self._positions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._signals: List[Dict] = []
+        self._alerts: List[Dict] = []
+        self._oldest: Optional[float] = None
+        self._flush_requested = False
+        self._writing = False
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._failures = 0          # vaciados fallidos seguidos
+        self._retry_at = 0.0        # monotonic del próximo reintento
+
+        self.stats = {
+            'enqueued': 0,
+            'coalesced': 0,
+            'flushes': 0,
+            'written': 0,
+            'errors': 0,
+            'retries': 0,
+            'dropped': 0,
+            'last_flush_ms': 0.0
+        }
+
+    # ===========================================
+    # CICLO DE VIDA
+    # ===========================================
+
+    def start(self):
+        """Arranca el hilo escritor (idempotente)"""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def close(self, timeout: float = 10.0):
+        """Vacía todo lo pendiente y detiene el escritor (apagado durable)"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # Sin hilo (o si no llegó a vaciar): escribir en el hilo actual
+        self._drain()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Bloquea hasta que lo encolado hasta ahora esté en disco"""
+        if self._thread is None or not self._thread.is_alive():
+            self._drain()
+            return True
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._pending_count() or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    # ===========================================
+    # ENCOLADO (no bloquea en disco)
+    # ===========================================
+
+    def enqueue_position(self, position: Dict) -> bool:
+        """Encola el estado de una posición; sustituye al pendiente del mismo id"""
+        with self._cond:
+            if position['id'] in self._positions:
+                self.stats['coalesced'] += 1
+                self._positions.move_to_end(position['id'])
+            self._positions[position['id']] = position
+            self._enqueued(1)
+        return True
+
+    def enqueue_signal(self, signal: Dict) -> bool:
+        return self.enqueue_signals([signal]) == 1
+
+    def enqueue_signals(self, signals: List[Dict]) -> int:
+        with self._cond:
+            self._signals.extend(signals)
+            self._enqueued(len(signals))
+        return len(signals)
+
+    def enqueue_alert(self, alert_type: str, message: str, data: Optional[Dict] = None,
+                      user_id: str = 'system') -> bool:
+        with self._cond:
+            self._alerts.append({'alert_type': alert_type, 'message': message,
+                                 'data': data, 'user_id': user_id})
+            self._enqueued(1)
+        return True
+
+    def _enqueued(self, count: int):
+        """Requiere self._cond"""
+        self.stats['enqueued'] += count
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        if self._pending_count() >= self.max_batch:
+            self._cond.notify_all()
+
+    def _pending_count(self) -> int:
+        return len(self._positions) + len(self._signals) + len(self._alerts)
+
+    def pending(self) -> int:
+        with self._cond:
+            return self._pending_count()
+
+    # ===========================================
+    # ESCRITOR
+    # ===========================================
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._should_flush():
+                    if self._stopping:
+                        return
+                    timeout = None
+                    if self._oldest is not None:
+                        due = self._oldest + self.flush_interval
+                        if self._flush_requested or self._pending_count() >= self.max_batch:
+                            due = time.monotonic()
+                        due = max(due, self._retry_at)
+                        timeout = max(0.0, due - time.monotonic())
+                    self._cond.wait(timeout)
+                batch = self._take_batch()
+            if not self._write(batch):
+                self._requeue(batch)
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+    def _should_flush(self) -> bool:
+        """Requiere self._cond"""
+        if not self._pending_count():
+            self._flush_requested = False
+            return False
+        if time.monotonic() < self._retry_at:
+            return False  # backoff tras un vaciado fallido (close() reintenta en su hilo)
+        return (self._stopping or self._flush_requested
+                or self._pending_count() >= self.max_batch
+                or time.monotonic() - self._oldest >= self.flush_interval)
+
+    def _take_batch(self):
+        """Intercambia los buffers (requiere self._cond)"""
+        batch = (list(self._positions.values()), self._signals, self._alerts)
+        self._positions = OrderedDict()
+        self._signals = []
+        self._alerts = []
+        self._oldest = None
+        self._writing = True
+        return batch
+
+    def _drain(self):
+        """Vacía en el hilo actual, esperando el backoff entre reintentos"""
+        while True:
+            with self._cond:
+                if not self._pending_count():
+                    return
+                wait = self._retry_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            with self._cond:
+                batch = self._take_batch()
+            ok = self._write(batch)
+            if not ok:
+                self._requeue(batch)
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+    def _write(self, batch) -> bool:
+        positions, signals, alerts = batch
+        start = time.perf_counter()
+        ok = True
+        expected = len(positions) + len(signals) + len(alerts)
+        try:
+            # Dentro de la transacción los save_* propagan sus errores
+            with self.database.transaction():
+                written = self.database.save_positions(positions)
+                written += self.database.save_signals(signals)
+                for alert in alerts:
+                    written += int(self.database.save_alert(**alert))
+                if written < expected:
+                    raise RuntimeError(f"sólo se escribieron {written} de {expected} filas")
+            self.stats['written'] += written
+        except Exception as e:
+            ok = False
+            self.stats['errors'] += 1
+            logger.error(f"❌ Error volcando cola de persistencia: {e}")
+        self.stats['flushes'] += 1
+        self.stats['last_flush_ms'] = (time.perf_counter() - start) * 1000
+        with self._cond:
+            if ok:
+                self._failures = 0
+                self._retry_at = 0.0
+            else:
+                self._failures += 1
+        return ok
+
+    def _requeue(self, batch):
+        """Devuelve un lote fallido a la cola (o lo descarta si agotó los reintentos)"""
+        positions, signals, alerts = batch
+        with self._cond:
+            if self._failures > self.max_retries:
+                self._failures = 0
+                self._retry_at = 0.0
+                self.stats['dropped'] += len(positions) + len(signals) + len(alerts)
+                logger.error(f"❌ Lote descartado tras {self.max_retries} reintentos")
+                return
+
+            # Delante de lo encolado después; una posición actualizada mientras tanto conserva su último estado
+            merged = OrderedDict((p['id'], p) for p in positions if p['id'] not in self._positions)
+            merged.update(self._positions)
+            self._positions = merged
+            self._signals = signals + self._signals
+            self._alerts = alerts + self._alerts
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+
+            delay = min(self.retry_backoff_max, self.retry_backoff * (2 ** (self._failures - 1)))
+            self._retry_at = time.monotonic() + delay
+            self.stats['retries'] += 1
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'pending': self.pending()}
@@ -26,6 +26,8 @@ import json
 import logging
 from abc import ABC, abstractmethod
 
+from indicator_engine import IndicatorEngine, compute_indicators, has_indicators
+
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -154,39 +156,17 @@ class PhilosopherTrader(ABC):
         )
     
     def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Calcula indicadores técnicos universales"""
-        
-        # RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-        
-        # MACD
-        df['EMA_12'] = df['close'].ewm(span=12).mean()
-        df['EMA_26'] = df['close'].ewm(span=26).mean()
-        df['MACD'] = df['EMA_12'] - df['EMA_26']
-        df['MACD_Signal'] = df['MACD'].ewm(span=9).mean()
-        
-        # Bollinger Bands
-        df['BB_Middle'] = df['close'].rolling(20).mean()
-        bb_std = df['close'].rolling(20).std()
-        df['BB_Upper'] = df['BB_Middle'] + (bb_std * 2)
-        df['BB_Lower'] = df['BB_Middle'] - (bb_std * 2)
-        
-        # ATR
-        high_low = df['high'] - df['low']
-        high_close = np.abs(df['high'] - df['close'].shift())
-        low_close = np.abs(df['low'] - df['close'].shift())
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        df['ATR'] = ranges.max(axis=1).rolling(14).mean()
-        
-        # Volume Profile
-        df['Volume_SMA'] = df['volume'].rolling(20).mean()
-        df['Volume_Ratio'] = df['volume'] / df['Volume_SMA']
-        
-        return df
+        """
+        Calcula indicadores técnicos universales
+        
+        Si el frame ya viene del IndicatorEngine se reutiliza tal cual; si no,
+        se calcula sobre una copia (el frame del llamador no se modifica).
+        """
+        
+        if has_indicators(df):
+            return df
+        
+        return compute_indicators(df)
 
 # ===========================================
 # SÓCRATES: El Cuestionador (Ranging Markets)
@@ -719,6 +699,9 @@ class PhilosophicalTradingSystem:
             'CONFUCIO': Confucio()
         }
         
+        # Indicadores compartidos: una sola vez por (símbolo, intervalo, vela)
+        self.indicator_engine = IndicatorEngine()
+        
         self.active_projects = {}  # Proyectos activos
         self.historical_signals = []  # Histórico de señales
         self.performance_metrics = {}  # Métricas de performance
@@ -748,11 +731,20 @@ class PhilosophicalTradingSystem:
         return project
     
     def analyze_with_philosophers(self, df: pd.DataFrame, symbol: str, 
-                                 philosophers: List[str]) -> List[PhilosophicalSignal]:
-        """Analiza con múltiples filósofos"""
+                                 philosophers: List[str],
+                                 use_engine: bool = True) -> List[PhilosophicalSignal]:
+        """
+        Analiza con múltiples filósofos
+        
+        Con use_engine los indicadores se calculan una vez en el IndicatorEngine
+        y todos los filósofos reciben el mismo frame de solo lectura.
+        """
         
         signals = []
         
+        if use_engine and not df.empty:
+            df = self.indicator_engine.compute(df, symbol)
+        
         for philosopher_name in philosophers:
             if philosopher_name in self.philosophers:
                 philosopher = self.philosophers[philosopher_name]
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+===========================================
+SNAPSHOT DE SEÑALES DE ALTA CALIDAD
+===========================================
+
+Calcula una sola vez por cierre de vela el conjunto de señales puntuadas
+(+70% de confianza) para todos los símbolos y lo mantiene en memoria.
+Las peticiones por usuario son proyecciones baratas de ese snapshot: no
+descargan velas ni recalculan indicadores.
+"""
+
+import asyncio
+import time
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYMBOLS = ["SOLUSDT", "XRPUSDT", "ADAUSDT", "DOGEUSDT", "AVAXUSDT", "LINKUSDT", "DOTUSDT", "PEPEUSDT"]
+
+INTERVAL_SECONDS = {'1m': 60, '5m': 300, '15m': 900, '30m': 1800, '1h': 3600, '4h': 14400, '1d': 86400}
+
+
+def score_signal(symbol: str, df: pd.DataFrame) -> Optional[Dict]:
+    """
+    Puntúa un símbolo con RSI, medias, MACD y volumen
+
+    Returns:
+        Señal (sin id ni user_id) si la confianza es >= 70%, si no None
+    """
+    current_price = float(df['close'].iloc[-1])
+
+    # RSI
+    delta = df['close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rs = gain / loss
+    rsi = 100 - (100 / (1 + rs))
+    rsi_value = float(rsi.iloc[-1]) if not rsi.empty else 50
+
+    # Medias móviles
+    ma20 = df['close'].rolling(20).mean().iloc[-1]
+    ma50 = df['close'].rolling(50).mean().iloc[-1] if len(df) >= 50 else ma20
+
+    # MACD
+    exp1 = df['close'].ewm(span=12, adjust=False).mean()
+    exp2 = df['close'].ewm(span=26, adjust=False).mean()
+    macd = exp1 - exp2
+    signal_line = macd.ewm(span=9, adjust=False).mean()
+    macd_value = float(macd.iloc[-1])
+    macd_signal = float(signal_line.iloc[-1])
+
+    # Volumen
+    volume_avg = df['volume'].rolling(20).mean().iloc[-1]
+    volume_current = df['volume'].iloc[-1]
+    volume_ratio = volume_current / volume_avg if volume_avg > 0 else 1
+
+    # Determinar tendencia del mercado
+    if current_price > ma20 > ma50:
+        market_trend = "BULLISH"
+    elif current_price < ma20 < ma50:
+        market_trend = "BEARISH"
+    else:
+        market_trend = "NEUTRAL"
+
+    # Calcular confianza basada en múltiples factores
+    confidence_score = 50  # Base
+    action = None
+    reasoning = []
+
+    # Análisis para señal de VENTA
+    if market_trend == "BEARISH" or (market_trend == "NEUTRAL" and current_price < ma20):
+        action = "SELL"
+        if rsi_value > 70:  # Sobrecompra
+            confidence_score += 25
+            reasoning.append("RSI en zona de distribución")
+        elif 40 <= rsi_value <= 70:  # RSI favorable para venta
+            confidence_score += 15
+            reasoning.append("RSI en zona de distribución")
+
+        if macd_value < macd_signal:  # MACD negativo
+            confidence_score += 15
+            reasoning.append("MACD con cruce bajista")
+
+        if volume_ratio > 1.5:  # Volumen alto
+            confidence_score += 10
+            reasoning.append("Volumen elevado confirma venta")
+
+        if current_price < ma20:  # Precio bajo MA20
+            confidence_score += 10
+            reasoning.append("Precio bajo media móvil 20")
+
+    # Análisis para señal de COMPRA
+    elif market_trend == "BULLISH" or (market_trend == "NEUTRAL" and current_price > ma20):
+        action = "BUY"
+        if rsi_value < 30:  # Sobreventa
+            confidence_score += 25
+            reasoning.append("RSI sobreventa en tendencia alcista")
+        elif 30 <= rsi_value <= 60:  # RSI favorable
+            confidence_score += 15
+            reasoning.append("RSI en zona de acumulación")
+
+        if macd_value > macd_signal:  # MACD positivo
+            confidence_score += 15
+            reasoning.append("MACD con cruce alcista")
+
+        if volume_ratio > 1.5:  # Volumen alto
+            confidence_score += 10
+            reasoning.append("Volumen elevado confirma movimiento")
+
+        if current_price > ma20:  # Precio sobre MA20
+            confidence_score += 10
+            reasoning.append("Precio sobre media móvil 20")
+
+    # Solo crear señal si hay acción clara y confianza >= 70%
+    if not action or confidence_score < 70:
+        return None
+
+    # Calcular niveles
+    atr = (df['high'] - df['low']).rolling(14).mean().iloc[-1]
+
+    return {
+        "symbol": symbol,
+        "action": action,
+        "confidence": min(confidence_score, 95),  # Cap at 95%
+        "entry_price": current_price,
+        "stop_loss": current_price - (atr * 1.5) if action == "BUY" else current_price + (atr * 1.5),
+        "take_profit": current_price + (atr * 3) if action == "BUY" else current_price - (atr * 3),
+        "philosopher": "Sistema Avanzado",
+        "reasoning": " + ".join(reasoning[:3]),  # Top 3 razones
+        "market_trend": market_trend,
+        "rsi": round(rsi_value, 1),
+        "volume_ratio": round(volume_ratio, 2)
+    }
+
+
+@dataclass
+class SignalSnapshot:
+    """Conjunto de señales puntuadas para un cierre de vela"""
+    candle_open: int  # inicio (epoch s) de la vela en formación al calcular
+    computed_at: datetime
+    compute_ms: float
+    signals: List[Dict] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+class SignalSnapshotService:
+    """
+    Servicio de snapshot de señales compartido por todos los usuarios
+
+    El snapshot se recalcula sólo cuando cierra una vela del intervalo; las
+    peticiones concurrentes durante el recálculo esperan al mismo cálculo.
+    """
+
+    def __init__(self, fetch_all: Callable, symbols: List[str] = None,
+                 interval: str = '15m', limit: int = 100, top_n: int = 5,
+                 persist: Optional[Callable[[List[Dict]], int]] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            fetch_all: Corrutina fetch_all(symbols, interval, limit) -> {symbol: df}
+            symbols: Símbolos a puntuar
+            interval: Intervalo de las velas; marca la frecuencia de recálculo
+            limit: Velas por símbolo
+            top_n: Señales devueltas por proyección
+            persist: Función que guarda en lote las señales proyectadas (p.ej. db.save_signals)
+            clock: Reloj en segundos (inyectable para tests y benchmark)
+        """
+        self.fetch_all = fetch_all
+        self.symbols = symbols or list(DEFAULT_SYMBOLS)
+        self.interval = interval
+        self.interval_seconds = INTERVAL_SECONDS[interval]
+        self.limit = limit
+        self.top_n = top_n
+        self.persist = persist
+        self.clock = clock
+
+        self.snapshot: Optional[SignalSnapshot] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._persisted: Set[Tuple[str, int]] = set()
+        self.stats = {'computes': 0, 'served': 0}
+
+    def _current_candle(self) -> int:
+        now = int(self.clock())
+        return now - now % self.interval_seconds
+
+    def is_fresh(self) -> bool:
+        return self.snapshot is not None and self.snapshot.candle_open == self._current_candle()
+
+    async def get_snapshot(self) -> SignalSnapshot:
+        """Snapshot vigente; lo recalcula una sola vez por cierre de vela"""
+        if self.is_fresh():
+            self.stats['served'] += 1
+            return self.snapshot
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            # Otro llamador pudo recalcularlo mientras esperábamos
+            if not self.is_fresh():
+                self.snapshot = await self._compute()
+            self.stats['served'] += 1
+            return self.snapshot
+
+    async def _compute(self) -> SignalSnapshot:
+        candle_open = self._current_candle()
+        start = time.perf_counter()
+
+        market_data = await self.fetch_all(self.symbols, self.interval, self.limit + 1)
+
+        signals = []
+        errors = {}
+        for symbol in self.symbols:
+            df = market_data.get(symbol)
+            if df is None or df.empty:
+                continue
+            try:
+                # Sólo velas cerradas: el snapshot no cambia dentro de la vela
+                closed = df[df.index < pd.Timestamp(candle_open, unit='s')].tail(self.limit)
+                signal = score_signal(symbol, closed) if len(closed) else None
+                if signal:
+                    signals.append(signal)
+            except Exception as e:
+                errors[symbol] = str(e)
+                print(f"Error analyzing {symbol}: {e}")
+
+        # Ordenar por confianza (mayor a menor)
+        signals.sort(key=lambda x: x['confidence'], reverse=True)
+
+        self.stats['computes'] += 1
+        self._persisted.clear()
+
+        return SignalSnapshot(
+            candle_open=candle_open,
+            computed_at=datetime.now(),
+            compute_ms=(time.perf_counter() - start) * 1000,
+            signals=signals,
+            errors=errors
+        )
+
+    async def get_signals(self) -> List[Dict]:
+        """Top señales globales del snapshot"""
+        snapshot = await self.get_snapshot()
+        stamp = snapshot.computed_at.timestamp()
+        return [
+            {**signal, "id": f"{signal['symbol']}_{stamp}", "timestamp": snapshot.computed_at.isoformat()}
+            for signal in snapshot.signals[:self.top_n]
+        ]
+
+    async def get_signals_for_user(self, user_id: str) -> List[Dict]:
+        """
+        Top señales del snapshot para un usuario. Se persisten todas las
+        señales que superan el umbral (no sólo el top), una vez por vela.
+        """
+        snapshot = await self.get_snapshot()
+        stamp = snapshot.computed_at.timestamp()
+        projected = [
+            {
+                **signal,
+                "id": f"{signal['symbol']}_{user_id}_{stamp}",
+                "user_id": user_id,
+                "timestamp": snapshot.computed_at.isoformat(),
+            }
+            for signal in snapshot.signals
+        ]
+
+        key = (user_id, snapshot.candle_open)
+        if self.persist and key not in self._persisted:
+            self._persisted.add(key)
+            try:
+                self.persist(projected)
+            except Exception as save_error:
+                print(f"Error saving user signal to database: {save_error}")
+
+        return projected[:self.top_n]
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Tests de TradingDatabase: pool WAL, índices y escritura en lote"""
+
+import threading
+
+import pytest
+
+from database import TradingDatabase
+
+
+def make_signal(i, user_id="user_1"):
+    return {'id': f"sig_{i}", 'user_id': user_id, 'symbol': "BTCUSDT",
+            'action': "BUY", 'confidence': 80.0, 'entry_price': 100.0 + i}
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = TradingDatabase(str(tmp_path / "trading.db"))
+    yield database
+    database.close()
+
+
+def test_connection_reused_per_thread_in_wal(db):
+    conn = db.get_connection()
+    assert db.get_connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(db.get_connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+
+def test_queries_use_indexes(db):
+    conn = db.get_connection()
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM signals WHERE user_id = ? ORDER BY timestamp DESC LIMIT 20",
+        ("user_1",)
+    ).fetchall()
+    assert any("idx_signals_user_ts" in row[-1] for row in plan)
+
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM positions WHERE status = 'OPEN' AND user_id = ? ORDER BY open_time DESC",
+        ("user_1",)
+    ).fetchall()
+    assert any("idx_positions_user_status_open" in row[-1] for row in plan)
+
+
+def test_save_signals_batch_skips_duplicates(db):
+    assert db.save_signal(make_signal(0))
+    saved = db.save_signals([make_signal(i) for i in range(5)])
+
+    assert saved == 4
+    assert len(db.get_recent_signals(50, user_id="user_1")) == 5
+    assert db.get_statistics()['total_signals'] == 5
+
+
+def test_transaction_groups_writes_and_rolls_back(db):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.save_signal(make_signal(1))
+            db.save_signal(make_signal(2))
+            raise RuntimeError("fallo a mitad del lote")
+    assert db.get_recent_signals(10) == []
+
+    with db.transaction():
+        db.save_signal(make_signal(1))
+        db.mark_signal_executed("sig_1")
+    assert db.get_statistics()['executed_signals'] == 1
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Tests del motor de indicadores compartido (datos sintéticos, sin red)"""
+
+import numpy as np
+import pytest
+
+from indicator_engine import IndicatorEngine, compute_indicators, INDICATOR_COLUMNS
+from philosophers_extended import register_extended_philosophers
+
+
+def klines_15m(ohlcv, n, seed=7):
+    """Velas de 15m con el formato de BinanceConnector (columnas en minúscula)"""
+    df = ohlcv(n, seed, start='2025-01-01', freq='15min', name='timestamp', lowercase=True)
+    df.attrs['timeframe'] = '15m'
+    return df
+
+
+def assert_matches(result, expected):
+    for column in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(result[column].to_numpy(), expected[column].to_numpy(),
+                                   rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=column)
+
+
+def test_incremental_matches_full_recompute(ohlcv):
+    candles = klines_15m(ohlcv, 400)
+    engine = IndicatorEngine()
+
+    engine.compute(candles.iloc[:200], 'BTCUSDT')
+    for end in range(201, 401):
+        result = engine.compute(candles.iloc[:end], 'BTCUSDT')
+
+    assert engine.stats['full_recomputes'] == 1
+    assert engine.stats['incremental_rows'] > 0
+    assert_matches(result, compute_indicators(candles))
+
+
+def test_forming_candle_update_and_cache_hit(ohlcv):
+    candles = klines_15m(ohlcv, 300)
+    engine = IndicatorEngine()
+    engine.compute(candles, 'BTCUSDT')
+
+    forming = candles.copy()
+    forming.iloc[-1, forming.columns.get_loc('close')] *= 1.01
+    result = engine.compute(forming, 'BTCUSDT')
+    assert_matches(result, compute_indicators(forming))
+
+    again = engine.compute(forming, 'BTCUSDT')
+    assert again is result
+    assert engine.stats['hits'] == 1
+
+
+def test_sliding_window_advances_incrementally(ohlcv):
+    # Patrón de producción: klines con limit fijo, la ventana avanza una vela por ciclo
+    candles = klines_15m(ohlcv, 400)
+    engine = IndicatorEngine()
+    engine.compute(candles.iloc[0:200], 'BTCUSDT')
+    for start in range(1, 201):
+        result = engine.compute(candles.iloc[start:start + 200], 'BTCUSDT')
+
+    assert engine.stats['full_recomputes'] == 1
+    assert engine.stats['incremental_rows'] == 2 * 200
+    assert len(result) == 200
+    assert result.index.equals(candles.index[200:400])
+
+    # Igual que un cálculo completo sobre el histórico retenido, recortado a la ventana
+    assert_matches(result, compute_indicators(candles).iloc[200:400])
+
+    # Las ventanas rolling ya llenas coinciden con un proceso nuevo que sólo ve esa ventana
+    fresh = compute_indicators(candles.iloc[200:400])
+    for column in ['RSI', 'BB_Middle', 'BB_Upper', 'BB_Lower', 'ATR', 'Volume_SMA', 'Volume_Ratio']:
+        np.testing.assert_allclose(result[column].to_numpy()[20:], fresh[column].to_numpy()[20:],
+                                   rtol=1e-9, err_msg=column)
+
+    # Una ventana más corta con la misma última vela reutiliza el estado
+    tail = engine.compute(candles.iloc[300:400], 'BTCUSDT')
+    assert_matches(tail, compute_indicators(candles).iloc[300:400])
+    assert engine.stats['hits'] == 1
+
+    # Una ventana que no llega a la última vela guardada vuelve a sembrar el estado
+    earlier = engine.compute(candles.iloc[0:300], 'BTCUSDT')
+    assert_matches(earlier, compute_indicators(candles.iloc[0:300]))
+    assert engine.stats['full_recomputes'] == 2
+
+
+def test_caller_frame_untouched_and_result_read_only(ohlcv):
+    candles = klines_15m(ohlcv, 120)
+    original_columns = list(candles.columns)
+    result = IndicatorEngine().compute(candles, 'BTCUSDT')
+
+    assert list(candles.columns) == original_columns
+    with pytest.raises(ValueError):
+        result.iloc[-1, 0] = 0.0
+
+
+def test_philosophers_same_signals_with_engine(ohlcv):
+    candles = klines_15m(ohlcv, 300, seed=11)
+    system = register_extended_philosophers()
+    names = list(system.philosophers)
+
+    with_engine = system.analyze_with_philosophers(candles, 'BTCUSDT', names)
+    without_engine = system.analyze_with_philosophers(candles, 'BTCUSDT', names, use_engine=False)
+
+    assert [(s.philosopher, s.action, s.entry_price) for s in with_engine] == \
+        [(s.philosopher, s.action, s.entry_price) for s in without_engine]
+    assert 'RSI' not in candles.columns
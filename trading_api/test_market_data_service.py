@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Tests del fan-out asíncrono de datos de mercado (conector simulado, sin red)"""
+
+import asyncio
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from market_data_service import AsyncMarketDataFetcher
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'ADAUSDT', 'DOTUSDT', 'LINKUSDT', 'DOGEUSDT', 'XRPUSDT']
+
+
+class FakeExchange:
+    def __init__(self, rate_limit_ms=0):
+        self.rateLimit = rate_limit_ms
+        self.markets_loaded = 0
+
+    def load_markets(self):
+        self.markets_loaded += 1
+
+
+class FakeConnector:
+    """get_historical_data bloqueante que registra concurrencia e inicios"""
+
+    def __init__(self, delay=0.05, rate_limit_ms=0, failing=()):
+        self.exchange = FakeExchange(rate_limit_ms)
+        self.delay = delay
+        self.failing = set(failing)
+        self.active = 0
+        self.peak = 0
+        self.starts = []
+        self._lock = threading.Lock()
+
+    def get_historical_data(self, symbol, timeframe, limit):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.starts.append(time.monotonic())
+        try:
+            time.sleep(self.delay)
+            if symbol in self.failing:
+                raise ConnectionError(f"timeout {symbol}")
+            index = pd.date_range('2025-01-01', periods=limit, freq='min', name='timestamp')
+            return pd.DataFrame({'close': range(limit)}, index=index, dtype=float)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_fan_out_is_bounded_by_the_semaphore():
+    connector = FakeConnector(delay=0.1)
+    fetcher = AsyncMarketDataFetcher(connector, max_concurrency=3)
+
+    start = time.perf_counter()
+    data = asyncio.run(fetcher.fetch_all(SYMBOLS, '1m', 50))
+    elapsed = time.perf_counter() - start
+
+    assert connector.peak == 3
+    assert all(len(data[s]) == 50 for s in SYMBOLS)
+    # 8 requests de 0.1 s en tandas de 3: ~0.3 s en lugar de 0.8 s secuenciales
+    assert elapsed < 0.6
+    assert connector.exchange.markets_loaded == 1
+
+    asyncio.run(fetcher.fetch_all(SYMBOLS[:2]))
+    assert connector.exchange.markets_loaded == 1
+
+
+def test_request_starts_are_spaced_by_rate_limit():
+    connector = FakeConnector(delay=0.0, rate_limit_ms=50)
+    fetcher = AsyncMarketDataFetcher(connector, max_concurrency=8)
+    assert fetcher.min_request_interval == pytest.approx(0.05)
+
+    asyncio.run(fetcher.fetch_all(SYMBOLS[:5]))
+    starts = sorted(connector.starts)
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert len(gaps) == 4 and min(gaps) >= 0.045
+
+
+def test_errors_are_isolated_per_symbol():
+    connector = FakeConnector(failing={'SOLUSDT'})
+    fetcher = AsyncMarketDataFetcher(connector, max_concurrency=4)
+    data = asyncio.run(fetcher.fetch_all(SYMBOLS[:4]))
+
+    assert data['SOLUSDT'].empty
+    assert all(len(data[s]) == 100 for s in SYMBOLS[:4] if s != 'SOLUSDT')
+    assert set(fetcher.symbol_latency_ms) == set(SYMBOLS[:4])
+
+
+def test_latency_report_in_system_status(monkeypatch):
+    from fastapi.testclient import TestClient
+    import fastapi_server
+
+    connector = FakeConnector(delay=0.02)
+    fetcher = AsyncMarketDataFetcher(connector, max_concurrency=2)
+    asyncio.run(fetcher.fetch_all(SYMBOLS[:3], '15m', 20))
+    monkeypatch.setattr(fastapi_server.trading_manager, 'market_data', fetcher)
+
+    latency = TestClient(fastapi_server.app).get('/api/system-status').json()['market_data_latency']
+    assert latency['symbols'] == 3 and latency['timeframe'] == '15m'
+    assert set(latency['per_symbol_ms']) == set(SYMBOLS[:3])
+    assert latency['slowest_symbol'] in SYMBOLS[:3]
+    assert latency['slowest_ms'] == max(latency['per_symbol_ms'].values())
+    assert latency['sum_ms'] >= latency['cycle_ms'] > 0
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Tests de la cola de persistencia write-behind (SQLite temporal)"""
+
+import sqlite3
+import time
+
+import pytest
+
+from database import TradingDatabase
+from persistence_queue import WriteBehindQueue
+
+
+def make_position(pnl, status="OPEN"):
+    return {'id': "pos_1", 'user_id': "system", 'symbol': "BTCUSDT", 'type': "LONG",
+            'entry_price': 100.0, 'quantity': 1.0, 'pnl': pnl, 'status': status}
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = TradingDatabase(str(tmp_path / "trading.db"))
+    yield database
+    database.close()
+
+
+def test_position_updates_coalesce(db):
+    queue = WriteBehindQueue(db, flush_interval=60)
+    queue.start()
+    for pnl in range(10):
+        queue.enqueue_position(make_position(float(pnl)))
+    queue.enqueue_position(make_position(9.0, status="CLOSED"))
+    assert queue.flush()
+
+    assert queue.stats['coalesced'] == 10
+    assert queue.stats['flushes'] == 1
+    assert db.get_open_positions() == []
+    assert db.get_statistics()['total_pnl'] == 9.0
+    queue.close()
+
+
+def test_flushes_on_size_and_time(db):
+    queue = WriteBehindQueue(db, max_batch=5, flush_interval=0.05)
+    queue.start()
+    queue.enqueue_signals([{'id': f"sig_{i}", 'user_id': "u", 'symbol': "ETHUSDT",
+                            'action': "BUY", 'confidence': 80.0} for i in range(5)])
+    queue.enqueue_alert("INFO", "hola", {"x": 1})
+
+    deadline = time.monotonic() + 2
+    while queue.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+
+    assert db.get_statistics()['total_signals'] == 5
+    assert db.get_recent_alerts()[0]['data'] == {"x": 1}
+    queue.close()
+
+
+def test_close_is_durable(db):
+    queue = WriteBehindQueue(db, flush_interval=60)
+    queue.start()
+    queue.enqueue_alert("WARNING", "pendiente al apagar")
+    queue.close()
+
+    assert queue.pending() == 0
+    assert db.get_recent_alerts()[0]['message'] == "pendiente al apagar"
+
+
+def test_locked_database_requeues_then_drops(tmp_path):
+    path = str(tmp_path / "trading.db")
+    db = TradingDatabase(path, timeout=0.05)
+    # Otra conexión con el lock de escritura: el vaciado falla de verdad
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+
+    queue = WriteBehindQueue(db, flush_interval=60, max_retries=50, retry_backoff=0.02, retry_backoff_max=0.05)
+    queue.start()
+    queue.enqueue_position(make_position(1.0))
+    queue.enqueue_signal({'id': "sig_1", 'user_id': "u", 'symbol': "ETHUSDT", 'action': "BUY", 'confidence': 80.0})
+    assert not queue.flush(timeout=0.3)
+    assert queue.stats['errors'] >= 1 and queue.stats['retries'] >= 1
+    assert queue.stats['written'] == 0 and queue.stats['dropped'] == 0
+
+    # Otra actualización de la posición durante los reintentos: se guarda su último estado
+    queue.enqueue_position(make_position(5.0))
+    blocker.execute("ROLLBACK")
+    assert queue.flush()
+    assert queue.stats['written'] >= 2 and queue.stats['dropped'] == 0
+    assert db.get_open_positions()[0]['pnl'] == 5.0
+    assert db.get_statistics()['total_signals'] == 1
+    queue.close()
+
+    # Con el lock retenido se agotan los reintentos y el lote se descarta (contado)
+    blocker.execute("BEGIN IMMEDIATE")
+    queue = WriteBehindQueue(db, flush_interval=60, max_retries=2, retry_backoff=0.01)
+    queue.enqueue_alert("INFO", "no cabe")
+    queue.close()
+    blocker.execute("ROLLBACK")
+    blocker.close()
+
+    assert queue.stats['errors'] == 3 and queue.stats['dropped'] == 1 and queue.pending() == 0
+    assert db.get_recent_alerts() == []
+    db.close()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Tests del snapshot de señales: un cálculo por vela, sólo velas cerradas y señales persistidas"""
+
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import signal_snapshot
+from signal_snapshot import SignalSnapshotService
+
+CANDLE = 900
+T0 = 1_700_000_000 - 1_700_000_000 % CANDLE
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = T0 + 60
+
+    def __call__(self):
+        return self.now
+
+
+class FakeMarket:
+    """fetch_all asíncrono: velas de 15m hasta la vela en formación incluida"""
+
+    def __init__(self, clock, delay=0.05):
+        self.clock = clock
+        self.delay = delay
+        self.calls = 0
+
+    async def fetch_all(self, symbols, interval, limit):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        forming = self.clock() - self.clock() % CANDLE
+        index = pd.to_datetime(np.arange(forming - (limit - 1) * CANDLE, forming + 1, CANDLE), unit='s')
+        close = np.linspace(100, 110, limit)
+        frame = pd.DataFrame({'open': close, 'high': close * 1.01, 'low': close * 0.99,
+                              'close': close, 'volume': np.full(limit, 1000.0)}, index=index)
+        return {symbol: frame for symbol in symbols}
+
+
+@pytest.fixture
+def scored(monkeypatch):
+    """score_signal simulado: registra la última vela vista y puntúa por símbolo"""
+    seen = []
+
+    def fake_score(symbol, df):
+        seen.append(df.index[-1])
+        return {'symbol': symbol, 'action': 'BUY', 'confidence': 70 + len(seen) % 20,
+                'entry_price': float(df['close'].iloc[-1])}
+
+    monkeypatch.setattr(signal_snapshot, 'score_signal', fake_score)
+    return seen
+
+
+def make_service(persist=None):
+    clock = FakeClock()
+    market = FakeMarket(clock)
+    service = SignalSnapshotService(market.fetch_all, symbols=signal_snapshot.DEFAULT_SYMBOLS,
+                                    interval='15m', limit=100, top_n=5, persist=persist, clock=clock)
+    return service, market, clock
+
+
+def test_concurrent_callers_share_one_compute_per_candle(scored):
+    service, market, clock = make_service()
+
+    async def burst():
+        return await asyncio.gather(*(service.get_snapshot() for _ in range(20)))
+
+    snapshots = asyncio.run(burst())
+    assert all(s is snapshots[0] for s in snapshots)
+    assert market.calls == 1 and service.stats['computes'] == 1 and service.stats['served'] == 20
+
+    clock.now += 600   # misma vela
+    assert asyncio.run(service.get_snapshot()) is snapshots[0]
+    clock.now += 300   # cierra la vela
+    assert asyncio.run(service.get_snapshot()) is not snapshots[0]
+    assert market.calls == 2
+
+
+def test_only_closed_candles_are_scored(scored):
+    service, _, clock = make_service()
+    snapshot = asyncio.run(service.get_snapshot())
+
+    forming = pd.Timestamp(snapshot.candle_open, unit='s')
+    assert scored and all(last == forming - pd.Timedelta(seconds=CANDLE) for last in scored)
+
+
+def test_user_projection_persists_every_qualifying_signal_once_per_candle(scored):
+    saved = []
+    service, _, clock = make_service(persist=lambda rows: saved.append(rows) or len(rows))
+
+    top = asyncio.run(service.get_signals_for_user('alice'))
+    assert len(top) == 5
+    assert [s['confidence'] for s in top] == sorted((s['confidence'] for s in top), reverse=True)
+
+    assert len(saved) == 1 and len(saved[0]) == len(signal_snapshot.DEFAULT_SYMBOLS)
+    assert {row['user_id'] for row in saved[0]} == {'alice'}
+    assert len({row['id'] for row in saved[0]}) == len(saved[0])
+
+    asyncio.run(service.get_signals_for_user('alice'))
+    asyncio.run(service.get_signals_for_user('bob'))
+    assert len(saved) == 2 and saved[1][0]['user_id'] == 'bob'
+
+    clock.now += CANDLE
+    asyncio.run(service.get_signals_for_user('alice'))
+    assert len(saved) == 3
@@ -238,6 +238,12 @@ SYMBOL_DECIMALS = {
     'BNBUSDT': 2
 }
 
+def format_price(price: float, symbol: str) -> float:
+    """Formatea precio según la precisión requerida del símbolo"""
+    decimals = SYMBOL_DECIMALS.get(symbol, 4)
+    # Usar formato más estricto para evitar errores de punto flotante
+    return float(f"{price:.{decimals}f}")
+
 def get_asset_config(symbol: str) -> dict:
     """Retorna configuración completa del activo"""
     asset_type = get_asset_type(symbol)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Volume Profile - Perfil de volumen vectorizado e incremental
+
+El volumen de cada vela se reparte uniformemente sobre su rango
+[low, high], de modo que la masa acumulada por debajo de un precio x es
+una función lineal a trozos:
+
+    F(x) = Σ_{low_i < x} d_i·(x - low_i) - Σ_{high_i < x} d_i·(x - high_i)
+
+con d_i = volume_i / (high_i - low_i). Con los extremos ordenados y sus
+sumas acumuladas, F se evalúa en todos los bordes de los bins con dos
+searchsorted (O((velas + bins)·log velas)), y el volumen de cada bin es
+la diferencia entre bordes consecutivos. Las velas sin rango (high == low)
+aportan todo su volumen al bin que contiene su precio.
+
+RollingVolumeProfile mantiene esa estructura para las velas cerradas de
+una ventana y trata aparte la vela en formación: un tick sólo reevalúa F
+en los bordes; la estructura se reconstruye cuando cierran velas.
+"""
+
+from collections import deque
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _cumsum0(values: np.ndarray) -> np.ndarray:
+    """Suma acumulada con un 0 delante (out[k] = suma de los k primeros)"""
+    out = np.zeros(len(values) + 1)
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+class VolumeProfile:
+    """Distribución de volumen de un conjunto fijo de velas"""
+
+    def __init__(self, low: np.ndarray, high: np.ndarray, volume: np.ndarray):
+        low = np.asarray(low, dtype=np.float64)
+        high = np.asarray(high, dtype=np.float64)
+        volume = np.asarray(volume, dtype=np.float64)
+
+        self.count = len(low)
+        self.low = float(low.min()) if self.count else np.nan
+        self.high = float(high.max()) if self.count else np.nan
+
+        span = high - low
+        ranged = span > 0
+        density = volume[ranged] / span[ranged]
+
+        order = np.argsort(low[ranged], kind='stable')
+        self._lows = low[ranged][order]
+        self._low_d = _cumsum0(density[order])
+        self._low_dx = _cumsum0(density[order] * self._lows)
+
+        order = np.argsort(high[ranged], kind='stable')
+        self._highs = high[ranged][order]
+        self._high_d = _cumsum0(density[order])
+        self._high_dx = _cumsum0(density[order] * self._highs)
+
+        order = np.argsort(low[~ranged], kind='stable')
+        self._points = low[~ranged][order]
+        self._point_v = _cumsum0(volume[~ranged][order])
+
+    def mass_below(self, x: np.ndarray, include_points_at: bool = False) -> np.ndarray:
+        """Volumen por debajo de cada precio de x"""
+        x = np.asarray(x, dtype=np.float64)
+        k = np.searchsorted(self._lows, x, side='left')
+        mass = x * self._low_d[k] - self._low_dx[k]
+        k = np.searchsorted(self._highs, x, side='left')
+        mass -= x * self._high_d[k] - self._high_dx[k]
+        k = np.searchsorted(self._points, x, side='right' if include_points_at else 'left')
+        return mass + self._point_v[k]
+
+    def histogram(self, edges: np.ndarray) -> np.ndarray:
+        """Volumen por bin [edges[i], edges[i+1]) (el último bin incluye su borde superior)"""
+        mass = self.mass_below(edges)
+        mass[-1] = self.mass_below(edges[-1:], include_points_at=True)[0]
+        return np.maximum(np.diff(mass), 0.0)
+
+
+def profile_edges(low: float, high: float, n_bins: int) -> np.ndarray:
+    """Bordes de n_bins bins iguales entre low y high"""
+    return low + np.arange(n_bins + 1) * ((high - low) / n_bins)
+
+
+def volume_profile(low: np.ndarray, high: np.ndarray, volume: np.ndarray,
+                   n_bins: int = 50) -> Tuple[np.ndarray, np.ndarray]:
+    """Perfil de volumen en una pasada: (centros de los bins, volumen por bin)"""
+    profile = VolumeProfile(low, high, volume)
+    if not profile.count:
+        return np.empty(0), np.empty(0)
+    edges = profile_edges(profile.low, profile.high, n_bins)
+    return (edges[:-1] + edges[1:]) / 2, profile.histogram(edges)
+
+
+class RollingVolumeProfile:
+    """Perfil de volumen de una ventana que avanza con las velas"""
+
+    def __init__(self, n_bins: int = 50, max_candles: Optional[int] = None):
+        """
+        Args:
+            n_bins: Bins del perfil sobre el rango de la ventana
+            max_candles: Velas cerradas a conservar (None = las que indique sync)
+        """
+        self.n_bins = n_bins
+        self.max_candles = max_candles
+        self._times = deque()
+        self._rows = deque()    # (low, high, volume) de velas cerradas
+        self._closed: Optional[VolumeProfile] = None
+        self._live_time = None
+        self._live: Optional[VolumeProfile] = None
+        self.stats = {'rebuilds': 0, 'closed_candles': 0, 'live_updates': 0}
+
+    def __len__(self):
+        return len(self._rows) + (self._live is not None)
+
+    def reset(self):
+        self._times.clear()
+        self._rows.clear()
+        self._closed = None
+        self._live_time = None
+        self._live = None
+
+    def push(self, timestamp, low: float, high: float, volume: float):
+        """Añade una vela cerrada (la estructura se reconstruye al consultar)"""
+        self._times.append(timestamp)
+        self._rows.append((low, high, volume))
+        if self.max_candles is not None and len(self._rows) > self.max_candles:
+            self._times.popleft()
+            self._rows.popleft()
+        self._closed = None
+        self.stats['closed_candles'] += 1
+
+    def set_live(self, timestamp, low: float, high: float, volume: float):
+        """Actualiza la vela en formación (coste por tick: sin reconstruir)"""
+        self._live_time = timestamp
+        self._live = VolumeProfile([low], [high], [volume])
+        self.stats['live_updates'] += 1
+
+    def evict_before(self, timestamp):
+        """Descarta las velas cerradas anteriores a timestamp"""
+        while self._times and self._times[0] < timestamp:
+            self._times.popleft()
+            self._rows.popleft()
+            self._closed = None
+
+    def sync(self, df: pd.DataFrame) -> bool:
+        """
+        Alinea la ventana con df (todas las filas cerradas salvo la última,
+        que se trata como vela en formación). Devuelve True si bastó con
+        añadir/descartar velas y False si hubo que reconstruir.
+        """
+        if df.empty:
+            self.reset()
+            return False
+
+        index = df.index
+        incremental = False
+        if self._times and index[0] >= self._times[0]:
+            self.evict_before(index[0])
+            try:
+                position = index.get_loc(self._times[-1]) if self._times else -1
+            except KeyError:
+                position = None
+            # Las velas guardadas deben ser exactamente las primeras de df
+            incremental = (isinstance(position, (int, np.integer)) and position < len(index) - 1
+                           and position + 1 == len(self._times))
+
+        start = position + 1 if incremental else 0
+        if not incremental:
+            self.reset()
+            self.stats['rebuilds'] += 1
+
+        low = df['Low'].to_numpy(dtype=np.float64)
+        high = df['High'].to_numpy(dtype=np.float64)
+        volume = df['Volume'].to_numpy(dtype=np.float64)
+        for i in range(start, len(df) - 1):
+            self.push(index[i], low[i], high[i], volume[i])
+        self.set_live(index[-1], low[-1], high[-1], volume[-1])
+        return incremental
+
+    def _closed_profile(self) -> VolumeProfile:
+        if self._closed is None:
+            rows = np.array(self._rows, dtype=np.float64).reshape(-1, 3)
+            self._closed = VolumeProfile(rows[:, 0], rows[:, 1], rows[:, 2])
+        return self._closed
+
+    def profile(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(centros de los bins, volumen por bin) de la ventana actual"""
+        parts = [p for p in (self._closed_profile(), self._live) if p is not None and p.count]
+        if not parts:
+            return np.empty(0), np.empty(0)
+        edges = profile_edges(min(p.low for p in parts), max(p.high for p in parts), self.n_bins)
+        volumes = sum(p.histogram(edges) for p in parts)
+        return (edges[:-1] + edges[1:]) / 2, volumes
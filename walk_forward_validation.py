@@ -4,21 +4,117 @@ Walk-Forward Analysis para Validación Robusta
 Entrena en un período, valida en el siguiente, repite el proceso
 """
 
+import os
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from robust_trading_system_v2 import RobustTradingSystemV2
 import warnings
 warnings.filterwarnings('ignore')
 
+
+# ===========================================
+# DATOS COMPARTIDOS ENTRE PROCESOS
+# ===========================================
+
+class SharedFrame:
+    """
+    DataFrame numérico publicado en memoria compartida
+
+    El proceso principal copia las columnas una vez a un bloque
+    SharedMemory; cada worker lo adjunta y reconstruye el DataFrame sin
+    volver a serializar los datos por cada combinación de parámetros.
+    """
+    
+    def __init__(self, df):
+        values = df.to_numpy(dtype=np.float64)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=np.float64, buffer=self.shm.buf)[:] = values
+        self.spec = {
+            'name': self.shm.name,
+            'shape': values.shape,
+            'columns': list(df.columns),
+            'bool_columns': [c for c in df.columns if df[c].dtype == bool],
+            'index': df.index.as_unit('ns').asi8.copy(),
+            'tz': str(df.index.tz) if df.index.tz is not None else None,
+            'index_name': df.index.name,
+        }
+    
+    @staticmethod
+    def attach(spec):
+        """Reconstruye el DataFrame en un worker; devuelve (df, shm)"""
+        shm = shared_memory.SharedMemory(name=spec['name'])
+        values = np.ndarray(spec['shape'], dtype=np.float64, buffer=shm.buf)
+        index = pd.DatetimeIndex(spec['index'].view('datetime64[ns]'), name=spec['index_name'])
+        if spec['tz']:
+            index = index.tz_localize('UTC').tz_convert(spec['tz'])
+        df = pd.DataFrame(values.copy(), index=index, columns=spec['columns'])
+        for column in spec['bool_columns']:
+            df[column] = df[column].astype(bool)
+        return df, shm
+    
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _evaluate_params(params, df, regimes, initial_capital, symbol):
+    """Backtest de una combinación sobre datos ya preparados"""
+    system = RobustTradingSystemV2(initial_capital)
+    for key, value in params.items():
+        if key in system.base_params:
+            system.base_params[key] = value
+    
+    trades = system.run_backtest(df, symbol, regimes)
+    if not trades:
+        return trades, None
+    return trades, system.calculate_metrics(trades)
+
+
+_worker_state = {}
+
+
+def _init_worker(spec, regimes, initial_capital, symbol):
+    df, shm = SharedFrame.attach(spec)
+    _worker_state.update(df=df, shm=shm, regimes=regimes,
+                         initial_capital=initial_capital, symbol=symbol)
+
+
+def _evaluate_chunk(chunk):
+    """Evalúa un bloque [(posición, params)] en un worker"""
+    results = []
+    for position, params in chunk:
+        _, metrics = _evaluate_params(params, _worker_state['df'], _worker_state['regimes'],
+                                      _worker_state['initial_capital'], _worker_state['symbol'])
+        results.append((position, metrics))
+    return results
+
+
 class WalkForwardAnalysis:
     """
     Implementa walk-forward analysis para validación robusta
+    
+    Las velas de cada símbolo se descargan una sola vez y los indicadores
+    y regímenes (independientes de los parámetros) se calculan una vez por
+    período; la rejilla de parámetros se evalúa en un pool de procesos.
     """
     
-    def __init__(self, initial_capital=10000):
+    def __init__(self, initial_capital=10000, workers=None):
+        """
+        Args:
+            initial_capital: Capital inicial de cada backtest
+            workers: Procesos para evaluar la rejilla (1 = secuencial);
+                     por defecto os.cpu_count()
+        """
         self.initial_capital = initial_capital
+        self.workers = workers or os.cpu_count() or 1
+        
+        # Datos descargados por símbolo y períodos preparados
+        self._raw_data = {}
+        self._prepared = {}
         
         # Parámetros a optimizar con rangos conservadores
         self.param_ranges = {
@@ -87,6 +183,82 @@ class WalkForwardAnalysis:
         
         return combinations
     
+    # ===========================================
+    # DATOS (UNA SOLA DESCARGA POR SÍMBOLO)
+    # ===========================================
+    
+    def prefetch(self, symbol):
+        """Descarga de una vez el rango que cubre todos los períodos"""
+        start = min(p['train_start'] for p in self.walk_forward_periods)
+        end = max(p['test_end'] for p in self.walk_forward_periods)
+        self._load_range(symbol, start, end)
+    
+    def _load_range(self, symbol, start, end):
+        """Velas [start, end) del símbolo, descargando sólo si no están cubiertas"""
+        cached = self._raw_data.get(symbol)
+        if cached is None or start < cached['start'] or end > cached['end']:
+            start = min(start, cached['start']) if cached else start
+            end = max(end, cached['end']) if cached else end
+            df = RobustTradingSystemV2(self.initial_capital).load_data(symbol, start, end)
+            cached = self._raw_data[symbol] = {'start': start, 'end': end, 'df': df}
+        
+        df = cached['df']
+        tz = df.index.tz
+        lower = pd.Timestamp(start, tz=tz)
+        upper = pd.Timestamp(end, tz=tz)
+        return df[(df.index >= lower) & (df.index < upper)].copy()
+    
+    def load_period(self, symbol, start, end):
+        """
+        Período preparado (velas con indicadores y regímenes), calculado una vez
+        
+        Returns:
+            (df, regimes) o (None, None) si no hay suficientes velas
+        """
+        key = (symbol, start, end)
+        if key not in self._prepared:
+            df = self._load_range(symbol, start, end)
+            if len(df) < 50:
+                self._prepared[key] = (None, None)
+            else:
+                system = RobustTradingSystemV2(self.initial_capital)
+                df = system.prepare_indicators(df)
+                self._prepared[key] = (df, system.precompute_regimes(df))
+        return self._prepared[key]
+    
+    # ===========================================
+    # OPTIMIZACIÓN
+    # ===========================================
+    
+    def evaluate_grid(self, param_combinations, df, regimes, symbol):
+        """
+        Métricas de cada combinación, en el mismo orden de entrada
+        
+        Con workers > 1 las velas se publican en memoria compartida y la
+        rejilla se reparte en bloques entre procesos.
+        """
+        if self.workers <= 1 or len(param_combinations) <= 1:
+            return [
+                _evaluate_params(params, df, regimes, self.initial_capital, symbol)[1]
+                for params in param_combinations
+            ]
+        
+        indexed = list(enumerate(param_combinations))
+        n_chunks = min(len(indexed), self.workers * 4)
+        chunks = [indexed[i::n_chunks] for i in range(n_chunks)]
+        
+        shared = SharedFrame(df)
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(shared.spec, regimes, self.initial_capital, symbol)) as pool:
+                results = [None] * len(param_combinations)
+                for chunk_results in pool.map(_evaluate_chunk, chunks):
+                    for position, metrics in chunk_results:
+                        results[position] = metrics
+        finally:
+            shared.close()
+        return results
+    
     def optimize_parameters(self, train_start, train_end, symbol='BTC-USD'):
         """
         Optimiza parámetros en período de entrenamiento
@@ -98,21 +270,15 @@ class WalkForwardAnalysis:
         
         print(f"  Testing {len(param_combinations)} parameter combinations...")
         
-        for params in param_combinations:
-            # Crear sistema con parámetros específicos
-            system = RobustTradingSystemV2(self.initial_capital)
-            
-            # Actualizar parámetros
-            for key, value in params.items():
-                if key in system.base_params:
-                    system.base_params[key] = value
-            
-            # Ejecutar backtest
-            trades = system.backtest(symbol, train_start, train_end)
-            
-            if trades:
-                metrics = system.calculate_metrics(trades)
-                
+        df, regimes = self.load_period(symbol, train_start, train_end)
+        if df is None:
+            return best_params, best_metrics, best_score
+        
+        all_metrics = self.evaluate_grid(param_combinations, df, regimes, symbol)
+        
+        # Selección en el orden de la rejilla: mismo resultado que en secuencial
+        for params, metrics in zip(param_combinations, all_metrics):
+            if metrics:
                 # Calcular score compuesto (priorizar consistencia)
                 score = self.calculate_optimization_score(metrics)
                 
@@ -162,18 +328,12 @@ class WalkForwardAnalysis:
         """
         Valida parámetros en período de prueba
         """
-        system = RobustTradingSystemV2(self.initial_capital)
+        df, regimes = self.load_period(symbol, test_start, test_end)
+        if df is None:
+            return [], None
         
-        # Actualizar parámetros
-        for key, value in params.items():
-            if key in system.base_params:
-                system.base_params[key] = value
-        
-        # Ejecutar backtest
-        trades = system.backtest(symbol, test_start, test_end)
-        
-        if trades:
-            metrics = system.calculate_metrics(trades)
+        trades, metrics = _evaluate_params(params, df, regimes, self.initial_capital, symbol)
+        if metrics:
             return trades, metrics
         
         return [], None
@@ -187,8 +347,12 @@ class WalkForwardAnalysis:
         print(f"Symbol: {symbol}")
         print(f"Periods: {len(self.walk_forward_periods)}")
         print(f"Parameter combinations: {len(self.generate_param_combinations())}")
+        print(f"Workers: {self.workers}")
         print("="*80)
         
+        # Una sola descarga para todos los períodos
+        self.prefetch(symbol)
+        
         all_test_trades = []
         
         for i, period in enumerate(self.walk_forward_periods, 1):